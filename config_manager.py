@@ -466,6 +466,10 @@ class ConfigManager:
         self.get_plans() # Ensure initialization
         return self.configs.get('active_plan', "Ultra Performance 🚀")
 
+    def get_active_plan_config(self):
+        """Retorna la configuración del plan activo (dict) o None."""
+        return self.get_plan(self.get_active_plan())
+
     def set_active_plan(self, name):
         self.configs['active_plan'] = name
         self.save_configs()
@@ -489,3 +493,41 @@ class ConfigManager:
         """Guardar configuración de sincronización GCP"""
         self.configs['_gcp_sync'] = config
         self.save_configs()
+
+    # ===== Configuración de transferencias =====
+
+    DEFAULT_TRANSFER_SETTINGS = {
+        # Subidas multiparte huérfanas más antiguas que esto se abortan
+        'stale_upload_hours': 72,
+        # Antigüedad máxima del escaneo de tamaño de un bucket antes de reconciliar
+        'bucket_size_reconcile_hours': 24,
+        # Conexiones HTTP persistentes por cliente S3 compartido
+        'max_pool_connections': 50,
+        # Transferencias (workers) simultáneas admitidas por el planificador
+        'max_concurrent_transfers': 3,
+        # Límite de banda global por dirección en MB/s (0 = sin límite)
+        'download_limit_mbps': 0,
+        'upload_limit_mbps': 0,
+        # Conexiones (GETs por rango en paralelo) por descarga de disco de Azure
+        'azure_disk_connections': 8,
+        # Exportar solo las páginas asignadas de los discos (los huecos se rellenan con ceros)
+        'azure_sparse_export': True,
+        # Guardar las descargas locales de discos como .vhd.zst seekable (requiere zstandard)
+        'azure_compressed_export': False,
+        'azure_compression_level': 3,
+        # Reanudar al arrancar las transferencias que un cierre o caída dejó a medias
+        'auto_resume_transfers': True,
+    }
+
+    def get_transfer_settings(self):
+        """Obtener ajustes de transferencias combinados con los valores por defecto"""
+        settings = dict(self.DEFAULT_TRANSFER_SETTINGS)
+        settings.update(self.configs.get('_transfer_settings', {}))
+        return settings
+
+    def set_transfer_settings(self, settings):
+        """Guardar ajustes de transferencias (solo se guardan las claves indicadas)"""
+        current = self.configs.get('_transfer_settings', {})
+        current.update(settings)
+        self.configs['_transfer_settings'] = current
+        self.save_configs()
@@ -0,0 +1,426 @@
+"""
+Descarga de discos administrados de Azure a través de su URL SAS.
+
+Un único ``GET`` queda limitado por el rendimiento de un flujo TCP; en
+discos de 512 GB a 4 TB eso son horas. Aquí el disco se pide en segmentos
+con GETs por rango sobre varias conexiones (``SegmentedDownloader``), cada
+uno escrito en su desplazamiento de un ``.part`` preasignado, y el mapa de
+segmentos completados permite reanudar tras un corte.
+
+Los discos administrados son page blobs casi vacíos: en modo disperso se
+consultan sus rangos de páginas (``comp=pagelist``) y solo se piden los
+rangos con datos. En local los huecos quedan como huecos del archivo; en
+streaming (``SparseRangeReader``) los ceros se generan sin tocar la red.
+
+Si el blob tiene ``Content-MD5`` la descarga lo verifica en línea (ver
+``core.integrity``); los discos administrados normalmente no lo tienen.
+
+``export_disk_compressed`` guarda el disco como ``.zst`` seekable (ver
+``core.seekable_zstd``), comprimido en paralelo mientras se descarga.
+
+Solo se usa HTTP plano (``requests``), por lo que funciona igual contra
+cualquier servidor que admita ``Range``.
+"""
+
+import bisect
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from core.chunk_manifest import ChunkLedger
+from core.integrity import ExpectedChecksums, IntegrityCheck
+from core.seekable_zstd import DEFAULT_COMPRESSION_LEVEL, FRAME_SIZE, SeekableZstdExporter
+from core.segmented_download import (
+    DEFAULT_SEGMENT_SIZE, MAX_SEGMENT_ATTEMPTS, READ_CHUNK_SIZE, ByteRanges, DownloadProgressCallback,
+    FetchRange, RemoteObjectChanged, SegmentedDownloader
+)
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+try:
+    from logger_manager import get_logger
+
+    _logger = get_logger(__name__)
+except ImportError:  # pragma: no cover - fallback defensivo
+    _logger = None
+
+
+# Conexiones simultáneas por disco (ajustable en la configuración)
+DEFAULT_DISK_CONNECTIONS = 8
+# Segundos de espera para conectar y entre bloques recibidos
+HTTP_TIMEOUT = (30, 300)
+
+MIB = 1024 * 1024
+GIB = 1024 * MIB
+# Versión del API de Blob con paginación (NextMarker) en Get Page Ranges
+PAGE_RANGES_API_VERSION = "2020-10-02"
+# Ventana de cada consulta de páginas: en discos muy fragmentados una
+# consulta sobre todo el disco puede agotar el tiempo del servicio
+PAGE_RANGES_WINDOW = 64 * GIB
+# Huecos menores que esto se piden igualmente: sale más barato que otro GET
+SPARSE_MERGE_GAP = MIB
+
+
+def open_session(max_connections: int = DEFAULT_DISK_CONNECTIONS):
+    """Sesión HTTP con un pool de conexiones persistentes para los segmentos"""
+    if not REQUESTS_AVAILABLE:
+        raise ImportError("requests no está instalado")
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, max_connections))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _head_disk(session, sas_url: str):
+    response = session.head(sas_url, timeout=HTTP_TIMEOUT, allow_redirects=True)
+    response.raise_for_status()
+    size = int(response.headers.get("Content-Length", 0))
+    if size <= 0:
+        raise IOError("El servidor no informó del tamaño del disco")
+    return size, response.headers
+
+
+def probe_disk(session, sas_url: str) -> Tuple[int, Optional[str]]:
+    """Tamaño y ETag del disco (``HEAD`` sobre la URL SAS)"""
+    size, headers = _head_disk(session, sas_url)
+    return size, headers.get("ETag")
+
+
+def range_fetcher(session, sas_url: str, etag: Optional[str] = None):
+    """
+    ``fetch_range(start, end)`` para ``SegmentedDownloader`` sobre la URL SAS.
+
+    Con ETag, cada petición lleva ``If-Match``: si el disco cambia a mitad
+    de la descarga los segmentos viejos no se mezclan con los nuevos.
+    """
+    def fetch_range(start: int, end: int):
+        headers = {"Range": f"bytes={start}-{end}"}
+        if etag:
+            headers["If-Match"] = etag
+        response = session.get(sas_url, headers=headers, stream=True, timeout=HTTP_TIMEOUT)
+        try:
+            if response.status_code == 412:
+                raise RemoteObjectChanged("El disco cambió durante la descarga")
+            response.raise_for_status()
+            if response.status_code != 206:
+                # Un 200 traería el disco entero a este segmento
+                raise IOError(f"El servidor ignoró el rango {start}-{end} (HTTP {response.status_code})")
+            for chunk in response.iter_content(chunk_size=READ_CHUNK_SIZE):
+                if chunk:
+                    yield chunk
+        finally:
+            response.close()
+
+    return fetch_range
+
+
+def get_page_ranges(session, sas_url: str, total_size: int,
+                    window: int = PAGE_RANGES_WINDOW) -> List[Tuple[int, int]]:
+    """
+    Rangos con datos (inicio, fin_inclusivo) del page blob del disco.
+
+    Raises:
+        IOError: el servidor no admite ``comp=pagelist`` (no es un page blob).
+    """
+    ranges = []
+    for window_start in range(0, total_size, window):
+        window_end = min(window_start + window, total_size) - 1
+        marker = None
+        while True:
+            params = {"comp": "pagelist"}
+            if marker:
+                params["marker"] = marker
+            response = session.get(
+                sas_url, params=params, timeout=HTTP_TIMEOUT,
+                headers={"x-ms-version": PAGE_RANGES_API_VERSION,
+                         "x-ms-range": f"bytes={window_start}-{window_end}"},
+            )
+            if response.status_code != 200:
+                raise IOError(f"Get Page Ranges no disponible (HTTP {response.status_code})")
+            try:
+                root = ET.fromstring(response.content)
+            except ET.ParseError as exc:
+                raise IOError(f"Respuesta de Get Page Ranges ilegible: {exc}")
+            if root.tag != "PageList":
+                raise IOError("Respuesta de Get Page Ranges inesperada")
+            for page_range in root.iter("PageRange"):
+                ranges.append((int(page_range.findtext("Start")), int(page_range.findtext("End"))))
+            marker = root.findtext("NextMarker")
+            if not marker:
+                break
+    return coalesce_ranges(ranges)
+
+
+def coalesce_ranges(ranges: ByteRanges, max_gap: int = 0) -> List[Tuple[int, int]]:
+    """Ordenar y unir rangos solapados, contiguos o separados por menos de ``max_gap``"""
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1 + max_gap:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class SparseRangeReader:
+    """
+    Lectura (file-like) de un disco disperso, o de la ventana ``[start, end]``.
+
+    Los rangos con datos se piden con ``fetch_range``; los huecos se
+    devuelven como ceros generados localmente. Las posiciones (``tell``,
+    ``seek``) son relativas a la ventana, y ``seek`` vuelve a pedir desde el
+    punto indicado: un cliente que reintenta un envío puede rebobinar.
+    """
+
+    def __init__(self, fetch_range: FetchRange, total_size: int, data_ranges: ByteRanges,
+                 start: int = 0, end: Optional[int] = None) -> None:
+        self.fetch_range = fetch_range
+        self.total_size = total_size
+        self.start = start
+        self.end = total_size - 1 if end is None else end
+        # Rangos con datos recortados a la ventana
+        self.data_ranges = [
+            (max(range_start, self.start), min(range_end, self.end))
+            for range_start, range_end in data_ranges
+            if range_start <= self.end and range_end >= self.start
+        ]
+        self._range_ends = [range_end for _, range_end in self.data_ranges]
+        self.data_bytes = sum(range_end - range_start + 1 for range_start, range_end in self.data_ranges)
+        self._position = self.start
+        self._range_index = 0
+        self._chunks: Optional[Iterator[bytes]] = None
+        self._buffer = b""
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start + 1
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.end + 1 - self._position
+        parts = []
+        while size > 0 and self._position <= self.end:
+            data = self._read_some(size)
+            parts.append(data)
+            size -= len(data)
+        return b"".join(parts)
+
+    def _read_some(self, size: int) -> bytes:
+        if self._range_index < len(self.data_ranges):
+            start, end = self.data_ranges[self._range_index]
+        else:
+            start = end = self.end + 1
+        if self._position < start:
+            # Hueco: ceros hasta el siguiente rango con datos
+            length = min(size, start - self._position)
+            self._position += length
+            return bytes(length)
+        if self._chunks is None:
+            self._chunks = iter(self.fetch_range(self._position, end))
+        if not self._buffer:
+            self._buffer = next(self._chunks, b"")
+            if not self._buffer:
+                raise IOError(f"Rango {start}-{end} incompleto en la posición {self._position}")
+        data = self._buffer[:min(size, end - self._position + 1)]
+        self._buffer = self._buffer[len(data):]
+        self._position += len(data)
+        if self._position > end:
+            self._close_range()
+            self._range_index += 1
+        return data
+
+    def _close_range(self) -> None:
+        close = getattr(self._chunks, "close", None)
+        if close:
+            close()
+        self._chunks = None
+        self._buffer = b""
+
+    def tell(self) -> int:
+        return self._position - self.start
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        base = {0: 0, 1: self.tell(), 2: self.size}[whence]
+        position = self.start + min(max(0, base + offset), self.size)
+        if position != self._position:
+            self._close_range()
+            self._position = position
+            self._range_index = bisect.bisect_left(self._range_ends, position)
+        return self.tell()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        self._close_range()
+
+
+def window_reader(fetch_range: FetchRange, total_size: int, data_ranges: ByteRanges,
+                  cancel_event: Optional[threading.Event] = None) -> Callable[[int, int], bytes]:
+    """
+    ``read(offset, length)`` de una ventana del disco, con reintentos.
+
+    Para los motores que piden bloques enteros (partes multiparte, tramas
+    zstd): un corte de red a mitad de bloque repite la lectura, con espera
+    creciente, hasta ``MAX_SEGMENT_ATTEMPTS`` veces, igual que un segmento
+    de ``SegmentedDownloader``. Un disco que cambió no se reintenta.
+    """
+    def read(offset: int, length: int) -> bytes:
+        for attempt in range(1, MAX_SEGMENT_ATTEMPTS + 1):
+            reader = SparseRangeReader(fetch_range, total_size, data_ranges, offset, offset + length - 1)
+            try:
+                return reader.read()
+            except RemoteObjectChanged:
+                raise
+            except Exception as exc:  # noqa: BLE001
+                if attempt == MAX_SEGMENT_ATTEMPTS or (cancel_event is not None and cancel_event.is_set()):
+                    raise
+                if _logger:
+                    _logger.warning("Lectura %d-%d falló (intento %d): %s",
+                                    offset, offset + length - 1, attempt, exc)
+                delay = min(2 ** attempt, 10)
+                if cancel_event is not None:
+                    cancel_event.wait(delay)
+                else:
+                    time.sleep(delay)
+            finally:
+                reader.close()
+
+    return read
+
+
+def sparse_ranges(session, sas_url: str, total_size: int) -> Optional[List[Tuple[int, int]]]:
+    """Rangos con datos para el modo disperso, o None si hay que leer el disco entero"""
+    try:
+        ranges = get_page_ranges(session, sas_url, total_size)
+    except Exception as exc:  # noqa: BLE001 - sin rangos se descarga todo
+        if _logger:
+            _logger.warning("Sin rangos de páginas, se lee el disco completo: %s", exc)
+        return None
+    ranges = coalesce_ranges(ranges, SPARSE_MERGE_GAP)
+    if _logger:
+        data_bytes = sum(end - start + 1 for start, end in ranges)
+        _logger.info("Disco disperso: %.2f de %.2f GB con datos",
+                     data_bytes / GIB, total_size / GIB)
+    return ranges
+
+
+def download_disk(
+    sas_url: str,
+    output_path: str,
+    *,
+    max_connections: int = DEFAULT_DISK_CONNECTIONS,
+    segment_size: int = DEFAULT_SEGMENT_SIZE,
+    progress_callback: Optional[DownloadProgressCallback] = None,
+    cancel_event: Optional[threading.Event] = None,
+    session=None,
+    sparse: bool = True,
+    integrity_callback: Optional[Callable[[IntegrityCheck], None]] = None,
+    chunk_ledger: Optional[ChunkLedger] = None,
+) -> str:
+    """
+    Descargar el disco en ``output_path`` con ``max_connections`` GETs por rango.
+
+    Una llamada posterior con el mismo destino continúa desde los segmentos
+    ya completados (mientras el ETag del disco no cambie). Con ``sparse``
+    solo se piden las páginas asignadas y el progreso se mide sobre ellas.
+    ``integrity_callback`` recibe el resultado de la verificación en línea y
+    ``chunk_ledger`` registra los segmentos en el manifiesto de la transferencia.
+
+    Raises:
+        DownloadCancelled: con ``cancel_event`` activado; el progreso se conserva.
+        RemoteObjectChanged: el disco cambió; el estado parcial se descarta.
+        DownloadIntegrityError: el MD5 no coincide; el estado parcial se descarta.
+    """
+    own_session = session is None
+    if own_session:
+        session = open_session(max_connections)
+    try:
+        total_size, headers = _head_disk(session, sas_url)
+        etag = headers.get("ETag")
+        data_ranges = sparse_ranges(session, sas_url, total_size) if sparse else None
+        if _logger:
+            _logger.info("Descargando disco (%.2f GB) con %d conexiones",
+                         total_size / (1024 ** 3), max_connections)
+        downloader = SegmentedDownloader(
+            range_fetcher(session, sas_url, etag), output_path, total_size,
+            etag=etag.strip('"') if etag else None,
+            segment_size=segment_size,
+            max_concurrency=max_connections,
+            progress_callback=progress_callback,
+            cancel_event=cancel_event,
+            data_ranges=data_ranges,
+            expected=ExpectedChecksums.from_http_headers(headers),
+            chunk_ledger=chunk_ledger,
+        )
+        try:
+            return downloader.download()
+        finally:
+            if integrity_callback and downloader.integrity is not None:
+                integrity_callback(downloader.integrity)
+    finally:
+        if own_session:
+            session.close()
+
+
+def export_disk_compressed(
+    sas_url: str,
+    output_path: str,
+    *,
+    max_connections: int = DEFAULT_DISK_CONNECTIONS,
+    level: int = DEFAULT_COMPRESSION_LEVEL,
+    frame_size: int = FRAME_SIZE,
+    progress_callback: Optional[DownloadProgressCallback] = None,
+    cancel_event: Optional[threading.Event] = None,
+    session=None,
+    sparse: bool = True,
+) -> str:
+    """
+    Descargar el disco comprimido en tramas zstd con tabla de acceso aleatorio.
+
+    Cada una de las ``max_connections`` tareas pide una trama por rango y la
+    comprime, así que red y CPU se reparten entre los mismos hilos. Una
+    llamada posterior con el mismo destino continúa tras la última trama
+    escrita (mientras el ETag del disco no cambie).
+
+    Raises:
+        ImportError: ``zstandard`` no está instalado.
+        DownloadCancelled: con ``cancel_event`` activado; el progreso se conserva.
+        RemoteObjectChanged: el disco cambió; el estado parcial se descarta.
+    """
+    own_session = session is None
+    if own_session:
+        session = open_session(max_connections)
+    try:
+        total_size, etag = probe_disk(session, sas_url)
+        data_ranges = sparse_ranges(session, sas_url, total_size) if sparse else None
+        ranges = data_ranges if data_ranges is not None else [(0, total_size - 1)]
+        read_frame = window_reader(range_fetcher(session, sas_url, etag), total_size, ranges, cancel_event)
+
+        if _logger:
+            _logger.info("Exportando disco comprimido (%.2f GB) con %d conexiones",
+                         total_size / GIB, max_connections)
+        exporter = SeekableZstdExporter(
+            read_frame, output_path, total_size,
+            source_id=etag.strip('"') if etag else None,
+            frame_size=frame_size,
+            level=level,
+            max_concurrency=max_connections,
+            progress_callback=progress_callback,
+            cancel_event=cancel_event,
+            data_ranges=data_ranges,
+        )
+        return exporter.export()
+    finally:
+        if own_session:
+            session.close()
@@ -0,0 +1,135 @@
+"""
+Libro de tamaños por bucket con actualización incremental.
+
+Evita recorrer todo el bucket en cada refresco del dashboard: el tamaño se
+siembra con un escaneo completo y después se ajusta con los deltas de las
+operaciones de la propia aplicación (subidas, borrados, sincronizaciones).
+Una reconciliación periódica en segundo plano corrige la deriva causada por
+sobrescrituras o cambios hechos desde otros clientes.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+try:
+    from logger_manager import get_logger
+
+    _logger = get_logger(__name__)
+except ImportError:  # pragma: no cover - fallback defensivo
+    _logger = None
+
+
+DEFAULT_LEDGER_FILE = "bucket_sizes.json"
+
+# Antigüedad máxima de un escaneo antes de programar una reconciliación
+DEFAULT_RECONCILE_HOURS = 24
+
+
+class BucketSizeLedger:
+    """Tamaño y número de objetos por bucket, persistido en JSON"""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or os.path.join(os.getcwd(), DEFAULT_LEDGER_FILE)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    @staticmethod
+    def make_key(endpoint: str, bucket: str) -> str:
+        return f"{endpoint}|{bucket}"
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f).get("buckets", {})
+        except Exception as exc:  # noqa: BLE001
+            if _logger:
+                _logger.warning("Libro de tamaños ilegible (%s): %s", self.path, exc)
+            self._entries = {}
+
+    def _save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"buckets": self._entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as exc:  # noqa: BLE001
+            if _logger:
+                _logger.error("Error guardando libro de tamaños: %s", exc)
+
+    def get(self, endpoint: str, bucket: str) -> Optional[Dict[str, Any]]:
+        """Retorna {'size', 'objects', 'scanned_at', 'updated_at', 'stale'} o None si no está sembrado."""
+        with self._lock:
+            entry = self._entries.get(self.make_key(endpoint, bucket))
+            return dict(entry) if entry else None
+
+    def seed(self, endpoint: str, bucket: str, size: int, objects: int) -> None:
+        """Registrar el resultado de un escaneo completo"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._entries[self.make_key(endpoint, bucket)] = {
+                'size': int(size),
+                'objects': int(objects),
+                'scanned_at': now,
+                'updated_at': now,
+                'stale': False,
+            }
+            self._save()
+
+    def apply_delta(self, endpoint: str, bucket: str, size_delta: int, objects_delta: int = 0) -> None:
+        """Ajustar el tamaño de un bucket sembrado; se ignora si aún no hay escaneo"""
+        with self._lock:
+            entry = self._entries.get(self.make_key(endpoint, bucket))
+            if entry is None:
+                return
+            entry['size'] = max(0, entry['size'] + int(size_delta))
+            entry['objects'] = max(0, entry['objects'] + int(objects_delta))
+            entry['updated_at'] = datetime.now().isoformat()
+            self._save()
+
+    def reset(self, endpoint: str, bucket: str) -> None:
+        """El bucket quedó vacío (purga completa)"""
+        self.seed(endpoint, bucket, 0, 0)
+
+    def mark_stale(self, endpoint: str, bucket: str) -> None:
+        """Marcar para reconciliar (cambios cuyo delta no se conoce, p. ej. rclone sync)"""
+        with self._lock:
+            entry = self._entries.get(self.make_key(endpoint, bucket))
+            if entry is None or entry.get('stale'):
+                return
+            entry['stale'] = True
+            self._save()
+
+    def forget(self, endpoint: str, bucket: str) -> None:
+        """Eliminar el registro (bucket borrado)"""
+        with self._lock:
+            if self._entries.pop(self.make_key(endpoint, bucket), None) is not None:
+                self._save()
+
+    def needs_reconcile(self, endpoint: str, bucket: str,
+                        max_age_hours: float = DEFAULT_RECONCILE_HOURS) -> bool:
+        """True si el bucket no está sembrado, está marcado o su escaneo es antiguo"""
+        entry = self.get(endpoint, bucket)
+        if entry is None or entry.get('stale'):
+            return True
+        try:
+            scanned_at = datetime.fromisoformat(entry['scanned_at'])
+        except (KeyError, TypeError, ValueError):
+            return True
+        return datetime.now() - scanned_at > timedelta(hours=max_age_hours)
+
+
+_ledger_instance: Optional[BucketSizeLedger] = None
+
+
+def get_bucket_ledger() -> BucketSizeLedger:
+    """Obtener instancia singleton del libro de tamaños"""
+    global _ledger_instance
+    if _ledger_instance is None:
+        _ledger_instance = BucketSizeLedger()
+    return _ledger_instance
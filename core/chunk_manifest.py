@@ -0,0 +1,186 @@
+"""
+Manifiesto de fragmentos de una transferencia.
+
+Un único contador de bytes solo permite reanudar un flujo contiguo. El
+manifiesto divide la transferencia en fragmentos de tamaño fijo y guarda un
+mapa de bits de los completados, de modo que varios rangos pueden ir en
+paralelo (y terminar en cualquier orden) y tras un corte solo se repiten los
+que faltan.
+
+Persistido, el mapa de bits va comprimido con zlib y en base64: un disco de
+2 TB en fragmentos de 8 MiB son 32 KiB de bits, y las rachas de fragmentos
+hechos o pendientes se comprimen a unos pocos bytes.
+
+El manifiesto queda ligado a su origen (``source_id``, p. ej. el ETag): uno
+guardado para otro origen no sirve para reanudar. ``ChunkLedger`` enlaza los
+motores por rangos con el manifiesto guardado en la transferencia
+(``TransferInfo``), sin que el motor dependa del ``TransferManager``.
+"""
+
+import base64
+import math
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+MIB = 1024 * 1024
+
+DEFAULT_CHUNK_SIZE = 8 * MIB
+
+
+class ChunkManifest:
+    """
+    Mapa de bits de fragmentos completados.
+
+    No es seguro entre hilos por sí solo: quien lo comparte (el
+    TransferManager, ``SegmentState``) lo protege con su propio lock.
+    """
+
+    def __init__(self, total_bytes: int, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 bitmap: Optional[bytes] = None, source_id: Optional[str] = None) -> None:
+        if chunk_size <= 0:
+            raise ValueError("chunk_size debe ser positivo")
+        self.total_bytes = total_bytes
+        self.chunk_size = chunk_size
+        self.source_id = source_id
+        self.chunk_count = max(1, math.ceil(total_bytes / chunk_size)) if total_bytes else 0
+        self._bitmap = bytearray((self.chunk_count + 7) // 8)
+        self._done_count = 0
+        self._done_bytes = 0
+        if bitmap is not None:
+            self.load_bitmap(bitmap)
+
+    # ----- Consulta -----
+
+    def chunk_range(self, index: int) -> Tuple[int, int]:
+        """(inicio, fin_inclusivo) del fragmento"""
+        start = index * self.chunk_size
+        return start, min(start + self.chunk_size, self.total_bytes) - 1
+
+    def chunk_length(self, index: int) -> int:
+        start, end = self.chunk_range(index)
+        return end - start + 1
+
+    def is_done(self, index: int) -> bool:
+        return bool(self._bitmap[index // 8] & (1 << (index % 8)))
+
+    def pending_chunks(self) -> List[int]:
+        return list(self.iter_pending())
+
+    def iter_pending(self) -> Iterator[int]:
+        for byte_index, value in enumerate(self._bitmap):
+            if value == 0xFF:
+                continue
+            base = byte_index * 8
+            for bit in range(8):
+                index = base + bit
+                if index < self.chunk_count and not value & (1 << bit):
+                    yield index
+
+    @property
+    def done_count(self) -> int:
+        return self._done_count
+
+    @property
+    def completed_bytes(self) -> int:
+        return self._done_bytes
+
+    @property
+    def is_complete(self) -> bool:
+        return self._done_count == self.chunk_count
+
+    # ----- Cambios -----
+
+    def mark_done(self, index: int) -> bool:
+        """Marcar un fragmento; False si ya lo estaba"""
+        if not 0 <= index < self.chunk_count:
+            raise IndexError(f"Fragmento {index} fuera de rango (0-{self.chunk_count - 1})")
+        mask = 1 << (index % 8)
+        if self._bitmap[index // 8] & mask:
+            return False
+        self._bitmap[index // 8] |= mask
+        self._done_count += 1
+        self._done_bytes += self.chunk_length(index)
+        return True
+
+    def load_bitmap(self, bitmap: bytes) -> None:
+        """Sustituir el mapa de bits (p. ej. al cargar un estado guardado)"""
+        if len(bitmap) != len(self._bitmap):
+            raise ValueError(f"Mapa de bits de {len(bitmap)} bytes; se esperaban {len(self._bitmap)}")
+        self._bitmap[:] = bitmap
+        # Bits sobrantes del último byte: nunca cuentan
+        extra = len(self._bitmap) * 8 - self.chunk_count
+        if extra:
+            self._bitmap[-1] &= 0xFF >> extra
+        self._done_count = 0
+        self._done_bytes = 0
+        for index in range(self.chunk_count):
+            if self.is_done(index):
+                self._done_count += 1
+                self._done_bytes += self.chunk_length(index)
+
+    def bitmap(self) -> bytes:
+        return bytes(self._bitmap)
+
+    # ----- Persistencia -----
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_bytes": self.total_bytes,
+            "chunk_size": self.chunk_size,
+            "source_id": self.source_id,
+            "bitmap": base64.b64encode(zlib.compress(bytes(self._bitmap), 9)).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ChunkManifest":
+        bitmap = zlib.decompress(base64.b64decode(data.get("bitmap", ""))) if data.get("bitmap") else None
+        return cls(int(data["total_bytes"]), int(data["chunk_size"]), bitmap, data.get("source_id"))
+
+    def copy(self) -> "ChunkManifest":
+        return ChunkManifest(self.total_bytes, self.chunk_size, self.bitmap(), self.source_id)
+
+    def matches(self, total_bytes: int, chunk_size: Optional[int] = None,
+                source_id: Optional[str] = None) -> bool:
+        """True si el manifiesto describe el mismo tamaño (y tamaño de fragmento y origen, si se indican)"""
+        return (self.total_bytes == total_bytes
+                and (chunk_size is None or self.chunk_size == chunk_size)
+                and (source_id is None or self.source_id == source_id))
+
+
+class ChunkLedger:
+    """
+    Manifiesto de una transferencia visto desde un motor por rangos.
+
+    El motor (``SegmentedDownloader``, ``ComposeUploader``) registra su
+    manifiesto al empezar (``start``) y cada fragmento al completarlo
+    (``mark_done``, desde cualquier hilo); al reanudar sin estado propio
+    puede leer el registrado (``recorded``).
+
+    Ejemplo de uso:
+
+        ledger = transfer_manager.chunk_ledger(transfer_id)
+        download_disk(sas_url, "D:/web01.vhd", chunk_ledger=ledger)
+    """
+
+    def __init__(self, load: Callable[[], Optional[ChunkManifest]],
+                 store: Callable[[ChunkManifest], None],
+                 mark_done: Callable[[int], None]) -> None:
+        self._load = load
+        self._store = store
+        self._mark_done = mark_done
+
+    def recorded(self, total_bytes: int, chunk_size: int,
+                 source_id: Optional[str]) -> Optional[ChunkManifest]:
+        """Copia del manifiesto registrado si corresponde al mismo origen, o None"""
+        manifest = self._load()
+        # Sin origen conocido no se puede descartar que sea otro: se exige igualdad exacta
+        if manifest is None or not manifest.matches(total_bytes, chunk_size) or manifest.source_id != source_id:
+            return None
+        return manifest
+
+    def start(self, manifest: ChunkManifest) -> None:
+        """Registrar el manifiesto con el que arranca el motor (sustituye al anterior)"""
+        self._store(manifest.copy())
+
+    def mark_done(self, index: int) -> None:
+        self._mark_done(index)
@@ -0,0 +1,438 @@
+"""
+Backups deduplicados con fragmentación definida por contenido (CDC).
+
+Cada archivo se corta en fragmentos de tamaño variable con un hash rodante
+(gear, estilo FastCDC): los cortes dependen del contenido y no de la
+posición, de modo que insertar o borrar bytes solo altera los fragmentos
+vecinos. Los fragmentos se guardan en el bucket direccionados por su
+SHA-256 y cada instantánea es un manifiesto comprimido que lista, por
+archivo, sus fragmentos en orden.
+
+Una copia repetida solo sube los fragmentos que el bucket no tiene, y los
+archivos con el mismo tamaño y mtime que en la instantánea anterior
+reutilizan su lista de fragmentos sin volver a leerse. La restauración
+reensambla cada archivo a partir del manifiesto y verifica cada fragmento.
+
+Estructura bajo el prefijo (``dedup/`` por defecto)::
+
+    chunks/<ab>/<sha256>                 fragmento (contenido tal cual)
+    snapshots/<origen>/<id>.json.gz      manifiesto de la instantánea
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+try:
+    from logger_manager import get_logger
+
+    _logger = get_logger(__name__)
+except ImportError:  # pragma: no cover - fallback defensivo
+    _logger = None
+
+
+KIB = 1024
+MIB = 1024 * KIB
+
+MIN_CHUNK_SIZE = 512 * KIB
+AVG_CHUNK_SIZE = 1 * MIB
+MAX_CHUNK_SIZE = 4 * MIB
+DEFAULT_DEDUP_PREFIX = "dedup/"
+DEFAULT_DEDUP_CONCURRENCY = 16
+MANIFEST_VERSION = 1
+READ_SIZE = 8 * MIB
+
+_HASH_BITS = 32
+_HASH_MASK = (1 << _HASH_BITS) - 1
+# Tabla gear determinista: los cortes deben ser idénticos entre ejecuciones y equipos
+_GEAR = tuple(
+    int.from_bytes(hashlib.sha256(bytes([i])).digest()[:_HASH_BITS // 8], 'big') for i in range(256)
+)
+
+# progress_callback(phase, done, total, detail)
+DedupProgressCallback = Callable[[str, int, int, str], None]
+
+
+class DedupCancelled(Exception):
+    """La operación se canceló con ``cancel_event``"""
+
+
+def _cut_masks(avg_size: int):
+    # Bits altos del gear: los bajos solo dependen de los últimos bytes
+    bits = max(1, avg_size.bit_length() - 1)
+
+    def high_bits(n: int) -> int:
+        n = min(n, _HASH_BITS)
+        return ((1 << n) - 1) << (_HASH_BITS - n)
+
+    # Normalización FastCDC: más estricto antes del tamaño medio, más laxo después
+    return high_bits(bits + 2), high_bits(max(1, bits - 2))
+
+
+def _scan(data, start: int, stop: int, h: int, mask: int):
+    """Primer corte en ``data[start:stop]`` como ``(posición, hash)``; posición None si no hay"""
+    gear = _GEAR
+    i = start
+    for byte in data[start:stop]:
+        h = ((h << 1) + gear[byte]) & _HASH_MASK
+        i += 1
+        if not h & mask:
+            return i, h
+    return None, h
+
+
+def find_cut_point(data, min_size: int = MIN_CHUNK_SIZE, avg_size: int = AVG_CHUNK_SIZE,
+                   max_size: int = MAX_CHUNK_SIZE) -> int:
+    """
+    Longitud del primer fragmento de ``data``.
+
+    Los primeros ``min_size`` bytes no se examinan (salto de FastCDC), lo
+    que además acota el coste del bucle en Python.
+    """
+    length = len(data)
+    if length <= min_size:
+        return length
+    limit = min(length, max_size)
+    normal = min(avg_size, limit)
+    mask_small, mask_large = _cut_masks(avg_size)
+    cut, h = _scan(data, min_size, normal, 0, mask_small)
+    if cut is None:
+        cut, h = _scan(data, normal, limit, h, mask_large)
+    return limit if cut is None else cut
+
+
+def iter_chunks(stream, min_size: int = MIN_CHUNK_SIZE, avg_size: int = AVG_CHUNK_SIZE,
+                max_size: int = MAX_CHUNK_SIZE) -> Iterator[bytes]:
+    """Fragmentos definidos por contenido de un flujo binario (memoria acotada)"""
+    buffer = b''
+    pos = 0
+    eof = False
+    while True:
+        if not eof and len(buffer) - pos < max_size:
+            data = stream.read(max(READ_SIZE, max_size))
+            if data:
+                buffer = buffer[pos:] + data
+                pos = 0
+            else:
+                eof = True
+            continue
+        if pos >= len(buffer):
+            return
+        cut = find_cut_point(memoryview(buffer)[pos:], min_size, avg_size, max_size)
+        yield buffer[pos:pos + cut]
+        pos += cut
+
+
+def chunk_key(prefix: str, digest: str) -> str:
+    return f"{prefix}chunks/{digest[:2]}/{digest}"
+
+
+@dataclass
+class DedupBackupResult:
+    """Resultado de una copia deduplicada"""
+    snapshot_id: Optional[str] = None
+    files: int = 0
+    # Archivos con tamaño y mtime iguales a la instantánea anterior (no se leen)
+    files_reused: int = 0
+    bytes_total: int = 0
+    bytes_scanned: int = 0
+    chunks_total: int = 0
+    chunks_uploaded: int = 0
+    bytes_uploaded: int = 0
+    # Archivos ilegibles que quedaron fuera de la instantánea: {'File', 'Message'}
+    skipped_files: List[Dict[str, Any]] = field(default_factory=list)
+    # Fragmentos que no se pudieron subir (sin ellos no se publica el manifiesto)
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        return not self.errors and self.snapshot_id is not None
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Bytes lógicos por byte enviado"""
+        return self.bytes_total / self.bytes_uploaded if self.bytes_uploaded else float('inf')
+
+
+@dataclass
+class DedupRestoreResult:
+    """Resultado de la restauración de una instantánea"""
+    files: int = 0
+    bytes_written: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        return not self.errors
+
+
+class DedupBackupEngine:
+    """
+    Copias deduplicadas de carpetas sobre un bucket S3.
+
+    Ejemplo de uso:
+
+        engine = DedupBackupEngine(s3_handler.client, "mi-bucket")
+        result = engine.backup("C:/Datos")
+        print(result.chunks_uploaded, result.dedup_ratio)
+        engine.restore(result.snapshot_id, "D:/Restaurado", source_name="Datos")
+    """
+
+    def __init__(
+        self,
+        client,
+        bucket: str,
+        *,
+        prefix: str = DEFAULT_DEDUP_PREFIX,
+        max_concurrency: int = DEFAULT_DEDUP_CONCURRENCY,
+        min_size: int = MIN_CHUNK_SIZE,
+        avg_size: int = AVG_CHUNK_SIZE,
+        max_size: int = MAX_CHUNK_SIZE,
+        progress_callback: Optional[DedupProgressCallback] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> None:
+        if not min_size < avg_size < max_size:
+            raise ValueError("Se requiere min_size < avg_size < max_size")
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix if not prefix or prefix.endswith('/') else prefix + '/'
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_size = min_size
+        self.avg_size = avg_size
+        self.max_size = max_size
+        self.progress_callback = progress_callback
+        self.cancel_event = cancel_event
+
+    # ----- Instantáneas -----
+
+    def _snapshot_prefix(self, source_name: str) -> str:
+        return f"{self.prefix}snapshots/{source_name}/"
+
+    def list_snapshots(self, source_name: str) -> List[str]:
+        """Identificadores de las instantáneas de un origen, de la más antigua a la más reciente"""
+        snapshot_prefix = self._snapshot_prefix(source_name)
+        ids = [key[len(snapshot_prefix):-len('.json.gz')]
+               for key in self._list_keys(snapshot_prefix) if key.endswith('.json.gz')]
+        return sorted(ids)
+
+    def load_manifest(self, source_name: str, snapshot_id: str) -> Dict[str, Any]:
+        key = f"{self._snapshot_prefix(source_name)}{snapshot_id}.json.gz"
+        body = self.client.get_object(Bucket=self.bucket, Key=key)['Body'].read()
+        manifest = json.loads(gzip.decompress(body))
+        if manifest.get('version') != MANIFEST_VERSION:
+            raise ValueError(f"Versión de manifiesto no soportada: {manifest.get('version')}")
+        return manifest
+
+    def _list_keys(self, prefix: str) -> Iterator[str]:
+        params = {'Bucket': self.bucket, 'Prefix': prefix, 'MaxKeys': 1000}
+        while True:
+            response = self.client.list_objects_v2(**params)
+            for obj in response.get('Contents', []):
+                yield obj['Key']
+            if not response.get('IsTruncated'):
+                return
+            params['ContinuationToken'] = response['NextContinuationToken']
+
+    # ----- Copia -----
+
+    def backup(self, source_folder: str, source_name: Optional[str] = None) -> DedupBackupResult:
+        """
+        Crear una instantánea de ``source_folder``.
+
+        Returns:
+            DedupBackupResult; ``snapshot_id`` es None si algún fragmento no
+            se pudo subir (el manifiesto solo se publica completo).
+        """
+        start = time.monotonic()
+        source_name = source_name or os.path.basename(os.path.normpath(source_folder))
+        result = DedupBackupResult()
+
+        chunks_prefix = f"{self.prefix}chunks/"
+        known: Set[str] = {key.rsplit('/', 1)[-1] for key in self._list_keys(chunks_prefix)}
+        previous = self._previous_files(source_name)
+
+        lock = threading.Lock()
+        # Contrapresión: como mucho 2×concurrencia fragmentos en memoria
+        slots = threading.BoundedSemaphore(self.max_concurrency * 2)
+
+        def upload_chunk(digest: str, data: bytes) -> None:
+            try:
+                self.client.put_object(Bucket=self.bucket, Key=chunk_key(self.prefix, digest), Body=data)
+                with lock:
+                    result.chunks_uploaded += 1
+                    result.bytes_uploaded += len(data)
+            except Exception as exc:  # noqa: BLE001 - se registra y no se publica el manifiesto
+                with lock:
+                    result.errors.append({'Chunk': digest, 'Message': str(exc)})
+            finally:
+                slots.release()
+
+        files = []
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="dedup") as executor:
+            for rel_path, full_path in self._walk(source_folder):
+                self._check_cancel()
+                try:
+                    stat = os.stat(full_path)
+                    entry = {'path': rel_path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+                    prior = previous.get(rel_path)
+                    if (prior and prior['size'] == stat.st_size and prior['mtime_ns'] == stat.st_mtime_ns
+                            and known.issuperset(prior['chunks'])):
+                        entry['chunks'] = prior['chunks']
+                        result.files_reused += 1
+                    else:
+                        entry['chunks'] = []
+                        with open(full_path, 'rb') as f:
+                            for data in iter_chunks(f, self.min_size, self.avg_size, self.max_size):
+                                self._check_cancel()
+                                digest = hashlib.sha256(data).hexdigest()
+                                entry['chunks'].append(digest)
+                                result.bytes_scanned += len(data)
+                                if digest in known:
+                                    continue
+                                known.add(digest)
+                                slots.acquire()
+                                executor.submit(upload_chunk, digest, data)
+                except DedupCancelled:
+                    raise
+                except OSError as exc:
+                    result.skipped_files.append({'File': full_path, 'Message': str(exc)})
+                    continue
+                files.append(entry)
+                result.files += 1
+                result.bytes_total += entry['size']
+                result.chunks_total += len(entry['chunks'])
+                self._report('backup', result.files, 0, rel_path)
+
+        if not result.errors:
+            result.snapshot_id = self._write_manifest(source_name, source_folder, files)
+        result.elapsed = time.monotonic() - start
+        if _logger:
+            _logger.info(
+                "Instantánea %s de '%s': %d archivos (%d reutilizados), %d/%d fragmentos nuevos, "
+                "%d bytes enviados de %d, %d errores",
+                result.snapshot_id, source_name, result.files, result.files_reused,
+                result.chunks_uploaded, result.chunks_total, result.bytes_uploaded,
+                result.bytes_total, len(result.errors),
+            )
+        return result
+
+    def _walk(self, source_folder: str) -> Iterator:
+        for root, dirs, files in os.walk(source_folder):
+            dirs.sort()
+            for name in sorted(files):
+                full_path = os.path.join(root, name)
+                # Rutas con '/' para que el manifiesto sea portable entre sistemas
+                yield os.path.relpath(full_path, source_folder).replace(os.sep, '/'), full_path
+
+    def _previous_files(self, source_name: str) -> Dict[str, Dict[str, Any]]:
+        snapshots = self.list_snapshots(source_name)
+        if not snapshots:
+            return {}
+        try:
+            manifest = self.load_manifest(source_name, snapshots[-1])
+        except Exception as exc:  # noqa: BLE001 - sin manifiesto previo se relee todo
+            if _logger:
+                _logger.warning("Manifiesto previo de '%s' ilegible: %s", source_name, exc)
+            return {}
+        chunker = manifest.get('chunker', {})
+        if chunker != self._chunker_params():
+            # Otros parámetros de corte: reutilizar las listas mezclaría dos particiones
+            return {}
+        return {entry['path']: entry for entry in manifest.get('files', [])}
+
+    def _chunker_params(self) -> Dict[str, int]:
+        return {'min': self.min_size, 'avg': self.avg_size, 'max': self.max_size}
+
+    def _write_manifest(self, source_name: str, source_folder: str, files: List[Dict[str, Any]]) -> str:
+        snapshot_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'snapshot_id': snapshot_id,
+            'source': source_folder,
+            'created_at': datetime.now().isoformat(),
+            'chunker': self._chunker_params(),
+            'files': files,
+        }
+        body = gzip.compress(json.dumps(manifest, separators=(',', ':')).encode('utf-8'))
+        key = f"{self._snapshot_prefix(source_name)}{snapshot_id}.json.gz"
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=body)
+        return snapshot_id
+
+    # ----- Restauración -----
+
+    def restore(self, snapshot_id: str, target_folder: str, *, source_name: str) -> DedupRestoreResult:
+        """Reconstruir en ``target_folder`` los archivos de una instantánea"""
+        start = time.monotonic()
+        manifest = self.load_manifest(source_name, snapshot_id)
+        entries = manifest.get('files', [])
+        result = DedupRestoreResult()
+        lock = threading.Lock()
+
+        def restore_file(entry: Dict[str, Any]) -> None:
+            rel_path = entry['path']
+            try:
+                self._restore_file(entry, target_folder)
+                with lock:
+                    result.files += 1
+                    result.bytes_written += entry['size']
+                    done = result.files
+            except DedupCancelled:
+                raise
+            except Exception as exc:  # noqa: BLE001 - seguir con el resto de archivos
+                with lock:
+                    result.errors.append({'File': rel_path, 'Message': str(exc)})
+                    done = result.files
+            self._report('restore', done, len(entries), rel_path)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="dedup-restore") as executor:
+            for future in [executor.submit(restore_file, entry) for entry in entries]:
+                future.result()
+
+        result.elapsed = time.monotonic() - start
+        return result
+
+    def _restore_file(self, entry: Dict[str, Any], target_folder: str) -> None:
+        rel_path = entry['path']
+        target = os.path.normpath(os.path.join(target_folder, *rel_path.split('/')))
+        if os.path.commonpath([os.path.abspath(target), os.path.abspath(target_folder)]) != \
+                os.path.abspath(target_folder):
+            raise ValueError(f"Ruta fuera del destino: {rel_path}")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f"{target}.part"
+        with open(tmp_path, 'wb') as f:
+            for digest in entry['chunks']:
+                self._check_cancel()
+                body = self.client.get_object(Bucket=self.bucket, Key=chunk_key(self.prefix, digest))['Body']
+                data = body.read()
+                if hashlib.sha256(data).hexdigest() != digest:
+                    raise IOError(f"Fragmento corrupto {digest} en {rel_path}")
+                f.write(data)
+        if os.path.getsize(tmp_path) != entry['size']:
+            os.remove(tmp_path)
+            raise IOError(f"Tamaño inesperado al restaurar {rel_path}")
+        os.replace(tmp_path, target)
+        mtime_ns = entry.get('mtime_ns')
+        if mtime_ns:
+            os.utime(target, ns=(mtime_ns, mtime_ns))
+
+    # ----- Utilidades -----
+
+    def _check_cancel(self) -> None:
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise DedupCancelled("Operación cancelada")
+
+    def _report(self, phase: str, done: int, total: int, detail: str) -> None:
+        if self.progress_callback:
+            try:
+                self.progress_callback(phase, done, total, detail)
+            except Exception:  # noqa: BLE001 - no detener la copia por la UI
+                pass
@@ -0,0 +1,387 @@
+"""
+Subida paralela y reanudable a Google Cloud Storage por componentes.
+
+Un único flujo hacia ``blob.upload_from_file`` queda limitado a una
+conexión y, si el origen no se puede rebobinar, cualquier reintento del
+cliente corrompe o reinicia la subida. Aquí el objeto se divide en
+componentes de tamaño fijo que se suben en paralelo como objetos
+temporales (``<destino>.parts/<etiqueta>/<índice>``), cada uno desde un
+lector rebobinable, y al final se unen en el servidor con ``compose``
+(hasta 32 fuentes por llamada, en árbol si hacen falta más).
+
+La subida de un objeto en GCS es atómica: un componente listado con su
+tamaño esperado está completo. Al reanudar basta listar el prefijo y subir
+los que faltan. La etiqueta del prefijo depende del origen (ETag, tamaño y
+tamaño de componente), así que un origen distinto nunca reutiliza
+componentes viejos.
+
+Cada componente se resume (MD5/CRC32C) mientras se lee del origen y se
+compara con lo que GCS guardó; uno que no coincide se borra y se vuelve a
+subir. Al final el CRC32C del objeto compuesto se contrasta con la
+combinación de los de sus componentes.
+
+Con ``chunk_ledger`` los componentes se registran también en el manifiesto
+de la transferencia (``TransferInfo``). El listado del bucket sigue siendo
+la referencia al reanudar: un componente solo cuenta si existe con su tamaño.
+
+Para probar contra un emulador (fake-gcs-server), ``google-cloud-storage``
+respeta ``STORAGE_EMULATOR_HOST``.
+"""
+
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from core.chunk_manifest import ChunkLedger, ChunkManifest
+from core.integrity import (
+    MISMATCH, UNVERIFIABLE, VERIFIED, ChunkDigest, ExpectedChecksums, IntegrityCheck, StreamHasher,
+    default_hasher, verify_digests
+)
+try:
+    from logger_manager import get_logger
+
+    _logger = get_logger(__name__)
+except ImportError:  # pragma: no cover - fallback defensivo
+    _logger = None
+
+
+MIB = 1024 * 1024
+
+DEFAULT_COMPONENT_SIZE = 64 * MIB
+DEFAULT_GCS_CONCURRENCY = 8
+# Límite de la API: fuentes por llamada a compose
+MAX_COMPOSE_SOURCES = 32
+# Tamaño de cada petición de la sesión reanudable de un componente
+# (múltiplo de 256 KiB; es también la memoria por hilo)
+UPLOAD_CHUNK_SIZE = 16 * MIB
+MAX_COMPONENT_ATTEMPTS = 3
+PARTS_SUFFIX = ".parts/"
+
+# open_part(start, end_inclusivo) -> lector rebobinable (read/seek/tell)
+OpenPart = Callable[[int, int], Any]
+# progress_callback(bytes_done, total_bytes)
+ComposeProgressCallback = Callable[[int, int], None]
+
+
+class ComposeUploadCancelled(Exception):
+    """La subida se detuvo; los componentes subidos se conservan para reanudarla."""
+
+
+class ComposeIntegrityError(Exception):
+    """Lo que guardó GCS no coincide con lo leído del origen."""
+
+    def __init__(self, message: str, integrity: Optional[IntegrityCheck] = None) -> None:
+        super().__init__(message)
+        self.integrity = integrity
+
+
+@dataclass
+class ComposeResult:
+    """Resultado de una subida por componentes"""
+    blob_name: str
+    total_bytes: int
+    components: int
+    uploaded: int = 0
+    # Componentes que ya estaban en el bucket (reanudación)
+    reused: int = 0
+    integrity: Optional[IntegrityCheck] = None
+
+    @property
+    def success(self) -> bool:
+        return self.uploaded + self.reused == self.components
+
+
+def source_tag(etag: Optional[str], total_size: int, component_size: int) -> str:
+    """Etiqueta estable del origen para el prefijo de componentes"""
+    key = f"{(etag or '').strip(chr(34))}:{total_size}:{component_size}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+class _ProgressReader:
+    """
+    Envuelve el lector de un componente para contar bytes, resumirlos y
+    atender la cancelación.
+
+    El cliente puede rebobinar a mitad de componente (reintento de un trozo
+    de la sesión reanudable): lo ya resumido no se vuelve a resumir.
+    """
+
+    def __init__(self, reader, report: Callable[[int], None], cancel_event: threading.Event) -> None:
+        self._reader = reader
+        self._report = report
+        self._cancel = cancel_event
+        self.hasher: Optional[StreamHasher] = None
+        self._hashed = 0
+
+    def reset_hash(self, hasher: StreamHasher) -> None:
+        """Empezar un resumen nuevo (cada intento completo del componente)"""
+        self.hasher = hasher
+        self._hashed = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if self._cancel.is_set():
+            raise ComposeUploadCancelled("Subida detenida")
+        position = self._reader.tell()
+        data = self._reader.read(size)
+        if self.hasher is not None and position + len(data) > self._hashed:
+            if position > self._hashed:
+                # Salto hacia delante: el resumen ya no describe el componente
+                self.hasher = None
+            else:
+                self.hasher.update(memoryview(data)[self._hashed - position:])
+                self._hashed = position + len(data)
+        self._report(len(data))
+        return data
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        # Un reintento rebobina: los bytes reenviados no cuentan dos veces
+        before = self._reader.tell()
+        after = self._reader.seek(offset, whence)
+        self._report(after - before)
+        return after
+
+    def tell(self) -> int:
+        return self._reader.tell()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        close = getattr(self._reader, "close", None)
+        if close:
+            close()
+
+
+class ComposeUploader:
+    """
+    Sube un origen por rangos a un objeto de GCS con componentes en paralelo y ``compose``.
+
+    Ejemplo de uso:
+
+        uploader = ComposeUploader(
+            storage.Client().bucket("mi-bucket"), "discos/web01.vhd", size,
+            lambda start, end: SparseRangeReader(fetch_range, size, ranges, start, end),
+            tag=source_tag(etag, size, DEFAULT_COMPONENT_SIZE),
+            max_concurrency=8, progress_callback=on_progress,
+        )
+        result = uploader.upload()
+    """
+
+    def __init__(
+        self,
+        bucket,
+        blob_name: str,
+        total_size: int,
+        open_part: OpenPart,
+        *,
+        tag: str,
+        component_size: int = DEFAULT_COMPONENT_SIZE,
+        max_concurrency: int = DEFAULT_GCS_CONCURRENCY,
+        content_type: str = "application/octet-stream",
+        progress_callback: Optional[ComposeProgressCallback] = None,
+        cancel_event: Optional[threading.Event] = None,
+        chunk_ledger: Optional[ChunkLedger] = None,
+    ) -> None:
+        self.bucket = bucket
+        self.blob_name = blob_name
+        self.total_size = total_size
+        self.open_part = open_part
+        self.component_size = max(1, component_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.content_type = content_type
+        self.progress_callback = progress_callback
+        self.parts_root = blob_name + PARTS_SUFFIX
+        self.tag = tag
+        self.prefix = f"{self.parts_root}{tag}/"
+        self.chunk_ledger = chunk_ledger
+        self.component_count = max(1, -(-total_size // self.component_size))
+        self._cancel = cancel_event or threading.Event()
+        self._lock = threading.Lock()
+        self._bytes_done = 0
+        # Índice -> CRC32C que GCS informa de cada componente (None si no lo informa)
+        self._component_crcs: Dict[int, Optional[int]] = {}
+        self._unverified = 0
+
+    def cancel(self) -> None:
+        """Detener la subida; los componentes completos se conservan"""
+        self._cancel.set()
+
+    def component_name(self, index: int) -> str:
+        return f"{self.prefix}{index:06d}"
+
+    def component_range(self, index: int):
+        start = index * self.component_size
+        return start, min(start + self.component_size, self.total_size) - 1
+
+    def upload(self) -> ComposeResult:
+        """
+        Subir los componentes que falten, unirlos y borrar los temporales.
+
+        Raises:
+            ComposeUploadCancelled: con ``cancel()``; los componentes subidos se conservan.
+            Exception: el primer error de un componente o de ``compose``.
+        """
+        existing = self._existing_components()
+        pending = [i for i in range(self.component_count) if i not in existing]
+        result = ComposeResult(self.blob_name, self.total_size, self.component_count,
+                               reused=len(existing))
+        self._bytes_done = sum(self._component_length(i) for i in existing)
+        if self.chunk_ledger:
+            recorded = self.chunk_ledger.recorded(self.total_size, self.component_size, self.tag)
+            lost = [i for i in range(self.component_count)
+                    if recorded is not None and recorded.is_done(i) and i not in existing]
+            if lost and _logger:
+                # p. ej. una regla de ciclo de vida del bucket borró temporales
+                _logger.warning("%d componentes registrados de %s ya no están en el bucket; se suben de nuevo",
+                                len(lost), self.blob_name)
+            manifest = ChunkManifest(self.total_size, self.component_size, source_id=self.tag)
+            for index in existing:
+                manifest.mark_done(index)
+            self.chunk_ledger.start(manifest)
+        self._report(0)
+        if _logger:
+            _logger.info("Subida por componentes a %s: %d/%d pendientes (%d hilos)",
+                         self.blob_name, len(pending), self.component_count, self.max_concurrency)
+
+        self._run(self._upload_component, pending)
+        result.uploaded = len(pending)
+        if self._cancel.is_set():
+            raise ComposeUploadCancelled("Subida detenida")
+
+        destination = self._compose_all()
+        result.integrity = self._check_composite(destination)
+        if result.integrity.status == MISMATCH:
+            raise ComposeIntegrityError(f"{self.blob_name}: {result.integrity.message}", result.integrity)
+        self._cleanup()
+        return result
+
+    def _component_length(self, index: int) -> int:
+        start, end = self.component_range(index)
+        return end - start + 1
+
+    def _existing_components(self) -> Dict[int, int]:
+        """Componentes ya subidos con su tamaño esperado (índice -> tamaño)"""
+        existing = {}
+        for blob in self.bucket.list_blobs(prefix=self.prefix):
+            suffix = blob.name[len(self.prefix):]
+            if not suffix.isdigit():
+                continue  # Compuestos intermedios de un intento anterior
+            index = int(suffix)
+            if index < self.component_count and blob.size == self._component_length(index):
+                existing[index] = blob.size
+                self._component_crcs[index] = ExpectedChecksums.from_gcs_blob(blob).crc32c
+        return existing
+
+    def _run(self, func: Callable[[Any], None], items: List[Any]) -> None:
+        if not items:
+            return
+        workers = min(self.max_concurrency, len(items))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gcs-component") as pool:
+            futures = [pool.submit(func, item) for item in items]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException:
+                # Detener el resto; lo subido queda en el bucket para reanudar
+                self._cancel.set()
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def _upload_component(self, index: int) -> None:
+        start, end = self.component_range(index)
+        reader = _ProgressReader(self.open_part(start, end), self._report, self._cancel)
+        try:
+            for attempt in range(1, MAX_COMPONENT_ATTEMPTS + 1):
+                if self._cancel.is_set():
+                    raise ComposeUploadCancelled("Subida detenida")
+                blob = self.bucket.blob(self.component_name(index), chunk_size=UPLOAD_CHUNK_SIZE)
+                reader.reset_hash(default_hasher())
+                try:
+                    blob.upload_from_file(reader, size=end - start + 1, content_type=self.content_type)
+                    self._check_component(index, blob, reader.hasher)
+                    if self.chunk_ledger:
+                        self.chunk_ledger.mark_done(index)
+                    return
+                except Exception as exc:  # noqa: BLE001
+                    # Lo enviado en un intento fallido no cuenta
+                    reader.seek(0)
+                    if isinstance(exc, ComposeUploadCancelled) or attempt == MAX_COMPONENT_ATTEMPTS:
+                        raise
+                    if _logger:
+                        _logger.warning("Componente %d falló (intento %d): %s", index, attempt, exc)
+                    time.sleep(min(2 ** attempt, 10))
+        finally:
+            reader.close()
+
+    def _check_component(self, index: int, blob, hasher: Optional[StreamHasher]) -> None:
+        """Comparar lo leído del origen con los resúmenes que GCS calculó al recibirlo"""
+        remote = ExpectedChecksums.from_gcs_blob(blob)
+        check = verify_digests(remote, [hasher.digest()]) if hasher else IntegrityCheck(UNVERIFIABLE)
+        if check.status == MISMATCH:
+            # Un componente corrupto con el tamaño correcto se reutilizaría al reanudar
+            try:
+                blob.delete()
+            except Exception:  # noqa: BLE001 - se sobrescribe en el reintento
+                pass
+            raise ComposeIntegrityError(f"Componente {index}: {check.message}", check)
+        with self._lock:
+            self._component_crcs[index] = remote.crc32c
+            if check.status != VERIFIED:
+                self._unverified += 1
+
+    def _check_composite(self, destination) -> IntegrityCheck:
+        """CRC32C del objeto compuesto frente a la combinación de los componentes"""
+        crcs = [self._component_crcs.get(i) for i in range(self.component_count)]
+        if any(crc is None for crc in crcs):
+            return IntegrityCheck(UNVERIFIABLE)
+        digests = [ChunkDigest(self._component_length(i), crc32c=crc) for i, crc in enumerate(crcs)]
+        check = verify_digests(ExpectedChecksums.from_gcs_blob(destination), digests)
+        if check.status == VERIFIED and self._unverified:
+            # El compuesto cuadra, pero algún componente no se pudo contrastar con el origen
+            return IntegrityCheck(UNVERIFIABLE, crc32c=check.crc32c)
+        return check
+
+    def _compose_all(self):
+        """Unir los componentes en árbol (32 fuentes por llamada) y luego en el destino"""
+        names = [self.component_name(i) for i in range(self.component_count)]
+        level = 0
+        while len(names) > MAX_COMPOSE_SOURCES:
+            groups = [names[i:i + MAX_COMPOSE_SOURCES] for i in range(0, len(names), MAX_COMPOSE_SOURCES)]
+            targets = [f"{self.prefix}compose-{level}-{n:05d}" for n in range(len(groups))]
+            self._run(lambda item: self._compose(*item), list(zip(targets, groups)))
+            names = targets
+            level += 1
+        return self._compose(self.blob_name, names)
+
+    def _compose(self, target: str, sources: List[str]):
+        destination = self.bucket.blob(target)
+        destination.content_type = self.content_type
+        destination.compose([self.bucket.blob(name) for name in sources])
+        return destination
+
+    def _cleanup(self) -> None:
+        """Borrar los componentes (también los de intentos con otro origen)"""
+        blobs = list(self.bucket.list_blobs(prefix=self.parts_root))
+        try:
+            self.bucket.delete_blobs(blobs, on_error=lambda blob: None)
+        except Exception as exc:  # noqa: BLE001 - el destino ya está completo
+            if _logger:
+                _logger.warning("No se pudieron borrar los componentes de %s: %s", self.blob_name, exc)
+
+    def _report(self, delta: int) -> None:
+        with self._lock:
+            self._bytes_done += delta
+            bytes_done = self._bytes_done
+        # Fuera del lock: el callback puede frenar (límite de banda) al hilo que avisa
+        if self.progress_callback:
+            try:
+                self.progress_callback(bytes_done, self.total_size)
+            except Exception:  # noqa: BLE001 - no detener la subida por la UI
+                pass
@@ -0,0 +1,355 @@
+"""
+Verificación de integridad en línea (MD5 / CRC32C) de las transferencias.
+
+Los bytes se resumen a medida que pasan por el flujo de la transferencia,
+sin una segunda lectura del destino, y el resultado se compara con lo que
+publica el proveedor: ``Content-MD5`` en Azure, ``md5Hash``/``crc32c`` en
+GCS y el ETag en S3.
+
+En las transferencias por rangos en paralelo cada fragmento lleva su propio
+resumen. Los CRC32C se combinan en el del objeto completo sin volver a leer
+datos (``crc32c_combine``); los MD5 no se pueden combinar, pero los de
+fragmentos alineados con las partes de una subida multiparte reconstruyen su
+ETag (MD5 de los MD5 binarios, ``-<partes>``). Si el proveedor solo publica un
+MD5 del objeto entero y hubo varios fragmentos, los fragmentos no lo calculan:
+la descarga segmentada lo lleva aparte sobre el prefijo contiguo completado.
+
+El CRC32C usa ``google-crc32c`` (dependencia de ``google-cloud-storage``)
+cuando está instalado. La implementación en Python puro de respaldo es
+correcta pero lenta: sin la extensión los hashers de los flujos no calculan
+CRC32C (se verifica con MD5 si el proveedor lo publica), y combinar sigue
+siendo posible porque no recorre datos.
+"""
+
+import base64
+import binascii
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+from core.s3_etag import etag_parts_count, is_verifiable_etag, normalize_etag
+
+try:
+    import google_crc32c
+    _crc32c_extend = google_crc32c.extend
+    CRC32C_AVAILABLE = True
+except ImportError:
+    _crc32c_extend = None
+    CRC32C_AVAILABLE = False
+
+# Polinomio de Castagnoli (reflejado)
+_CRC32C_POLY = 0x82F63B78
+_ZERO_BLOCK = bytes(1024 * 1024)
+
+# Resultado de una comprobación
+VERIFIED = "verified"
+MISMATCH = "mismatch"
+UNVERIFIABLE = "unverifiable"
+
+
+def _make_table() -> List[int]:
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ _CRC32C_POLY if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_CRC32C_TABLE = _make_table()
+
+
+def _crc32c_py(data: bytes, crc: int = 0) -> int:
+    crc ^= 0xFFFFFFFF
+    table = _CRC32C_TABLE
+    for byte in data:
+        crc = table[(crc ^ byte) & 0xFF] ^ (crc >> 8)
+    return crc ^ 0xFFFFFFFF
+
+
+def crc32c(data: bytes, crc: int = 0) -> int:
+    """CRC32C de ``data``, continuando desde ``crc`` (0 para empezar)"""
+    if _crc32c_extend is not None:
+        # La extensión solo acepta bytes de solo lectura (no memoryview/bytearray)
+        if not isinstance(data, bytes):
+            data = bytes(data)
+        return _crc32c_extend(crc, data)
+    return _crc32c_py(data, crc)
+
+
+def _multmodp(a: int, b: int) -> int:
+    """Producto de dos polinomios módulo el de CRC32C (representación reflejada)"""
+    m = 1 << 31
+    p = 0
+    while True:
+        if a & m:
+            p ^= b
+            if not a & (m - 1):
+                break
+        m >>= 1
+        b = (b >> 1) ^ _CRC32C_POLY if b & 1 else b >> 1
+    return p
+
+
+def _make_x2n_table() -> List[int]:
+    # x^(2^k) módulo el polinomio, para desplazar un CRC n bytes en O(log n)
+    table = []
+    p = 1 << 30  # x^1
+    for _ in range(32):
+        table.append(p)
+        p = _multmodp(p, p)
+    return table
+
+
+_X2N_TABLE = _make_x2n_table()
+
+
+def _x8nmodp(length: int) -> int:
+    p = 1 << 31  # x^0
+    k = 3
+    while length:
+        if length & 1:
+            p = _multmodp(_X2N_TABLE[k & 31], p)
+        length >>= 1
+        k += 1
+    return p
+
+
+def crc32c_combine(crc1: int, crc2: int, length2: int) -> int:
+    """CRC32C de ``A + B`` a partir del de ``A``, el de ``B`` y la longitud de ``B``"""
+    if length2 <= 0:
+        return crc1
+    return _multmodp(_x8nmodp(length2), crc1) ^ crc2
+
+
+def crc32c_zeros(length: int, crc: int = 0) -> int:
+    """CRC32C tras añadir ``length`` bytes a cero, sin generarlos"""
+    if length <= 0:
+        return crc
+    zeros = _multmodp(_x8nmodp(length), 0xFFFFFFFF) ^ 0xFFFFFFFF
+    return crc32c_combine(crc, zeros, length)
+
+
+@dataclass
+class ChunkDigest:
+    """Resúmenes de un fragmento contiguo (o del objeto entero)"""
+    length: int
+    md5: Optional[str] = None
+    crc32c: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"length": self.length, "md5": self.md5, "crc32c": self.crc32c}
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "ChunkDigest":
+        return cls(int(data["length"]), data.get("md5"), data.get("crc32c"))
+
+
+class StreamHasher:
+    """
+    MD5 y CRC32C incrementales de un flujo.
+
+    Ejemplo de uso:
+
+        hasher = StreamHasher(md5=True, crc32c=True)
+        for chunk in body:
+            f.write(chunk)
+            hasher.update(chunk)
+        digest = hasher.digest()
+    """
+
+    def __init__(self, md5: bool = True, crc32c: bool = True) -> None:
+        self._md5 = hashlib.md5() if md5 else None
+        self._crc = 0 if crc32c else None
+        self.length = 0
+
+    def update(self, data: bytes) -> None:
+        if self._md5 is not None:
+            self._md5.update(data)
+        if self._crc is not None:
+            self._crc = crc32c(data, self._crc)
+        self.length += len(data)
+
+    def update_zeros(self, length: int) -> None:
+        """Añadir un hueco de ceros (discos dispersos) sin pedirlo a la red"""
+        if length <= 0:
+            return
+        if self._crc is not None:
+            self._crc = crc32c_zeros(length, self._crc)
+        if self._md5 is not None:
+            remaining = length
+            while remaining > 0:
+                block = min(remaining, len(_ZERO_BLOCK))
+                self._md5.update(memoryview(_ZERO_BLOCK)[:block])
+                remaining -= block
+        self.length += length
+
+    def digest(self) -> ChunkDigest:
+        return ChunkDigest(
+            self.length,
+            self._md5.hexdigest() if self._md5 is not None else None,
+            self._crc,
+        )
+
+
+def default_hasher() -> StreamHasher:
+    """MD5, más CRC32C si la extensión nativa está instalada"""
+    return StreamHasher(md5=True, crc32c=CRC32C_AVAILABLE)
+
+
+def combine_digests(digests: Sequence[ChunkDigest]) -> ChunkDigest:
+    """
+    Resumen del objeto a partir de los de sus fragmentos consecutivos.
+
+    El CRC32C se combina; el MD5 solo se conserva si hay un único fragmento.
+    """
+    length = sum(digest.length for digest in digests)
+    crc = None
+    if digests and all(digest.crc32c is not None for digest in digests):
+        crc = digests[0].crc32c
+        for digest in digests[1:]:
+            crc = crc32c_combine(crc, digest.crc32c, digest.length)
+    md5 = digests[0].md5 if len(digests) == 1 else None
+    return ChunkDigest(length, md5, crc)
+
+
+def multipart_etag(digests: Sequence[ChunkDigest]) -> Optional[str]:
+    """ETag multiparte de S3 si cada fragmento es una parte, o None sin MD5"""
+    if not digests or any(digest.md5 is None for digest in digests):
+        return None
+    joined = b"".join(binascii.unhexlify(digest.md5) for digest in digests)
+    return f"{hashlib.md5(joined).hexdigest()}-{len(digests)}"
+
+
+def _b64_md5(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    try:
+        return base64.b64decode(value).hex()
+    except (binascii.Error, ValueError):
+        return None
+
+
+def _b64_crc32c(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    try:
+        raw = base64.b64decode(value)
+    except (binascii.Error, ValueError):
+        return None
+    return int.from_bytes(raw, "big") if len(raw) == 4 else None
+
+
+def encode_crc32c(value: int) -> str:
+    """CRC32C en el formato de GCS (base64 de 4 bytes big-endian)"""
+    return base64.b64encode(value.to_bytes(4, "big")).decode("ascii")
+
+
+@dataclass
+class ExpectedChecksums:
+    """Resúmenes que publica el proveedor para el objeto"""
+    md5: Optional[str] = None
+    crc32c: Optional[int] = None
+    # ETag S3 multiparte y tamaño de sus partes
+    etag: Optional[str] = None
+    part_size: Optional[int] = None
+
+    @property
+    def empty(self) -> bool:
+        return self.md5 is None and self.crc32c is None and self.etag is None
+
+    @classmethod
+    def from_gcs_blob(cls, blob) -> "ExpectedChecksums":
+        """``md5_hash`` y ``crc32c`` de un blob (los compuestos solo traen CRC32C)"""
+        return cls(md5=_b64_md5(getattr(blob, "md5_hash", None)),
+                   crc32c=_b64_crc32c(getattr(blob, "crc32c", None)))
+
+    @classmethod
+    def from_http_headers(cls, headers: Mapping[str, str]) -> "ExpectedChecksums":
+        """``Content-MD5`` (Azure) y ``x-goog-hash`` de una respuesta HTTP"""
+        expected = cls(md5=_b64_md5(headers.get("Content-MD5")))
+        for item in (headers.get("x-goog-hash") or "").split(","):
+            name, _, value = item.strip().partition("=")
+            if name == "crc32c":
+                expected.crc32c = _b64_crc32c(value)
+            elif name == "md5" and expected.md5 is None:
+                expected.md5 = _b64_md5(value)
+        return expected
+
+    @classmethod
+    def from_s3_etag(cls, etag: Optional[str], part_size: Optional[int] = None) -> "ExpectedChecksums":
+        """ETag de S3: MD5 simple o multiparte (los de SSE-KMS/SSE-C no son verificables)"""
+        if not is_verifiable_etag(etag):
+            return cls()
+        etag = normalize_etag(etag)
+        if etag_parts_count(etag) is None:
+            return cls(md5=etag)
+        return cls(etag=etag, part_size=part_size)
+
+    def wants_md5(self) -> bool:
+        return self.md5 is not None or self.etag is not None
+
+    def wants_crc32c(self) -> bool:
+        return self.crc32c is not None
+
+    def hasher(self, md5: bool = True) -> StreamHasher:
+        """Hasher con solo los algoritmos que se pueden comparar (``md5=False`` lo omite)"""
+        return StreamHasher(md5=md5 and self.wants_md5(), crc32c=self.wants_crc32c() and CRC32C_AVAILABLE)
+
+
+@dataclass
+class IntegrityCheck:
+    """Resultado de comparar los resúmenes calculados con los del proveedor"""
+    status: str
+    algorithm: Optional[str] = None
+    expected: Optional[str] = None
+    actual: Optional[str] = None
+    # CRC32C calculado del objeto (base64, formato GCS), si se calculó
+    crc32c: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.status != MISMATCH
+
+    @property
+    def message(self) -> str:
+        if self.status == VERIFIED:
+            return f"Integridad verificada ({self.algorithm})"
+        if self.status == MISMATCH:
+            return f"{self.algorithm} no coincide: esperado {self.expected}, calculado {self.actual}"
+        return "Integridad no verificable con los datos del proveedor"
+
+
+def verify_digests(expected: Optional[ExpectedChecksums], digests: Sequence[ChunkDigest]) -> IntegrityCheck:
+    """
+    Comparar los resúmenes de los fragmentos (consecutivos) con los del proveedor.
+
+    Se comprueban todos los algoritmos posibles; basta uno que no coincida
+    para que el resultado sea ``MISMATCH``.
+    """
+    combined = combine_digests(digests)
+    crc_text = encode_crc32c(combined.crc32c) if combined.crc32c is not None else None
+    checks = []
+    if expected is not None:
+        if expected.crc32c is not None and combined.crc32c is not None:
+            checks.append(("crc32c", encode_crc32c(expected.crc32c), crc_text))
+        if expected.md5 is not None and combined.md5 is not None:
+            checks.append(("md5", expected.md5, combined.md5))
+        if expected.etag is not None and _parts_aligned(digests, expected):
+            checks.append(("etag", expected.etag, multipart_etag(digests)))
+
+    checks = [check for check in checks if check[2] is not None]
+    if not checks:
+        return IntegrityCheck(UNVERIFIABLE, crc32c=crc_text)
+    for algorithm, wanted, actual in checks:
+        if wanted != actual:
+            return IntegrityCheck(MISMATCH, algorithm, wanted, actual, crc_text)
+    return IntegrityCheck(VERIFIED, "+".join(check[0] for check in checks), crc32c=crc_text)
+
+
+def _parts_aligned(digests: Sequence[ChunkDigest], expected: ExpectedChecksums) -> bool:
+    """True si cada fragmento coincide con una parte del ETag multiparte"""
+    if not expected.part_size or len(digests) != etag_parts_count(expected.etag):
+        return False
+    return all(digest.length == expected.part_size for digest in digests[:-1])
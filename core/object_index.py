@@ -0,0 +1,398 @@
+"""
+Índice local de metadatos de objetos (SQLite).
+
+Guarda clave, tamaño, ETag, fecha de modificación y clase de almacenamiento
+de cada objeto por cuenta/bucket en ``object_index.db`` (junto a
+``active_transfers.json``). Las vistas y el motor de sincronización lo
+consultan por prefijo, patrón glob, rango de tamaño o fecha sin tocar la
+red, con búsquedas de milisegundos incluso con millones de objetos.
+
+El índice se mantiene por deltas:
+
+* Escritura directa: cada subida, borrado, copia o movimiento hecho desde
+  la aplicación actualiza sus filas al momento.
+* Resincronización por generaciones: un listado (completo o de un prefijo)
+  marca las filas vistas con una generación nueva y al terminar elimina las
+  que no aparecieron, sin vaciar el índice mientras tanto.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+try:
+    from logger_manager import get_logger
+
+    _logger = get_logger(__name__)
+except ImportError:  # pragma: no cover - fallback defensivo
+    _logger = None
+
+
+DEFAULT_INDEX_FILE = "object_index.db"
+# Antigüedad a partir de la cual las vistas vuelven a listar en remoto
+DEFAULT_INDEX_MAX_AGE = 15 * 60
+DEFAULT_QUERY_LIMIT = 1000
+
+# Cota superior para consultas por rango de prefijo (mayor que cualquier sufijo real)
+_PREFIX_END = "\U0010ffff"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    account TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    key TEXT NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0,
+    etag TEXT,
+    mtime REAL,
+    storage_class TEXT,
+    generation INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (account, bucket, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_objects_size ON objects (account, bucket, size);
+CREATE INDEX IF NOT EXISTS idx_objects_mtime ON objects (account, bucket, mtime);
+CREATE TABLE IF NOT EXISTS buckets (
+    account TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    generation INTEGER NOT NULL DEFAULT 0,
+    synced_at REAL,
+    PRIMARY KEY (account, bucket)
+);
+"""
+
+Timestamp = Union[datetime, float, int, None]
+
+
+def _to_epoch(value: Timestamp) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+def _prefix_range(prefix: str) -> Tuple[str, str]:
+    return prefix, prefix + _PREFIX_END
+
+
+class ObjectIndex:
+    """
+    Índice SQLite de metadatos por (cuenta, bucket, clave).
+
+    Ejemplo de uso:
+
+        index = get_object_index()
+        gen = index.begin_sync("ewr1.vultrobjects.com", "backups")
+        index.upsert_objects("ewr1.vultrobjects.com", "backups", objetos, gen)
+        index.finish_sync("ewr1.vultrobjects.com", "backups", gen)
+        grandes = index.query("ewr1.vultrobjects.com", "backups", glob="*.vhd", min_size=1 << 30)
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or os.path.join(os.getcwd(), DEFAULT_INDEX_FILE)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if self.path != ':memory:':
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def normalize(obj: Dict[str, Any]) -> Dict[str, Any]:
+        """Convertir una entrada de ``list_objects_v2`` al formato del índice"""
+        return {
+            'key': obj['Key'],
+            'size': obj.get('Size', 0),
+            'etag': (obj.get('ETag') or '').strip('"') or None,
+            'mtime': _to_epoch(obj.get('LastModified')),
+            'storage_class': obj.get('StorageClass'),
+        }
+
+    # ----- Escritura -----
+
+    def _current_generation(self, account: str, bucket: str) -> int:
+        row = self._conn.execute(
+            "SELECT generation FROM buckets WHERE account = ? AND bucket = ?", (account, bucket)
+        ).fetchone()
+        return row['generation'] if row else 0
+
+    def upsert_objects(self, account: str, bucket: str, objects: Iterable[Dict[str, Any]],
+                       generation: Optional[int] = None) -> int:
+        """
+        Insertar o actualizar objetos (dicts con key/size/etag/mtime/storage_class).
+
+        Returns:
+            Número de filas escritas.
+        """
+        with self._lock, self._conn:
+            if generation is None:
+                generation = self._current_generation(account, bucket)
+            rows = [
+                (account, bucket, o['key'], o.get('size', 0), o.get('etag'),
+                 _to_epoch(o.get('mtime')), o.get('storage_class'), generation)
+                for o in objects
+            ]
+            self._conn.executemany(
+                "INSERT INTO objects (account, bucket, key, size, etag, mtime, storage_class, generation) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (account, bucket, key) DO UPDATE SET size = excluded.size, "
+                "etag = excluded.etag, mtime = excluded.mtime, "
+                "storage_class = excluded.storage_class, generation = excluded.generation",
+                rows,
+            )
+            return len(rows)
+
+    def remove_objects(self, account: str, bucket: str, keys: Iterable[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM objects WHERE account = ? AND bucket = ? AND key = ?",
+                [(account, bucket, key) for key in keys],
+            )
+
+    def remove_prefix(self, account: str, bucket: str, prefix: str = '') -> None:
+        """Eliminar todas las filas bajo un prefijo ('' = el bucket entero)"""
+        low, high = _prefix_range(prefix)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM objects WHERE account = ? AND bucket = ? AND key >= ? AND key < ?",
+                (account, bucket, low, high),
+            )
+
+    def forget_bucket(self, account: str, bucket: str) -> None:
+        self.remove_prefix(account, bucket)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM buckets WHERE account = ? AND bucket = ?", (account, bucket))
+
+    def copy_prefix(self, account: str, src_bucket: str, src_prefix: str,
+                    dst_bucket: str, dst_prefix: str) -> int:
+        """Replicar en el índice una copia de prefijo hecha en el servidor"""
+        low, high = _prefix_range(src_prefix)
+        with self._lock, self._conn:
+            generation = self._current_generation(account, dst_bucket)
+            return self._conn.execute(
+                "INSERT OR REPLACE INTO objects "
+                "(account, bucket, key, size, etag, mtime, storage_class, generation) "
+                "SELECT account, ?, ? || substr(key, ?), size, etag, mtime, storage_class, ? "
+                "FROM objects WHERE account = ? AND bucket = ? AND key >= ? AND key < ?",
+                (dst_bucket, dst_prefix, len(src_prefix) + 1, generation,
+                 account, src_bucket, low, high),
+            ).rowcount
+
+    def mark_stale(self, account: str, bucket: str) -> None:
+        """Forzar que las vistas vuelvan a listar en remoto hasta la próxima resincronización"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE buckets SET synced_at = NULL WHERE account = ? AND bucket = ?", (account, bucket)
+            )
+
+    # ----- Resincronización por generaciones -----
+
+    def begin_sync(self, account: str, bucket: str) -> int:
+        """Abrir una resincronización y retornar su generación"""
+        with self._lock, self._conn:
+            generation = self._current_generation(account, bucket) + 1
+            self._conn.execute(
+                "INSERT INTO buckets (account, bucket, generation) VALUES (?, ?, ?) "
+                "ON CONFLICT (account, bucket) DO UPDATE SET generation = excluded.generation",
+                (account, bucket, generation),
+            )
+            return generation
+
+    def finish_sync(self, account: str, bucket: str, generation: int, prefix: str = '',
+                    recursive: bool = True) -> int:
+        """
+        Cerrar una resincronización: eliminar las filas del prefijo que el
+        listado no volvió a ver.
+
+        Args:
+            recursive: False si el listado usó delimitador (solo se barren los
+                hijos directos del prefijo).
+
+        Returns:
+            Número de filas eliminadas.
+        """
+        low, high = _prefix_range(prefix)
+        sql = ("DELETE FROM objects WHERE account = ? AND bucket = ? AND key >= ? AND key < ? "
+               "AND generation < ?")
+        params: List[Any] = [account, bucket, low, high, generation]
+        if not recursive:
+            sql += " AND instr(substr(key, ?), '/') = 0"
+            params.append(len(prefix) + 1)
+        with self._lock, self._conn:
+            deleted = self._conn.execute(sql, params).rowcount
+            if not prefix and recursive:
+                self._conn.execute(
+                    "UPDATE buckets SET synced_at = ? WHERE account = ? AND bucket = ?",
+                    (time.time(), account, bucket),
+                )
+        return deleted
+
+    def sync_pages(self, account: str, bucket: str, pages: Iterable[List[Dict[str, Any]]],
+                   prefix: str = '') -> int:
+        """
+        Resincronizar un bucket (o prefijo) a partir de páginas de
+        ``list_objects_v2`` (listas de dicts 'Key'/'Size'/...).
+
+        Returns:
+            Número de objetos indexados.
+        """
+        generation = self.begin_sync(account, bucket)
+        count = 0
+        for page in pages:
+            count += self.upsert_objects(account, bucket, (self.normalize(o) for o in page), generation)
+        removed = self.finish_sync(account, bucket, generation, prefix)
+        if _logger:
+            _logger.debug("Índice %s/%s%s: %d objetos, %d eliminados", account, bucket, prefix, count, removed)
+        return count
+
+    # ----- Consultas -----
+
+    def synced_at(self, account: str, bucket: str) -> Optional[float]:
+        """Instante (epoch) de la última resincronización completa, o None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT synced_at FROM buckets WHERE account = ? AND bucket = ?", (account, bucket)
+            ).fetchone()
+        return row['synced_at'] if row else None
+
+    def is_fresh(self, account: str, bucket: str, max_age: float = DEFAULT_INDEX_MAX_AGE) -> bool:
+        synced_at = self.synced_at(account, bucket)
+        return synced_at is not None and time.time() - synced_at <= max_age
+
+    def get(self, account: str, bucket: str, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT key, size, etag, mtime, storage_class FROM objects "
+                "WHERE account = ? AND bucket = ? AND key = ?", (account, bucket, key)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def query(
+        self,
+        account: str,
+        bucket: str,
+        *,
+        prefix: str = '',
+        glob: Optional[str] = None,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        modified_after: Timestamp = None,
+        modified_before: Timestamp = None,
+        limit: Optional[int] = DEFAULT_QUERY_LIMIT,
+        start_after: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Buscar objetos combinando filtros; resultados ordenados por clave.
+
+        ``glob`` usa la sintaxis GLOB de SQLite (``*``, ``?``, ``[abc]``,
+        sensible a mayúsculas) sobre la clave completa; su parte literal
+        inicial acota la búsqueda por rango. ``start_after`` permite paginar.
+        """
+        if glob and len(glob_to_prefix(glob)) > len(prefix):
+            prefix = glob_to_prefix(glob)
+        low, high = _prefix_range(prefix)
+        sql = ["SELECT key, size, etag, mtime, storage_class FROM objects",
+               "WHERE account = ? AND bucket = ? AND key >= ? AND key < ?"]
+        params: List[Any] = [account, bucket, low, high]
+        if start_after is not None:
+            sql.append("AND key > ?")
+            params.append(start_after)
+        if glob:
+            sql.append("AND key GLOB ?")
+            params.append(glob)
+        if min_size is not None:
+            sql.append("AND size >= ?")
+            params.append(min_size)
+        if max_size is not None:
+            sql.append("AND size <= ?")
+            params.append(max_size)
+        if modified_after is not None:
+            sql.append("AND mtime >= ?")
+            params.append(_to_epoch(modified_after))
+        if modified_before is not None:
+            sql.append("AND mtime < ?")
+            params.append(_to_epoch(modified_before))
+        sql.append("ORDER BY key")
+        if limit:
+            sql.append("LIMIT ?")
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(" ".join(sql), params).fetchall()
+        return [dict(row) for row in rows]
+
+    def list_folder(self, account: str, bucket: str, prefix: str = '',
+                    delimiter: str = '/') -> Tuple[List[str], List[Dict[str, Any]]]:
+        """
+        Hijos directos de un prefijo, como un listado con delimitador.
+
+        Las subcarpetas se obtienen saltando de una a la siguiente por el
+        índice de claves, sin recorrer su contenido.
+
+        Returns:
+            (prefijos_de_carpeta, objetos)
+        """
+        folders: List[str] = []
+        objects: List[Dict[str, Any]] = []
+        low, high = _prefix_range(prefix)
+        cursor: Optional[str] = None
+        with self._lock:
+            while True:
+                if cursor is None:
+                    bound_sql, bound = "key >= ?", low
+                else:
+                    bound_sql, bound = "key > ?", cursor
+                row = self._conn.execute(
+                    "SELECT key, size, etag, mtime, storage_class FROM objects "
+                    f"WHERE account = ? AND bucket = ? AND {bound_sql} AND key < ? "
+                    "ORDER BY key LIMIT 1",
+                    (account, bucket, bound, high),
+                ).fetchone()
+                if row is None:
+                    break
+                rest = row['key'][len(prefix):]
+                if delimiter in rest:
+                    folder = prefix + rest.split(delimiter, 1)[0] + delimiter
+                    folders.append(folder)
+                    # Saltar todo el contenido de la carpeta
+                    cursor = folder + _PREFIX_END
+                else:
+                    objects.append(dict(row))
+                    cursor = row['key']
+        return folders, objects
+
+    def stats(self, account: str, bucket: str, prefix: str = '') -> Dict[str, int]:
+        """Número de objetos y bytes indexados bajo un prefijo"""
+        low, high = _prefix_range(prefix)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) AS objects, COALESCE(SUM(size), 0) AS size FROM objects "
+                "WHERE account = ? AND bucket = ? AND key >= ? AND key < ?",
+                (account, bucket, low, high),
+            ).fetchone()
+        return {'objects': row['objects'], 'size': row['size']}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def glob_to_prefix(pattern: str) -> str:
+    """Prefijo literal de un patrón glob (acota la búsqueda por rango)"""
+    for i, char in enumerate(pattern):
+        if char in '*?[':
+            return pattern[:i]
+    return pattern
+
+
+_object_index: Optional[ObjectIndex] = None
+
+
+def get_object_index() -> ObjectIndex:
+    """Obtener instancia singleton del índice de objetos"""
+    global _object_index
+    if _object_index is None:
+        _object_index = ObjectIndex()
+    return _object_index
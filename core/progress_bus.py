@@ -0,0 +1,60 @@
+"""
+Bus de progreso con coalescencia para la interfaz.
+
+Los workers avisan del progreso decenas de veces por segundo, cada uno desde
+su hilo; reenviar cada aviso como señal Qt inunda el bucle de eventos con
+100+ transferencias. El bus guarda solo el último estado de cada
+transferencia y la interfaz lo recoge en lotes a ritmo fijo (``drain``), de
+modo que el coste por fotograma depende del número de transferencias, no de
+la frecuencia de los avisos.
+"""
+
+import threading
+from dataclasses import asdict, dataclass
+from typing import Any, Dict
+
+# Intervalo entre entregas de lotes a la interfaz (10 Hz)
+PROGRESS_UI_INTERVAL_MS = 100
+
+
+@dataclass
+class ProgressUpdate:
+    """Último progreso conocido de una transferencia"""
+    percent: int
+    bytes_transferred: int
+    total_bytes: int
+    status_text: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ProgressCoalescer:
+    """
+    Último estado por transferencia, vaciado por lotes.
+
+    ``post`` es seguro desde cualquier hilo y no emite nada; ``drain`` lo
+    llama el temporizador del hilo de la interfaz.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._latest: Dict[str, ProgressUpdate] = {}
+
+    def post(self, transfer_id: str, update: ProgressUpdate) -> None:
+        with self._lock:
+            previous = self._latest.get(transfer_id)
+            if previous is not None and not update.status_text:
+                # Un aviso sin texto no borra el último texto aún no entregado
+                update.status_text = previous.status_text
+            self._latest[transfer_id] = update
+
+    def drain(self) -> Dict[str, ProgressUpdate]:
+        """Entregar y vaciar el lote pendiente"""
+        with self._lock:
+            batch, self._latest = self._latest, {}
+        return batch
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._latest)
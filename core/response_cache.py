@@ -0,0 +1,152 @@
+"""
+Caché de respuestas acotada (LRU + TTL) con stale-while-revalidate.
+
+Pensada para resultados remotos baratos de servir pero caros de obtener
+(``list_buckets``, ``get_bucket_size``). Cada entrada tiene un TTL de
+frescura y una ventana adicional en la que el valor caducado todavía se
+sirve al instante mientras se refresca en segundo plano, de forma que la
+UI nunca espera a la red por un dato que ya conocía. Una misma instancia
+puede compartirse entre varios ``S3Handler`` de la misma cuenta.
+"""
+
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+try:
+    from logger_manager import get_logger
+
+    _logger = get_logger(__name__)
+except ImportError:  # pragma: no cover - fallback defensivo
+    _logger = None
+
+
+DEFAULT_MAX_ENTRIES = 256
+
+FRESH = "fresh"
+STALE = "stale"
+
+
+class ResponseCache:
+    """
+    Caché LRU con TTL, ventana de obsolescencia y contadores.
+
+    Ejemplo de uso:
+
+        cache = ResponseCache(max_entries=128)
+        value, state = cache.lookup('list_buckets', key)
+        if state == STALE:
+            cache.refresh_async('list_buckets', key, recargar)
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        # (namespace, key) -> (fresh_until, stale_until, value)
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, float, Any]]" = OrderedDict()
+        self._refreshing: set = set()
+        self._stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'evictions': 0, 'refreshes': 0}
+
+    def lookup(self, namespace: str, key: Hashable) -> Tuple[Any, Optional[str]]:
+        """
+        Buscar una entrada.
+
+        Returns:
+            (valor, estado) con estado ``FRESH``, ``STALE`` o None (fallo).
+        """
+        now = monotonic()
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                self._stats['misses'] += 1
+                return None, None
+            fresh_until, stale_until, value = entry
+            if now <= fresh_until:
+                self._entries.move_to_end((namespace, key))
+                self._stats['hits'] += 1
+                return value, FRESH
+            if now <= stale_until:
+                self._entries.move_to_end((namespace, key))
+                self._stats['stale_hits'] += 1
+                return value, STALE
+            del self._entries[(namespace, key)]
+            self._stats['misses'] += 1
+            return None, None
+
+    def set(self, namespace: str, key: Hashable, value: Any, ttl: float, stale_ttl: float = 0) -> None:
+        """Guardar un valor fresco durante ``ttl`` s y servible como obsoleto ``stale_ttl`` s más"""
+        if not ttl:
+            return
+        now = monotonic()
+        with self._lock:
+            self._entries[(namespace, key)] = (now + ttl, now + ttl + max(0, stale_ttl), value)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, namespace: Optional[str] = None, key: Optional[Hashable] = None) -> None:
+        """Eliminar todo, un namespace completo o una entrada concreta"""
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+            elif key is None:
+                for entry_key in [k for k in self._entries if k[0] == namespace]:
+                    del self._entries[entry_key]
+            else:
+                self._entries.pop((namespace, key), None)
+
+    def refresh_async(self, namespace: str, key: Hashable, loader: Callable[[], Any]) -> bool:
+        """
+        Ejecutar ``loader`` en segundo plano (una sola recarga por entrada).
+
+        El loader es responsable de guardar el nuevo valor con ``set``.
+
+        Returns:
+            True si se lanzó la recarga, False si ya había una en curso.
+        """
+        token = (namespace, key)
+        with self._lock:
+            if token in self._refreshing:
+                return False
+            self._refreshing.add(token)
+            self._stats['refreshes'] += 1
+
+        def run():
+            try:
+                loader()
+            except Exception as exc:  # noqa: BLE001
+                if _logger:
+                    _logger.warning("Recarga en segundo plano de %s falló: %s", namespace, exc)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(token)
+
+        threading.Thread(target=run, name=f"cache-refresh-{namespace}", daemon=True).start()
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de aciertos, fallos, desalojos y tamaño actual"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+            return stats
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+_shared_lock = threading.Lock()
+_shared_caches: Dict[Hashable, ResponseCache] = {}
+
+
+def get_shared_cache(account_key: Hashable, max_entries: int = DEFAULT_MAX_ENTRIES) -> ResponseCache:
+    """Obtener la caché compartida de una cuenta (p. ej. (endpoint, access_key))"""
+    with _shared_lock:
+        cache = _shared_caches.get(account_key)
+        if cache is None:
+            cache = ResponseCache(max_entries=max_entries)
+            _shared_caches[account_key] = cache
+        return cache
@@ -0,0 +1,170 @@
+"""
+Reanudación automática de transferencias interrumpidas.
+
+Al cargar su estado, el TransferManager marca con ``auto_resume`` las
+transferencias que estaban en curso o en cola cuando la aplicación se cerró
+(o cayó); las que pausó el usuario no se tocan. Cada pestaña registra un
+adaptador por tipo de transferencia que reconstruye el worker desde el
+último punto de control (bytes ya escritos, segmentos, manifiesto
+multiparte...) y el coordinador lo arranca a través del planificador.
+
+Un adaptador que todavía no puede reanudar (sin sesión en Azure, sin
+cliente de GCP...) lanza ``ResumeNotReady``: la transferencia sigue
+pendiente y se reintenta en el siguiente disparo (p. ej. al iniciar sesión).
+"""
+
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from core.transfer_scheduler import TransferPriority
+
+try:
+    from logger_manager import get_logger
+
+    _logger = get_logger(__name__)
+except ImportError:  # pragma: no cover - fallback defensivo
+    _logger = None
+
+
+# Un SAS que caduca en menos de este margen se renueva antes de reanudar
+SAS_EXPIRY_MARGIN = timedelta(minutes=15)
+
+# adapter(transfer) -> worker sin arrancar (con sus señales ya conectadas)
+ResumeAdapter = Callable[[Any], Any]
+
+
+class ResumeNotReady(Exception):
+    """El adaptador aún no puede reanudar (faltan credenciales); se reintenta más tarde"""
+
+
+@dataclass
+class ResumeReport:
+    """Resultado de una pasada de reanudación"""
+    resumed: List[str] = field(default_factory=list)
+    # Pendientes: sin adaptador registrado o sin credenciales todavía
+    deferred: List[str] = field(default_factory=list)
+    # transfer_id -> motivo
+    failed: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def success(self) -> bool:
+        return not self.failed
+
+
+def _parse_datetime(value: str) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+    # Sin zona: se asume UTC (formato de los SAS de Azure)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def sas_expiry(sas_url: Optional[str]) -> Optional[datetime]:
+    """Caducidad (``se=``) de una URL SAS de Azure, o None si no la lleva"""
+    if not sas_url:
+        return None
+    values = parse_qs(urlparse(sas_url).query).get("se")
+    return _parse_datetime(values[0]) if values else None
+
+
+def sas_expired(sas_url: Optional[str], expiry: Optional[str] = None,
+                now: Optional[datetime] = None, margin: timedelta = SAS_EXPIRY_MARGIN) -> bool:
+    """
+    True si el SAS no sirve para reanudar: falta, caducó o caduca en menos de ``margin``.
+
+    La caducidad se toma de la propia URL; ``expiry`` (ISO) es el respaldo.
+    Si no se conoce, el SAS se da por caducado (mejor pedir uno nuevo que
+    fallar a mitad de un disco).
+    """
+    if not sas_url:
+        return True
+    expires_at = sas_expiry(sas_url) or (_parse_datetime(expiry) if expiry else None)
+    if expires_at is None:
+        return True
+    now = now or datetime.now(timezone.utc)
+    return expires_at - margin <= now
+
+
+class ResumeCoordinator:
+    """
+    Reanuda las transferencias interrumpidas mediante adaptadores por tipo.
+
+    Ejemplo de uso:
+
+        coordinator = get_transfer_manager().resume_coordinator
+        coordinator.register(TransferType.S3_DOWNLOAD, self._resume_s3_download,
+                             TransferPriority.INTERACTIVE)
+        ...
+        report = coordinator.resume_pending()  # al arrancar o al iniciar sesión
+    """
+
+    def __init__(self, manager, enabled: bool = True) -> None:
+        self.manager = manager
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._adapters: Dict[str, ResumeAdapter] = {}
+        self._priorities: Dict[str, TransferPriority] = {}
+        # Ya despachadas en esta sesión: otra pasada (otro inicio de sesión) no las duplica.
+        # El indicador persistido se mantiene hasta que terminen o se pausen, por si
+        # la aplicación vuelve a cerrarse antes.
+        self._dispatched = set()
+
+    def register(self, transfer_type, adapter: ResumeAdapter,
+                 priority: TransferPriority = TransferPriority.BACKGROUND) -> None:
+        """Registrar el adaptador de un tipo (``TransferType`` o su valor)"""
+        key = getattr(transfer_type, "value", transfer_type)
+        with self._lock:
+            self._adapters[key] = adapter
+            self._priorities[key] = priority
+
+    def pending(self) -> List[Any]:
+        """Transferencias interrumpidas que esperan reanudarse"""
+        return [t for t in self.manager.get_all_transfers()
+                if getattr(t, "auto_resume", False) and t.id not in self._dispatched]
+
+    def resume(self, transfer_id: str) -> None:
+        """
+        Reanudar una transferencia concreta (también desde el botón de la cola).
+
+        Raises:
+            KeyError: transferencia o adaptador desconocidos.
+            ResumeNotReady: el adaptador aún no puede reanudarla.
+        """
+        with self._lock:
+            self._resume_locked(transfer_id)
+
+    def resume_pending(self) -> ResumeReport:
+        """Reanudar todas las transferencias interrumpidas que ya se puedan"""
+        report = ResumeReport()
+        if not self.enabled:
+            return report
+        with self._lock:
+            for transfer in self.pending():
+                try:
+                    self._resume_locked(transfer.id)
+                except (ResumeNotReady, KeyError):
+                    report.deferred.append(transfer.id)
+                except Exception as exc:  # noqa: BLE001 - una transferencia rota no frena al resto
+                    report.failed[transfer.id] = str(exc)
+                    self.manager.complete_transfer(transfer.id, False, f"No se pudo reanudar: {exc}")
+                else:
+                    report.resumed.append(transfer.id)
+        if _logger and (report.resumed or report.failed):
+            _logger.info("Reanudación automática: %d reanudadas, %d pendientes, %d fallidas",
+                         len(report.resumed), len(report.deferred), len(report.failed))
+        return report
+
+    def _resume_locked(self, transfer_id: str) -> None:
+        transfer = self.manager.get_transfer(transfer_id)
+        if transfer is None:
+            raise KeyError(transfer_id)
+        adapter = self._adapters.get(transfer.transfer_type)
+        if adapter is None:
+            raise KeyError(transfer.transfer_type)
+        worker = adapter(transfer)
+        self._dispatched.add(transfer_id)
+        self.manager.start_worker(worker, transfer_id, self._priorities[transfer.transfer_type])
@@ -0,0 +1,274 @@
+"""
+Plano de datos asíncrono (asyncio) para lotes de objetos pequeños.
+
+Subir decenas de miles de archivos pequeños con una petición bloqueante
+por archivo deja el rendimiento limitado por la latencia de cada PUT. Aquí
+un único bucle de eventos mantiene cientos de peticiones en vuelo con
+concurrencia acotada: el recorrido de archivos alimenta una cola de tamaño
+fijo (contrapresión) y un conjunto de corrutinas la consume.
+
+El transporte es aiobotocore si está instalado; si no, las llamadas del
+cliente boto3 compartido se despachan a un pool de hilos desde el mismo
+bucle, con idéntico control de concurrencia. Los archivos grandes se
+delegan al motor multiparte existente.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from aiobotocore.session import get_session as get_aio_session
+    from aiobotocore.config import AioConfig
+    AIOBOTOCORE_AVAILABLE = True
+except ImportError:
+    get_aio_session = None
+    AioConfig = None
+    AIOBOTOCORE_AVAILABLE = False
+
+try:
+    from logger_manager import get_logger
+
+    _logger = get_logger(__name__)
+except ImportError:  # pragma: no cover - fallback defensivo
+    _logger = None
+
+
+MIB = 1024 * 1024
+
+DEFAULT_ASYNC_CONCURRENCY = 128
+MAX_ASYNC_CONCURRENCY = 512
+# Hasta este tamaño el archivo se envía en un único PUT desde memoria
+SMALL_OBJECT_LIMIT = 8 * MIB
+# Hilos del pool del transporte boto3 (sin aiobotocore)
+MAX_FALLBACK_THREADS = 64
+
+# progress_callback(files_done, bytes_done, errors_total, last_key)
+BatchProgressCallback = Callable[[int, int, int, str], None]
+# large_file_upload(file_path, key) -> bool (bloqueante)
+LargeFileUpload = Callable[[str, str], bool]
+# uploaded_callback(key, size, etag) por cada PUT directo completado
+UploadedCallback = Callable[[str, int, Optional[str]], None]
+# change_detector(file_path, remote) -> True si el archivo no cambió (bloqueante)
+ChangeDetectorCallback = Callable[[str, Optional[Dict[str, Any]]], bool]
+# remote_lookup(key) -> {'size', 'etag', 'mtime'} o None (sin red: índice o listado previo)
+RemoteLookup = Callable[[str], Optional[Dict[str, Any]]]
+
+_STOP = object()
+
+
+@dataclass
+class BatchUploadResult:
+    """Resultado de una subida por lotes"""
+    uploaded: int = 0
+    bytes_uploaded: int = 0
+    # Archivos grandes delegados al motor multiparte (incluidos en los totales)
+    delegated: int = 0
+    bytes_delegated: int = 0
+    # Archivos sin cambios que no se enviaron
+    skipped: int = 0
+    bytes_skipped: int = 0
+    # Errores por archivo: {'Key', 'File', 'Code', 'Message'}
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        return not self.errors
+
+    @property
+    def processed(self) -> int:
+        return self.uploaded + self.skipped + len(self.errors)
+
+    @property
+    def files_per_second(self) -> float:
+        return self.uploaded / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class ThreadedAsyncClient:
+    """
+    Adaptador asíncrono sobre un cliente boto3 síncrono.
+
+    Cada llamada se ejecuta en un pool de hilos propio y se espera desde el
+    bucle de eventos; el número de peticiones simultáneas lo acota el
+    llamador.
+    """
+
+    def __init__(self, client, max_workers: int = MAX_FALLBACK_THREADS) -> None:
+        self._client = client
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="s3-async")
+
+    async def put_object(self, **kwargs) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: self._client.put_object(**kwargs))
+
+    async def head_object(self, **kwargs) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: self._client.head_object(**kwargs))
+
+    async def __aenter__(self) -> "ThreadedAsyncClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._executor.shutdown(wait=False)
+
+
+def create_aio_client(access_key: str, secret_key: str, host_base: str, max_pool_connections: int):
+    """Context manager asíncrono de un cliente aiobotocore para el endpoint"""
+    session = get_aio_session()
+    return session.create_client(
+        's3',
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        endpoint_url=f'https://{host_base}',
+        config=AioConfig(s3={'addressing_style': 'virtual'}, max_pool_connections=max_pool_connections),
+    )
+
+
+def _error_code(exc: Exception) -> str:
+    response = getattr(exc, 'response', None) or {}
+    return response.get('Error', {}).get('Code') or type(exc).__name__
+
+
+def _read_file(file_path: str) -> bytes:
+    with open(file_path, 'rb') as f:
+        return f.read()
+
+
+class AsyncBatchUploader:
+    """
+    Sube muchos archivos con cientos de peticiones concurrentes en un bucle.
+
+    Ejemplo de uso:
+
+        uploader = AsyncBatchUploader(
+            lambda: ThreadedAsyncClient(s3_client), "mi-bucket", concurrency=256,
+        )
+        result = uploader.upload(((path, key) for path, key in archivos))
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Any],
+        bucket: str,
+        *,
+        concurrency: int = DEFAULT_ASYNC_CONCURRENCY,
+        progress_callback: Optional[BatchProgressCallback] = None,
+        large_file_upload: Optional[LargeFileUpload] = None,
+        small_object_limit: int = SMALL_OBJECT_LIMIT,
+        uploaded_callback: Optional[UploadedCallback] = None,
+        change_detector: Optional[ChangeDetectorCallback] = None,
+        remote_lookup: Optional[RemoteLookup] = None,
+    ) -> None:
+        self.client_factory = client_factory
+        self.bucket = bucket
+        self.concurrency = max(1, min(concurrency, MAX_ASYNC_CONCURRENCY))
+        self.progress_callback = progress_callback
+        self.large_file_upload = large_file_upload
+        self.small_object_limit = small_object_limit
+        self.uploaded_callback = uploaded_callback
+        # Comparación previa: sin remote_lookup se consulta cada clave con HEAD en paralelo
+        self.change_detector = change_detector
+        self.remote_lookup = remote_lookup
+        self._result = BatchUploadResult()
+
+    def upload(self, files: Iterable[Tuple[str, str]]) -> BatchUploadResult:
+        """
+        Sube ``files`` (iterable perezoso de ``(ruta_local, clave)``) y retorna
+        el resultado. Bloquea el hilo llamador mientras corre el bucle.
+        """
+        return asyncio.run(self.upload_async(files))
+
+    async def upload_async(self, files: Iterable[Tuple[str, str]]) -> BatchUploadResult:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        # Cola acotada: el recorrido de archivos no se adelanta a la red
+        queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        async with self.client_factory() as client:
+            async def produce():
+                try:
+                    for item in files:
+                        await queue.put(item)
+                finally:
+                    for _ in range(self.concurrency):
+                        await queue.put(_STOP)
+
+            async def consume():
+                while True:
+                    item = await queue.get()
+                    if item is _STOP:
+                        return
+                    await self._upload_one(client, *item)
+
+            await asyncio.gather(produce(), *(consume() for _ in range(self.concurrency)))
+
+        self._result.elapsed = loop.time() - start
+        if _logger:
+            _logger.info(
+                "Lote a '%s': %d archivos (%d bytes) en %.1fs, %d sin cambios, %d errores, concurrencia %d",
+                self.bucket, self._result.uploaded, self._result.bytes_uploaded, self._result.elapsed,
+                self._result.skipped, len(self._result.errors), self.concurrency,
+            )
+        return self._result
+
+    async def _upload_one(self, client, file_path: str, key: str) -> None:
+        loop = asyncio.get_running_loop()
+        size = 0
+        try:
+            size = os.path.getsize(file_path)
+            if self.change_detector and await self._is_unchanged(client, file_path, key):
+                self._result.skipped += 1
+                self._result.bytes_skipped += size
+                self._report(key)
+                return
+            delegated = size > self.small_object_limit and self.large_file_upload is not None
+            if delegated:
+                ok = await loop.run_in_executor(None, self.large_file_upload, file_path, key)
+                if not ok:
+                    raise IOError(f"Subida multiparte de {key} fallida")
+            else:
+                body = await loop.run_in_executor(None, _read_file, file_path)
+                response = await client.put_object(Bucket=self.bucket, Key=key, Body=body)
+                if self.uploaded_callback:
+                    self.uploaded_callback(key, size, ((response or {}).get('ETag') or '').strip('"') or None)
+        except Exception as exc:  # noqa: BLE001 - registrar y seguir con el lote
+            self._result.errors.append({'Key': key, 'File': file_path,
+                                        'Code': _error_code(exc), 'Message': str(exc)})
+        else:
+            self._result.uploaded += 1
+            self._result.bytes_uploaded += size
+            if delegated:
+                self._result.delegated += 1
+                self._result.bytes_delegated += size
+
+        self._report(key)
+
+    async def _is_unchanged(self, client, file_path: str, key: str) -> bool:
+        loop = asyncio.get_running_loop()
+        if self.remote_lookup:
+            remote = self.remote_lookup(key)
+        else:
+            remote = await self._head(client, key)
+        if remote is None:
+            return False
+        # El hash local (si hace falta) no debe bloquear el bucle
+        return await loop.run_in_executor(None, self.change_detector, file_path, remote)
+
+    async def _head(self, client, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = await client.head_object(Bucket=self.bucket, Key=key)
+        except Exception:  # noqa: BLE001 - 404 u otro error: se sube igualmente
+            return None
+        return {'size': response.get('ContentLength'), 'etag': response.get('ETag'),
+                'mtime': response.get('LastModified')}
+
+    def _report(self, key: str) -> None:
+        if self.progress_callback:
+            result = self._result
+            try:
+                self.progress_callback(result.processed, result.bytes_uploaded, len(result.errors), key)
+            except Exception:  # noqa: BLE001 - no detener el lote por la UI
+                pass
@@ -0,0 +1,87 @@
+"""
+Registro compartido de clientes boto3 para todo el proceso.
+
+Crear un ``boto3.session.Session()`` y su cliente cuesta decenas de
+milisegundos y, sobre todo, cada cliente tiene su propio pool de
+conexiones: instanciar uno por ``S3Handler`` obliga a repetir el
+handshake TCP/TLS en cada pestaña, cambio de perfil o script. Aquí los
+clientes se reutilizan por (endpoint, credenciales) con conexiones
+persistentes (keep-alive), de modo que el handshake se paga una vez por
+endpoint. Los clientes de boto3 son seguros entre hilos.
+"""
+
+import hashlib
+import threading
+from typing import Dict, Optional, Tuple
+
+import boto3
+from botocore.client import Config
+
+try:
+    from logger_manager import get_logger
+
+    _logger = get_logger(__name__)
+except ImportError:  # pragma: no cover - fallback defensivo
+    _logger = None
+
+
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+
+_registry_lock = threading.Lock()
+# clave -> (max_pool_connections, cliente)
+_clients: Dict[Tuple[str, str, str], Tuple[int, object]] = {}
+
+
+def _registry_key(access_key: str, secret_key: str, host_base: str) -> Tuple[str, str, str]:
+    # No conservar el secreto en claro como clave del diccionario
+    secret_digest = hashlib.sha256(secret_key.encode('utf-8')).hexdigest()
+    return (host_base, access_key, secret_digest)
+
+
+def _create_client(access_key: str, secret_key: str, host_base: str, max_pool_connections: int):
+    session = boto3.session.Session()
+    return session.client(
+        's3',
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        endpoint_url=f'https://{host_base}',
+        config=Config(
+            s3={'addressing_style': 'virtual'},
+            max_pool_connections=max_pool_connections,
+            tcp_keepalive=True,
+        )
+    )
+
+
+def get_s3_client(access_key: str, secret_key: str, host_base: str,
+                  max_pool_connections: Optional[int] = None):
+    """
+    Obtener (o crear) el cliente compartido para un endpoint y credenciales.
+
+    Si se pide un pool mayor que el del cliente existente, el cliente se
+    recrea con el nuevo tamaño; pedir uno menor reutiliza el actual.
+    """
+    pool_size = max_pool_connections or DEFAULT_MAX_POOL_CONNECTIONS
+    key = _registry_key(access_key, secret_key, host_base)
+    with _registry_lock:
+        entry = _clients.get(key)
+        if entry is not None and entry[0] >= pool_size:
+            return entry[1]
+
+        client = _create_client(access_key, secret_key, host_base, pool_size)
+        _clients[key] = (pool_size, client)
+        if _logger:
+            _logger.debug("Cliente S3 creado para %s (pool=%d)", host_base, pool_size)
+        return client
+
+
+def release_s3_clients(host_base: Optional[str] = None) -> None:
+    """Descartar clientes del registro (todos o los de un endpoint)"""
+    with _registry_lock:
+        for key in [k for k in _clients if host_base is None or k[0] == host_base]:
+            del _clients[key]
+
+
+def registered_client_count() -> int:
+    with _registry_lock:
+        return len(_clients)
@@ -0,0 +1,246 @@
+"""
+Copia y movimiento de objetos S3 en el lado del servidor.
+
+Ningún byte pasa por el equipo local: los objetos de hasta 5 GB se copian
+con ``CopyObject`` y los mayores con una subida multiparte cuyas partes se
+rellenan en paralelo con ``UploadPartCopy`` (rangos del objeto origen).
+Los prefijos completos se recorren página a página y sus objetos se copian
+con un pool de hilos; al mover, los orígenes copiados se eliminan en lotes
+``DeleteObjects``.
+"""
+
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from core.s3_multipart import (
+    DEFAULT_CONCURRENCY, MIB, S3_MAX_PART_SIZE, compute_part_size, plan_parts
+)
+from core.s3_purge import DELETE_BATCH_SIZE
+
+try:
+    from logger_manager import get_logger
+
+    _logger = get_logger(__name__)
+except ImportError:  # pragma: no cover - fallback defensivo
+    _logger = None
+
+
+# CopyObject admite como máximo 5 GB; por encima es obligatorio UploadPartCopy
+COPY_OBJECT_LIMIT = S3_MAX_PART_SIZE
+MULTIPART_COPY_THRESHOLD = COPY_OBJECT_LIMIT
+# Las partes copiadas no viajan por la red local: partes grandes = menos peticiones
+MIN_COPY_PART_SIZE = 256 * MIB
+
+# progress_callback(objects_done, bytes_done, errors_total)
+CopyProgressCallback = Callable[[int, int, int], None]
+
+
+@dataclass
+class CopyResult:
+    """Resultado de una copia o movimiento de prefijo"""
+    copied: int = 0
+    bytes_copied: int = 0
+    deleted: int = 0
+    # Errores por objeto: {'Key', 'Code', 'Message'}
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def success(self) -> bool:
+        return not self.errors
+
+
+def _error_code(exc: Exception) -> str:
+    response = getattr(exc, 'response', None) or {}
+    return response.get('Error', {}).get('Code') or type(exc).__name__
+
+
+class ObjectCopier:
+    """
+    Copia objetos entre buckets/prefijos sin descargarlos.
+
+    Ejemplo de uso:
+
+        copier = ObjectCopier(s3_client, max_concurrency=8)
+        copier.copy_object("origen", "a/dump.zip", "destino", "b/dump.zip")
+        result = copier.copy_prefix("origen", "fotos/", "destino", "archivo/fotos/", move=True)
+    """
+
+    def __init__(
+        self,
+        client,
+        *,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        multipart_threshold: int = MULTIPART_COPY_THRESHOLD,
+    ) -> None:
+        self.client = client
+        self.max_concurrency = max(1, max_concurrency)
+        # Nunca por encima del límite de CopyObject
+        self.multipart_threshold = min(multipart_threshold, COPY_OBJECT_LIMIT)
+
+    def copy_object(self, src_bucket: str, src_key: str, dst_bucket: str, dst_key: str,
+                    *, size: Optional[int] = None, etag: Optional[str] = None) -> int:
+        """
+        Copia un objeto y retorna su tamaño en bytes.
+
+        Si no se conocen ``size``/``etag`` se obtienen con HEAD. El ETag se usa
+        como condición en cada parte para no mezclar versiones si el origen
+        cambia durante una copia multiparte.
+        """
+        if src_bucket == dst_bucket and src_key == dst_key:
+            raise ValueError("El origen y el destino de la copia son el mismo objeto")
+
+        head = None
+        if size is None:
+            head = self.client.head_object(Bucket=src_bucket, Key=src_key)
+            size = head.get('ContentLength', 0)
+            etag = etag or head.get('ETag')
+
+        source = {'Bucket': src_bucket, 'Key': src_key}
+        if size <= self.multipart_threshold:
+            self.client.copy_object(
+                CopySource=source, Bucket=dst_bucket, Key=dst_key, MetadataDirective='COPY'
+            )
+        else:
+            if head is None:
+                head = self.client.head_object(Bucket=src_bucket, Key=src_key)
+            self._multipart_copy(source, dst_bucket, dst_key, size, etag, head)
+        return size
+
+    def _multipart_copy(self, source: Dict[str, str], dst_bucket: str, dst_key: str,
+                        size: int, etag: Optional[str], head: Dict[str, Any]) -> None:
+        # UploadPartCopy no copia metadatos: se trasladan en la creación
+        create_args: Dict[str, Any] = {'Bucket': dst_bucket, 'Key': dst_key}
+        if head.get('ContentType'):
+            create_args['ContentType'] = head['ContentType']
+        if head.get('Metadata'):
+            create_args['Metadata'] = head['Metadata']
+        upload_id = self.client.create_multipart_upload(**create_args)['UploadId']
+
+        part_size = compute_part_size(size, min_part_size=MIN_COPY_PART_SIZE)
+        parts = plan_parts(size, part_size)
+        if _logger:
+            _logger.debug("UploadPartCopy %s/%s -> %s/%s: %d partes de %d MiB",
+                          source['Bucket'], source['Key'], dst_bucket, dst_key,
+                          len(parts), part_size // MIB)
+
+        def copy_part(part):
+            number, offset, length = part
+            params = {
+                'Bucket': dst_bucket, 'Key': dst_key, 'UploadId': upload_id,
+                'PartNumber': number, 'CopySource': source,
+                'CopySourceRange': f'bytes={offset}-{offset + length - 1}',
+            }
+            if etag:
+                params['CopySourceIfMatch'] = etag
+            response = self.client.upload_part_copy(**params)
+            return {'PartNumber': number, 'ETag': response['CopyPartResult']['ETag']}
+
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(parts)),
+                                    thread_name_prefix="s3-part-copy") as pool:
+                completed = list(pool.map(copy_part, parts))
+            self.client.complete_multipart_upload(
+                Bucket=dst_bucket, Key=dst_key, UploadId=upload_id,
+                MultipartUpload={'Parts': completed},
+            )
+        except BaseException:
+            try:
+                self.client.abort_multipart_upload(Bucket=dst_bucket, Key=dst_key, UploadId=upload_id)
+            except Exception as exc:  # noqa: BLE001
+                if _logger:
+                    _logger.warning("No se pudo abortar la copia multiparte %s: %s", upload_id, exc)
+            raise
+
+    def copy_prefix(self, src_bucket: str, src_prefix: str, dst_bucket: str, dst_prefix: str,
+                    *, move: bool = False,
+                    progress_callback: Optional[CopyProgressCallback] = None) -> CopyResult:
+        """
+        Copia (o mueve) todos los objetos bajo ``src_prefix`` a ``dst_prefix``.
+
+        Con ``move=True`` cada lote de orígenes copiados con éxito se elimina
+        con ``DeleteObjects``; los objetos que fallan permanecen en el origen.
+        """
+        if src_bucket == dst_bucket:
+            if src_prefix == dst_prefix:
+                raise ValueError("El prefijo de origen y destino es el mismo")
+            if dst_prefix.startswith(src_prefix):
+                # El listado volvería a encontrar los objetos recién copiados
+                raise ValueError("El prefijo destino no puede estar dentro del prefijo origen")
+
+        result = CopyResult()
+        lock = threading.Lock()
+        to_delete: List[Dict[str, str]] = []
+
+        def copy_one(obj):
+            dst_key = dst_prefix + obj['Key'][len(src_prefix):]
+            try:
+                copied = self.copy_object(src_bucket, obj['Key'], dst_bucket, dst_key,
+                                          size=obj.get('Size'), etag=obj.get('ETag'))
+            except Exception as exc:  # noqa: BLE001 - registrar y seguir con el resto
+                with lock:
+                    result.errors.append({'Key': obj['Key'], 'Code': _error_code(exc), 'Message': str(exc)})
+            else:
+                with lock:
+                    result.copied += 1
+                    result.bytes_copied += copied
+                    if move:
+                        to_delete.append({'Key': obj['Key']})
+            if progress_callback:
+                with lock:
+                    snapshot = (result.copied, result.bytes_copied, len(result.errors))
+                try:
+                    progress_callback(*snapshot)
+                except Exception:  # noqa: BLE001 - no detener la copia por la UI
+                    pass
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                thread_name_prefix="s3-copy") as pool:
+            in_flight = set()
+            for obj in self._iter_objects(src_bucket, src_prefix):
+                # Ventana acotada: el listado no se adelanta a la copia
+                if len(in_flight) >= self.max_concurrency * 2:
+                    _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                in_flight.add(pool.submit(copy_one, obj))
+                if move:
+                    self._flush_deletes(src_bucket, to_delete, lock, result)
+            wait(in_flight)
+
+        if move:
+            self._flush_deletes(src_bucket, to_delete, lock, result, final=True)
+
+        if _logger:
+            _logger.info(
+                "%s de %s/%s a %s/%s: %d objetos (%d bytes), %d errores",
+                "Movimiento" if move else "Copia", src_bucket, src_prefix, dst_bucket, dst_prefix,
+                result.copied, result.bytes_copied, len(result.errors),
+            )
+        return result
+
+    def _iter_objects(self, bucket: str, prefix: str) -> Iterator[Dict[str, Any]]:
+        params: Dict[str, Any] = {'Bucket': bucket, 'Prefix': prefix, 'MaxKeys': 1000}
+        while True:
+            response = self.client.list_objects_v2(**params)
+            for obj in response.get('Contents', []):
+                yield obj
+            if not response.get('IsTruncated'):
+                break
+            params['ContinuationToken'] = response['NextContinuationToken']
+
+    def _flush_deletes(self, bucket: str, to_delete: List[Dict[str, str]], lock: threading.Lock,
+                       result: CopyResult, final: bool = False) -> None:
+        while True:
+            with lock:
+                if len(to_delete) < DELETE_BATCH_SIZE and not (final and to_delete):
+                    return
+                batch = to_delete[:DELETE_BATCH_SIZE]
+                del to_delete[:DELETE_BATCH_SIZE]
+            try:
+                response = self.client.delete_objects(Bucket=bucket, Delete={'Objects': batch, 'Quiet': True})
+                errors = response.get('Errors', [])
+            except Exception as exc:  # noqa: BLE001 - el lote completo falló
+                errors = [{'Key': obj['Key'], 'Code': _error_code(exc), 'Message': str(exc)} for obj in batch]
+            with lock:
+                result.deleted += len(batch) - len(errors)
+                result.errors.extend(errors)
@@ -0,0 +1,135 @@
+"""
+Cálculo y verificación local de ETags S3.
+
+Para objetos subidos en una sola petición el ETag es el MD5 del contenido;
+para objetos multiparte es el MD5 de la concatenación de los MD5 binarios
+de cada parte, seguido de ``-<número de partes>``. Reconstruirlo en local
+permite verificar descargas y detectar archivos sin cambios sin volver a
+transferirlos. Los ETags que no siguen este formato (p. ej. cifrado
+SSE-KMS/SSE-C) no son verificables y se tratan como tales.
+"""
+
+import hashlib
+import math
+import re
+from typing import List, Optional
+
+from core.s3_multipart import MIB, compute_part_size
+
+HASH_READ_SIZE = 1024 * 1024
+# Tamaño de parte por defecto de boto3.upload_file (TransferConfig.multipart_chunksize)
+BOTO3_DEFAULT_CHUNK_SIZE = 8 * MIB
+
+_ETAG_RE = re.compile(r'^[0-9a-f]{32}(?:-(\d+))?$')
+
+
+def normalize_etag(etag: Optional[str]) -> str:
+    """ETag sin comillas y en minúsculas"""
+    return (etag or '').strip().strip('"').lower()
+
+
+def is_verifiable_etag(etag: Optional[str]) -> bool:
+    """True si el ETag tiene formato MD5 (simple o multiparte)"""
+    return bool(_ETAG_RE.match(normalize_etag(etag)))
+
+
+def etag_parts_count(etag: Optional[str]) -> Optional[int]:
+    """Número de partes de un ETag multiparte, o None si es un MD5 simple"""
+    match = _ETAG_RE.match(normalize_etag(etag))
+    if not match or match.group(1) is None:
+        return None
+    return int(match.group(1))
+
+
+def _md5_range(f, length: int) -> bytes:
+    digest = hashlib.md5()
+    remaining = length
+    while remaining > 0:
+        chunk = f.read(min(HASH_READ_SIZE, remaining))
+        if not chunk:
+            break
+        digest.update(chunk)
+        remaining -= len(chunk)
+    return digest.digest()
+
+
+def compute_etag(file_path: str, part_size: Optional[int] = None, file_size: Optional[int] = None) -> str:
+    """
+    Calcula el ETag que S3 asignaría a un archivo.
+
+    Args:
+        file_path: Archivo local.
+        part_size: Tamaño de parte de la subida multiparte; None para un
+            objeto subido en una sola petición.
+        file_size: Tamaño del archivo (se calcula si no se indica).
+    """
+    with open(file_path, 'rb') as f:
+        if not part_size:
+            digest = hashlib.md5()
+            for chunk in iter(lambda: f.read(HASH_READ_SIZE), b''):
+                digest.update(chunk)
+            return digest.hexdigest()
+
+        if file_size is None:
+            f.seek(0, 2)
+            file_size = f.tell()
+            f.seek(0)
+        parts = max(1, math.ceil(file_size / part_size))
+        part_digests = b''.join(_md5_range(f, part_size) for _ in range(parts))
+        return f"{hashlib.md5(part_digests).hexdigest()}-{parts}"
+
+
+def etag_matches(file_path: str, etag: Optional[str], part_size: Optional[int] = None) -> Optional[bool]:
+    """
+    Comparar un archivo local con un ETag remoto.
+
+    Returns:
+        True/False según coincida, o None si el ETag no es verificable o
+        falta el tamaño de parte de un ETag multiparte.
+    """
+    if not is_verifiable_etag(etag):
+        return None
+    expected = normalize_etag(etag)
+    if etag_parts_count(expected) is None:
+        return compute_etag(file_path) == expected
+    if not part_size:
+        return None
+    return compute_etag(file_path, part_size) == expected
+
+
+def candidate_part_sizes(file_size: int, parts_count: int) -> List[int]:
+    """
+    Tamaños de parte plausibles para un ETag multiparte de ``parts_count`` partes.
+
+    Cubre el tamaño que elige el motor multiparte de la aplicación, el de
+    ``boto3.upload_file`` (8 MiB por defecto) y el reparto uniforme en MiB
+    enteros; solo se devuelven los que producen exactamente ese número de partes.
+    """
+    exact = math.ceil(file_size / max(1, parts_count))
+    candidates = [
+        compute_part_size(file_size),
+        BOTO3_DEFAULT_CHUNK_SIZE,
+        math.ceil(exact / MIB) * MIB,
+        exact,
+    ]
+    if parts_count == 1:
+        candidates.append(max(1, file_size))
+    result: List[int] = []
+    for part_size in candidates:
+        if part_size > 0 and max(1, math.ceil(file_size / part_size)) == parts_count and part_size not in result:
+            result.append(part_size)
+    return result
+
+
+def remote_part_size(client, bucket: str, key: str) -> Optional[int]:
+    """
+    Tamaño de parte de un objeto multiparte (tamaño de su parte 1).
+
+    Returns:
+        Tamaño en bytes, o None si el proveedor no admite ``PartNumber``.
+    """
+    try:
+        response = client.head_object(Bucket=bucket, Key=key, PartNumber=1)
+    except Exception:  # noqa: BLE001 - proveedores sin soporte de PartNumber
+        return None
+    return response.get('ContentLength') or None
@@ -0,0 +1,523 @@
+"""
+Motor de subida multiparte paralela para S3 (Vultr Object Storage).
+
+Divide archivos grandes en partes cuyo tamaño escala con el tamaño del
+archivo y las sube en paralelo con un pool de hilos, reportando progreso
+por parte. La concurrencia se toma del plan Rclone activo
+(``ConfigManager.get_plans()``) para que la subida directa por boto3 siga
+el mismo perfil de rendimiento que los montajes.
+
+Las subidas pueden reanudarse: el UploadId y los ETags de las partes
+completadas se guardan en un manifiesto (``multipart_uploads.json``, junto
+a ``active_transfers.json``) y al reintentar solo se envían las partes que
+faltan según ListParts.
+
+El origen puede ser un archivo local o cualquier fuente con lectura por
+rangos (``read_part``), p. ej. un disco de Azure leído directamente de su
+SAS sin pasar por un archivo temporal.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    from logger_manager import get_logger
+
+    _logger = get_logger(__name__)
+except ImportError:  # pragma: no cover - fallback defensivo
+    _logger = None
+
+
+MIB = 1024 * 1024
+
+# Límites impuestos por la API S3
+S3_MIN_PART_SIZE = 5 * MIB
+S3_MAX_PART_SIZE = 5 * 1024 * MIB
+S3_MAX_PARTS = 10000
+
+# Parámetros por defecto del motor
+MIN_PART_SIZE = 8 * MIB
+TARGET_PARTS = 1000
+MULTIPART_THRESHOLD = 64 * MIB
+DEFAULT_CONCURRENCY = 8
+MAX_CONCURRENCY = 64
+# Memoria máxima en vuelo (partes leídas y pendientes de enviar)
+MAX_INFLIGHT_BYTES = 1024 * MIB
+
+# Edad a partir de la cual una subida multiparte huérfana se aborta
+DEFAULT_STALE_UPLOAD_HOURS = 72
+
+DEFAULT_MANIFEST_FILE = "multipart_uploads.json"
+# Intervalo mínimo entre escrituras del manifiesto por partes confirmadas
+MANIFEST_SAVE_INTERVAL = 2.0
+
+# progress_callback(part_number, part_bytes, bytes_done, total_bytes)
+PartProgressCallback = Callable[[int, int, int, int], None]
+# read_part(offset, length) -> bytes de la parte
+ReadPart = Callable[[int, int], bytes]
+
+
+class MultipartUploadCancelled(Exception):
+    """La subida fue cancelada antes de completarse."""
+
+
+def compute_part_size(file_size: int, min_part_size: int = MIN_PART_SIZE,
+                      target_parts: int = TARGET_PARTS) -> int:
+    """
+    Calcula el tamaño de parte para un archivo.
+
+    Apunta a unas ``target_parts`` partes, redondeando a MiB completos, sin
+    bajar de ``min_part_size`` ni superar los límites de S3 (5 GB por parte,
+    10.000 partes por objeto).
+    """
+    min_part_size = max(min_part_size, S3_MIN_PART_SIZE)
+    if file_size <= 0:
+        return min_part_size
+
+    part_size = math.ceil(file_size / max(1, target_parts))
+    part_size = math.ceil(part_size / MIB) * MIB
+    part_size = max(part_size, min_part_size)
+
+    # Garantizar que no se excede el máximo de partes
+    if math.ceil(file_size / part_size) > S3_MAX_PARTS:
+        part_size = math.ceil(math.ceil(file_size / S3_MAX_PARTS) / MIB) * MIB
+
+    return min(part_size, S3_MAX_PART_SIZE)
+
+
+def concurrency_from_plan(plan: Optional[Dict[str, Any]],
+                          default: int = DEFAULT_CONCURRENCY) -> int:
+    """
+    Obtiene la concurrencia de subida a partir de un plan Rclone.
+
+    Usa el campo ``transfers`` del plan (p. ej. "320" en Ultra Performance)
+    acotado a ``MAX_CONCURRENCY``; si el plan no es válido retorna ``default``.
+    """
+    if not plan:
+        return default
+    try:
+        transfers = int(str(plan.get('transfers', default)).strip())
+    except (TypeError, ValueError):
+        return default
+    if transfers <= 0:
+        return default
+    return max(1, min(transfers, MAX_CONCURRENCY))
+
+
+def plan_parts(file_size: int, part_size: int) -> List[Tuple[int, int, int]]:
+    """Retorna la lista de partes como tuplas (part_number, offset, length)."""
+    parts = []
+    offset = 0
+    part_number = 1
+    while offset < file_size:
+        length = min(part_size, file_size - offset)
+        parts.append((part_number, offset, length))
+        offset += length
+        part_number += 1
+    return parts
+
+
+def effective_concurrency(max_concurrency: int, part_size: int,
+                          max_inflight_bytes: int = MAX_INFLIGHT_BYTES) -> int:
+    """Limita la concurrencia para no superar la memoria en vuelo permitida."""
+    by_memory = max(1, max_inflight_bytes // max(1, part_size))
+    return max(1, min(max_concurrency, by_memory))
+
+
+class UploadManifestStore:
+    """
+    Manifiesto persistente de subidas multiparte en curso.
+
+    Cada entrada guarda el UploadId, la geometría de partes y los ETags ya
+    confirmados, identificada por endpoint/bucket/key. La escritura es
+    atómica (archivo temporal + ``os.replace``) para sobrevivir a cierres
+    inesperados.
+
+    Las partes confirmadas no reescriben el archivo una a una: se guardan
+    como mucho cada ``MANIFEST_SAVE_INTERVAL`` segundos y ``flush()`` guarda
+    lo pendiente. Las que se pierdan en un cierre abrupto las recupera
+    ListParts al reanudar.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or os.path.join(os.getcwd(), DEFAULT_MANIFEST_FILE)
+        self._lock = threading.Lock()
+        self._uploads: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._last_save = 0.0
+        self._load()
+
+    @staticmethod
+    def make_key(endpoint: str, bucket: str, key: str) -> str:
+        return f"{endpoint}|{bucket}|{key}"
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._uploads = json.load(f).get("uploads", {})
+        except Exception as exc:  # noqa: BLE001
+            if _logger:
+                _logger.warning("Manifiesto multiparte ilegible (%s): %s", self.path, exc)
+            self._uploads = {}
+
+    def _save(self) -> None:
+        self._dirty = False
+        self._last_save = time.monotonic()
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"uploads": self._uploads}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as exc:  # noqa: BLE001
+            if _logger:
+                _logger.error("Error guardando manifiesto multiparte: %s", exc)
+
+    def get(self, manifest_key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._uploads.get(manifest_key)
+            return json.loads(json.dumps(record)) if record else None
+
+    def put(self, manifest_key: str, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._uploads[manifest_key] = record
+            self._save()
+
+    def record_part(self, manifest_key: str, part_number: int, etag: str) -> None:
+        with self._lock:
+            record = self._uploads.get(manifest_key)
+            if record is None:
+                return
+            record.setdefault("parts", {})[str(part_number)] = etag
+            self._dirty = True
+            if time.monotonic() - self._last_save >= MANIFEST_SAVE_INTERVAL:
+                self._save()
+
+    def flush(self) -> None:
+        """Guardar las partes confirmadas que aún no están en disco"""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def remove(self, manifest_key: str) -> None:
+        with self._lock:
+            if self._uploads.pop(manifest_key, None) is not None or self._dirty:
+                self._save()
+
+    def upload_ids(self) -> Set[str]:
+        """UploadIds con manifiesto local (reanudables)"""
+        with self._lock:
+            return {r["upload_id"] for r in self._uploads.values() if r.get("upload_id")}
+
+    def all(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return json.loads(json.dumps(self._uploads))
+
+
+def list_uploaded_parts(client, bucket: str, key: str, upload_id: str) -> Dict[int, str]:
+    """Retorna {part_number: etag} de las partes confirmadas por el servidor (ListParts)."""
+    parts: Dict[int, str] = {}
+    kwargs = {'Bucket': bucket, 'Key': key, 'UploadId': upload_id}
+    while True:
+        response = client.list_parts(**kwargs)
+        for part in response.get('Parts', []):
+            parts[part['PartNumber']] = part['ETag']
+        if not response.get('IsTruncated'):
+            break
+        kwargs['PartNumberMarker'] = response.get('NextPartNumberMarker')
+    return parts
+
+
+def abort_stale_uploads(client, bucket: str, max_age_hours: float = DEFAULT_STALE_UPLOAD_HOURS,
+                        manifest_store: Optional[UploadManifestStore] = None,
+                        now: Optional[datetime] = None) -> List[str]:
+    """
+    Aborta las subidas multiparte iniciadas hace más de ``max_age_hours``.
+
+    Las que aún tienen entrada en ``manifest_store`` se conservan: son
+    subidas pausadas o interrumpidas que se pueden reanudar.
+
+    Returns:
+        Lista de UploadIds abortados.
+    """
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - timedelta(hours=max_age_hours)
+    aborted: List[str] = []
+    resumable = manifest_store.upload_ids() if manifest_store else set()
+    kwargs: Dict[str, Any] = {'Bucket': bucket}
+    while True:
+        response = client.list_multipart_uploads(**kwargs)
+        for upload in response.get('Uploads', []):
+            initiated = upload.get('Initiated')
+            if initiated is None:
+                continue
+            if initiated.tzinfo is None:
+                initiated = initiated.replace(tzinfo=timezone.utc)
+            if initiated >= cutoff or upload['UploadId'] in resumable:
+                continue
+            try:
+                client.abort_multipart_upload(
+                    Bucket=bucket, Key=upload['Key'], UploadId=upload['UploadId']
+                )
+                aborted.append(upload['UploadId'])
+            except Exception as exc:  # noqa: BLE001
+                if _logger:
+                    _logger.warning("No se pudo abortar %s (%s): %s", upload['Key'], upload['UploadId'], exc)
+        if not response.get('IsTruncated'):
+            break
+        kwargs['KeyMarker'] = response.get('NextKeyMarker')
+        kwargs['UploadIdMarker'] = response.get('NextUploadIdMarker')
+    return aborted
+
+
+_manifest_store: Optional[UploadManifestStore] = None
+
+
+def get_manifest_store() -> UploadManifestStore:
+    """Obtener instancia singleton del manifiesto de subidas multiparte"""
+    global _manifest_store
+    if _manifest_store is None:
+        _manifest_store = UploadManifestStore()
+    return _manifest_store
+
+
+class MultipartUploader:
+    """
+    Sube un archivo local a S3 usando multiparte en paralelo.
+
+    Ejemplo de uso:
+
+        uploader = MultipartUploader(
+            s3_client, "mi-bucket", "backups/dump.zip", "C:/tmp/dump.zip",
+            max_concurrency=concurrency_from_plan(plan),
+            progress_callback=on_part,
+        )
+        uploader.upload()
+
+    Sin archivo local, ``read_part`` + ``source_size`` dan el contenido y
+    ``source_id`` identifica el origen en el manifiesto (en lugar de ruta
+    y fecha de modificación).
+    """
+
+    def __init__(
+        self,
+        client,
+        bucket: str,
+        key: str,
+        file_path: Optional[str] = None,
+        *,
+        part_size: Optional[int] = None,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        progress_callback: Optional[PartProgressCallback] = None,
+        extra_args: Optional[Dict[str, Any]] = None,
+        manifest_store: Optional[UploadManifestStore] = None,
+        manifest_key: Optional[str] = None,
+        read_part: Optional[ReadPart] = None,
+        source_size: Optional[int] = None,
+        source_id: Optional[str] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> None:
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.file_path = file_path
+        if read_part is None:
+            self.file_size = os.path.getsize(file_path)
+            self.file_mtime = os.path.getmtime(file_path)
+            self.source_id = os.path.abspath(file_path)
+            self.read_part = self._read_file_part
+        else:
+            self.file_size = source_size
+            self.file_mtime = None
+            self.source_id = source_id
+            self.read_part = read_part
+        self.part_size = part_size or compute_part_size(self.file_size)
+        self.max_concurrency = effective_concurrency(max(1, max_concurrency), self.part_size)
+        self.progress_callback = progress_callback
+        self.extra_args = extra_args or {}
+        self.manifest_store = manifest_store
+        self.manifest_key = manifest_key or UploadManifestStore.make_key("", bucket, key)
+
+        self.upload_id: Optional[str] = None
+        self.resumed_parts = 0
+        self._cancel_event = cancel_event or threading.Event()
+        self._lock = threading.Lock()
+        self._bytes_done = 0
+
+    @property
+    def bytes_done(self) -> int:
+        return self._bytes_done
+
+    def cancel(self) -> None:
+        """Solicita detener la subida; las partes en vuelo terminan primero."""
+        self._cancel_event.set()
+
+    def upload(self) -> Dict[str, Any]:
+        """
+        Ejecuta la subida completa.
+
+        Si hay un manifiesto con una subida previa del mismo archivo, se
+        reanuda: solo se envían las partes que ListParts no confirma.
+
+        Returns:
+            Respuesta de ``complete_multipart_upload``.
+
+        Raises:
+            MultipartUploadCancelled: Si se llamó a ``cancel()``.
+            Exception: Cualquier error del cliente. Sin manifiesto la subida
+                se aborta; con manifiesto se conserva para reanudarla.
+        """
+        parts = plan_parts(self.file_size, self.part_size)
+        done = self._resume_from_manifest()
+        if self.upload_id is None:
+            response = self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, **self.extra_args
+            )
+            self.upload_id = response['UploadId']
+            self._persist_new_upload()
+
+        pending = [p for p in parts if p[0] not in done]
+        self.resumed_parts = len(done)
+        self._bytes_done = sum(length for number, _, length in parts if number in done)
+
+        if _logger:
+            _logger.debug(
+                "Multiparte %s/%s: %d partes de %d MiB (%d reanudadas), %d hilos",
+                self.bucket, self.key, len(parts), self.part_size // MIB,
+                self.resumed_parts, self.max_concurrency,
+            )
+
+        try:
+            completed = self._upload_parts(pending)
+            completed.extend({'PartNumber': n, 'ETag': etag} for n, etag in done.items())
+            completed.sort(key=lambda p: p['PartNumber'])
+            result = self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={'Parts': completed},
+            )
+        except BaseException:
+            if self.manifest_store is None:
+                self._abort()
+            else:
+                self.manifest_store.flush()
+            raise
+
+        if self.manifest_store:
+            self.manifest_store.remove(self.manifest_key)
+        return result
+
+    def _resume_from_manifest(self) -> Dict[int, str]:
+        """Recupera UploadId y partes confirmadas de una subida anterior compatible."""
+        if self.manifest_store is None:
+            return {}
+        record = self.manifest_store.get(self.manifest_key)
+        if not record:
+            return {}
+        if (record.get("file_path") != self.source_id
+                or record.get("file_size") != self.file_size
+                or record.get("file_mtime") != self.file_mtime
+                or record.get("part_size") != self.part_size):
+            # El archivo cambió: la subida previa no sirve
+            self._abort_upload_id(record.get("upload_id"))
+            self.manifest_store.remove(self.manifest_key)
+            return {}
+
+        upload_id = record["upload_id"]
+        try:
+            server_parts = list_uploaded_parts(self.client, self.bucket, self.key, upload_id)
+        except Exception as exc:  # noqa: BLE001 - NoSuchUpload u otro error: empezar de cero
+            if _logger:
+                _logger.info("Subida %s no reanudable (%s); se inicia de nuevo", upload_id, exc)
+            self.manifest_store.remove(self.manifest_key)
+            return {}
+
+        local_parts = {int(n): etag for n, etag in record.get("parts", {}).items()}
+        # Solo cuentan las partes que el servidor confirma con el mismo ETag
+        done = {n: etag for n, etag in server_parts.items() if local_parts.get(n, etag) == etag}
+        self.upload_id = upload_id
+        return done
+
+    def _persist_new_upload(self) -> None:
+        if self.manifest_store is None:
+            return
+        self.manifest_store.put(self.manifest_key, {
+            "upload_id": self.upload_id,
+            "bucket": self.bucket,
+            "key": self.key,
+            "file_path": self.source_id,
+            "file_size": self.file_size,
+            "file_mtime": self.file_mtime,
+            "part_size": self.part_size,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "parts": {},
+        })
+
+    def _upload_parts(self, parts: List[Tuple[int, int, int]]) -> List[Dict[str, Any]]:
+        completed: List[Dict[str, Any]] = []
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = [executor.submit(self._upload_part, *part) for part in parts]
+            try:
+                for future in as_completed(futures):
+                    completed.append(future.result())
+            except BaseException:
+                self._cancel_event.set()
+                for future in futures:
+                    future.cancel()
+                raise
+        return completed
+
+    def _upload_part(self, part_number: int, offset: int, length: int) -> Dict[str, Any]:
+        if self._cancel_event.is_set():
+            raise MultipartUploadCancelled("Subida cancelada")
+
+        data = self.read_part(offset, length)
+        if self._cancel_event.is_set():
+            raise MultipartUploadCancelled("Subida cancelada")
+
+        response = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=data,
+            ContentLength=length,
+        )
+
+        if self.manifest_store:
+            self.manifest_store.record_part(self.manifest_key, part_number, response['ETag'])
+
+        with self._lock:
+            self._bytes_done += length
+            bytes_done = self._bytes_done
+        if self.progress_callback:
+            self.progress_callback(part_number, length, bytes_done, self.file_size)
+
+        return {'PartNumber': part_number, 'ETag': response['ETag']}
+
+    def _read_file_part(self, offset: int, length: int) -> bytes:
+        with open(self.file_path, 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def _abort(self) -> None:
+        self._abort_upload_id(self.upload_id)
+
+    def _abort_upload_id(self, upload_id: Optional[str]) -> None:
+        if not upload_id:
+            return
+        try:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=upload_id
+            )
+        except Exception as exc:  # noqa: BLE001
+            if _logger:
+                _logger.warning("No se pudo abortar multiparte %s: %s", upload_id, exc)
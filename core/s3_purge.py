@@ -0,0 +1,182 @@
+"""
+Vaciado de buckets S3 en tubería (listado + borrado en paralelo).
+
+El listado recorre el bucket página a página y deposita lotes de hasta
+1000 claves en una cola acotada; un pool de hilos consume la cola y emite
+``DeleteObjects`` en paralelo. La memoria se mantiene plana sin importar el
+número de objetos, y en buckets con versionado se borran también todas las
+versiones y marcadores de borrado.
+"""
+
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    from logger_manager import get_logger
+
+    _logger = get_logger(__name__)
+except ImportError:  # pragma: no cover - fallback defensivo
+    _logger = None
+
+
+# Máximo de claves por DeleteObjects (límite de la API S3)
+DELETE_BATCH_SIZE = 1000
+DEFAULT_PURGE_WORKERS = 8
+
+# progress_callback(deleted_total, errors_total)
+PurgeProgressCallback = Callable[[int, int], None]
+
+_STOP = object()
+
+
+@dataclass
+class PurgeResult:
+    """Resultado de un vaciado de bucket"""
+    deleted: int = 0
+    batches: int = 0
+    # Errores por objeto/lote: {'Key', 'VersionId', 'Code', 'Message'}
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def success(self) -> bool:
+        return not self.errors
+
+
+class BucketPurger:
+    """
+    Borra todo el contenido de un bucket con listado y borrado en tubería.
+
+    Ejemplo de uso:
+
+        result = BucketPurger(s3_client, "mi-bucket", max_workers=16).purge()
+        if not result.success:
+            print(result.errors[:5])
+    """
+
+    def __init__(
+        self,
+        client,
+        bucket: str,
+        *,
+        max_workers: int = DEFAULT_PURGE_WORKERS,
+        include_versions: Optional[bool] = None,
+        prefix: str = '',
+        progress_callback: Optional[PurgeProgressCallback] = None,
+    ) -> None:
+        self.client = client
+        self.bucket = bucket
+        self.max_workers = max(1, max_workers)
+        self.include_versions = include_versions
+        self.prefix = prefix
+        self.progress_callback = progress_callback
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=self.max_workers * 2)
+        self._lock = threading.Lock()
+        self._result = PurgeResult()
+        self._abort = threading.Event()
+
+    def purge(self) -> PurgeResult:
+        """Ejecuta el vaciado y retorna el resultado (incluye errores por lote)."""
+        versioned = self.include_versions
+        if versioned is None:
+            versioned = self._is_versioned()
+
+        workers = [
+            threading.Thread(target=self._worker, name=f"purge-{self.bucket}-{i}", daemon=True)
+            for i in range(self.max_workers)
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            batches = self._iter_version_batches() if versioned else self._iter_object_batches()
+            for batch in batches:
+                if self._abort.is_set():
+                    break
+                self._queue.put(batch)
+        except BaseException:
+            self._abort.set()
+            raise
+        finally:
+            for _ in workers:
+                self._queue.put(_STOP)
+            for worker in workers:
+                worker.join()
+
+        if _logger:
+            _logger.info(
+                "Vaciado de '%s': %d objetos en %d lotes, %d errores",
+                self.bucket, self._result.deleted, self._result.batches, len(self._result.errors),
+            )
+        return self._result
+
+    def _is_versioned(self) -> bool:
+        try:
+            status = self.client.get_bucket_versioning(Bucket=self.bucket).get('Status')
+        except Exception:  # noqa: BLE001 - proveedores sin versionado
+            return False
+        return status in ('Enabled', 'Suspended')
+
+    def _iter_object_batches(self) -> Iterator[List[Dict[str, str]]]:
+        params: Dict[str, Any] = {'Bucket': self.bucket, 'MaxKeys': DELETE_BATCH_SIZE}
+        if self.prefix:
+            params['Prefix'] = self.prefix
+        while True:
+            response = self.client.list_objects_v2(**params)
+            batch = [{'Key': obj['Key']} for obj in response.get('Contents', [])]
+            if batch:
+                yield batch
+            if not response.get('IsTruncated'):
+                break
+            params['ContinuationToken'] = response['NextContinuationToken']
+
+    def _iter_version_batches(self) -> Iterator[List[Dict[str, str]]]:
+        params: Dict[str, Any] = {'Bucket': self.bucket, 'MaxKeys': DELETE_BATCH_SIZE}
+        if self.prefix:
+            params['Prefix'] = self.prefix
+        while True:
+            response = self.client.list_object_versions(**params)
+            entries = response.get('Versions', []) + response.get('DeleteMarkers', [])
+            batch = [{'Key': v['Key'], 'VersionId': v['VersionId']} for v in entries]
+            # Versiones + marcadores pueden superar 1000 en una misma página
+            for i in range(0, len(batch), DELETE_BATCH_SIZE):
+                yield batch[i:i + DELETE_BATCH_SIZE]
+            if not response.get('IsTruncated'):
+                break
+            params['KeyMarker'] = response.get('NextKeyMarker')
+            params['VersionIdMarker'] = response.get('NextVersionIdMarker')
+
+    def _worker(self) -> None:
+        while True:
+            batch = self._queue.get()
+            if batch is _STOP:
+                return
+            if self._abort.is_set():
+                continue
+            self._delete_batch(batch)
+
+    def _delete_batch(self, batch: List[Dict[str, str]]) -> None:
+        try:
+            response = self.client.delete_objects(
+                Bucket=self.bucket, Delete={'Objects': batch, 'Quiet': True}
+            )
+            errors = response.get('Errors', [])
+        except Exception as exc:  # noqa: BLE001 - el lote completo falló
+            errors = [{'Key': obj['Key'], 'VersionId': obj.get('VersionId'),
+                       'Code': type(exc).__name__, 'Message': str(exc)} for obj in batch]
+
+        with self._lock:
+            self._result.batches += 1
+            self._result.deleted += len(batch) - len(errors)
+            self._result.errors.extend(errors)
+            deleted, error_count = self._result.deleted, len(self._result.errors)
+
+        if errors and _logger:
+            _logger.warning("Lote de borrado en '%s' con %d errores (%s)",
+                            self.bucket, len(errors), errors[0].get('Code'))
+        if self.progress_callback:
+            try:
+                self.progress_callback(deleted, error_count)
+            except Exception:  # noqa: BLE001 - no detener el borrado por la UI
+                pass
@@ -0,0 +1,412 @@
+"""
+Exportación comprimida y con acceso aleatorio (formato seekable de Zstandard).
+
+Un disco exportado sin comprimir ocupa su tamaño completo aunque sea casi
+todo ceros o datos muy repetitivos. Aquí el flujo se divide en tramas de
+tamaño fijo (``FRAME_SIZE`` bytes sin comprimir) que se comprimen de forma
+independiente en varios hilos (``zstandard`` libera el GIL) y se escriben
+en orden. Al final se añade la tabla de tramas como trama ignorable
+(``Seek_Table``, formato "Zstandard Seekable Format"):
+
+- ``zstd -d`` y cualquier descompresor estándar leen el archivo entero
+  (tramas concatenadas; la tabla se ignora).
+- ``SeekableZstdReader`` va directo a la trama que contiene un
+  desplazamiento, para lecturas parciales y restauraciones selectivas.
+
+Mientras dura la exportación, junto al ``.part`` se mantiene un índice
+binario (8 bytes por trama, el mismo formato que las entradas de la tabla)
+que se escribe siempre después de los datos de su trama: tras un corte se
+trunca el ``.part`` a lo que el índice registra y se sigue desde ahí.
+"""
+
+import bisect
+import json
+import os
+import struct
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from core.segmented_download import (
+    PART_SUFFIX, ByteRanges, DownloadCancelled, DownloadProgressCallback, RemoteObjectChanged
+)
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    from logger_manager import get_logger
+
+    _logger = get_logger(__name__)
+except ImportError:  # pragma: no cover - fallback defensivo
+    _logger = None
+
+
+MIB = 1024 * 1024
+
+ZSTD_SUFFIX = ".zst"
+# Bytes sin comprimir por trama: granularidad de las lecturas parciales
+FRAME_SIZE = 4 * MIB
+DEFAULT_COMPRESSION_LEVEL = 3
+# Tramas en vuelo por hilo (limita la memoria mientras se espera a la más antigua)
+FRAMES_PER_WORKER = 2
+
+INDEX_SUFFIX = ".index"
+STATE_SUFFIX = ".state.json"
+
+_SKIPPABLE_MAGIC = 0x184D2A5E
+_SEEKABLE_MAGIC = 0x8F92EAB1
+_ENTRY = struct.Struct("<II")  # tamaño comprimido, tamaño sin comprimir
+_FOOTER = struct.Struct("<IBI")  # número de tramas, descriptor, magic
+_CHECKSUM_FLAG = 0x80
+
+# read_frame(offset, length) -> exactamente ``length`` bytes del origen
+ReadFrame = Callable[[int, int], bytes]
+
+
+def build_seek_table(entries: Sequence[Tuple[int, int]]) -> bytes:
+    """Trama ignorable con la tabla de tramas (sin checksums por trama)"""
+    body = b"".join(_ENTRY.pack(compressed, raw) for compressed, raw in entries)
+    body += _FOOTER.pack(len(entries), 0, _SEEKABLE_MAGIC)
+    return struct.pack("<II", _SKIPPABLE_MAGIC, len(body)) + body
+
+
+def read_seek_table(f) -> List[Tuple[int, int]]:
+    """
+    Entradas (comprimido, sin comprimir) de la tabla al final de ``f``.
+
+    Raises:
+        ValueError: el archivo no tiene tabla de tramas.
+    """
+    f.seek(0, os.SEEK_END)
+    end = f.tell()
+    if end < _FOOTER.size + 8:
+        raise ValueError("Archivo demasiado corto para ser zstd seekable")
+    f.seek(end - _FOOTER.size)
+    count, descriptor, magic = _FOOTER.unpack(f.read(_FOOTER.size))
+    if magic != _SEEKABLE_MAGIC:
+        raise ValueError("El archivo no tiene tabla de tramas (zstd seekable)")
+    entry_size = _ENTRY.size + (4 if descriptor & _CHECKSUM_FLAG else 0)
+    table_size = 8 + count * entry_size + _FOOTER.size
+    if table_size > end:
+        raise ValueError("Tabla de tramas corrupta")
+    f.seek(end - table_size)
+    skippable_magic, frame_size = struct.unpack("<II", f.read(8))
+    if skippable_magic != _SKIPPABLE_MAGIC or frame_size != table_size - 8:
+        raise ValueError("Tabla de tramas corrupta")
+    raw = f.read(count * entry_size)
+    return [_ENTRY.unpack_from(raw, i * entry_size) for i in range(count)]
+
+
+class SeekableZstdReader:
+    """
+    Lectura (file-like) del contenido descomprimido de un ``.zst`` seekable.
+
+    Solo se descomprimen las tramas que cubren lo leído; la última queda en
+    memoria para lecturas consecutivas.
+
+    Ejemplo de uso:
+
+        with SeekableZstdReader("web01.vhd.zst") as disk:
+            disk.seek(1024 * 1024 * 1024)
+            sector = disk.read(512)
+    """
+
+    def __init__(self, path: str) -> None:
+        if not ZSTD_AVAILABLE:
+            raise ImportError("zstandard no está instalado")
+        self._file = open(path, "rb")
+        try:
+            entries = read_seek_table(self._file)
+        except Exception:
+            self._file.close()
+            raise
+        self._compressed_offsets = [0]
+        self._raw_offsets = [0]
+        for compressed, raw in entries:
+            self._compressed_offsets.append(self._compressed_offsets[-1] + compressed)
+            self._raw_offsets.append(self._raw_offsets[-1] + raw)
+        self.frame_count = len(entries)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._position = 0
+        self._cached_index = -1
+        self._cached = b""
+
+    @property
+    def size(self) -> int:
+        return self._raw_offsets[-1]
+
+    def _frame(self, index: int) -> bytes:
+        if index != self._cached_index:
+            self._file.seek(self._compressed_offsets[index])
+            data = self._file.read(self._compressed_offsets[index + 1] - self._compressed_offsets[index])
+            self._cached = self._decompressor.decompress(data)
+            self._cached_index = index
+        return self._cached
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.size - self._position
+        parts = []
+        while size > 0 and self._position < self.size:
+            index = bisect.bisect_right(self._raw_offsets, self._position) - 1
+            frame = self._frame(index)
+            start = self._position - self._raw_offsets[index]
+            data = frame[start:start + size]
+            parts.append(data)
+            self._position += len(data)
+            size -= len(data)
+        return b"".join(parts)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        base = {0: 0, 1: self._position, 2: self.size}[whence]
+        self._position = min(max(0, base + offset), self.size)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "SeekableZstdReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class SeekableZstdExporter:
+    """
+    Comprime un origen por rangos en un ``.zst`` seekable, en paralelo y reanudable.
+
+    Cada hilo pide una trama al origen y la comprime; las tramas se escriben
+    en orden. Con ``data_ranges`` (discos dispersos) las tramas sin datos no
+    se piden (se reutiliza la trama de ceros ya comprimida) y el progreso se
+    mide sobre los bytes con datos, como en ``SegmentedDownloader``.
+
+    Ejemplo de uso:
+
+        exporter = SeekableZstdExporter(read_frame, "D:/export/web01.vhd.zst", size,
+                                        source_id=etag, max_concurrency=8)
+        exporter.export()
+    """
+
+    def __init__(
+        self,
+        read_frame: ReadFrame,
+        output_path: str,
+        total_size: int,
+        *,
+        source_id: Optional[str] = None,
+        frame_size: int = FRAME_SIZE,
+        level: int = DEFAULT_COMPRESSION_LEVEL,
+        max_concurrency: Optional[int] = None,
+        progress_callback: Optional[DownloadProgressCallback] = None,
+        cancel_event: Optional[threading.Event] = None,
+        data_ranges: Optional[ByteRanges] = None,
+    ) -> None:
+        if not ZSTD_AVAILABLE:
+            raise ImportError("zstandard no está instalado")
+        self.read_frame = read_frame
+        self.output_path = output_path
+        self.part_path = output_path + PART_SUFFIX
+        self.index_path = self.part_path + INDEX_SUFFIX
+        self.state_path = self.part_path + STATE_SUFFIX
+        self.total_size = total_size
+        self.source_id = source_id
+        self.frame_size = max(1, frame_size)
+        self.level = level
+        self.max_concurrency = max(1, max_concurrency or os.cpu_count() or 1)
+        self.progress_callback = progress_callback
+        self._cancel = cancel_event or threading.Event()
+        self.frame_count = max(1, -(-total_size // self.frame_size))
+        self.data_ranges = list(data_ranges) if data_ranges is not None else None
+        self._range_starts = [start for start, _ in self.data_ranges or ()]
+        self.transfer_size = sum(self._frame_data_bytes(i) for i in range(self.frame_count))
+        self._local = threading.local()
+        self._zero_frames = {}
+        self._zero_lock = threading.Lock()
+        self._bytes_done = 0
+        self.resumed_frames = 0
+        self.compressed_size = 0
+
+    def cancel(self) -> None:
+        """Detener la exportación; las tramas escritas se conservan"""
+        self._cancel.set()
+
+    def frame_range(self, index: int) -> Tuple[int, int]:
+        """(inicio, longitud) de la trama en el origen"""
+        start = index * self.frame_size
+        return start, min(self.frame_size, self.total_size - start)
+
+    def export(self) -> str:
+        """
+        Ejecuta la exportación y retorna la ruta final.
+
+        Raises:
+            DownloadCancelled: con ``cancel()``; las tramas escritas se conservan.
+            RemoteObjectChanged: el origen cambió; el estado parcial se descarta.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.output_path)), exist_ok=True)
+        entries = self._prepare()
+        self.resumed_frames = len(entries)
+        self.compressed_size = sum(compressed for compressed, _ in entries)
+        self._bytes_done = sum(self._frame_data_bytes(i) for i in range(len(entries)))
+        self._report()
+        if _logger:
+            _logger.info("Exportando %s comprimido: %d/%d tramas pendientes (%d hilos)",
+                         os.path.basename(self.output_path), self.frame_count - len(entries),
+                         self.frame_count, self.max_concurrency)
+
+        try:
+            with open(self.part_path, "r+b") as data, open(self.index_path, "ab") as index:
+                data.seek(self.compressed_size)
+                self._write_frames(len(entries), data, index, entries)
+                if self._cancel.is_set():
+                    raise DownloadCancelled("Exportación detenida")
+                data.write(build_seek_table(entries))
+        except RemoteObjectChanged:
+            self._discard()
+            raise
+
+        os.replace(self.part_path, self.output_path)
+        for path in (self.index_path, self.state_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        if _logger and self.total_size:
+            _logger.info("Exportación comprimida: %.2f GB -> %.2f GB", self.total_size / 1024 ** 3,
+                         os.path.getsize(self.output_path) / 1024 ** 3)
+        return self.output_path
+
+    def _prepare(self) -> List[Tuple[int, int]]:
+        """Entradas de las tramas ya escritas (reanudación) o un ``.part`` nuevo"""
+        state = {"size": self.total_size, "source_id": self.source_id, "frame_size": self.frame_size}
+        if os.path.exists(self.part_path) and os.path.exists(self.index_path):
+            try:
+                with open(self.state_path, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+                if saved == state:
+                    return self._load_index()
+            except Exception as exc:  # noqa: BLE001 - se empieza de cero
+                if _logger:
+                    _logger.warning("Estado de exportación ilegible (%s): %s", self.state_path, exc)
+
+        with open(self.part_path, "wb"), open(self.index_path, "wb"):
+            pass
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+        return []
+
+    def _load_index(self) -> List[Tuple[int, int]]:
+        with open(self.index_path, "rb") as f:
+            raw = f.read()
+        # Una entrada a medio escribir no cuenta
+        count = min(len(raw) // _ENTRY.size, self.frame_count)
+        entries = [_ENTRY.unpack_from(raw, i * _ENTRY.size) for i in range(count)]
+        compressed = sum(size for size, _ in entries)
+        if os.path.getsize(self.part_path) < compressed:
+            raise IOError("El archivo parcial es más corto que su índice")
+        # Datos de una trama sin su entrada: se vuelve a escribir
+        with open(self.part_path, "r+b") as f:
+            f.truncate(compressed)
+        with open(self.index_path, "r+b") as f:
+            f.truncate(count * _ENTRY.size)
+        return entries
+
+    def _write_frames(self, first: int, data, index, entries: List[Tuple[int, int]]) -> None:
+        window = self.max_concurrency * FRAMES_PER_WORKER
+        pending = deque()
+        next_frame = first
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="zstd-frame") as pool:
+            try:
+                while next_frame < self.frame_count or pending:
+                    while next_frame < self.frame_count and len(pending) < window and not self._cancel.is_set():
+                        pending.append(pool.submit(self._compress_frame, next_frame))
+                        next_frame += 1
+                    if not pending:
+                        break
+                    compressed, raw_length, frame_index = pending.popleft().result()
+                    # Primero los datos y después su entrada: el índice nunca va por delante
+                    data.write(compressed)
+                    data.flush()
+                    index.write(_ENTRY.pack(len(compressed), raw_length))
+                    index.flush()
+                    entries.append((len(compressed), raw_length))
+                    self.compressed_size += len(compressed)
+                    self._bytes_done += self._frame_data_bytes(frame_index)
+                    self._report()
+            except BaseException:
+                self._cancel.set()
+                for future in pending:
+                    future.cancel()
+                raise
+
+    def _compress_frame(self, index: int) -> Tuple[bytes, int, int]:
+        if self._cancel.is_set():
+            raise DownloadCancelled("Exportación detenida")
+        start, length = self.frame_range(index)
+        if self.data_ranges is not None and not self._frame_data_bytes(index):
+            return self._zero_frame(length), length, index
+        raw = self.read_frame(start, length)
+        if len(raw) != length:
+            raise IOError(f"Trama {index} incompleta: {len(raw)}/{length} bytes")
+        return self._compressor().compress(raw), length, index
+
+    def _compressor(self):
+        # ZstdCompressor no es seguro entre hilos: uno por hilo
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = self._local.compressor = zstandard.ZstdCompressor(
+                level=self.level, write_checksum=True, write_content_size=True)
+        return compressor
+
+    def _zero_frame(self, length: int) -> bytes:
+        """Trama de ceros comprimida (todas las de igual tamaño son idénticas)"""
+        with self._zero_lock:
+            if length not in self._zero_frames:
+                self._zero_frames[length] = self._compressor().compress(bytes(length))
+            return self._zero_frames[length]
+
+    def _frame_data_bytes(self, index: int) -> int:
+        """Bytes con datos de la trama (todos si el origen no es disperso)"""
+        start, length = self.frame_range(index)
+        if self.data_ranges is None:
+            return length
+        end = start + length - 1
+        total = 0
+        position = max(0, bisect.bisect_right(self._range_starts, start) - 1)
+        for data_start, data_end in self.data_ranges[position:]:
+            if data_start > end:
+                break
+            if data_end >= start:
+                total += min(end, data_end) - max(start, data_start) + 1
+        return total
+
+    def _report(self) -> None:
+        if self.progress_callback:
+            try:
+                self.progress_callback(self._bytes_done, self.transfer_size)
+            except Exception:  # noqa: BLE001 - no detener la exportación por la UI
+                pass
+
+    def _discard(self) -> None:
+        for path in (self.part_path, self.index_path, self.state_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,566 @@
+"""
+Descarga segmentada y reanudable por rangos de bytes.
+
+El archivo destino se preasigna como ``<destino>.part`` y se divide en
+segmentos que se piden en paralelo con GETs por rango; cada hilo escribe
+directamente en su desplazamiento. Un mapa de bits de segmentos completados
+se guarda junto al archivo parcial (``<destino>.part.segments.json``), de
+modo que tras un corte o cierre solo se descargan los segmentos que faltan.
+Al terminar se verifica el contenido (opcional) y el ``.part`` se renombra
+al destino final.
+
+El transporte es independiente del proveedor: basta una función
+``fetch_range(start, end)`` que devuelva un iterable de bloques de bytes.
+
+Para objetos dispersos (discos) se pueden indicar los rangos con datos
+(``data_ranges``): el resto se da por ceros, no se pide y en el archivo
+preasignado queda como hueco.
+
+Con los resúmenes que publica el proveedor (``expected``) cada segmento se
+resume (MD5/CRC32C) mientras se escribe; los resúmenes se guardan con el
+mapa de bits y al final se combinan y comparan sin releer el archivo. El MD5
+del objeto entero no se puede combinar: si hay varios segmentos se calcula
+aparte sobre el prefijo contiguo ya completado, leyendo cada segmento del
+archivo en orden cuando el anterior está escrito (aún en la caché del sistema).
+
+Con ``chunk_ledger`` los segmentos completados se registran también en el
+manifiesto de la transferencia (``TransferInfo``); si el ``.part`` existe
+pero su estado se perdió, la descarga continúa desde ese manifiesto.
+"""
+
+import bisect
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from core.chunk_manifest import ChunkLedger, ChunkManifest
+from core.integrity import (
+    MISMATCH, UNVERIFIABLE, VERIFIED, ChunkDigest, ExpectedChecksums, IntegrityCheck, StreamHasher,
+    combine_digests, verify_digests
+)
+
+try:
+    from logger_manager import get_logger
+
+    _logger = get_logger(__name__)
+except ImportError:  # pragma: no cover - fallback defensivo
+    _logger = None
+
+
+MIB = 1024 * 1024
+
+DEFAULT_SEGMENT_SIZE = 16 * MIB
+DEFAULT_DOWNLOAD_CONCURRENCY = 8
+READ_CHUNK_SIZE = MIB
+MAX_SEGMENT_ATTEMPTS = 3
+# Segundos mínimos entre escrituras del estado mientras se completan segmentos
+STATE_SAVE_INTERVAL = 2.0
+
+PART_SUFFIX = ".part"
+STATE_SUFFIX = ".segments.json"
+
+# fetch_range(start, end_inclusive) -> iterable de bloques de bytes
+FetchRange = Callable[[int, int], Iterable[bytes]]
+# progress_callback(bytes_done, total_bytes)
+DownloadProgressCallback = Callable[[int, int], None]
+# verify(part_path) -> True/False, o None si no es verificable
+VerifyCallback = Callable[[str], Optional[bool]]
+# Rangos (inicio, fin_inclusivo) ordenados y sin solapes
+ByteRanges = Sequence[Tuple[int, int]]
+
+# FSCTL_SET_SPARSE: en NTFS un archivo solo es disperso si se marca
+_FSCTL_SET_SPARSE = 0x000900C4
+
+
+class DownloadCancelled(Exception):
+    """La descarga se detuvo; el estado se conserva para reanudarla."""
+
+
+class RemoteObjectChanged(Exception):
+    """El objeto remoto cambió durante la descarga (ETag distinto)."""
+
+
+class DownloadIntegrityError(Exception):
+    """El contenido descargado no coincide con la verificación final."""
+
+
+class SegmentState:
+    """
+    Mapa de bits persistente de los segmentos ya escritos.
+
+    El estado queda ligado al tamaño y ETag del objeto: si cualquiera de los
+    dos cambia, el estado guardado se descarta y la descarga empieza de cero.
+
+    Cada segmento completado no reescribe el archivo: se guarda como mucho
+    cada ``STATE_SAVE_INTERVAL`` segundos y ``flush()`` guarda lo pendiente
+    al terminar o detenerse. Tras un cierre abrupto solo se repiten los
+    segmentos de ese último intervalo.
+    """
+
+    def __init__(self, path: str, size: int, segment_size: int, etag: Optional[str] = None) -> None:
+        self.path = path
+        self.size = size
+        self.segment_size = segment_size
+        self.etag = etag
+        self.manifest = ChunkManifest(size, segment_size)
+        self.segment_count = self.manifest.chunk_count
+        # Resúmenes de los segmentos completados (si se verifican en línea)
+        self.digests: Dict[int, ChunkDigest] = {}
+        self._lock = threading.Lock()
+        # Serializa escritura + renombrado del archivo temporal compartido
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._last_save = 0.0
+
+    @classmethod
+    def load(cls, path: str, size: int, etag: Optional[str] = None) -> Optional["SegmentState"]:
+        """Cargar el estado guardado si corresponde al mismo objeto"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('size') != size or data.get('etag') != etag:
+                return None
+            state = cls(path, size, int(data['segment_size']), etag)
+            if 'manifest' in data:
+                state.manifest.load_bitmap(ChunkManifest.from_dict(data['manifest']).bitmap())
+            else:
+                # Formato anterior: mapa de bits en hexadecimal
+                state.manifest.load_bitmap(bytes.fromhex(data.get('bitmap', '')))
+            state.digests = {int(index): ChunkDigest.from_dict(digest)
+                             for index, digest in data.get('digests', {}).items()}
+            return state
+        except Exception as exc:  # noqa: BLE001
+            if _logger:
+                _logger.warning("Estado de descarga ilegible (%s): %s", path, exc)
+            return None
+
+    def save(self) -> None:
+        with self._save_lock:
+            with self._lock:
+                data = {
+                    'size': self.size,
+                    'segment_size': self.segment_size,
+                    'etag': self.etag,
+                    'manifest': self.manifest.to_dict(),
+                    'digests': {str(index): digest.to_dict() for index, digest in self.digests.items()},
+                }
+                self._dirty = False
+                self._last_save = time.monotonic()
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except Exception as exc:  # noqa: BLE001
+                if _logger:
+                    _logger.error("Error guardando estado de descarga: %s", exc)
+
+    def flush(self) -> None:
+        """Guardar los segmentos completados desde la última escritura"""
+        if self._dirty:
+            self.save()
+
+    def segment_range(self, index: int):
+        """(inicio, fin_inclusivo) del segmento"""
+        return self.manifest.chunk_range(index)
+
+    def is_done(self, index: int) -> bool:
+        with self._lock:
+            return self.manifest.is_done(index)
+
+    def mark_done(self, index: int, save: bool = True, digest: Optional[ChunkDigest] = None) -> None:
+        with self._lock:
+            self.manifest.mark_done(index)
+            if digest is not None:
+                self.digests[index] = digest
+            self._dirty = True
+            due = time.monotonic() - self._last_save >= STATE_SAVE_INTERVAL
+        if save and due:
+            self.save()
+
+    def manifest_snapshot(self) -> ChunkManifest:
+        """Copia del mapa de bits ligada al ETag (para el manifiesto de la transferencia)"""
+        with self._lock:
+            return ChunkManifest(self.size, self.segment_size, self.manifest.bitmap(), self.etag)
+
+    def ordered_digests(self) -> Optional[List[ChunkDigest]]:
+        """Resúmenes de todos los segmentos en orden, o None si falta alguno"""
+        with self._lock:
+            if len(self.digests) != self.segment_count:
+                return None
+            return [self.digests[index] for index in range(self.segment_count)]
+
+    def pending_segments(self) -> List[int]:
+        with self._lock:
+            return self.manifest.pending_chunks()
+
+    def completed_bytes(self) -> int:
+        with self._lock:
+            return self.manifest.completed_bytes
+
+    def remove(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def mark_sparse(path: str) -> bool:
+    """
+    Marcar un archivo como disperso para que los huecos no ocupen disco.
+
+    En Linux y macOS ``truncate`` ya deja huecos; en Windows hace falta
+    ``FSCTL_SET_SPARSE``. Devuelve False si el sistema de archivos no lo admite.
+    """
+    if os.name != 'nt':
+        return True
+    try:
+        import ctypes
+        import msvcrt
+        from ctypes import wintypes
+
+        with open(path, 'r+b') as f:
+            handle = msvcrt.get_osfhandle(f.fileno())
+            returned = wintypes.DWORD()
+            return bool(ctypes.windll.kernel32.DeviceIoControl(
+                wintypes.HANDLE(handle), _FSCTL_SET_SPARSE, None, 0, None, 0,
+                ctypes.byref(returned), None,
+            ))
+    except Exception as exc:  # noqa: BLE001 - sin disperso solo se pierde espacio
+        if _logger:
+            _logger.warning("No se pudo marcar %s como disperso: %s", path, exc)
+        return False
+
+
+class SegmentedDownloader:
+    """
+    Descarga un objeto en segmentos paralelos sobre un archivo preasignado.
+
+    Ejemplo de uso:
+
+        downloader = SegmentedDownloader(fetch_range, "C:/restore/dump.zip", size,
+                                         etag=etag, max_concurrency=8)
+        downloader.download()
+
+    Con ``data_ranges`` solo se piden esos rangos; el progreso se mide
+    entonces sobre los bytes con datos (``transfer_size``). Con ``expected``
+    el resultado de la verificación en línea queda en ``integrity``; si no
+    es concluyente se recurre a ``verify`` (que relee el archivo).
+    """
+
+    def __init__(
+        self,
+        fetch_range: FetchRange,
+        file_path: str,
+        total_size: int,
+        *,
+        etag: Optional[str] = None,
+        segment_size: int = DEFAULT_SEGMENT_SIZE,
+        max_concurrency: int = DEFAULT_DOWNLOAD_CONCURRENCY,
+        progress_callback: Optional[DownloadProgressCallback] = None,
+        verify: Optional[VerifyCallback] = None,
+        cancel_event: Optional[threading.Event] = None,
+        data_ranges: Optional[ByteRanges] = None,
+        expected: Optional[ExpectedChecksums] = None,
+        chunk_ledger: Optional[ChunkLedger] = None,
+    ) -> None:
+        self.fetch_range = fetch_range
+        self.file_path = file_path
+        self.part_path = file_path + PART_SUFFIX
+        self.state_path = self.part_path + STATE_SUFFIX
+        self.total_size = total_size
+        self.etag = etag
+        self.segment_size = max(1, segment_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.progress_callback = progress_callback
+        self.verify = verify
+        self._cancel = cancel_event or threading.Event()
+        self.data_ranges = list(data_ranges) if data_ranges is not None else None
+        self._range_starts = [start for start, _ in self.data_ranges or ()]
+        self.transfer_size = (
+            sum(end - start + 1 for start, end in self.data_ranges)
+            if self.data_ranges is not None else total_size
+        )
+        self.expected = expected if expected is not None and not expected.empty else None
+        self.integrity: Optional[IntegrityCheck] = None
+        self.chunk_ledger = chunk_ledger
+        self._zero_digests: Dict[int, ChunkDigest] = {}
+        # MD5 del objeto entero sobre el prefijo contiguo (solo con varios segmentos)
+        self._prefix_md5 = None
+        self._prefix_index = 0
+        self._prefix_lock = threading.Lock()
+        self._progress_lock = threading.Lock()
+        self._bytes_done = 0
+        self.resumed_bytes = 0
+
+    def cancel(self) -> None:
+        """Detener la descarga; los segmentos completos se conservan"""
+        self._cancel.set()
+
+    def download(self) -> str:
+        """
+        Ejecuta la descarga y retorna la ruta final.
+
+        Raises:
+            DownloadCancelled, RemoteObjectChanged, DownloadIntegrityError o
+            la excepción del primer segmento que agote sus reintentos.
+        """
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        os.makedirs(directory, exist_ok=True)
+
+        state = self._prepare_state()
+        if self.expected and self.expected.md5 is not None and state.segment_count > 1:
+            self._prefix_md5 = StreamHasher(md5=True, crc32c=False)
+            self._prefix_index = 0
+        pending = state.pending_segments()
+        if self.data_ranges is not None:
+            # Segmentos sin datos: ya son ceros en el archivo preasignado
+            holes = [index for index in pending if not self._segment_spans(state, index)]
+            for index in holes:
+                state.mark_done(index, save=False, digest=self._zero_digest(state, index))
+            if holes:
+                state.flush()
+                pending = state.pending_segments()
+            self._bytes_done = self.resumed_bytes = self.transfer_size - sum(
+                end - start + 1 for index in pending for start, end in self._segment_spans(state, index)
+            )
+        else:
+            self._bytes_done = self.resumed_bytes = state.completed_bytes()
+        if self.chunk_ledger:
+            self.chunk_ledger.start(state.manifest_snapshot())
+        self._report(0)
+
+        if pending:
+            if _logger:
+                _logger.info(
+                    "Descargando %s: %d/%d segmentos pendientes (concurrencia %d)",
+                    os.path.basename(self.file_path), len(pending), state.segment_count,
+                    self.max_concurrency,
+                )
+            try:
+                self._run_segments(state, pending)
+            except RemoteObjectChanged:
+                self._discard(state)
+                raise
+            finally:
+                # Tras detenerse o fallar, el estado guardado debe incluir todo lo escrito
+                if os.path.exists(self.part_path):
+                    state.flush()
+
+        if self._cancel.is_set():
+            raise DownloadCancelled("Descarga detenida")
+
+        self.integrity = self._check_integrity(state)
+        if self.integrity.status == UNVERIFIABLE and self.verify:
+            # Sin resúmenes en línea utilizables: verificar releyendo el archivo
+            verified = self.verify(self.part_path)
+            if verified is not None:
+                self.integrity = IntegrityCheck(VERIFIED if verified else MISMATCH, "etag",
+                                                crc32c=self.integrity.crc32c)
+        if self.integrity.status == MISMATCH:
+            self._discard(state)
+            raise DownloadIntegrityError(
+                f"La verificación de {os.path.basename(self.file_path)} falló "
+                f"({self.integrity.algorithm}); se descargará de nuevo"
+            )
+
+        os.replace(self.part_path, self.file_path)
+        state.remove()
+        return self.file_path
+
+    def _prepare_state(self) -> SegmentState:
+        state = None
+        if os.path.exists(self.part_path):
+            state = SegmentState.load(self.state_path, self.total_size, self.etag)
+            if state is None and self.chunk_ledger:
+                state = self._state_from_ledger()
+        if state is None:
+            state = SegmentState(self.state_path, self.total_size, self.segment_size, self.etag)
+            # Preasignar el archivo completo para escribir cada segmento en su sitio
+            with open(self.part_path, 'wb'):
+                pass
+            if self.data_ranges is not None:
+                mark_sparse(self.part_path)
+            with open(self.part_path, 'r+b') as f:
+                f.truncate(self.total_size)
+            state.save()
+        return state
+
+    def _state_from_ledger(self) -> Optional[SegmentState]:
+        """Estado del ``.part`` reconstruido desde el manifiesto de la transferencia"""
+        recorded = self.chunk_ledger.recorded(self.total_size, self.segment_size, self.etag)
+        if recorded is None or not recorded.done_count:
+            return None
+        state = SegmentState(self.state_path, self.total_size, self.segment_size, self.etag)
+        state.manifest.load_bitmap(recorded.bitmap())
+        if _logger:
+            _logger.info("Estado de %s recuperado del manifiesto de la transferencia (%d segmentos)",
+                         os.path.basename(self.file_path), recorded.done_count)
+        state.save()
+        return state
+
+    def _check_integrity(self, state: SegmentState) -> IntegrityCheck:
+        digests = state.ordered_digests() if self.expected else None
+        if digests is None:
+            # Sin resúmenes del proveedor, o estado guardado por una versión sin ellos
+            return IntegrityCheck(UNVERIFIABLE)
+        if self._prefix_md5 is not None:
+            self._advance_prefix(state, wait=True)
+            combined = combine_digests(digests)
+            combined.md5 = self._prefix_md5.digest().md5
+            digests = [combined]
+        return verify_digests(self.expected, digests)
+
+    def _segment_hasher(self):
+        # Con el MD5 llevado sobre el prefijo, los segmentos solo calculan CRC32C
+        return self.expected.hasher(md5=self._prefix_md5 is None)
+
+    def _advance_prefix(self, state: SegmentState, wait: bool = False) -> None:
+        """
+        Añadir al MD5 del prefijo los segmentos consecutivos ya completados.
+
+        Los hilos de segmento no esperan si otro hilo ya avanza el prefijo; la
+        pasada final (``wait=True``) recoge lo que haya quedado pendiente.
+        """
+        if self._prefix_md5 is None or not self._prefix_lock.acquire(blocking=wait):
+            return
+        try:
+            if self._prefix_index >= state.segment_count or not state.is_done(self._prefix_index):
+                return
+            # Sin búfer: una lectura anticipada guardaría bytes de segmentos aún sin escribir
+            with open(self.part_path, 'rb', buffering=0) as f:
+                while self._prefix_index < state.segment_count and state.is_done(self._prefix_index):
+                    if self._cancel.is_set() and not wait:
+                        return
+                    self._hash_prefix_segment(state, self._prefix_index, f)
+                    self._prefix_index += 1
+        finally:
+            self._prefix_lock.release()
+
+    def _hash_prefix_segment(self, state: SegmentState, index: int, f) -> None:
+        segment_start, segment_end = state.segment_range(index)
+        position = segment_start
+        for start, end in self._segment_spans(state, index):
+            # Huecos de un disco disperso: ceros sin leerlos
+            self._prefix_md5.update_zeros(start - position)
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise IOError(f"Segmento {index} incompleto en {self.part_path}")
+                self._prefix_md5.update(chunk)
+                remaining -= len(chunk)
+            position = end + 1
+        self._prefix_md5.update_zeros(segment_end + 1 - position)
+
+    def _zero_digest(self, state: SegmentState, index: int) -> Optional[ChunkDigest]:
+        """Resumen de un segmento sin datos (todos los de igual tamaño comparten el cálculo)"""
+        if not self.expected:
+            return None
+        length = state.manifest.chunk_length(index)
+        if length not in self._zero_digests:
+            hasher = self._segment_hasher()
+            hasher.update_zeros(length)
+            self._zero_digests[length] = hasher.digest()
+        return self._zero_digests[length]
+
+    def _run_segments(self, state: SegmentState, pending: List[int]) -> None:
+        workers = min(self.max_concurrency, len(pending))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="s3-segment") as pool:
+            futures = [pool.submit(self._download_segment, state, index) for index in pending]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException:
+                # Detener el resto de segmentos; los completos quedan en el mapa de bits
+                self._cancel.set()
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def _segment_spans(self, state: SegmentState, index: int) -> List[Tuple[int, int]]:
+        """Rangos a pedir dentro del segmento (el segmento entero si no es disperso)"""
+        start, end = state.segment_range(index)
+        if self.data_ranges is None:
+            return [(start, end)]
+        spans = []
+        position = max(0, bisect.bisect_right(self._range_starts, start) - 1)
+        for data_start, data_end in self.data_ranges[position:]:
+            if data_start > end:
+                break
+            if data_end >= start:
+                spans.append((max(start, data_start), min(end, data_end)))
+        return spans
+
+    def _download_segment(self, state: SegmentState, index: int) -> None:
+        spans = self._segment_spans(state, index)
+        expected = sum(end - start + 1 for start, end in spans)
+        segment_start, segment_end = state.segment_range(index)
+
+        for attempt in range(1, MAX_SEGMENT_ATTEMPTS + 1):
+            if self._cancel.is_set():
+                raise DownloadCancelled("Descarga detenida")
+            written = 0
+            hasher = self._segment_hasher() if self.expected else None
+            try:
+                with open(self.part_path, 'r+b') as f:
+                    position = segment_start
+                    for start, end in spans:
+                        f.seek(start)
+                        if hasher:
+                            # Huecos del disco dentro del segmento: ceros sin pedirlos
+                            hasher.update_zeros(start - position)
+                        for chunk in self.fetch_range(start, end):
+                            if self._cancel.is_set():
+                                raise DownloadCancelled("Descarga detenida")
+                            f.write(chunk)
+                            if hasher:
+                                hasher.update(chunk)
+                            written += len(chunk)
+                            self._report(len(chunk))
+                        position = end + 1
+                    if hasher:
+                        hasher.update_zeros(segment_end + 1 - position)
+                if written != expected:
+                    raise IOError(f"Segmento {index} incompleto: {written}/{expected} bytes")
+                state.mark_done(index, digest=hasher.digest() if hasher else None)
+                if self.chunk_ledger:
+                    self.chunk_ledger.mark_done(index)
+                break
+            except (DownloadCancelled, RemoteObjectChanged):
+                self._report(-written)
+                raise
+            except Exception as exc:  # noqa: BLE001
+                self._report(-written)
+                if attempt == MAX_SEGMENT_ATTEMPTS:
+                    raise
+                if _logger:
+                    _logger.warning("Segmento %d falló (intento %d): %s", index, attempt, exc)
+                time.sleep(min(2 ** attempt, 10))
+        self._advance_prefix(state)
+
+    def _report(self, delta: int) -> None:
+        with self._progress_lock:
+            self._bytes_done += delta
+            bytes_done = self._bytes_done
+        # Fuera del lock: el callback puede frenar (límite de banda) al hilo que avisa
+        # sin detener al resto; los totales pueden llegar ligeramente desordenados
+        if self.progress_callback:
+            try:
+                self.progress_callback(bytes_done, self.transfer_size)
+            except Exception:  # noqa: BLE001 - no detener la descarga por la UI
+                pass
+
+    def _discard(self, state: SegmentState) -> None:
+        state.remove()
+        try:
+            os.remove(self.part_path)
+        except FileNotFoundError:
+            pass
@@ -7,7 +7,7 @@ resultados, errores y progreso mediante señales de Qt.
 
 from typing import Any, Callable, Optional
 
-from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtCore import QObject, QRunnable, QThread, QThreadPool, pyqtSignal
 
 try:
     from logger_manager import get_logger
@@ -39,6 +39,7 @@ class _TaskWorker(QRunnable):
         description: Optional[str],
         logger,
         provide_progress: bool,
+        low_priority: bool = False,
     ) -> None:
         super().__init__()
         self.fn = fn
@@ -48,9 +49,13 @@ class _TaskWorker(QRunnable):
         self.signals = _WorkerSignals()
         self._logger = logger
         self._provide_progress = provide_progress
+        self._low_priority = low_priority
 
     def run(self) -> None:  # pragma: no cover - ejecutado en hilos
         """Ejecuta la función en un hilo del pool."""
+        thread = QThread.currentThread()
+        if self._low_priority and thread is not None:
+            thread.setPriority(QThread.Priority.LowestPriority)
         try:
             if self._provide_progress and "progress_callback" not in self.kwargs:
                 self.kwargs["progress_callback"] = self.signals.progress
@@ -65,6 +70,9 @@ class _TaskWorker(QRunnable):
         else:
             self.signals.success.emit(result)
         finally:
+            if self._low_priority and thread is not None:
+                # Los hilos del pool se reutilizan: restaurar prioridad
+                thread.setPriority(QThread.Priority.InheritPriority)
             self.signals.finished.emit()
 
 
@@ -102,6 +110,7 @@ class TaskRunner(QObject):
         on_progress: Optional[Callable[[int, Any], None]] = None,
         description: Optional[str] = None,
         provide_progress: bool = False,
+        low_priority: bool = False,
         **kwargs: Any,
     ) -> _TaskWorker:
         """
@@ -116,6 +125,8 @@ class TaskRunner(QObject):
             on_progress: Callback para progreso (int, datos extra).
             description: Texto para logging/depuración.
             provide_progress: Inyecta progress_callback en kwargs si no existe.
+            low_priority: Ejecuta con prioridad mínima y al final de la cola
+                (tareas de mantenimiento como reconciliaciones).
             **kwargs: Argumentos nombrados para la función.
 
         Returns:
@@ -129,6 +140,7 @@ class TaskRunner(QObject):
             description=description,
             logger=self._logger,
             provide_progress=provide_progress or on_progress is not None,
+            low_priority=low_priority,
         )
 
         if on_success:
@@ -143,7 +155,7 @@ class TaskRunner(QObject):
         if self._logger:
             self._logger.debug("Ejecutando tarea '%s'", worker.description)
 
-        self._pool.start(worker)
+        self._pool.start(worker, -1 if low_priority else 0)
         return worker
 
     def set_max_workers(self, count: int) -> None:
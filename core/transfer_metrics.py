@@ -0,0 +1,193 @@
+"""
+Métricas de rendimiento de transferencias: velocidad, ETA y picos.
+
+Cada transferencia tiene un ``RateTracker`` alimentado con el total de bytes
+transferidos en cada aviso de progreso. De esas muestras salen:
+
+- velocidad EWMA (media móvil exponencial, constante de tiempo ``tau``),
+  estable frente a avisos irregulares;
+- velocidad en ventana (bytes de los últimos ``window`` segundos), que
+  reacciona rápido a un enlace degradado;
+- velocidad media desde el inicio (o la reanudación) y pico observado;
+- ETA a partir de la EWMA y de los bytes restantes.
+
+Sin avisos nuevos las velocidades decaen hacia 0 en lugar de congelarse.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, Optional
+
+DEFAULT_RATE_WINDOW = 10.0
+DEFAULT_EWMA_TAU = 5.0
+# Segundos de transferencia antes de comparar con el pico (arranque lento de TCP)
+DEGRADED_WARMUP = 30.0
+# Por debajo de esta fracción del pico, el enlace se considera degradado
+DEGRADED_RATIO = 0.25
+
+
+@dataclass
+class TransferMetrics:
+    """Instantánea de las métricas de una transferencia (velocidades en bytes/s)"""
+    bytes_done: int = 0
+    total_bytes: int = 0
+    rate_ewma: float = 0.0
+    rate_window: float = 0.0
+    rate_average: float = 0.0
+    rate_peak: float = 0.0
+    elapsed: float = 0.0
+    # Segundos restantes estimados; None si no hay velocidad o tamaño total
+    eta_seconds: Optional[float] = None
+    degraded: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class AggregateMetrics:
+    """Métricas del conjunto de transferencias activas"""
+    active: int = 0
+    bytes_remaining: int = 0
+    rate_ewma: float = 0.0
+    rate_window: float = 0.0
+    rate_peak: float = 0.0
+    eta_seconds: Optional[float] = None
+    degraded: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class RateTracker:
+    """
+    Velocidad de una transferencia a partir de su progreso acumulado.
+
+    ``update`` recibe el total de bytes (no el incremento); un valor menor
+    que el anterior (reinicio de la transferencia) reinicia las métricas.
+    """
+
+    def __init__(self, window: float = DEFAULT_RATE_WINDOW, tau: float = DEFAULT_EWMA_TAU) -> None:
+        self.window = window
+        self.tau = tau
+        self._lock = threading.Lock()
+        self._reset(None, 0)
+
+    def _reset(self, now: Optional[float], bytes_done: int) -> None:
+        self._samples = deque()
+        self._started_at = now
+        self._start_bytes = bytes_done
+        self._last_time = now
+        self._last_bytes = bytes_done
+        self._ewma = 0.0
+        self._peak = 0.0
+        self._total = 0
+        if now is not None:
+            self._samples.append((now, bytes_done))
+
+    def update(self, bytes_done: int, total_bytes: Optional[int] = None, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if total_bytes:
+                self._total = total_bytes
+            if self._last_time is None or bytes_done < self._last_bytes:
+                total = self._total
+                self._reset(now, bytes_done)
+                self._total = total
+                return
+            dt = now - self._last_time
+            if dt <= 0:
+                # Varios avisos en el mismo instante: acumular en la muestra actual
+                self._last_bytes = bytes_done
+                self._samples[-1] = (now, bytes_done)
+                return
+            instant = (bytes_done - self._last_bytes) / dt
+            alpha = 1.0 - math.exp(-dt / self.tau)
+            self._ewma += alpha * (instant - self._ewma)
+            self._last_time = now
+            self._last_bytes = bytes_done
+            self._samples.append((now, bytes_done))
+            while len(self._samples) > 2 and self._samples[1][0] <= now - self.window:
+                self._samples.popleft()
+            # El pico se mide sobre la EWMA: un aviso aislado no lo dispara
+            self._peak = max(self._peak, self._ewma)
+
+    def snapshot(self, now: Optional[float] = None) -> TransferMetrics:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._last_time is None:
+                return TransferMetrics(total_bytes=self._total)
+            idle = max(0.0, now - self._last_time)
+            # Sin avisos recientes la velocidad decae en lugar de quedarse fija
+            ewma = self._ewma * math.exp(-idle / self.tau)
+
+            # La cola conserva una muestra anterior a la ventana como base
+            base_time, base_bytes = self._samples[0]
+            if idle >= self.window or now <= base_time:
+                rate_window = 0.0
+            else:
+                rate_window = (self._last_bytes - base_bytes) / (now - base_time)
+
+            elapsed = now - self._started_at
+            rate_average = (self._last_bytes - self._start_bytes) / elapsed if elapsed > 0 else 0.0
+            remaining = max(0, self._total - self._last_bytes) if self._total else None
+            eta = remaining / ewma if remaining is not None and ewma > 0 else None
+            degraded = (
+                elapsed >= DEGRADED_WARMUP and self._peak > 0
+                and rate_window < self._peak * DEGRADED_RATIO
+            )
+            return TransferMetrics(
+                bytes_done=self._last_bytes,
+                total_bytes=self._total,
+                rate_ewma=ewma,
+                rate_window=rate_window,
+                rate_average=rate_average,
+                rate_peak=self._peak,
+                elapsed=elapsed,
+                eta_seconds=eta,
+                degraded=degraded,
+            )
+
+
+def aggregate_metrics(metrics: Iterable[TransferMetrics], peak: float = 0.0) -> AggregateMetrics:
+    """Sumar las métricas de las transferencias activas"""
+    result = AggregateMetrics(rate_peak=peak)
+    unknown_total = False
+    for m in metrics:
+        result.active += 1
+        result.rate_ewma += m.rate_ewma
+        result.rate_window += m.rate_window
+        result.degraded += int(m.degraded)
+        if m.total_bytes:
+            result.bytes_remaining += max(0, m.total_bytes - m.bytes_done)
+        else:
+            unknown_total = True
+    result.rate_peak = max(result.rate_peak, result.rate_ewma)
+    if result.active and not unknown_total and result.rate_ewma > 0:
+        result.eta_seconds = result.bytes_remaining / result.rate_ewma
+    return result
+
+
+def format_rate(bytes_per_second: float) -> str:
+    """Velocidad legible: '12.3 MB/s'"""
+    for unit, factor in (("GB/s", 1024 ** 3), ("MB/s", 1024 ** 2), ("KB/s", 1024)):
+        if bytes_per_second >= factor:
+            return f"{bytes_per_second / factor:.1f} {unit}"
+    return f"{bytes_per_second:.0f} B/s"
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    """Tiempo restante legible: '1h 05m', '4m 10s' o '--'"""
+    if seconds is None or seconds < 0 or math.isinf(seconds):
+        return "--"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    if minutes:
+        return f"{minutes}m {secs:02d}s"
+    return f"{secs}s"
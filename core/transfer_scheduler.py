@@ -0,0 +1,288 @@
+"""
+Planificador global de transferencias.
+
+Cada pestaña crea sus propios workers; sin coordinación, una exportación de
+disco de 2 TB y una descarga interactiva compiten en igualdad por conexiones
+y ancho de banda. El planificador decide cuándo arranca cada worker y a qué
+ritmo puede mover bytes:
+
+- **Admisión**: como mucho ``max_concurrent`` transferencias a la vez. Las de
+  segundo plano nunca ocupan todos los huecos (uno queda reservado para
+  las interactivas).
+- **Colas**: FIFO dentro de cada clase de prioridad; las interactivas van
+  primero, pero tras ``FAIRNESS_BURST`` arranques interactivos seguidos con
+  trabajo de fondo esperando se admite uno de fondo (sin inanición).
+- **Ancho de banda**: un token bucket por dirección (descarga/subida). Con
+  transferencias interactivas activas, las de fondo pasan además por un
+  bucket con una fracción del límite.
+"""
+
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+try:
+    from logger_manager import get_logger
+
+    _logger = get_logger(__name__)
+except ImportError:  # pragma: no cover - fallback defensivo
+    _logger = None
+
+
+MIB = 1024 * 1024
+
+DEFAULT_MAX_CONCURRENT_TRANSFERS = 3
+# Huecos que las transferencias de fondo no pueden ocupar
+INTERACTIVE_RESERVED_SLOTS = 1
+# Arranques interactivos seguidos antes de dejar pasar uno de fondo
+FAIRNESS_BURST = 4
+# Fracción del límite de banda para el fondo mientras hay interactivas activas
+BACKGROUND_BANDWIDTH_SHARE = 0.2
+# Espera máxima de cada siesta del token bucket (para atender cancelaciones)
+MAX_THROTTLE_SLEEP = 0.25
+
+DOWNLOAD = "download"
+UPLOAD = "upload"
+DIRECTIONS = (DOWNLOAD, UPLOAD)
+
+
+class TransferPriority(Enum):
+    INTERACTIVE = "interactive"
+    BACKGROUND = "background"
+
+
+class TokenBucket:
+    """
+    Limitador de bytes por segundo (``rate`` 0 = sin límite).
+
+    Funciona con deuda: cada consumidor reserva sus bytes al llegar y espera
+    a que la deuda se salde, por lo que el orden es FIFO entre hilos.
+    """
+
+    def __init__(self, rate: float = 0, burst: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep) -> None:
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.rate = 0.0
+        self.burst = 0.0
+        self._tokens = 0.0
+        self._updated = clock()
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate: float, burst: Optional[float] = None) -> None:
+        with self._lock:
+            self.rate = max(0.0, float(rate or 0))
+            # Ráfaga por defecto: un segundo de tráfico
+            self.burst = float(burst) if burst else self.rate
+            self._tokens = min(self._tokens, self.burst)
+            self._updated = self._clock()
+
+    def consume(self, nbytes: int, cancel_event: Optional[threading.Event] = None) -> bool:
+        """
+        Bloquear hasta que ``nbytes`` quepan en el límite.
+
+        Returns:
+            False si se canceló durante la espera.
+        """
+        with self._lock:
+            if self.rate <= 0 or nbytes <= 0:
+                return True
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= nbytes
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        deadline = self._clock() + wait
+        while wait > 0:
+            if cancel_event is not None and cancel_event.is_set():
+                return False
+            self._sleep(min(wait, MAX_THROTTLE_SLEEP))
+            wait = deadline - self._clock()
+        return True
+
+
+class TransferScheduler:
+    """
+    Admisión, prioridades y ancho de banda compartidos por todas las transferencias.
+
+    Ejemplo de uso:
+
+        scheduler = TransferScheduler(max_concurrent=3, download_limit=50 * MIB)
+        scheduler.submit("t1", worker.start, TransferPriority.BACKGROUND)
+        ...
+        scheduler.throttle(DOWNLOAD, len(chunk), TransferPriority.BACKGROUND)
+        ...
+        scheduler.release("t1")  # al terminar el worker
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT_TRANSFERS,
+        *,
+        download_limit: float = 0,
+        upload_limit: float = 0,
+        background_share: float = BACKGROUND_BANDWIDTH_SHARE,
+    ) -> None:
+        self._lock = threading.Lock()
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.background_share = background_share
+        self._queues: Dict[TransferPriority, Deque[Tuple[str, Callable[[], None]]]] = {
+            priority: deque() for priority in TransferPriority
+        }
+        # ticket_id -> (prioridad, ``start`` de la ejecución en curso)
+        self._running: Dict[str, Tuple[TransferPriority, Callable[[], None]]] = {}
+        self._interactive_streak = 0
+        self._buckets = {direction: TokenBucket() for direction in DIRECTIONS}
+        self._background_buckets = {direction: TokenBucket() for direction in DIRECTIONS}
+        self.set_bandwidth_limits(download_limit, upload_limit)
+
+    # ----- Configuración -----
+
+    def configure(self, max_concurrent: Optional[int] = None, download_limit: Optional[float] = None,
+                  upload_limit: Optional[float] = None) -> None:
+        """Cambiar límites en caliente; un aumento de huecos arranca lo que espera"""
+        if max_concurrent is not None:
+            with self._lock:
+                self.max_concurrent = max(1, int(max_concurrent))
+        if download_limit is not None or upload_limit is not None:
+            self.set_bandwidth_limits(
+                self._buckets[DOWNLOAD].rate if download_limit is None else download_limit,
+                self._buckets[UPLOAD].rate if upload_limit is None else upload_limit,
+            )
+        self._dispatch()
+
+    def set_bandwidth_limits(self, download_limit: float, upload_limit: float) -> None:
+        """Límites en bytes/s por dirección (0 = sin límite)"""
+        for direction, limit in ((DOWNLOAD, download_limit), (UPLOAD, upload_limit)):
+            self._buckets[direction].set_rate(limit)
+            self._background_buckets[direction].set_rate((limit or 0) * self.background_share)
+
+    def bandwidth_limit(self, direction: str) -> float:
+        return self._buckets[direction].rate
+
+    def rclone_bwlimit(self, direction: str) -> Optional[str]:
+        """Límite para ``--bwlimit`` de rclone (KiB/s), o None si no hay límite"""
+        rate = self._buckets[direction].rate
+        return f"{max(1, int(rate / 1024))}K" if rate > 0 else None
+
+    # ----- Admisión -----
+
+    def submit(self, ticket_id: str, start: Callable[[], None],
+               priority: TransferPriority = TransferPriority.INTERACTIVE) -> bool:
+        """
+        Encolar una transferencia; ``start`` se llama cuando haya hueco.
+
+        Returns:
+            True si arrancó de inmediato, False si quedó en cola.
+        """
+        with self._lock:
+            self._queues[priority].append((ticket_id, start))
+        started = self._dispatch()
+        return ticket_id in started
+
+    def release(self, ticket_id: str, start: Optional[Callable[[], None]] = None) -> bool:
+        """
+        Liberar el hueco de una transferencia terminada (o pausada) y arrancar la siguiente.
+
+        Se ignora si ``ticket_id`` no está en marcha o, con ``start``, si la
+        ejecución en marcha es otra: el aviso tardío de un worker anterior con
+        el mismo identificador no libera el hueco del actual.
+
+        Returns:
+            True si se liberó el hueco.
+        """
+        with self._lock:
+            running = self._running.get(ticket_id)
+            if running is None or (start is not None and running[1] != start):
+                return False
+            del self._running[ticket_id]
+        self._dispatch()
+        return True
+
+    def cancel(self, ticket_id: str) -> bool:
+        """Quitar de la cola una transferencia que aún no arrancó"""
+        with self._lock:
+            for queue in self._queues.values():
+                for item in queue:
+                    if item[0] == ticket_id:
+                        queue.remove(item)
+                        return True
+        return False
+
+    def is_queued(self, ticket_id: str) -> bool:
+        with self._lock:
+            return any(item[0] == ticket_id for queue in self._queues.values() for item in queue)
+
+    def is_running(self, ticket_id: str) -> bool:
+        with self._lock:
+            return ticket_id in self._running
+
+    def queued(self) -> List[str]:
+        """Identificadores en cola, en el orden en que arrancarían"""
+        with self._lock:
+            return [item[0] for priority in TransferPriority for item in self._queues[priority]]
+
+    def running_count(self, priority: Optional[TransferPriority] = None) -> int:
+        with self._lock:
+            return self._count_running(priority)
+
+    def _count_running(self, priority: Optional[TransferPriority]) -> int:
+        if priority is None:
+            return len(self._running)
+        return sum(1 for p, _ in self._running.values() if p is priority)
+
+    def _next_locked(self) -> Optional[Tuple[str, Callable[[], None], TransferPriority]]:
+        if len(self._running) >= self.max_concurrent:
+            return None
+        interactive = self._queues[TransferPriority.INTERACTIVE]
+        background = self._queues[TransferPriority.BACKGROUND]
+        background_slots = max(1, self.max_concurrent - INTERACTIVE_RESERVED_SLOTS)
+        background_allowed = background and self._count_running(TransferPriority.BACKGROUND) < background_slots
+
+        if interactive and not (background_allowed and self._interactive_streak >= FAIRNESS_BURST):
+            self._interactive_streak = self._interactive_streak + 1 if background else 0
+            ticket_id, start = interactive.popleft()
+            return ticket_id, start, TransferPriority.INTERACTIVE
+        if background_allowed:
+            self._interactive_streak = 0
+            ticket_id, start = background.popleft()
+            return ticket_id, start, TransferPriority.BACKGROUND
+        return None
+
+    def _dispatch(self) -> List[str]:
+        started = []
+        while True:
+            with self._lock:
+                item = self._next_locked()
+                if item is None:
+                    return started
+                ticket_id, start, priority = item
+                self._running[ticket_id] = (priority, start)
+            try:
+                start()
+                started.append(ticket_id)
+            except Exception as exc:  # noqa: BLE001 - un worker roto no bloquea la cola
+                if _logger:
+                    _logger.error("No se pudo arrancar la transferencia %s: %s", ticket_id, exc)
+                with self._lock:
+                    self._running.pop(ticket_id, None)
+
+    # ----- Ancho de banda -----
+
+    def throttle(self, direction: str, nbytes: int,
+                 priority: TransferPriority = TransferPriority.INTERACTIVE,
+                 cancel_event: Optional[threading.Event] = None) -> bool:
+        """
+        Esperar a que ``nbytes`` quepan en el límite de la dirección.
+
+        Los workers lo llaman por cada bloque leído o escrito. Returns False
+        si se canceló durante la espera.
+        """
+        if (priority is TransferPriority.BACKGROUND
+                and self.running_count(TransferPriority.INTERACTIVE) > 0
+                and not self._background_buckets[direction].consume(nbytes, cancel_event)):
+            return False
+        return self._buckets[direction].consume(nbytes, cancel_event)
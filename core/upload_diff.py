@@ -0,0 +1,160 @@
+"""
+Comparación previa a la subida: detectar archivos sin cambios.
+
+Antes de enviar un archivo se compara con el objeto remoto (obtenido del
+índice local, de un único listado del prefijo destino o de HEADs en
+paralelo). Si el tamaño coincide, se reconstruye el ETag local (MD5 simple
+o multiparte probando los tamaños de parte plausibles) y solo se sube si
+difiere. Los ETags calculados se guardan en ``local_etags.json`` por
+(ruta, tamaño, mtime), de modo que en las copias nocturnas repetidas los
+archivos intactos no se vuelven a leer ni a enviar.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from core.s3_etag import (
+    candidate_part_sizes, compute_etag, etag_parts_count, is_verifiable_etag, normalize_etag
+)
+
+try:
+    from logger_manager import get_logger
+
+    _logger = get_logger(__name__)
+except ImportError:  # pragma: no cover - fallback defensivo
+    _logger = None
+
+
+DEFAULT_ETAG_CACHE_FILE = "local_etags.json"
+# Claves por página de list_objects_v2
+LIST_PAGE_KEYS = 1000
+
+
+def prefer_listing(remote_objects: Optional[int], local_files: Optional[int]) -> bool:
+    """
+    True si listar el prefijo destino cuesta menos peticiones que un HEAD por archivo.
+
+    Un listado cuesta ``remote_objects / 1000`` peticiones y un HEAD por
+    archivo ``local_files``; si alguno de los dos se desconoce se lista
+    (una pasada secuencial y acotada).
+    """
+    if remote_objects is None or local_files is None:
+        return True
+    return remote_objects / LIST_PAGE_KEYS <= local_files
+
+
+class LocalETagCache:
+    """
+    Caché persistente de ETags locales por archivo.
+
+    Una entrada solo es válida mientras el tamaño y el mtime (ns) del archivo
+    no cambien; guarda un ETag por tamaño de parte probado (0 = MD5 simple).
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or os.path.join(os.getcwd(), DEFAULT_ETAG_CACHE_FILE)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f).get("files", {})
+        except Exception as exc:  # noqa: BLE001
+            if _logger:
+                _logger.warning("Caché de ETags ilegible (%s): %s", self.path, exc)
+            self._entries = {}
+
+    def save(self) -> None:
+        """Guardar si hubo cambios (una vez por pasada, no por archivo)"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"files": self._entries}
+            self._dirty = False
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as exc:  # noqa: BLE001
+            if _logger:
+                _logger.error("Error guardando caché de ETags: %s", exc)
+
+    def get(self, file_path: str, size: int, mtime_ns: int, part_size: int) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(os.path.abspath(file_path))
+            if not entry or entry.get("size") != size or entry.get("mtime_ns") != mtime_ns:
+                return None
+            return entry.get("etags", {}).get(str(part_size))
+
+    def put(self, file_path: str, size: int, mtime_ns: int, part_size: int, etag: str) -> None:
+        key = os.path.abspath(file_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry or entry.get("size") != size or entry.get("mtime_ns") != mtime_ns:
+                entry = {"size": size, "mtime_ns": mtime_ns, "etags": {}}
+                self._entries[key] = entry
+            entry["etags"][str(part_size)] = etag
+            self._dirty = True
+
+
+class ChangeDetector:
+    """
+    Decide si un archivo local coincide con su objeto remoto.
+
+    ``remote`` es un dict con ``size``, ``etag`` y opcionalmente ``mtime``
+    (epoch o datetime), tal como lo devuelven el índice local o un HEAD.
+    """
+
+    def __init__(self, etag_cache: Optional[LocalETagCache] = None) -> None:
+        self.etag_cache = etag_cache
+
+    def is_unchanged(self, file_path: str, remote: Optional[Dict[str, Any]]) -> bool:
+        if not remote:
+            return False
+        stat = os.stat(file_path)
+        if stat.st_size != remote.get('size'):
+            return False
+
+        etag = normalize_etag(remote.get('etag'))
+        if not is_verifiable_etag(etag):
+            # ETag opaco (cifrado): mismo tamaño y copia remota posterior al último cambio
+            remote_mtime = remote.get('mtime')
+            if isinstance(remote_mtime, datetime):
+                remote_mtime = remote_mtime.timestamp()
+            return remote_mtime is not None and remote_mtime >= stat.st_mtime
+
+        parts = etag_parts_count(etag)
+        part_sizes = [0] if parts is None else candidate_part_sizes(stat.st_size, parts)
+        return any(
+            self._local_etag(file_path, stat, part_size) == etag for part_size in part_sizes
+        )
+
+    def _local_etag(self, file_path: str, stat: os.stat_result, part_size: int) -> str:
+        if self.etag_cache:
+            cached = self.etag_cache.get(file_path, stat.st_size, stat.st_mtime_ns, part_size)
+            if cached:
+                return cached
+        etag = compute_etag(file_path, part_size or None, stat.st_size)
+        if self.etag_cache:
+            self.etag_cache.put(file_path, stat.st_size, stat.st_mtime_ns, part_size, etag)
+        return etag
+
+
+_etag_cache: Optional[LocalETagCache] = None
+
+
+def get_etag_cache() -> LocalETagCache:
+    """Obtener instancia singleton de la caché de ETags locales"""
+    global _etag_cache
+    if _etag_cache is None:
+        _etag_cache = LocalETagCache()
+    return _etag_cache
@@ -5,6 +5,9 @@ from watchdog.events import FileSystemEventHandler
 from threading import Thread, Lock
 import queue
 
+# Ventana en la que los eventos de archivos hijos de un directorio movido se ignoran
+MOVED_DIR_WINDOW = 10
+
 class FileWatcher(FileSystemEventHandler):
     def __init__(self, s3_handler, bucket_name, watch_dir, callback=None):
         self.s3_handler = s3_handler
@@ -15,6 +18,8 @@ class FileWatcher(FileSystemEventHandler):
         self.lock = Lock()
         self.running = False
         self.upload_thread = None
+        # Directorios movidos recientemente: {ruta_origen: instante}
+        self._moved_dirs = {}
 
     def on_created(self, event):
         if not event.is_directory:
@@ -24,10 +29,24 @@ class FileWatcher(FileSystemEventHandler):
         if not event.is_directory:
             self._queue_upload(event.src_path, "modified")
 
+    def on_moved(self, event):
+        """Renombrados: se replican en el servidor sin volver a subir los datos"""
+        now = time.monotonic()
+        with self.lock:
+            self._moved_dirs = {p: t for p, t in self._moved_dirs.items() if now - t < MOVED_DIR_WINDOW}
+            if event.is_directory:
+                self._moved_dirs[event.src_path] = now
+            elif any(event.src_path.startswith(p + os.sep) for p in self._moved_dirs):
+                # Ya cubierto por el movimiento del directorio padre
+                return
+        self.upload_queue.put((event.src_path, "moved", event.dest_path))
+        if self.callback:
+            self.callback(f"Detected moved: {os.path.basename(event.src_path)}")
+
     def _queue_upload(self, file_path, action):
         """Add file to upload queue"""
         if os.path.exists(file_path) and os.path.isfile(file_path):
-            self.upload_queue.put((file_path, action))
+            self.upload_queue.put((file_path, action, None))
             if self.callback:
                 self.callback(f"Detected {action}: {os.path.basename(file_path)}")
 
@@ -35,7 +54,12 @@ class FileWatcher(FileSystemEventHandler):
         """Worker thread to process upload queue"""
         while self.running:
             try:
-                file_path, action = self.upload_queue.get(timeout=1)
+                file_path, action, dest_path = self.upload_queue.get(timeout=1)
+
+                if action == "moved":
+                    self._apply_move(file_path, dest_path)
+                    self.upload_queue.task_done()
+                    continue
                 
                 # Wait a bit to ensure file is fully written
                 time.sleep(2)
@@ -64,6 +88,25 @@ class FileWatcher(FileSystemEventHandler):
                 if self.callback:
                     self.callback(f"Error: {str(e)}")
 
+    def _apply_move(self, src_path, dest_path):
+        """Mover en el bucket el objeto o prefijo renombrado localmente"""
+        src_key = os.path.relpath(src_path, self.watch_dir)
+        dest_key = os.path.relpath(dest_path, self.watch_dir)
+
+        if os.path.isdir(dest_path):
+            success = self.s3_handler.move_prefix(
+                self.bucket_name, src_key + os.sep, self.bucket_name, dest_key + os.sep
+            )
+        else:
+            success = self.s3_handler.move_object(self.bucket_name, src_key, self.bucket_name, dest_key)
+            if not success and os.path.isfile(dest_path):
+                # El origen no estaba en el bucket (p. ej. temporal de un editor): subir el destino
+                success = self.s3_handler.upload_file(self.bucket_name, dest_path, dest_key)
+
+        if self.callback:
+            mark = "✓ Moved" if success else "✗ Failed move"
+            self.callback(f"{mark}: {src_key} -> {dest_key}")
+
     def start_monitoring(self):
         """Start the file monitoring"""
         self.running = True
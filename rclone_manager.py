@@ -17,6 +17,19 @@ except ImportError:
     ConnectionError = Exception
     PermissionError = Exception
 
+try:
+    from core.bucket_ledger import get_bucket_ledger
+    BUCKET_LEDGER_AVAILABLE = True
+except ImportError:
+    BUCKET_LEDGER_AVAILABLE = False
+
+try:
+    from core.dedup_backup import DedupBackupEngine, DedupCancelled
+    from core.s3_client_pool import get_s3_client
+    DEDUP_AVAILABLE = True
+except ImportError:
+    DEDUP_AVAILABLE = False
+
 class RcloneManager:
     def __init__(self, config_manager):
         self.config_manager = config_manager
@@ -34,6 +47,7 @@ class RcloneManager:
         self.rclone_config_file = os.path.join(self.rclone_config_dir, "rclone.conf")
         os.makedirs(self.rclone_config_dir, exist_ok=True)
         self.mount_process = None
+        self.last_dedup_result = None
     
     @staticmethod
     def detect_mounted_drives():
@@ -664,6 +678,112 @@ class RcloneManager:
         except Exception as e:
             return False, str(e)
 
+    def dedup_backup(self, profile_name, source_folder, bucket_name, progress_callback=None,
+                     cancel_event=None, **kwargs):
+        """
+        Backup deduplicado: solo sube los fragmentos que el bucket aún no tiene.
+
+        Alternativa a ``compress_folder`` + ``upload_file``: en lugar de un ZIP
+        completo por ejecución se publica una instantánea (manifiesto) que
+        referencia fragmentos definidos por contenido y compartidos entre
+        copias. El detalle queda en ``last_dedup_result``.
+
+        Returns:
+            tuple: (success, message)
+        """
+        self.last_dedup_result = None
+        if not DEDUP_AVAILABLE:
+            return False, "Backup deduplicado no disponible (falta boto3)"
+        config = self.config_manager.get_config(profile_name) or {}
+        access_key = config.get('access_key')
+        secret_key = config.get('secret_key')
+        host_base = config.get('host_base')
+        if not access_key or not secret_key or not host_base:
+            return False, f"Perfil '{profile_name}' incompleto"
+
+        try:
+            concurrency = min(int(kwargs.get('transfers', 16)), 64)
+        except (TypeError, ValueError):
+            concurrency = 16
+
+        last_report = [0.0]
+
+        def on_progress(phase, done, total, detail):
+            # Como mucho dos avisos por segundo: un árbol grande no satura la UI
+            now = time.monotonic()
+            if progress_callback and now - last_report[0] >= 0.5:
+                last_report[0] = now
+                progress_callback(f"{done} archivos - {detail}")
+
+        try:
+            engine = DedupBackupEngine(
+                get_s3_client(access_key, secret_key, host_base, max_pool_connections=concurrency),
+                bucket_name,
+                max_concurrency=concurrency,
+                progress_callback=on_progress,
+                cancel_event=cancel_event,
+            )
+            result = engine.backup(source_folder)
+        except DedupCancelled:
+            return False, "Operación cancelada por el usuario"
+        except Exception as e:
+            return False, str(e)
+
+        self.last_dedup_result = result
+        if result.bytes_uploaded:
+            self._note_bucket_change(profile_name, bucket_name, result.bytes_uploaded, result.chunks_uploaded)
+        if not result.success:
+            return False, f"{len(result.errors)} fragmentos no se pudieron subir; instantánea no publicada"
+        return True, (
+            f"Instantánea {result.snapshot_id}: {result.files} archivos, "
+            f"{result.chunks_uploaded} fragmentos nuevos de {result.chunks_total} "
+            f"({result.bytes_uploaded / (1024*1024):.1f} MB enviados de {result.bytes_total / (1024*1024):.1f} MB)"
+        )
+
+    def restore_dedup_snapshot(self, profile_name, bucket_name, source_name, snapshot_id, target_folder,
+                               progress_callback=None):
+        """
+        Restaurar una instantánea deduplicada (``snapshot_id`` None = la más reciente).
+
+        Returns:
+            tuple: (success, message)
+        """
+        if not DEDUP_AVAILABLE:
+            return False, "Backup deduplicado no disponible (falta boto3)"
+        config = self.config_manager.get_config(profile_name) or {}
+        try:
+            engine = DedupBackupEngine(
+                get_s3_client(config.get('access_key'), config.get('secret_key'), config.get('host_base')),
+                bucket_name,
+                progress_callback=(lambda phase, done, total, detail: progress_callback(f"{done}/{total} - {detail}"))
+                if progress_callback else None,
+            )
+            if snapshot_id is None:
+                snapshots = engine.list_snapshots(source_name)
+                if not snapshots:
+                    return False, f"No hay instantáneas de '{source_name}' en {bucket_name}"
+                snapshot_id = snapshots[-1]
+            result = engine.restore(snapshot_id, target_folder, source_name=source_name)
+        except Exception as e:
+            return False, str(e)
+        if not result.success:
+            return False, f"{len(result.errors)} archivos no se pudieron restaurar"
+        return True, f"Restaurados {result.files} archivos de la instantánea {snapshot_id}"
+
+    def _note_bucket_change(self, profile_name, bucket_name, size_delta=None, objects_delta=0):
+        """Actualizar el libro de tamaños tras una operación de rclone sobre un bucket"""
+        if not BUCKET_LEDGER_AVAILABLE:
+            return
+        config = self.config_manager.get_config(profile_name) or {}
+        host_base = config.get('host_base')
+        if not host_base:
+            return
+        ledger = get_bucket_ledger()
+        if size_delta is None:
+            ledger.mark_stale(host_base, bucket_name)
+        else:
+            ledger.apply_delta(host_base, bucket_name, size_delta, objects_delta)
+
     def upload_file(self, profile_name, local_file, bucket_name, remote_filename=None, progress_callback=None, **kwargs):
         """
         Sube un archivo único usando rclone copyto con optimizaciones S3 (multipart).
@@ -718,6 +838,8 @@ class RcloneManager:
                 cmd.extend(["--checkers", str(kwargs['checkers'])])
             if 'tpslimit' in kwargs and int(kwargs['tpslimit']) > 0:
                 cmd.extend(["--tpslimit", str(kwargs['tpslimit'])])
+            if kwargs.get('bwlimit'):
+                cmd.extend(["--bwlimit", str(kwargs['bwlimit'])])
             
             # Debug log
             print(f"DEBUG: upload_file flags: concurrency={s3_concurrency}")
@@ -744,6 +866,7 @@ class RcloneManager:
                         return False, "Cancelado por el usuario"
 
             if process.returncode == 0:
+                self._note_bucket_change(profile_name, bucket_name, os.path.getsize(local_file), 1)
                 return True, "Subida completada"
             else:
                 return False, "Error en rclone copyto"
@@ -795,6 +918,10 @@ class RcloneManager:
             if burst and burst != '0':
                 cmd.extend(["--tpslimit-burst", burst])
 
+            # Límite de banda global del planificador de transferencias
+            if kwargs.get('bwlimit'):
+                cmd.extend(["--bwlimit", str(kwargs['bwlimit'])])
+
             process = subprocess.Popen(
                 cmd,
                 stdout=subprocess.PIPE,
@@ -811,6 +938,8 @@ class RcloneManager:
                     progress_callback(line.strip())
 
             if process.returncode == 0:
+                # rclone copy no informa el delta exacto: reconciliar en segundo plano
+                self._note_bucket_change(profile_name, bucket_name)
                 return True, "Sincronización paralela completada"
             else:
                 return False, "Error en rclone copy paralelo"
@@ -1,8 +1,29 @@
-import boto3
-from botocore.client import Config
 from botocore.exceptions import ClientError, NoCredentialsError, EndpointConnectionError
 import os
-from time import monotonic
+import time
+from datetime import datetime, timezone
+
+from core.s3_multipart import (
+    MultipartUploader, MULTIPART_THRESHOLD, DEFAULT_STALE_UPLOAD_HOURS, S3_MAX_PARTS,
+    MultipartUploadCancelled, UploadManifestStore, abort_stale_uploads, compute_part_size,
+    concurrency_from_plan, get_manifest_store
+)
+from core.bucket_ledger import get_bucket_ledger
+from core.s3_purge import BucketPurger
+from core.s3_copy import ObjectCopier
+from core.s3_async import (
+    AIOBOTOCORE_AVAILABLE, DEFAULT_ASYNC_CONCURRENCY, MAX_FALLBACK_THREADS, SMALL_OBJECT_LIMIT,
+    AsyncBatchUploader, ThreadedAsyncClient, create_aio_client
+)
+from core.s3_client_pool import DEFAULT_MAX_POOL_CONNECTIONS, get_s3_client
+from core.object_index import get_object_index
+from core.response_cache import DEFAULT_MAX_ENTRIES, STALE, ResponseCache, get_shared_cache
+from core.segmented_download import (
+    DEFAULT_SEGMENT_SIZE, READ_CHUNK_SIZE, DownloadCancelled, RemoteObjectChanged, SegmentedDownloader
+)
+from core.s3_etag import etag_matches, etag_parts_count, normalize_etag, remote_part_size
+from core.integrity import ExpectedChecksums
+from core.upload_diff import ChangeDetector, get_etag_cache, prefer_listing
 
 # ===== MEJORA #48: Manejo de Errores Mejorado =====
 try:
@@ -21,11 +42,32 @@ except ImportError:
     logger = None
 
 class S3Handler:
-    def __init__(self, access_key, secret_key, host_base, *, cache_enabled=True, cache_ttl=None):
+    def __init__(self, access_key, secret_key, host_base, *, cache_enabled=True, cache_ttl=None,
+                 transfer_plan=None, max_concurrency=None, multipart_threshold=MULTIPART_THRESHOLD,
+                 resumable_uploads=True, stale_upload_hours=DEFAULT_STALE_UPLOAD_HOURS,
+                 size_ledger=True, max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+                 cache_stale_ttl=None, cache_max_entries=DEFAULT_MAX_ENTRIES, shared_cache=True,
+                 object_index=True):
         self.access_key = access_key
         self.secret_key = secret_key
         self.host_base = host_base
         self.last_error = None
+        self.last_purge_result = None
+        self.last_copy_result = None
+        self.last_batch_result = None
+        # IntegrityCheck de la última descarga (None si no llegó a comprobarse)
+        self.last_integrity = None
+
+        # Concurrencia de subida multiparte: explícita o derivada del plan Rclone activo
+        self.max_concurrency = max_concurrency or concurrency_from_plan(transfer_plan)
+        self.multipart_threshold = multipart_threshold
+        # Manifiesto de partes para reanudar subidas tras un cierre o corte de red
+        self.manifest_store = get_manifest_store() if resumable_uploads else None
+        self.stale_upload_hours = stale_upload_hours
+        # Libro de tamaños: get_bucket_size en O(1) con deltas de cada operación
+        self.size_ledger = get_bucket_ledger() if size_ledger else None
+        # Índice local de metadatos: navegación y búsqueda sin llamadas de red
+        self.object_index = get_object_index() if object_index else None
 
         self.cache_enabled = cache_enabled
         default_cache_ttl = {
@@ -35,7 +77,19 @@ class S3Handler:
         if cache_ttl:
             default_cache_ttl.update(cache_ttl)
         self.cache_ttl = default_cache_ttl
-        self._cache = {}
+        # Ventana tras el TTL en la que se sirve el valor viejo y se refresca en segundo plano
+        default_stale_ttl = {
+            'list_buckets': 600,
+            'get_bucket_size': 3600,
+        }
+        if cache_stale_ttl:
+            default_stale_ttl.update(cache_stale_ttl)
+        self.cache_stale_ttl = default_stale_ttl
+        # Caché LRU acotada, compartida entre handlers de la misma cuenta
+        if shared_cache:
+            self._cache = get_shared_cache((host_base, access_key), cache_max_entries)
+        else:
+            self._cache = ResponseCache(cache_max_entries)
 
         # Validar credenciales antes de crear el cliente
         if not access_key or not secret_key:
@@ -53,13 +107,10 @@ class S3Handler:
             raise ValueError(error_msg)
 
         try:
-            self.session = boto3.session.Session()
-            self.client = self.session.client(
-                's3',
-                aws_access_key_id=access_key,
-                aws_secret_access_key=secret_key,
-                endpoint_url=f'https://{host_base}',
-                config=Config(s3={'addressing_style': 'virtual'})
+            # Cliente compartido por (endpoint, credenciales): conexiones TLS reutilizadas
+            self.client = get_s3_client(
+                access_key, secret_key, host_base,
+                max_pool_connections=max(max_pool_connections or 0, self.max_concurrency)
             )
             if LOGGING_AVAILABLE:
                 logger.debug(f"S3Handler inicializado para {host_base}")
@@ -81,7 +132,10 @@ class S3Handler:
 
         cache_key = self._build_cache_key()
         if use_cache:
-            cached = self._get_from_cache('list_buckets', cache_key)
+            cached = self._get_from_cache(
+                'list_buckets', cache_key,
+                revalidate=lambda: self.list_buckets(use_cache=False)
+            )
             if cached is not None:
                 return cached
 
@@ -160,26 +214,342 @@ class S3Handler:
                 return [], error.message
             return [], message
 
-    def upload_file(self, bucket_name, file_path, object_name=None):
+    def upload_file(self, bucket_name, file_path, object_name=None, *, progress_callback=None,
+                    cancel_event=None):
+        """
+        Subir un archivo al bucket.
+
+        Los archivos a partir de ``multipart_threshold`` se suben con el motor
+        multiparte paralelo (tamaño de parte proporcional al archivo y
+        concurrencia del plan activo). Si una subida anterior del mismo
+        archivo quedó a medias, se reanuda enviando solo las partes que faltan.
+
+        Args:
+            progress_callback: Opcional, ``callback(part_number, part_bytes,
+                bytes_done, total_bytes)`` invocado al completar cada parte.
+            cancel_event: Opcional, ``threading.Event`` para detener una subida
+                multiparte conservando las partes ya enviadas.
+
+        Returns:
+            bool: True si se completó. Una cancelación deja ``last_error``
+            en "Subida detenida".
+        """
         if object_name is None:
             object_name = os.path.basename(file_path)
 
         try:
-            self.client.upload_file(file_path, bucket_name, object_name)
+            file_size = os.path.getsize(file_path)
+            if file_size >= self.multipart_threshold:
+                uploader = MultipartUploader(
+                    self.client, bucket_name, object_name, file_path,
+                    max_concurrency=self.max_concurrency,
+                    progress_callback=progress_callback,
+                    manifest_store=self.manifest_store,
+                    manifest_key=UploadManifestStore.make_key(self.host_base, bucket_name, object_name),
+                    cancel_event=cancel_event,
+                )
+                uploader.upload()
+            else:
+                self.client.upload_file(file_path, bucket_name, object_name)
+                if progress_callback:
+                    progress_callback(1, file_size, file_size, file_size)
             print(f"File {file_path} uploaded to {bucket_name}/{object_name}")
+            # Delta asumiendo objeto nuevo; las sobrescrituras las corrige la reconciliación
+            self._apply_size_delta(bucket_name, file_size, 1)
+            self._index_upsert(bucket_name, object_name, file_size)
             if self.cache_enabled:
                 self.clear_cache('get_bucket_size', self._build_cache_key(bucket_name))
             return True
+        except MultipartUploadCancelled:
+            self.last_error = "Subida detenida"
+            return False
         except Exception as e:
+            self.last_error = f"Error al subir archivo: {e}"
             print(f"Error uploading file: {e}")
             return False
 
-    def list_objects(self, bucket_name, prefix=''):
+    def upload_stream(self, bucket_name, object_name, read_part, size, source_id, *,
+                      progress_callback=None, cancel_event=None):
+        """
+        Subir un origen leído por rangos (sin archivo local) con multiparte.
+
+        ``read_part(offset, length)`` devuelve los bytes de cada parte; solo
+        hay en memoria las partes en vuelo (acotadas por el motor). El
+        manifiesto multiparte, identificado por ``source_id``, permite
+        reanudar enviando solo las partes que faltan.
+
+        Args:
+            progress_callback: Opcional, ``callback(part_number, part_bytes,
+                bytes_done, total_bytes)`` invocado al completar cada parte.
+            cancel_event: Opcional, ``threading.Event`` para detener la subida
+                conservando las partes ya enviadas.
+
+        Returns:
+            bool: True si se completó. Una cancelación deja ``last_error``
+            en "Subida detenida".
+        """
+        self.last_error = None
         try:
-            response = self.client.list_objects_v2(Bucket=bucket_name, Prefix=prefix)
-            if 'Contents' in response:
-                return [obj['Key'] for obj in response['Contents']]
+            uploader = MultipartUploader(
+                self.client, bucket_name, object_name,
+                # Menor tamaño de parte que mantiene el origen (discos de varios TB)
+                # bajo el límite de 10.000 partes de S3; por eso ``size`` debe
+                # conocerse antes de empezar
+                part_size=compute_part_size(size, target_parts=S3_MAX_PARTS),
+                max_concurrency=self.max_concurrency,
+                progress_callback=progress_callback,
+                manifest_store=self.manifest_store,
+                manifest_key=UploadManifestStore.make_key(self.host_base, bucket_name, object_name),
+                read_part=read_part,
+                source_size=size,
+                source_id=source_id,
+                cancel_event=cancel_event,
+            )
+            uploader.upload()
+            self._apply_size_delta(bucket_name, size, 1)
+            self._index_upsert(bucket_name, object_name, size)
+            if self.cache_enabled:
+                self.clear_cache('get_bucket_size', self._build_cache_key(bucket_name))
+            return True
+        except MultipartUploadCancelled:
+            self.last_error = "Subida detenida"
+            return False
+        except Exception as e:
+            self.last_error = f"Error al subir {object_name}: {e}"
+            print(f"Error uploading stream: {e}")
+            return False
+
+    def upload_files(self, bucket_name, files, *, concurrency=DEFAULT_ASYNC_CONCURRENCY,
+                     progress_callback=None, skip_unchanged=False, remote_prefix=None):
+        """
+        Subir muchos archivos con el plano de datos asíncrono.
+
+        Mantiene hasta ``concurrency`` PUTs en vuelo desde un único bucle de
+        eventos (aiobotocore si está instalado; si no, el cliente compartido
+        despachado a un pool de hilos). Los archivos grandes pasan por
+        ``upload_file`` (multiparte reanudable).
+
+        Args:
+            files: Iterable (puede ser perezoso) de ``(ruta_local, clave)``.
+            progress_callback: Opcional, ``callback(files_done, bytes_done,
+                errors, last_key)`` tras cada archivo (``files_done`` incluye
+                los omitidos).
+            skip_unchanged: Omitir los archivos cuyo tamaño y ETag coinciden
+                con el objeto remoto.
+            remote_prefix: Prefijo común de las claves destino; permite
+                obtener el estado remoto con un único listado en lugar de
+                un HEAD por archivo.
+
+        Returns:
+            bool: True si no hubo errores. El detalle queda en ``last_batch_result``
+            (None si el lote falló antes de terminar).
+        """
+        self.last_error = None
+        self.last_batch_result = None
+        if AIOBOTOCORE_AVAILABLE:
+            client_factory = lambda: create_aio_client(
+                self.access_key, self.secret_key, self.host_base, concurrency
+            )
+        else:
+            threads = min(concurrency, MAX_FALLBACK_THREADS)
+            client = get_s3_client(self.access_key, self.secret_key, self.host_base,
+                                   max_pool_connections=threads)
+            client_factory = lambda: ThreadedAsyncClient(client, threads)
+
+        change_detector = remote_lookup = None
+        etag_cache = None
+        if skip_unchanged:
+            etag_cache = get_etag_cache()
+            change_detector = ChangeDetector(etag_cache).is_unchanged
+            try:
+                remote_lookup = self._remote_lookup(bucket_name, remote_prefix, files)
+            except Exception as e:
+                # Sin listado se comprueba cada archivo con HEAD
+                if LOGGING_AVAILABLE:
+                    logger.warning(f"No se pudo listar '{bucket_name}/{remote_prefix}': {e}")
+
+        indexed = []
+        uploader = AsyncBatchUploader(
+            client_factory, bucket_name,
+            concurrency=concurrency,
+            progress_callback=progress_callback,
+            large_file_upload=lambda path, key: self.upload_file(bucket_name, path, key),
+            small_object_limit=min(SMALL_OBJECT_LIMIT, self.multipart_threshold),
+            uploaded_callback=lambda key, size, etag: indexed.append(
+                {'key': key, 'size': size, 'etag': etag, 'mtime': time.time()}
+            ),
+            change_detector=change_detector,
+            remote_lookup=remote_lookup,
+        )
+        try:
+            result = uploader.upload(files)
+        except Exception as e:
+            self.last_error = f"Error en la subida por lotes: {e}"
+            if LOGGING_AVAILABLE:
+                logger.error(self.last_error)
+            return False
+        finally:
+            if etag_cache:
+                etag_cache.save()
+
+        self.last_batch_result = result
+        if self.object_index and indexed:
+            self.object_index.upsert_objects(self.host_base, bucket_name, indexed)
+        # Los archivos grandes ya aplicaron su delta en upload_file
+        self._note_size_change(
+            bucket_name, result.bytes_uploaded - result.bytes_delegated, result.uploaded - result.delegated
+        )
+        if not result.success:
+            first = result.errors[0]
+            self.last_error = (
+                f"{len(result.errors)} archivos no se pudieron subir a '{bucket_name}' "
+                f"({first.get('Code')}: {first.get('Message')})"
+            )
+            if LOGGING_AVAILABLE:
+                logger.error(self.last_error)
+        return result.success
+
+    def _remote_lookup(self, bucket_name, remote_prefix, files):
+        """
+        Elegir cómo obtener el estado remoto para la comparación previa.
+
+        Con el índice al día se consulta sin red; si se conoce el prefijo y
+        listarlo cuesta menos que un HEAD por archivo, se lista una vez (y
+        de paso se resincroniza el índice de ese prefijo). Retorna None para
+        consultar cada clave con HEAD en paralelo.
+        """
+        if self.index_is_fresh(bucket_name):
+            return lambda key: self.object_index.get(self.host_base, bucket_name, key)
+        if remote_prefix is None:
+            return None
+
+        ledger_entry = self.size_ledger.get(self.host_base, bucket_name) if self.size_ledger else None
+        remote_objects = ledger_entry['objects'] if ledger_entry else None
+        local_files = len(files) if hasattr(files, '__len__') else None
+        if not prefer_listing(remote_objects, local_files):
+            return None
+
+        pages = (page['objects'] for page in self.iter_objects(bucket_name, remote_prefix))
+        if self.object_index:
+            self.object_index.sync_pages(self.host_base, bucket_name, pages, remote_prefix)
+            return lambda key: self.object_index.get(self.host_base, bucket_name, key)
+
+        remote = {}
+        for objects in pages:
+            for obj in objects:
+                remote[obj['Key']] = {
+                    'size': obj.get('Size'),
+                    'etag': obj.get('ETag'),
+                    'mtime': obj.get('LastModified'),
+                }
+        return remote.get
+
+    def cleanup_stale_uploads(self, bucket_name, max_age_hours=None):
+        """
+        Abortar subidas multiparte huérfanas del bucket (AbortMultipartUpload).
+
+        Args:
+            bucket_name: Nombre del bucket
+            max_age_hours: Edad mínima para abortar; por defecto ``stale_upload_hours``.
+
+        Returns:
+            list: UploadIds abortados (vacía si hubo error)
+        """
+        max_age = self.stale_upload_hours if max_age_hours is None else max_age_hours
+        try:
+            aborted = abort_stale_uploads(
+                self.client, bucket_name, max_age, manifest_store=self.manifest_store
+            )
+            if aborted and LOGGING_AVAILABLE:
+                logger.info(f"Abortadas {len(aborted)} subidas multiparte huérfanas en '{bucket_name}'")
+            return aborted
+        except Exception as e:
+            if LOGGING_AVAILABLE:
+                logger.warning(f"No se pudieron limpiar subidas huérfanas en '{bucket_name}': {e}")
             return []
+
+    def iter_objects(self, bucket_name, prefix='', delimiter=None, *, start_after=None, page_size=1000):
+        """
+        Recorrer los objetos de un bucket página a página (generador).
+
+        Cada página se solicita solo cuando se consume la anterior, por lo que
+        la memoria es constante y el primer resultado llega tras una petición.
+
+        Args:
+            bucket_name: Nombre del bucket
+            prefix: Prefijo de las claves a listar
+            delimiter: Delimitador de carpetas (ej. '/'); con él, las
+                subcarpetas se devuelven en ``prefixes`` (CommonPrefixes).
+            start_after: Clave a partir de la cual listar (cursor, exclusivo)
+            page_size: Máximo de claves por página (límite S3: 1000)
+
+        Yields:
+            dict: {'objects': [dict], 'prefixes': [str], 'cursor': str|None}
+                  ``objects`` contiene Key, Size, LastModified, ETag y
+                  StorageClass; ``cursor`` es la última clave de la página,
+                  válida como ``start_after`` para continuar más tarde.
+        """
+        params = {'Bucket': bucket_name, 'Prefix': prefix, 'MaxKeys': page_size}
+        if delimiter:
+            params['Delimiter'] = delimiter
+        if start_after:
+            params['StartAfter'] = start_after
+
+        while True:
+            response = self.client.list_objects_v2(**params)
+            objects = response.get('Contents', [])
+            prefixes = [p['Prefix'] for p in response.get('CommonPrefixes', [])]
+
+            cursor = None
+            if objects or prefixes:
+                cursor = max([o['Key'] for o in objects[-1:]] + prefixes[-1:])
+
+            yield {'objects': objects, 'prefixes': prefixes, 'cursor': cursor}
+
+            if not response.get('IsTruncated'):
+                break
+            params.pop('StartAfter', None)
+            params['ContinuationToken'] = response['NextContinuationToken']
+
+    def list_folder(self, bucket_name, prefix='', *, use_index=True):
+        """
+        Hijos directos de un prefijo: ``(prefijos_de_carpeta, objetos)``.
+
+        Si el índice local del bucket está al día se responde desde él sin
+        red; si no, se lista en remoto con delimitador '/' y el resultado
+        refresca en el índice los hijos directos de esa carpeta.
+        """
+        if use_index and self.index_is_fresh(bucket_name):
+            folders, rows = self.object_index.list_folder(self.host_base, bucket_name, prefix)
+            objects = [{
+                'Key': row['key'],
+                'Size': row['size'],
+                'ETag': row['etag'],
+                'LastModified': datetime.fromtimestamp(row['mtime'], timezone.utc) if row['mtime'] else None,
+                'StorageClass': row['storage_class'],
+            } for row in rows]
+            return folders, objects
+
+        folders, objects = [], []
+        for page in self.iter_objects(bucket_name, prefix, delimiter='/'):
+            folders.extend(page['prefixes'])
+            objects.extend(page['objects'])
+        if self.object_index:
+            generation = self.object_index.begin_sync(self.host_base, bucket_name)
+            self.object_index.upsert_objects(
+                self.host_base, bucket_name, (self.object_index.normalize(o) for o in objects), generation
+            )
+            self.object_index.finish_sync(self.host_base, bucket_name, generation, prefix, recursive=False)
+        return folders, objects
+
+    def list_objects(self, bucket_name, prefix=''):
+        """Listar todas las claves bajo un prefijo (recorre todas las páginas)"""
+        try:
+            return [
+                obj['Key']
+                for page in self.iter_objects(bucket_name, prefix)
+                for obj in page['objects']
+            ]
         except Exception as e:
             print(f"Error listing objects: {e}")
             return []
@@ -188,6 +558,11 @@ class S3Handler:
         """
         Obtener el tamaño total usado en un bucket
 
+        Con ``use_cache`` el valor sale del libro de tamaños (O(1), sin red)
+        si el bucket ya fue escaneado; solo el primer acceso recorre el bucket.
+        Con ``use_cache=False`` se fuerza un escaneo completo (ver
+        ``reconcile_bucket_size``).
+
         Args:
             bucket_name: Nombre del bucket
             use_cache: Si es True, utilizar resultados en caché cuando estén disponibles.
@@ -199,25 +574,54 @@ class S3Handler:
         """
         cache_key = self._build_cache_key(bucket_name)
         if use_cache:
-            cached = self._get_from_cache('get_bucket_size', cache_key)
+            # Con libro de tamaños el valor viejo no hace falta: el libro es O(1)
+            revalidate = None if self.size_ledger else (lambda: self.reconcile_bucket_size(bucket_name))
+            cached = self._get_from_cache('get_bucket_size', cache_key, revalidate=revalidate)
             if cached is not None:
                 return cached
+            if self.size_ledger:
+                entry = self.size_ledger.get(self.host_base, bucket_name)
+                if entry is not None:
+                    return entry['size'], None
+
+        return self.reconcile_bucket_size(bucket_name)
+
+    def reconcile_bucket_size(self, bucket_name):
+        """
+        Recorrer el bucket completo y resembrar el libro de tamaños.
+
+        Pensado para ejecutarse en segundo plano y corregir la deriva.
 
+        Returns:
+            tuple: (size_bytes, error_message), igual que ``get_bucket_size``
+        """
+        cache_key = self._build_cache_key(bucket_name)
         try:
             if LOGGING_AVAILABLE:
                 logger.debug(f"Calculando tamaño del bucket '{bucket_name}'")
 
             total_size = 0
-            paginator = self.client.get_paginator('list_objects_v2')
-
-            for page in paginator.paginate(Bucket=bucket_name):
-                if 'Contents' in page:
-                    for obj in page['Contents']:
-                        total_size += obj.get('Size', 0)
+            total_objects = 0
+            # El mismo recorrido resincroniza el índice de metadatos
+            generation = self.object_index.begin_sync(self.host_base, bucket_name) if self.object_index else None
+            for page in self.iter_objects(bucket_name):
+                for obj in page['objects']:
+                    total_size += obj.get('Size', 0)
+                    total_objects += 1
+                if self.object_index:
+                    self.object_index.upsert_objects(
+                        self.host_base, bucket_name,
+                        (self.object_index.normalize(obj) for obj in page['objects']), generation
+                    )
+            if self.object_index:
+                self.object_index.finish_sync(self.host_base, bucket_name, generation)
 
             if LOGGING_AVAILABLE:
                 logger.info(f"Tamaño del bucket '{bucket_name}': {total_size} bytes ({total_size / (1024*1024):.2f} MB)")
 
+            if self.size_ledger:
+                self.size_ledger.seed(self.host_base, bucket_name, total_size, total_objects)
+
             result = (total_size, None)
             self._set_cache('get_bucket_size', cache_key, result)
             return result
@@ -246,8 +650,21 @@ class S3Handler:
 
     def delete_object(self, bucket_name, object_name):
         try:
+            # Tamaño previo para el delta del libro (None si no se pudo consultar)
+            deleted_size = None
+            if self.size_ledger:
+                try:
+                    deleted_size = self.client.head_object(Bucket=bucket_name, Key=object_name).get('ContentLength', 0)
+                except Exception:
+                    deleted_size = None
             self.client.delete_object(Bucket=bucket_name, Key=object_name)
             print(f"Deleted {object_name} from {bucket_name}")
+            if deleted_size is not None:
+                self._apply_size_delta(bucket_name, -deleted_size, -1)
+            elif self.size_ledger:
+                self.size_ledger.mark_stale(self.host_base, bucket_name)
+            if self.object_index:
+                self.object_index.remove_objects(self.host_base, bucket_name, [object_name])
             if self.cache_enabled:
                 self.clear_cache('get_bucket_size', self._build_cache_key(bucket_name))
             return True
@@ -255,43 +672,275 @@ class S3Handler:
             print(f"Error deleting object: {e}")
             return False
 
-    def delete_all_objects(self, bucket_name):
+    def delete_all_objects(self, bucket_name, *, include_versions=None, progress_callback=None):
+        """
+        Vaciar el bucket con listado y borrado en tubería.
+
+        Las páginas del listado alimentan una cola acotada y un pool de hilos
+        emite lotes de ``DeleteObjects`` en paralelo (memoria constante). En
+        buckets con versionado se borran también versiones y marcadores.
+
+        Args:
+            include_versions: Forzar (True/False) el borrado de versiones;
+                None lo detecta con GetBucketVersioning.
+            progress_callback: Opcional, ``callback(deleted, errors)`` por lote.
+
+        Returns:
+            bool: True si no hubo errores. El detalle queda en ``last_purge_result``.
+        """
         try:
-            # List all objects
-            paginator = self.client.get_paginator('list_objects_v2')
-            pages = paginator.paginate(Bucket=bucket_name)
-
-            delete_us = []
-            for page in pages:
-                if 'Contents' in page:
-                    delete_us.extend([{'Key': obj['Key']} for obj in page['Contents']])
-
-            # Delete in batches of 1000 (S3 limit)
-            if delete_us:
-                for i in range(0, len(delete_us), 1000):
-                    batch = delete_us[i:i+1000]
-                    self.client.delete_objects(
-                        Bucket=bucket_name,
-                        Delete={'Objects': batch}
-                    )
-                print(f"Deleted {len(delete_us)} objects from {bucket_name}")
+            purger = BucketPurger(
+                self.client, bucket_name,
+                max_workers=self.max_concurrency,
+                include_versions=include_versions,
+                progress_callback=progress_callback,
+            )
+            result = purger.purge()
+            self.last_purge_result = result
+            print(f"Deleted {result.deleted} objects from {bucket_name}")
+
+            if result.deleted:
+                if self.size_ledger:
+                    if result.success:
+                        self.size_ledger.reset(self.host_base, bucket_name)
+                    else:
+                        self.size_ledger.mark_stale(self.host_base, bucket_name)
+                if self.object_index:
+                    if result.success:
+                        self.object_index.remove_prefix(self.host_base, bucket_name)
+                    else:
+                        self.object_index.mark_stale(self.host_base, bucket_name)
                 if self.cache_enabled:
                     self.clear_cache('get_bucket_size', self._build_cache_key(bucket_name))
 
-            return True
+            if not result.success:
+                first = result.errors[0]
+                self.last_error = (
+                    f"No se pudieron eliminar {len(result.errors)} objetos de '{bucket_name}' "
+                    f"({first.get('Code')}: {first.get('Message')})"
+                )
+                if LOGGING_AVAILABLE:
+                    logger.error(self.last_error)
+            return result.success
         except Exception as e:
             print(f"Error deleting all objects: {e}")
             return False
 
-    def download_file(self, bucket_name, object_name, file_path):
+    def copy_object(self, src_bucket, src_key, dst_bucket, dst_key):
+        """
+        Copiar un objeto en el servidor (CopyObject, o UploadPartCopy en
+        paralelo para objetos de más de 5 GB). Los datos no pasan por el equipo.
+        """
+        self.last_error = None
+        try:
+            size = self._copier().copy_object(src_bucket, src_key, dst_bucket, dst_key)
+            # Delta asumiendo objeto nuevo; las sobrescrituras las corrige la reconciliación
+            self._note_size_change(dst_bucket, size, 1)
+            self._index_upsert(dst_bucket, dst_key, size)
+            return True
+        except Exception as e:
+            self.last_error = f"Error al copiar {src_bucket}/{src_key}: {e}"
+            if LOGGING_AVAILABLE:
+                logger.error(self.last_error)
+            return False
+
+    def move_object(self, src_bucket, src_key, dst_bucket, dst_key):
+        """Mover (copiar en el servidor y eliminar el origen) un objeto"""
+        if not self.copy_object(src_bucket, src_key, dst_bucket, dst_key):
+            return False
+        return self.delete_object(src_bucket, src_key)
+
+    def copy_prefix(self, src_bucket, src_prefix, dst_bucket, dst_prefix, *, progress_callback=None):
+        """
+        Copiar en el servidor todos los objetos de un prefijo.
+
+        Args:
+            progress_callback: Opcional, ``callback(objects_done, bytes_done, errors)``.
+
+        Returns:
+            bool: True si no hubo errores. El detalle queda en ``last_copy_result``.
+        """
+        return self._copy_prefix(src_bucket, src_prefix, dst_bucket, dst_prefix,
+                                 move=False, progress_callback=progress_callback)
+
+    def move_prefix(self, src_bucket, src_prefix, dst_bucket, dst_prefix, *, progress_callback=None):
+        """
+        Mover (renombrar) un prefijo completo a velocidad de servidor.
+
+        Los orígenes se eliminan por lotes a medida que se copian; los objetos
+        que fallan se quedan en el origen y se listan en ``last_copy_result``.
+        """
+        return self._copy_prefix(src_bucket, src_prefix, dst_bucket, dst_prefix,
+                                 move=True, progress_callback=progress_callback)
+
+    def _copy_prefix(self, src_bucket, src_prefix, dst_bucket, dst_prefix, *, move, progress_callback):
+        self.last_error = None
         try:
-            self.client.download_file(bucket_name, object_name, file_path)
+            result = self._copier().copy_prefix(
+                src_bucket, src_prefix, dst_bucket, dst_prefix,
+                move=move, progress_callback=progress_callback,
+            )
+        except Exception as e:
+            self.last_error = f"Error al copiar el prefijo '{src_prefix}': {e}"
+            if LOGGING_AVAILABLE:
+                logger.error(self.last_error)
+            return False
+
+        self.last_copy_result = result
+        if result.copied:
+            self._note_size_change(dst_bucket, result.bytes_copied, result.copied)
+        if self.object_index:
+            self.object_index.copy_prefix(self.host_base, src_bucket, src_prefix, dst_bucket, dst_prefix)
+            if move and result.success:
+                self.object_index.remove_prefix(self.host_base, src_bucket, src_prefix)
+            elif not result.success:
+                # No se sabe qué claves quedaron en cada lado
+                self.object_index.mark_stale(self.host_base, src_bucket)
+                self.object_index.mark_stale(self.host_base, dst_bucket)
+        if move and result.deleted:
+            if result.success:
+                self._note_size_change(src_bucket, -result.bytes_copied, -result.deleted)
+            else:
+                # No se sabe qué tamaños quedaron en el origen
+                self._note_size_change(src_bucket, None, 0)
+
+        if not result.success:
+            first = result.errors[0]
+            self.last_error = (
+                f"{len(result.errors)} objetos de '{src_prefix}' no se pudieron "
+                f"{'mover' if move else 'copiar'} ({first.get('Code')}: {first.get('Message')})"
+            )
+            if LOGGING_AVAILABLE:
+                logger.error(self.last_error)
+        return result.success
+
+    def search_objects(self, bucket_name, **filters):
+        """
+        Buscar en el índice local (sin red) por ``prefix``, ``glob``,
+        ``min_size``/``max_size`` y ``modified_after``/``modified_before``.
+
+        El índice se completa con ``reconcile_bucket_size`` (recorrido en
+        segundo plano) y se mantiene con cada operación hecha desde aquí.
+        """
+        if not self.object_index:
+            return []
+        return self.object_index.query(self.host_base, bucket_name, **filters)
+
+    def index_is_fresh(self, bucket_name, max_age=None):
+        """True si el índice del bucket se resincronizó hace menos de ``max_age`` s"""
+        if not self.object_index:
+            return False
+        if max_age is None:
+            return self.object_index.is_fresh(self.host_base, bucket_name)
+        return self.object_index.is_fresh(self.host_base, bucket_name, max_age)
+
+    def _index_upsert(self, bucket_name, key, size, etag=None):
+        if self.object_index:
+            self.object_index.upsert_objects(self.host_base, bucket_name, [
+                {'key': key, 'size': size, 'etag': etag, 'mtime': time.time()}
+            ])
+
+    def _copier(self):
+        return ObjectCopier(self.client, max_concurrency=self.max_concurrency)
+
+    def _note_size_change(self, bucket_name, size_delta, objects_delta):
+        """Aplicar un delta al libro (None = marcar para reconciliar) e invalidar la caché"""
+        if size_delta is None:
+            if self.size_ledger:
+                self.size_ledger.mark_stale(self.host_base, bucket_name)
+        else:
+            self._apply_size_delta(bucket_name, size_delta, objects_delta)
+        if self.cache_enabled:
+            self.clear_cache('get_bucket_size', self._build_cache_key(bucket_name))
+
+    def download_file(self, bucket_name, object_name, file_path, *, progress_callback=None,
+                      cancel_event=None, segment_size=DEFAULT_SEGMENT_SIZE, verify=True):
+        """
+        Descargar un objeto con GETs por rango en paralelo.
+
+        El destino se preasigna como ``<file_path>.part`` y los segmentos
+        completados se registran en un mapa de bits junto a él: si la descarga
+        se corta, la siguiente llamada con el mismo destino solo pide los
+        segmentos que faltan (siempre que el ETag remoto no haya cambiado).
+
+        El ETag se verifica en línea: con un ETag multiparte los segmentos se
+        alinean con las partes del objeto y sus MD5 reconstruyen el ETag; un
+        MD5 simple se calcula sobre el prefijo contiguo de segmentos ya
+        escritos. El resultado queda en ``last_integrity``.
+
+        Args:
+            progress_callback: Opcional, ``callback(bytes_done, total_bytes)``.
+            cancel_event: Opcional, ``threading.Event`` para detener la descarga
+                conservando el progreso.
+        """
+        self.last_error = None
+        self.last_integrity = None
+        try:
+            head = self.client.head_object(Bucket=bucket_name, Key=object_name)
+            total_size = head.get('ContentLength', 0)
+            etag = head.get('ETag')
+            part_size = None
+            if verify and etag_parts_count(etag):
+                part_size = remote_part_size(self.client, bucket_name, object_name)
+                if part_size:
+                    # Un segmento por parte: sus MD5 reconstruyen el ETag sin releer
+                    segment_size = part_size
+
+            def fetch_range(start, end):
+                params = {'Bucket': bucket_name, 'Key': object_name, 'Range': f'bytes={start}-{end}'}
+                if etag:
+                    # Un objeto sobrescrito a mitad de descarga no debe mezclarse con el anterior
+                    params['IfMatch'] = etag
+                try:
+                    body = self.client.get_object(**params)['Body']
+                except ClientError as e:
+                    if e.response.get('Error', {}).get('Code') in ('PreconditionFailed', '412'):
+                        raise RemoteObjectChanged(f"{object_name} cambió durante la descarga")
+                    raise
+                try:
+                    yield from body.iter_chunks(READ_CHUNK_SIZE)
+                finally:
+                    body.close()
+
+            def verify_etag(part_path):
+                return etag_matches(part_path, etag, part_size)
+
+            downloader = SegmentedDownloader(
+                fetch_range, file_path, total_size,
+                etag=normalize_etag(etag) or None,
+                segment_size=segment_size,
+                max_concurrency=self.max_concurrency,
+                progress_callback=progress_callback,
+                verify=verify_etag if verify else None,
+                cancel_event=cancel_event,
+                expected=ExpectedChecksums.from_s3_etag(etag, part_size) if verify else None,
+            )
+            try:
+                downloader.download()
+            finally:
+                self.last_integrity = downloader.integrity
             print(f"Downloaded {object_name} to {file_path}")
             return True
+        except DownloadCancelled:
+            self.last_error = "Descarga detenida"
+            return False
         except Exception as e:
+            self.last_error = f"Error al descargar archivo: {e}"
             print(f"Error downloading file: {e}")
             return False
 
+    def _apply_size_delta(self, bucket_name, size_delta, objects_delta):
+        if self.size_ledger:
+            self.size_ledger.apply_delta(self.host_base, bucket_name, size_delta, objects_delta)
+
+    def needs_size_reconcile(self, bucket_name, max_age_hours=None):
+        """True si el tamaño del bucket en el libro debe reconciliarse en segundo plano"""
+        if not self.size_ledger:
+            return False
+        if max_age_hours is None:
+            return self.size_ledger.needs_reconcile(self.host_base, bucket_name)
+        return self.size_ledger.needs_reconcile(self.host_base, bucket_name, max_age_hours)
+
     def _build_cache_key(self, *args, **kwargs):
         if not args and not kwargs:
             return ()
@@ -302,22 +951,21 @@ class S3Handler:
             kw_items = ()
         return (args, kw_items)
 
-    def _get_from_cache(self, namespace, key):
+    def _get_from_cache(self, namespace, key, revalidate=None):
+        """
+        Buscar en caché.
+
+        Si la entrada está caducada pero dentro de su ventana de
+        obsolescencia y se indica ``revalidate``, se devuelve el valor viejo
+        al instante y ``revalidate`` se ejecuta en segundo plano.
+        """
         if not self.cache_enabled:
             return None
-        namespace_cache = self._cache.get(namespace)
-        if not namespace_cache:
-            return None
-        entry = namespace_cache.get(key)
-        if not entry:
-            return None
-        expires_at, value = entry
-        if monotonic() > expires_at:
-            # Expirado
-            namespace_cache.pop(key, None)
-            if not namespace_cache:
-                self._cache.pop(namespace, None)
-            return None
+        value, state = self._cache.lookup(namespace, key)
+        if state == STALE:
+            if revalidate is None:
+                return None
+            self._cache.refresh_async(namespace, key, revalidate)
         return value
 
     def _set_cache(self, namespace, key, value):
@@ -326,24 +974,16 @@ class S3Handler:
         ttl = self.cache_ttl.get(namespace)
         if not ttl:
             return
-        namespace_cache = self._cache.setdefault(namespace, {})
-        namespace_cache[key] = (monotonic() + ttl, value)
+        self._cache.set(namespace, key, value, ttl, self.cache_stale_ttl.get(namespace, 0))
 
     def clear_cache(self, namespace=None, key=None):
         if not self.cache_enabled:
             return
-        if namespace is None:
-            self._cache.clear()
-            return
-        namespace_cache = self._cache.get(namespace)
-        if not namespace_cache:
-            return
-        if key is None:
-            namespace_cache.clear()
-        else:
-            namespace_cache.pop(key, None)
-        if not namespace_cache:
-            self._cache.pop(namespace, None)
+        self._cache.invalidate(namespace, key)
+
+    def cache_stats(self):
+        """Contadores de la caché (hits, stale_hits, misses, evictions, refreshes, size)"""
+        return self._cache.stats()
     
     # ===== NUEVO: Gestión de Buckets =====
     
@@ -466,14 +1106,17 @@ class S3Handler:
                     logger.warning(f"Intento de eliminar bucket no vacío sin force: {bucket_name}")
                 return (False, error_msg)
             
-            # Si force=True y hay objetos, eliminarlos todos primero
-            if force and has_objects:
+            # Si force=True, vaciar primero (también versiones antiguas, que
+            # no aparecen en list_objects_v2 pero impiden borrar el bucket)
+            if force:
                 if LOGGING_AVAILABLE:
                     logger.info(f"Eliminando todos los objetos del bucket {bucket_name}...")
                 
                 success = self.delete_all_objects(bucket_name)
                 if not success:
                     error_msg = f"Error al eliminar los objetos del bucket '{bucket_name}'"
+                    if self.last_purge_result and self.last_purge_result.errors:
+                        error_msg += f"\n\n{self.last_error}"
                     self.last_error = error_msg
                     return (False, error_msg)
             
@@ -483,6 +1126,10 @@ class S3Handler:
             # Invalidar cachés relevantes
             self.clear_cache('list_buckets')
             self.clear_cache('get_bucket_size')
+            if self.size_ledger:
+                self.size_ledger.forget(self.host_base, bucket_name)
+            if self.object_index:
+                self.object_index.forget_bucket(self.host_base, bucket_name)
             
             success_msg = f"Bucket '{bucket_name}' eliminado exitosamente"
             if LOGGING_AVAILABLE:
@@ -23,12 +23,17 @@ def backup_now():
         QMessageBox.critical(None, "Error", "Failed to load profile configuration.")
         return
     
-    s3_handler = S3Handler(config['access_key'], config['secret_key'], config['host_base'])
-    buckets = s3_handler.list_buckets()
+    s3_handler = S3Handler(config['access_key'], config['secret_key'], config['host_base'],
+                           transfer_plan=config_manager.get_active_plan_config())
+    buckets, error = s3_handler.list_buckets()
     
+    if error:
+        QMessageBox.critical(None, "Error", f"Failed to list buckets:\n{error}")
+        return
     if not buckets:
         QMessageBox.critical(None, "Error", "No buckets found. Please create a bucket first.")
         return
+    bucket_name = buckets[0]
     
     # Select folder to backup
     folder = QFileDialog.getExistingDirectory(None, "Select Folder to Backup Now")
@@ -42,31 +47,30 @@ def backup_now():
     reply = QMessageBox.question(
         None,
         "Confirm Backup",
-        f"Ready to backup {file_count} files from:\n{folder}\n\nTo bucket: {buckets[0]}\n\nContinue?",
+        f"Ready to backup {file_count} files from:\n{folder}\n\nTo bucket: {bucket_name}\n\nContinue?",
         QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
     )
     
     if reply == QMessageBox.StandardButton.No:
         return
     
-    # Perform backup
-    uploaded = 0
-    errors = 0
-    
-    for root, dirs, files in os.walk(folder):
-        for file in files:
-            file_path = os.path.join(root, file)
-            relative_path = os.path.relpath(file_path, folder)
-            
-            if s3_handler.upload_file(buckets[0], file_path, relative_path):
-                uploaded += 1
-            else:
-                errors += 1
+    # Perform backup (asyncio batch: many concurrent PUTs instead of one per file)
+    def iter_files():
+        for root, dirs, files in os.walk(folder):
+            for file in files:
+                file_path = os.path.join(root, file)
+                yield file_path, os.path.relpath(file_path, folder)
+
+    s3_handler.upload_files(bucket_name, iter_files(), skip_unchanged=True, remote_prefix='')
+    result = s3_handler.last_batch_result
+    uploaded = result.uploaded if result else 0
+    skipped = result.skipped if result else 0
+    errors = len(result.errors) if result else file_count
     
     QMessageBox.information(
         None,
         "Backup Complete",
-        f"Backup completed!\n\nUploaded: {uploaded} files\nErrors: {errors}"
+        f"Backup completed!\n\nUploaded: {uploaded} files\nUnchanged: {skipped} files\nErrors: {errors}"
     )
 
 if __name__ == '__main__':
@@ -0,0 +1,99 @@
+"""
+Benchmark de subida por lotes - VultrDriveDesktop
+Compara subir muchos archivos pequeños uno a uno (como el BackupThread
+original) contra el plano de datos asíncrono, usando un S3 local simulado
+con latencia fija por petición.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.s3_async import AsyncBatchUploader, ThreadedAsyncClient
+
+# Latencia simulada por PUT (RTT al endpoint) y tamaño del lote
+REQUEST_LATENCY = 0.03
+FILE_COUNT = 2000
+FILE_SIZE = 4 * 1024
+
+
+class LocalS3StandIn:
+    """S3 local simulado: almacena en memoria y tarda REQUEST_LATENCY por petición"""
+
+    def __init__(self):
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body):
+        time.sleep(REQUEST_LATENCY)
+        with self._lock:
+            self.objects[Key] = len(Body)
+        return {}
+
+
+class AsyncLocalS3StandIn(LocalS3StandIn):
+    """Misma latencia, pero con una API nativa asíncrona (como aiobotocore)"""
+
+    async def put_object(self, Bucket, Key, Body):
+        await asyncio.sleep(REQUEST_LATENCY)
+        self.objects[Key] = len(Body)
+        return {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+def sequential(files):
+    client = LocalS3StandIn()
+    start = time.perf_counter()
+    for path, key in files:
+        with open(path, 'rb') as f:
+            client.put_object(Bucket='bench', Key=key, Body=f.read())
+    return time.perf_counter() - start
+
+
+def batched(files, client_factory, concurrency):
+    result = AsyncBatchUploader(client_factory, 'bench', concurrency=concurrency).upload(files)
+    assert result.success and result.uploaded == len(files)
+    return result.elapsed
+
+
+def main():
+    print("=" * 60)
+    print("BENCHMARK SUBIDA POR LOTES - VultrDriveDesktop")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = []
+        for i in range(FILE_COUNT):
+            path = os.path.join(tmp, f"{i:05d}.bin")
+            with open(path, 'wb') as f:
+                f.write(os.urandom(FILE_SIZE))
+            files.append((path, f"bench/{i:05d}.bin"))
+
+        # El secuencial se mide sobre una muestra y se extrapola
+        sample = files[:200]
+        seq_rate = len(sample) / sequential(sample)
+        print(f"✓ Secuencial (upload_file por archivo): {seq_rate:.0f} archivos/s")
+
+        for concurrency in (64, 256):
+            elapsed = batched(files, lambda: ThreadedAsyncClient(LocalS3StandIn(), 64), concurrency)
+            rate = FILE_COUNT / elapsed
+            print(f"✓ asyncio + pool boto3 (concurrencia {concurrency}): {rate:.0f} archivos/s "
+                  f"(x{rate / seq_rate:.1f})")
+
+            elapsed = batched(files, AsyncLocalS3StandIn, concurrency)
+            rate = FILE_COUNT / elapsed
+            print(f"✓ asyncio nativo (concurrencia {concurrency}): {rate:.0f} archivos/s "
+                  f"(x{rate / seq_rate:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark de subida multiparte - VultrDriveDesktop
+Compara la subida secuencial (1 hilo) contra el motor multiparte paralelo
+usando un cliente S3 simulado con latencia por petición.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.s3_multipart import MIB, MultipartUploader, concurrency_from_plan
+
+# Latencia simulada por parte (RTT + envío) y tamaño del archivo de prueba
+PART_LATENCY = 0.05
+FILE_SIZE = 64 * MIB
+PART_SIZE = 8 * MIB
+
+
+class LatencyS3Client:
+    """Cliente S3 simulado: cada upload_part tarda PART_LATENCY segundos"""
+
+    def create_multipart_upload(self, **kwargs):
+        return {'UploadId': 'bench'}
+
+    def upload_part(self, PartNumber, **kwargs):
+        time.sleep(PART_LATENCY)
+        return {'ETag': f'"{PartNumber}"'}
+
+    def complete_multipart_upload(self, **kwargs):
+        return {}
+
+    def abort_multipart_upload(self, **kwargs):
+        return {}
+
+
+def run(file_path, concurrency):
+    uploader = MultipartUploader(
+        LatencyS3Client(), 'bench', 'bench.bin', file_path,
+        part_size=PART_SIZE, max_concurrency=concurrency,
+    )
+    start = time.perf_counter()
+    uploader.upload()
+    return time.perf_counter() - start
+
+
+def main():
+    print("=" * 60)
+    print("BENCHMARK MULTIPARTE - VultrDriveDesktop")
+    print("=" * 60)
+
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        f.truncate(FILE_SIZE)
+        file_path = f.name
+
+    try:
+        sequential = run(file_path, 1)
+        print(f"✓ Secuencial (1 hilo): {sequential:.2f}s "
+              f"({FILE_SIZE / MIB / sequential:.1f} MiB/s simulados)")
+
+        for plan_name, transfers in (("Stability", "4"), ("Balanced", "32")):
+            concurrency = concurrency_from_plan({'transfers': transfers})
+            elapsed = run(file_path, concurrency)
+            print(f"✓ Plan {plan_name} ({concurrency} hilos): {elapsed:.2f}s "
+                  f"({FILE_SIZE / MIB / elapsed:.1f} MiB/s, x{sequential / elapsed:.1f})")
+    finally:
+        os.unlink(file_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+Tests para la descarga de discos de Azure por rangos (core.azure_disk)
+contra un servidor HTTP local que admite Range
+"""
+
+import unittest
+import sys
+import os
+import re
+import base64
+import hashlib
+import tempfile
+import threading
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.azure_disk import (
+    REQUESTS_AVAILABLE, SparseRangeReader, coalesce_ranges, download_disk, export_disk_compressed,
+    get_page_ranges, open_session, range_fetcher, window_reader
+)
+from core.seekable_zstd import ZSTD_AVAILABLE, SeekableZstdReader
+from core.segmented_download import PART_SUFFIX, DownloadCancelled, DownloadIntegrityError, RemoteObjectChanged
+
+
+DISK = os.urandom(300 * 1024 + 123)
+SEGMENT = 64 * 1024
+
+# Disco disperso de 8 MiB con tres zonas escritas (alineadas a páginas de 512 bytes)
+SPARSE_PAGES = [(0, 4095), (3 * 1024 * 1024, 3 * 1024 * 1024 + 65535), (8 * 1024 * 1024 - 512, 8 * 1024 * 1024 - 1)]
+
+
+def sparse_disk():
+    data = bytearray(8 * 1024 * 1024)
+    for start, end in SPARSE_PAGES:
+        data[start:end + 1] = os.urandom(end - start + 1)
+    return bytes(data)
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Sirve ``server.data`` como un blob de Azure (HEAD, Range, If-Match)"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.server.data)))
+        self.send_header("ETag", self.server.etag)
+        if self.server.content_md5:
+            self.send_header("Content-MD5", self.server.content_md5)
+        self.end_headers()
+
+    def do_GET(self):
+        server = self.server
+        if parse_qs(urlparse(self.path).query).get("comp") == ["pagelist"]:
+            return self.page_list()
+        match = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        with server.lock:
+            server.ranges.append(int(match.group(1)) if match else None)
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            if self.headers.get("If-Match") not in (None, server.etag):
+                self.send_response(412)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            start, end = int(match.group(1)), int(match.group(2))
+            body = server.data[start:end + 1]
+            # Dar tiempo a que los demás segmentos se solapen
+            server.barrier_wait()
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(server.data)}")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            with server.lock:
+                server.bytes_served += len(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def page_list(self):
+        """Get Page Ranges: rangos escritos dentro de ``x-ms-range``"""
+        server = self.server
+        if server.pages is None:
+            self.send_response(400)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        window = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("x-ms-range", ""))
+        low, high = int(window.group(1)), int(window.group(2))
+        body = "".join(
+            f"<PageRange><Start>{max(start, low)}</Start><End>{min(end, high)}</End></PageRange>"
+            for start, end in server.pages if start <= high and end >= low
+        )
+        body = f'<?xml version="1.0" encoding="utf-8"?><PageList>{body}<NextMarker /></PageList>'.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class DiskServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, data):
+        super().__init__(("127.0.0.1", 0), RangeHandler)
+        self.data = data
+        self.pages = None
+        self.content_md5 = None
+        self.bytes_served = 0
+        self.etag = '"0x8DB0000000001"'
+        self.lock = threading.Lock()
+        self.ranges = []
+        self.active = 0
+        self.max_active = 0
+        self.barrier = None
+
+    def barrier_wait(self):
+        if self.barrier is not None:
+            try:
+                self.barrier.wait(timeout=0.5)
+            except threading.BrokenBarrierError:
+                pass
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/disk.vhd?sv=2022&sig=x"
+
+
+@unittest.skipUnless(REQUESTS_AVAILABLE, "requests no está instalado")
+class TestAzureDiskDownload(unittest.TestCase):
+    """Tests de la descarga segmentada por HTTP"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dest = os.path.join(self.tmp.name, "disk.vhd")
+        self.server = DiskServer(DISK)
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def serve_sparse(self):
+        self.server.data = sparse_disk()
+        self.server.pages = SPARSE_PAGES
+        return self.server.data
+
+    def download(self, **kwargs):
+        kwargs.setdefault("segment_size", SEGMENT)
+        kwargs.setdefault("max_connections", 4)
+        return download_disk(self.server.url, self.dest, **kwargs)
+
+    def test_parallel_ranged_download(self):
+        self.server.barrier = threading.Barrier(4)
+        progress = []
+        self.download(progress_callback=lambda done, total: progress.append((done, total)))
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), DISK)
+        self.assertEqual(self.server.max_active, 4)
+        self.assertEqual(sorted(self.server.ranges), list(range(0, len(DISK), SEGMENT)))
+        self.assertEqual(max(progress), (len(DISK), len(DISK)))
+
+    def test_resume_only_fetches_missing_segments(self):
+        cancel = threading.Event()
+
+        def stop_after_two(done, total):
+            if done >= 2 * SEGMENT:
+                cancel.set()
+
+        with self.assertRaises(DownloadCancelled):
+            self.download(max_connections=1, cancel_event=cancel, progress_callback=stop_after_two)
+        self.assertTrue(os.path.exists(self.dest + PART_SUFFIX))
+
+        self.server.ranges.clear()
+        self.download()
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), DISK)
+        self.assertNotIn(0, self.server.ranges)
+        self.assertLess(len(self.server.ranges), len(range(0, len(DISK), SEGMENT)))
+
+    def test_changed_disk_is_detected(self):
+        cancel = threading.Event()
+        with self.assertRaises(DownloadCancelled):
+            self.download(max_connections=1, cancel_event=cancel,
+                          progress_callback=lambda done, total: cancel.set())
+
+        # El disco cambió entre sesiones: el estado guardado ya no vale
+        self.server.etag = '"0x8DB0000000002"'
+        self.download()
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), DISK)
+
+    def test_etag_change_mid_download(self):
+        original = RangeHandler.do_GET
+
+        def changing_get(handler):
+            handler.server.etag = '"0x8DB0000000009"'
+            original(handler)
+
+        RangeHandler.do_GET = changing_get
+        self.addCleanup(setattr, RangeHandler, "do_GET", original)
+        with self.assertRaises(RemoteObjectChanged):
+            self.download()
+        self.assertFalse(os.path.exists(self.dest + PART_SUFFIX))
+
+
+    def test_content_md5_is_verified_inline(self):
+        checks = []
+        # Varios segmentos: el MD5 del disco entero se lleva sobre el prefijo
+        self.server.content_md5 = base64.b64encode(hashlib.md5(DISK).digest()).decode()
+        self.download(integrity_callback=checks.append)
+        self.assertEqual(checks[-1].status, "verified")
+
+        os.remove(self.dest)
+        self.server.content_md5 = base64.b64encode(hashlib.md5(b"otro").digest()).decode()
+        with self.assertRaises(DownloadIntegrityError):
+            self.download(integrity_callback=checks.append)
+        self.assertEqual(checks[-1].status, "mismatch")
+        self.assertFalse(os.path.exists(self.dest))
+
+    def test_not_a_page_blob_downloads_everything(self):
+        self.download(sparse=True)
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), DISK)
+        self.assertEqual(self.server.bytes_served, len(DISK))
+
+    def test_sparse_download_fetches_only_allocated_pages(self):
+        data = self.serve_sparse()
+        progress = []
+        self.download(segment_size=1024 * 1024,
+                      progress_callback=lambda done, total: progress.append((done, total)))
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), data)
+        allocated = sum(end - start + 1 for start, end in SPARSE_PAGES)
+        self.assertEqual(self.server.bytes_served, allocated)
+        self.assertEqual(max(progress), (allocated, allocated))
+
+    @unittest.skipUnless(ZSTD_AVAILABLE, "zstandard no está instalado")
+    def test_compressed_export_of_sparse_disk(self):
+        data = self.serve_sparse()
+        self.dest += ".zst"
+        export_disk_compressed(self.server.url, self.dest, max_connections=4, frame_size=1024 * 1024)
+        allocated = sum(end - start + 1 for start, end in SPARSE_PAGES)
+        self.assertEqual(self.server.bytes_served, allocated)
+        self.assertLess(os.path.getsize(self.dest), len(data) // 10)
+        with SeekableZstdReader(self.dest) as disk:
+            disk.seek(3 * 1024 * 1024)
+            self.assertEqual(disk.read(65536), data[3 * 1024 * 1024:3 * 1024 * 1024 + 65536])
+            disk.seek(0)
+            self.assertEqual(disk.read(), data)
+
+    def test_page_ranges_are_queried_in_windows(self):
+        self.serve_sparse()
+        with open_session() as session:
+            ranges = get_page_ranges(session, self.server.url, 8 * 1024 * 1024, window=1024 * 1024)
+        self.assertEqual(ranges, SPARSE_PAGES)
+
+    def test_sparse_stream_synthesizes_zeros(self):
+        data = self.serve_sparse()
+        with open_session() as session:
+            reader = SparseRangeReader(range_fetcher(session, self.server.url), len(data), SPARSE_PAGES)
+            chunks = iter(lambda: reader.read(300 * 1000), b"")
+            self.assertEqual(b"".join(chunks), data)
+        self.assertEqual(self.server.bytes_served, reader.data_bytes)
+
+
+class TestRanges(unittest.TestCase):
+    """Tests de los rangos con datos (sin red)"""
+
+    def test_coalesce(self):
+        ranges = [(1024, 2047), (0, 511), (512, 1023), (5000, 5999), (6100, 6199)]
+        self.assertEqual(coalesce_ranges(ranges), [(0, 2047), (5000, 5999), (6100, 6199)])
+        self.assertEqual(coalesce_ranges(ranges, max_gap=100), [(0, 2047), (5000, 6199)])
+
+    def test_reader_without_data(self):
+        reader = SparseRangeReader(lambda start, end: iter(()), 4096, [])
+        self.assertEqual(reader.read(), bytes(4096))
+        self.assertEqual(reader.read(10), b"")
+
+    def test_window_reader_retries_interrupted_read(self):
+        calls = []
+
+        def fetch_range(start, end):
+            calls.append(start)
+            yield DISK[start:start + 100]
+            if len(calls) == 1:
+                raise ConnectionError("conexión reiniciada")
+            yield DISK[start + 100:end + 1]
+
+        read = window_reader(fetch_range, len(DISK), [(0, len(DISK) - 1)])
+        with mock.patch("core.azure_disk.time.sleep") as sleep:
+            self.assertEqual(read(1000, 5000), DISK[1000:6000])
+        self.assertEqual(calls, [1000, 1000])
+        sleep.assert_called_once()
+
+    def test_window_reader_does_not_retry_changed_disk(self):
+        def fetch_range(start, end):
+            raise RemoteObjectChanged("El disco cambió")
+            yield b""
+
+        read = window_reader(fetch_range, len(DISK), [(0, len(DISK) - 1)])
+        with self.assertRaises(RemoteObjectChanged):
+            read(0, 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
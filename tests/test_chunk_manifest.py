@@ -0,0 +1,77 @@
+"""
+Tests para el manifiesto de fragmentos (core.chunk_manifest)
+"""
+
+import unittest
+import json
+import sys
+import os
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.chunk_manifest import ChunkLedger, ChunkManifest
+
+
+class TestChunkManifest(unittest.TestCase):
+    """Tests del mapa de bits y su serialización"""
+
+    def test_ranges_with_partial_last_chunk(self):
+        manifest = ChunkManifest(2500, 1000)
+        self.assertEqual(manifest.chunk_count, 3)
+        self.assertEqual(manifest.chunk_range(0), (0, 999))
+        self.assertEqual(manifest.chunk_range(2), (2000, 2499))
+        self.assertEqual(manifest.chunk_length(2), 500)
+
+    def test_out_of_order_completion(self):
+        manifest = ChunkManifest(10 * 1000, 1000)
+        for index in (9, 2, 0, 1):
+            self.assertTrue(manifest.mark_done(index))
+        self.assertFalse(manifest.mark_done(2))
+        self.assertEqual(manifest.pending_chunks(), [3, 4, 5, 6, 7, 8])
+        self.assertEqual(manifest.completed_bytes, 4000)
+        with self.assertRaises(IndexError):
+            manifest.mark_done(10)
+
+    def test_complete(self):
+        manifest = ChunkManifest(2500, 1000)
+        for index in manifest.pending_chunks():
+            manifest.mark_done(index)
+        self.assertTrue(manifest.is_complete)
+        self.assertEqual(manifest.completed_bytes, 2500)
+
+    def test_roundtrip_is_compact(self):
+        # 2 TiB en fragmentos de 8 MiB: 262144 fragmentos
+        manifest = ChunkManifest(2 * 1024 ** 4, 8 * 1024 ** 2, source_id="0x8DB1")
+        for index in range(0, 100000):
+            manifest.mark_done(index)
+        manifest.mark_done(200000)
+        data = manifest.to_dict()
+        self.assertLess(len(json.dumps(data)), 1024)
+
+        restored = ChunkManifest.from_dict(json.loads(json.dumps(data)))
+        self.assertEqual(restored.bitmap(), manifest.bitmap())
+        self.assertEqual(restored.done_count, 100001)
+        self.assertTrue(restored.matches(manifest.total_bytes, manifest.chunk_size, "0x8DB1"))
+        self.assertFalse(restored.matches(manifest.total_bytes, manifest.chunk_size, "0x8DB2"))
+
+    def test_bitmap_size_mismatch(self):
+        with self.assertRaises(ValueError):
+            ChunkManifest(10 * 1000, 1000, bitmap=b"\x00")
+
+
+    def test_ledger_only_returns_same_source(self):
+        stored = []
+        ledger = ChunkLedger(lambda: stored[-1] if stored else None, stored.append, lambda index: None)
+        manifest = ChunkManifest(5000, 1000, source_id="etag-1")
+        manifest.mark_done(3)
+        ledger.start(manifest)
+        # start guarda una copia: el motor puede seguir cambiando la suya
+        manifest.mark_done(4)
+        self.assertEqual(ledger.recorded(5000, 1000, "etag-1").pending_chunks(), [0, 1, 2, 4])
+        self.assertIsNone(ledger.recorded(5000, 1000, "etag-2"))
+        self.assertIsNone(ledger.recorded(5000, 500, "etag-1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Tests para el backup deduplicado (core.dedup_backup)
+"""
+
+import unittest
+import sys
+import os
+import io
+import random
+import tempfile
+import threading
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.dedup_backup import DedupBackupEngine, DedupCancelled, iter_chunks
+
+KIB = 1024
+
+
+class FakeBody:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+class FakeBucketClient:
+    """Cliente S3 simulado: objetos como {key: bytes}"""
+
+    def __init__(self):
+        self.objects = {}
+        self.puts = 0
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body):
+        with self._lock:
+            self.puts += 1
+            self.objects[Key] = bytes(Body)
+
+    def get_object(self, Bucket, Key):
+        return {'Body': FakeBody(self.objects[Key])}
+
+    def list_objects_v2(self, Bucket, Prefix, MaxKeys, ContinuationToken=None):
+        keys = sorted(k for k in self.objects if k.startswith(Prefix) and k > (ContinuationToken or ''))
+        page = keys[:MaxKeys]
+        return {'Contents': [{'Key': k} for k in page], 'IsTruncated': len(keys) > MaxKeys,
+                'NextContinuationToken': page[-1] if page else None}
+
+
+def small_engine(client, **kwargs):
+    # Fragmentos pequeños para que los tests sean rápidos
+    return DedupBackupEngine(client, 'bucket', min_size=4 * KIB, avg_size=16 * KIB, max_size=64 * KIB, **kwargs)
+
+
+class TestChunking(unittest.TestCase):
+    """Tests para la fragmentación definida por contenido"""
+
+    def test_insert_only_changes_neighbouring_chunks(self):
+        data = random.Random(1).randbytes(1024 * KIB)
+        shifted = data[:300 * KIB] + b'insertado' + data[300 * KIB:]
+        original = list(iter_chunks(io.BytesIO(data), 4 * KIB, 16 * KIB, 64 * KIB))
+        changed = list(iter_chunks(io.BytesIO(shifted), 4 * KIB, 16 * KIB, 64 * KIB))
+        self.assertEqual(b''.join(original), data)
+        self.assertTrue(all(len(c) <= 64 * KIB for c in original))
+        shared = len(set(original) & set(changed))
+        self.assertGreaterEqual(shared, len(original) - 3)
+
+
+class TestDedupBackupEngine(unittest.TestCase):
+    """Tests para DedupBackupEngine"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.source = os.path.join(self.tmp.name, "Datos")
+        os.makedirs(os.path.join(self.source, "sub"))
+        rng = random.Random(7)
+        self.files = {
+            "a.bin": rng.randbytes(200 * KIB),
+            "sub/b.bin": rng.randbytes(120 * KIB),
+            "empty.txt": b'',
+        }
+        # Copia exacta: se deduplica dentro de la misma instantánea
+        self.files["sub/copia.bin"] = self.files["a.bin"]
+        for rel, data in self.files.items():
+            with open(os.path.join(self.source, *rel.split('/')), 'wb') as f:
+                f.write(data)
+        self.client = FakeBucketClient()
+
+    def test_backup_and_restore_roundtrip(self):
+        result = small_engine(self.client).backup(self.source)
+        self.assertTrue(result.success)
+        self.assertEqual(result.files, 4)
+        self.assertLess(result.bytes_uploaded, result.bytes_total)
+
+        target = os.path.join(self.tmp.name, "restaurado")
+        restored = small_engine(self.client).restore(result.snapshot_id, target, source_name="Datos")
+        self.assertTrue(restored.success)
+        for rel, data in self.files.items():
+            with open(os.path.join(target, *rel.split('/')), 'rb') as f:
+                self.assertEqual(f.read(), data)
+
+    def test_second_backup_uploads_only_changed_chunks(self):
+        first = small_engine(self.client).backup(self.source)
+        path = os.path.join(self.source, "sub", "b.bin")
+        with open(path, 'r+b') as f:
+            f.seek(60 * KIB)
+            f.write(b'cambio')
+        second = small_engine(self.client).backup(self.source)
+        self.assertTrue(second.success)
+        self.assertEqual(second.files_reused, 3)
+        self.assertLessEqual(second.bytes_scanned, 120 * KIB)
+        self.assertLess(second.bytes_uploaded, 64 * KIB * 2 + 1)
+        self.assertEqual(small_engine(self.client).list_snapshots("Datos"),
+                         sorted([first.snapshot_id, second.snapshot_id]))
+
+    def test_failed_chunk_upload_does_not_publish_manifest(self):
+        client = FakeBucketClient()
+        put = client.put_object
+
+        def failing_put(Bucket, Key, Body):
+            if '/chunks/' in f"/{Key}" and len(client.objects) == 1:
+                raise IOError("503 SlowDown")
+            put(Bucket, Key, Body)
+
+        client.put_object = failing_put
+        result = small_engine(client, max_concurrency=1).backup(self.source)
+        self.assertFalse(result.success)
+        self.assertIsNone(result.snapshot_id)
+        self.assertEqual(small_engine(client).list_snapshots("Datos"), [])
+
+    def test_cancel(self):
+        cancel = threading.Event()
+        cancel.set()
+        with self.assertRaises(DedupCancelled):
+            small_engine(self.client, cancel_event=cancel).backup(self.source)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,216 @@
+"""
+Tests para la subida por componentes a GCS (core.gcs_compose) contra un
+bucket en memoria que imita la API de google-cloud-storage
+"""
+
+import unittest
+import sys
+import os
+import base64
+import hashlib
+import threading
+from unittest import mock
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import gcs_compose
+from core.azure_disk import SparseRangeReader
+from core.chunk_manifest import ChunkLedger
+from core.gcs_compose import ComposeIntegrityError, ComposeUploadCancelled, ComposeUploader, source_tag
+from core.integrity import crc32c, encode_crc32c
+
+
+DATA = os.urandom(100 * 1000 + 77)
+COMPONENT = 1000
+
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.content_type = None
+
+    @property
+    def size(self):
+        data = self.bucket.objects.get(self.name)
+        return None if data is None else len(data)
+
+    @property
+    def md5_hash(self):
+        data = self.bucket.objects.get(self.name)
+        if data is None or self.name in self.bucket.composites:
+            return None  # GCS no calcula MD5 de los objetos compuestos
+        return base64.b64encode(hashlib.md5(data).digest()).decode()
+
+    @property
+    def crc32c(self):
+        data = self.bucket.objects.get(self.name)
+        return None if data is None else encode_crc32c(crc32c(data))
+
+    def delete(self):
+        with self.bucket.lock:
+            self.bucket.objects.pop(self.name, None)
+
+    def upload_from_file(self, file_obj, size=None, content_type=None):
+        self.bucket.upload_calls += 1
+        if self.name in self.bucket.fail_once:
+            # Conexión cortada a mitad: el cliente rebobina y reintenta
+            self.bucket.fail_once.discard(self.name)
+            file_obj.read(size // 2)
+            raise ConnectionError("conexión reiniciada")
+        data = file_obj.read(size)
+        if len(data) != size:
+            raise IOError("lectura incompleta")
+        if self.name in self.bucket.corrupt_once:
+            # Lo que llega al servidor no es lo que se leyó del origen
+            self.bucket.corrupt_once.discard(self.name)
+            data = bytes([data[0] ^ 0xFF]) + data[1:]
+        with self.bucket.lock:
+            self.bucket.objects[self.name] = data
+
+    def compose(self, sources):
+        assert 1 <= len(sources) <= gcs_compose.MAX_COMPOSE_SOURCES
+        self.bucket.compose_calls += 1
+        with self.bucket.lock:
+            self.bucket.objects[self.name] = b"".join(self.bucket.objects[s.name] for s in sources)
+            self.bucket.composites.add(self.name)
+
+
+class FakeBucket:
+    def __init__(self):
+        self.objects = {}
+        self.lock = threading.Lock()
+        self.fail_once = set()
+        self.corrupt_once = set()
+        self.composites = set()
+        self.upload_calls = 0
+        self.compose_calls = 0
+
+    def blob(self, name, chunk_size=None):
+        return FakeBlob(self, name)
+
+    def list_blobs(self, prefix=""):
+        with self.lock:
+            names = sorted(n for n in self.objects if n.startswith(prefix))
+        return [FakeBlob(self, n) for n in names]
+
+    def delete_blobs(self, blobs, on_error=None):
+        with self.lock:
+            for blob in blobs:
+                self.objects.pop(blob.name, None)
+
+
+def open_part(start, end):
+    return SparseRangeReader(lambda s, e: iter([DATA[s:e + 1]]), len(DATA), [(0, len(DATA) - 1)], start, end)
+
+
+class TestComposeUploader(unittest.TestCase):
+    """Tests de la subida por componentes"""
+
+    def setUp(self):
+        self.bucket = FakeBucket()
+        patcher = mock.patch.object(gcs_compose.time, 'sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make(self, **kwargs):
+        kwargs.setdefault('component_size', COMPONENT)
+        kwargs.setdefault('max_concurrency', 4)
+        return ComposeUploader(self.bucket, "disks/web.vhd", len(DATA), open_part,
+                               tag=source_tag('"0x1"', len(DATA), COMPONENT), **kwargs)
+
+    def test_tree_compose_and_cleanup(self):
+        progress = []
+        result = self.make(progress_callback=lambda done, total: progress.append(done)).upload()
+        self.assertTrue(result.success)
+        self.assertEqual(result.components, 101)
+        self.assertEqual(self.bucket.objects["disks/web.vhd"], DATA)
+        # 101 componentes: 4 compuestos intermedios + el destino
+        self.assertEqual(self.bucket.compose_calls, 5)
+        self.assertEqual(list(self.bucket.objects), ["disks/web.vhd"])
+        self.assertEqual(max(progress), len(DATA))
+
+    def test_failed_component_rewinds_and_retries(self):
+        uploader = self.make()
+        self.bucket.fail_once = {uploader.component_name(3), uploader.component_name(50)}
+        progress = []
+        uploader.progress_callback = lambda done, total: progress.append(done)
+        uploader.upload()
+        self.assertEqual(self.bucket.objects["disks/web.vhd"], DATA)
+        self.assertEqual(self.bucket.upload_calls, 103)
+        # Lo enviado en el intento fallido se descuenta
+        self.assertEqual(max(progress), len(DATA))
+
+    def test_resume_uploads_only_missing_components(self):
+        cancel = threading.Event()
+        uploader = self.make(max_concurrency=1, cancel_event=cancel,
+                             progress_callback=lambda done, total: done >= 30 * COMPONENT and cancel.set())
+        with self.assertRaises(ComposeUploadCancelled):
+            uploader.upload()
+        kept = len(self.bucket.objects)
+        self.assertGreaterEqual(kept, 30)
+        self.assertNotIn("disks/web.vhd", self.bucket.objects)
+
+        self.bucket.upload_calls = 0
+        stored, started_with = [], []
+        ledger = ChunkLedger(lambda: None, lambda m: (stored.append(m), started_with.append(m.done_count)),
+                             lambda index: stored[-1].mark_done(index))
+        result = self.make(chunk_ledger=ledger).upload()
+        self.assertEqual(result.reused, kept)
+        self.assertEqual(self.bucket.upload_calls, 101 - kept)
+        self.assertEqual(self.bucket.objects["disks/web.vhd"], DATA)
+        # El manifiesto de la transferencia parte de los reutilizados y acaba completo
+        self.assertEqual(started_with, [kept])
+        self.assertTrue(stored[-1].is_complete)
+
+    def test_changed_source_does_not_reuse_components(self):
+        stale = ComposeUploader(self.bucket, "disks/web.vhd", len(DATA), open_part,
+                                tag=source_tag('"0x0"', len(DATA), COMPONENT), component_size=COMPONENT)
+        self.bucket.objects[stale.component_name(0)] = b"x" * COMPONENT
+
+        result = self.make().upload()
+        self.assertEqual(result.reused, 0)
+        self.assertEqual(self.bucket.objects["disks/web.vhd"], DATA)
+        # Los componentes del origen anterior también se borran
+        self.assertEqual(list(self.bucket.objects), ["disks/web.vhd"])
+
+    def test_components_and_composite_are_verified(self):
+        result = self.make().upload()
+        self.assertEqual(result.integrity.status, 'verified')
+        self.assertEqual(result.integrity.crc32c, encode_crc32c(crc32c(DATA)))
+
+    def test_corrupt_component_is_reuploaded(self):
+        uploader = self.make()
+        self.bucket.corrupt_once = {uploader.component_name(7)}
+        result = uploader.upload()
+        self.assertEqual(self.bucket.objects["disks/web.vhd"], DATA)
+        self.assertEqual(self.bucket.upload_calls, 102)
+        self.assertEqual(result.integrity.status, 'verified')
+
+    def test_persistent_corruption_fails_without_keeping_component(self):
+        uploader = self.make(max_concurrency=1)
+        name = uploader.component_name(2)
+        original = FakeBlob.upload_from_file
+
+        def always_corrupt(blob, file_obj, size=None, content_type=None):
+            if blob.name == name:
+                blob.bucket.corrupt_once.add(name)
+            original(blob, file_obj, size=size, content_type=content_type)
+
+        with mock.patch.object(FakeBlob, 'upload_from_file', always_corrupt):
+            with self.assertRaises(ComposeIntegrityError) as ctx:
+                uploader.upload()
+        self.assertEqual(ctx.exception.integrity.status, 'mismatch')
+        # Un componente corrupto no debe reutilizarse al reanudar
+        self.assertNotIn(name, self.bucket.objects)
+
+    def test_single_component(self):
+        uploader = ComposeUploader(self.bucket, "small.bin", len(DATA), open_part, tag="t",
+                                   component_size=len(DATA) * 2)
+        uploader.upload()
+        self.assertEqual(self.bucket.objects["small.bin"], DATA)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Tests para el índice local de metadatos (core.object_index)
+"""
+
+import unittest
+import sys
+import os
+from datetime import datetime, timezone
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.object_index import ObjectIndex, glob_to_prefix
+
+ACCOUNT = 'ewr1.vultrobjects.com'
+
+
+def listing(keys, size=10, day=1):
+    return [{'Key': k, 'Size': size, 'ETag': '"abc"',
+             'LastModified': datetime(2024, 1, day, tzinfo=timezone.utc)} for k in keys]
+
+
+class TestObjectIndex(unittest.TestCase):
+    """Tests para ObjectIndex"""
+
+    def setUp(self):
+        self.index = ObjectIndex(':memory:')
+        self.addCleanup(self.index.close)
+        self.index.sync_pages(ACCOUNT, 'bucket', [
+            listing(['docs/a.pdf', 'docs/b.txt'], size=100, day=1),
+            listing(['docs/old/c.pdf', 'img/1.png', 'readme.md'], size=5000, day=20),
+        ])
+
+    def test_query_filters(self):
+        keys = lambda rows: [r['key'] for r in rows]
+        self.assertEqual(keys(self.index.query(ACCOUNT, 'bucket', prefix='docs/')),
+                         ['docs/a.pdf', 'docs/b.txt', 'docs/old/c.pdf'])
+        self.assertEqual(keys(self.index.query(ACCOUNT, 'bucket', glob='*.pdf')),
+                         ['docs/a.pdf', 'docs/old/c.pdf'])
+        self.assertEqual(keys(self.index.query(ACCOUNT, 'bucket', min_size=1000, prefix='docs/')),
+                         ['docs/old/c.pdf'])
+        after = datetime(2024, 1, 10, tzinfo=timezone.utc)
+        self.assertEqual(len(self.index.query(ACCOUNT, 'bucket', modified_after=after)), 3)
+        self.assertEqual(self.index.get(ACCOUNT, 'bucket', 'readme.md')['etag'], 'abc')
+
+    def test_list_folder_skips_subfolders(self):
+        folders, objects = self.index.list_folder(ACCOUNT, 'bucket', 'docs/')
+        self.assertEqual(folders, ['docs/old/'])
+        self.assertEqual([o['key'] for o in objects], ['docs/a.pdf', 'docs/b.txt'])
+        folders, objects = self.index.list_folder(ACCOUNT, 'bucket')
+        self.assertEqual(folders, ['docs/', 'img/'])
+        self.assertEqual([o['key'] for o in objects], ['readme.md'])
+
+    def test_resync_removes_missing_objects(self):
+        indexed = self.index.sync_pages(ACCOUNT, 'bucket', [listing(['docs/a.pdf', 'new.txt'])])
+        self.assertEqual(indexed, 2)
+        self.assertEqual(self.index.stats(ACCOUNT, 'bucket'), {'objects': 2, 'size': 20})
+        self.assertTrue(self.index.is_fresh(ACCOUNT, 'bucket'))
+
+    def test_folder_resync_keeps_deeper_keys(self):
+        generation = self.index.begin_sync(ACCOUNT, 'bucket')
+        self.index.upsert_objects(ACCOUNT, 'bucket', [{'key': 'docs/a.pdf', 'size': 1}], generation)
+        self.index.finish_sync(ACCOUNT, 'bucket', generation, 'docs/', recursive=False)
+        keys = [r['key'] for r in self.index.query(ACCOUNT, 'bucket', prefix='docs/')]
+        self.assertEqual(keys, ['docs/a.pdf', 'docs/old/c.pdf'])
+
+    def test_copy_prefix(self):
+        self.index.copy_prefix(ACCOUNT, 'bucket', 'docs/', 'archive', '2024/docs/')
+        self.assertEqual(self.index.stats(ACCOUNT, 'archive', '2024/docs/')['objects'], 3)
+
+    def test_glob_prefix(self):
+        self.assertEqual(glob_to_prefix('backups/2024-*.zip'), 'backups/2024-')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+Tests para el bus de progreso con coalescencia (core.progress_bus)
+"""
+
+import unittest
+import threading
+import sys
+import os
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.progress_bus import ProgressCoalescer, ProgressUpdate
+
+
+class TestProgressCoalescer(unittest.TestCase):
+    """Tests para ProgressCoalescer"""
+
+    def test_keeps_latest_per_transfer(self):
+        bus = ProgressCoalescer()
+        for i in range(1, 101):
+            bus.post("a", ProgressUpdate(i, i * 10, 1000))
+        bus.post("b", ProgressUpdate(5, 50, 1000))
+        batch = bus.drain()
+        self.assertEqual(list(batch), ["a", "b"])
+        self.assertEqual(batch["a"].bytes_transferred, 1000)
+        self.assertEqual(len(bus), 0)
+        self.assertEqual(bus.drain(), {})
+
+    def test_empty_status_keeps_pending_text(self):
+        bus = ProgressCoalescer()
+        bus.post("a", ProgressUpdate(1, 10, 1000, "Reanudando desde 1 GB"))
+        bus.post("a", ProgressUpdate(2, 20, 1000))
+        self.assertEqual(bus.drain()["a"].status_text, "Reanudando desde 1 GB")
+
+    def test_concurrent_posts(self):
+        bus = ProgressCoalescer()
+
+        def worker(name):
+            for i in range(2000):
+                bus.post(name, ProgressUpdate(0, i, 0))
+
+        threads = [threading.Thread(target=worker, args=(f"t{n}",)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        batch = bus.drain()
+        self.assertEqual(len(batch), 8)
+        self.assertTrue(all(update.bytes_transferred == 1999 for update in batch.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Tests para ResponseCache (LRU + TTL + stale-while-revalidate)
+"""
+
+import unittest
+import sys
+import os
+import threading
+from unittest import mock
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import response_cache
+from core.response_cache import FRESH, STALE, ResponseCache, get_shared_cache
+
+
+class TestResponseCache(unittest.TestCase):
+    """Tests para ResponseCache"""
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(response_cache, 'monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = ResponseCache(max_entries=2)
+
+    def test_fresh_then_stale_then_expired(self):
+        self.cache.set('ns', 'k', 'v', ttl=10, stale_ttl=20)
+        self.assertEqual(self.cache.lookup('ns', 'k'), ('v', FRESH))
+        self.now += 15
+        self.assertEqual(self.cache.lookup('ns', 'k'), ('v', STALE))
+        self.now += 20
+        self.assertEqual(self.cache.lookup('ns', 'k'), (None, None))
+
+    def test_lru_eviction(self):
+        self.cache.set('ns', 'a', 1, ttl=10)
+        self.cache.set('ns', 'b', 2, ttl=10)
+        self.cache.lookup('ns', 'a')  # 'a' pasa a ser la más reciente
+        self.cache.set('ns', 'c', 3, ttl=10)
+        self.assertEqual(self.cache.lookup('ns', 'b'), (None, None))
+        self.assertEqual(self.cache.lookup('ns', 'a'), (1, FRESH))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_counters(self):
+        self.cache.set('ns', 'a', 1, ttl=10)
+        self.cache.lookup('ns', 'a')
+        self.cache.lookup('ns', 'missing')
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (1, 1, 1))
+
+    def test_invalidate_namespace(self):
+        self.cache.set('a', 1, 'x', ttl=10)
+        self.cache.set('b', 1, 'y', ttl=10)
+        self.cache.invalidate('a')
+        self.assertEqual(len(self.cache), 1)
+
+    def test_refresh_async_is_single_flight(self):
+        release = threading.Event()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            release.wait(5)
+
+        self.assertTrue(self.cache.refresh_async('ns', 'k', loader))
+        self.assertFalse(self.cache.refresh_async('ns', 'k', loader))
+        release.set()
+
+    def test_shared_cache_per_account(self):
+        self.assertIs(get_shared_cache(('host', 'key-1')), get_shared_cache(('host', 'key-1')))
+        self.assertIsNot(get_shared_cache(('host', 'key-1')), get_shared_cache(('host', 'key-2')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Tests para la reanudación automática de transferencias (core.resume_coordinator)
+"""
+
+import unittest
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.resume_coordinator import ResumeCoordinator, ResumeNotReady, sas_expired, sas_expiry
+from core.transfer_scheduler import TransferPriority
+
+NOW = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+
+
+def sas_url(expiry: datetime) -> str:
+    se = expiry.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return f"https://md-abc.blob.core.windows.net/disk/abcd?sv=2018-03-28&sr=b&se={se}&sp=r&sig=x%2By"
+
+
+class FakeManager:
+    """Lo mínimo del TransferManager que usa el coordinador"""
+
+    def __init__(self, *transfers):
+        self.transfers = {t.id: t for t in transfers}
+        self.started = []
+        self.completed = {}
+
+    def get_all_transfers(self):
+        return list(self.transfers.values())
+
+    def get_transfer(self, transfer_id):
+        return self.transfers.get(transfer_id)
+
+    def start_worker(self, worker, transfer_id, priority):
+        self.started.append((transfer_id, worker, priority))
+
+    def complete_transfer(self, transfer_id, success, message=""):
+        self.completed[transfer_id] = (success, message)
+        self.transfers[transfer_id].auto_resume = False
+
+
+def transfer(transfer_id, transfer_type="s3_download", auto_resume=True):
+    return SimpleNamespace(id=transfer_id, transfer_type=transfer_type, auto_resume=auto_resume)
+
+
+class TestSasExpiry(unittest.TestCase):
+    """Tests para la caducidad de los SAS de Azure"""
+
+    def test_expiry_from_url(self):
+        self.assertEqual(sas_expiry(sas_url(NOW)), NOW)
+        self.assertIsNone(sas_expiry("https://host/disk?sig=x"))
+
+    def test_expired_with_margin(self):
+        self.assertFalse(sas_expired(sas_url(NOW + timedelta(hours=3)), now=NOW))
+        self.assertTrue(sas_expired(sas_url(NOW + timedelta(minutes=5)), now=NOW))
+        self.assertTrue(sas_expired(sas_url(NOW - timedelta(hours=1)), now=NOW))
+
+    def test_unknown_expiry_uses_fallback_or_expires(self):
+        url = "https://host/disk?sig=x"
+        self.assertFalse(sas_expired(url, (NOW + timedelta(hours=3)).isoformat(), now=NOW))
+        self.assertTrue(sas_expired(url, now=NOW))
+        self.assertTrue(sas_expired(None, now=NOW))
+
+
+class TestResumeCoordinator(unittest.TestCase):
+    """Tests para el despacho de reanudaciones"""
+
+    def test_resumes_only_interrupted_transfers(self):
+        manager = FakeManager(transfer("a"), transfer("b", auto_resume=False))
+        coordinator = ResumeCoordinator(manager)
+        coordinator.register("s3_download", lambda t: f"worker-{t.id}", TransferPriority.INTERACTIVE)
+
+        report = coordinator.resume_pending()
+        self.assertEqual(report.resumed, ["a"])
+        self.assertEqual(manager.started, [("a", "worker-a", TransferPriority.INTERACTIVE)])
+        # Una segunda pasada no la vuelve a despachar
+        self.assertEqual(coordinator.resume_pending().resumed, [])
+
+    def test_not_ready_and_unknown_types_are_deferred(self):
+        manager = FakeManager(transfer("a", "azure_to_local"), transfer("b", "gcp_download"))
+        coordinator = ResumeCoordinator(manager)
+        ready = []
+
+        def adapter(t):
+            if not ready:
+                raise ResumeNotReady("sin credenciales")
+            return "worker"
+
+        coordinator.register("azure_to_local", adapter)
+        report = coordinator.resume_pending()
+        self.assertEqual(sorted(report.deferred), ["a", "b"])
+        self.assertEqual(manager.started, [])
+
+        # Tras iniciar sesión, la siguiente pasada la reanuda
+        ready.append(True)
+        self.assertEqual(coordinator.resume_pending().resumed, ["a"])
+        self.assertEqual(manager.started[0][2], TransferPriority.BACKGROUND)
+
+    def test_adapter_failure_marks_error(self):
+        manager = FakeManager(transfer("a"))
+        coordinator = ResumeCoordinator(manager)
+
+        def adapter(t):
+            raise FileNotFoundError("origen borrado")
+
+        coordinator.register("s3_download", adapter)
+        report = coordinator.resume_pending()
+        self.assertFalse(report.success)
+        self.assertIn("origen borrado", manager.completed["a"][1])
+        self.assertFalse(manager.transfers["a"].auto_resume)
+
+    def test_disabled(self):
+        manager = FakeManager(transfer("a"))
+        coordinator = ResumeCoordinator(manager, enabled=False)
+        coordinator.register("s3_download", lambda t: "worker")
+        self.assertEqual(coordinator.resume_pending().resumed, [])
+        # La reanudación manual sigue disponible
+        coordinator.resume("a")
+        self.assertEqual(len(manager.started), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
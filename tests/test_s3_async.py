@@ -0,0 +1,138 @@
+"""
+Tests para el plano de datos asíncrono (core.s3_async)
+"""
+
+import unittest
+import sys
+import os
+import asyncio
+import tempfile
+import threading
+import time
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.s3_async import AsyncBatchUploader, ThreadedAsyncClient
+
+
+class FakeAsyncClient:
+    """Cliente asíncrono simulado que mide las peticiones en vuelo"""
+
+    def __init__(self, latency=0.01, failing_keys=()):
+        self.latency = latency
+        self.failing_keys = set(failing_keys)
+        self.objects = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def put_object(self, Bucket, Key, Body):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if Key in self.failing_keys:
+                raise IOError("503 SlowDown")
+            self.objects[Key] = Body
+        finally:
+            self.in_flight -= 1
+
+    async def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise IOError("404 Not Found")
+        return {'ContentLength': len(self.objects[Key]), 'ETag': '"e"'}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+class FakeSyncClient:
+    def __init__(self):
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body):
+        time.sleep(0.005)
+        with self._lock:
+            self.objects[Key] = Body
+
+
+class TestAsyncBatchUploader(unittest.TestCase):
+    """Tests para AsyncBatchUploader"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.files = []
+        for i in range(200):
+            path = os.path.join(self.tmp.name, f"f{i:03d}.txt")
+            with open(path, 'wb') as f:
+                f.write(b'x' * i)
+            self.files.append((path, f"backup/f{i:03d}.txt"))
+
+    def test_uploads_with_bounded_concurrency(self):
+        client = FakeAsyncClient()
+        result = AsyncBatchUploader(lambda: client, 'bucket', concurrency=32).upload(iter(self.files))
+        self.assertTrue(result.success)
+        self.assertEqual(result.uploaded, 200)
+        self.assertEqual(result.bytes_uploaded, sum(range(200)))
+        self.assertEqual(client.objects['backup/f010.txt'], b'x' * 10)
+        self.assertLessEqual(client.max_in_flight, 32)
+        self.assertGreater(client.max_in_flight, 1)
+
+    def test_errors_are_collected_per_file(self):
+        client = FakeAsyncClient(failing_keys=['backup/f005.txt'])
+        progress = []
+        result = AsyncBatchUploader(
+            lambda: client, 'bucket', concurrency=8,
+            progress_callback=lambda done, size, errors, key: progress.append((done, errors)),
+        ).upload(self.files)
+        self.assertEqual(result.uploaded, 199)
+        self.assertEqual(result.errors[0]['Key'], 'backup/f005.txt')
+        self.assertEqual(progress[-1], (200, 1))
+
+    def test_large_files_are_delegated(self):
+        delegated = []
+        result = AsyncBatchUploader(
+            lambda: FakeAsyncClient(), 'bucket', small_object_limit=150,
+            large_file_upload=lambda path, key: delegated.append(key) or True,
+        ).upload(self.files)
+        self.assertEqual(len(delegated), 49)
+        self.assertEqual((result.uploaded, result.delegated), (200, 49))
+
+    def test_unchanged_files_are_skipped(self):
+        client = FakeAsyncClient()
+        client.objects = {key: b'x' * i for i, (_, key) in enumerate(self.files[:150])}
+        checked = []
+        result = AsyncBatchUploader(
+            lambda: client, 'bucket', concurrency=16,
+            change_detector=lambda path, remote: checked.append(path) or True,
+        ).upload(self.files)
+        self.assertEqual(len(checked), 150)
+        self.assertEqual((result.skipped, result.uploaded), (150, 50))
+        self.assertEqual(result.processed, 200)
+
+    def test_remote_lookup_avoids_head_requests(self):
+        remote = {key: {'size': i, 'etag': 'e'} for i, (_, key) in enumerate(self.files) if i % 2}
+        client = FakeAsyncClient()
+        result = AsyncBatchUploader(
+            lambda: client, 'bucket',
+            change_detector=lambda path, entry: True, remote_lookup=remote.get,
+        ).upload(self.files)
+        self.assertEqual((result.skipped, result.uploaded), (100, 100))
+        self.assertNotIn('backup/f001.txt', client.objects)
+
+    def test_threaded_fallback_client(self):
+        sync_client = FakeSyncClient()
+        result = AsyncBatchUploader(
+            lambda: ThreadedAsyncClient(sync_client, max_workers=16), 'bucket', concurrency=64
+        ).upload(self.files)
+        self.assertTrue(result.success)
+        self.assertEqual(len(sync_client.objects), 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+Tests para la copia y movimiento en servidor (core.s3_copy)
+"""
+
+import unittest
+import sys
+import os
+import threading
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.s3_copy import MIN_COPY_PART_SIZE, ObjectCopier
+
+
+class FakeCopyClient:
+    """Cliente S3 simulado: objetos como {(bucket, key): size}"""
+
+    def __init__(self, objects):
+        self.objects = dict(objects)
+        self.copy_calls = 0
+        self.part_ranges = []
+        self.completed = {}
+        self._lock = threading.Lock()
+
+    def head_object(self, Bucket, Key):
+        return {'ContentLength': self.objects[(Bucket, Key)], 'ETag': '"etag"', 'ContentType': 'application/zip'}
+
+    def copy_object(self, CopySource, Bucket, Key, MetadataDirective):
+        with self._lock:
+            self.copy_calls += 1
+            self.objects[(Bucket, Key)] = self.objects[(CopySource['Bucket'], CopySource['Key'])]
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        return {'UploadId': 'up-1'}
+
+    def upload_part_copy(self, Bucket, Key, UploadId, PartNumber, CopySource, CopySourceRange,
+                         CopySourceIfMatch=None):
+        start, end = (int(v) for v in CopySourceRange[len('bytes='):].split('-'))
+        with self._lock:
+            self.part_ranges.append((start, end))
+        return {'CopyPartResult': {'ETag': f'"p{PartNumber}"'}}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = MultipartUpload['Parts']
+        self.completed[(Bucket, Key)] = [p['PartNumber'] for p in parts]
+        self.objects[(Bucket, Key)] = sum(end - start + 1 for start, end in self.part_ranges)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        pass
+
+    def list_objects_v2(self, Bucket, Prefix, MaxKeys, ContinuationToken=None):
+        keys = sorted(k for b, k in self.objects if b == Bucket and k.startswith(Prefix)
+                      and k > (ContinuationToken or ''))[:MaxKeys]
+        return {'Contents': [{'Key': k, 'Size': self.objects[(Bucket, k)], 'ETag': '"e"'} for k in keys],
+                'IsTruncated': len(keys) == MaxKeys, 'NextContinuationToken': keys[-1] if keys else None}
+
+    def delete_objects(self, Bucket, Delete):
+        with self._lock:
+            for obj in Delete['Objects']:
+                self.objects.pop((Bucket, obj['Key']), None)
+        return {}
+
+
+class TestObjectCopier(unittest.TestCase):
+    """Tests para ObjectCopier"""
+
+    def test_small_object_uses_copy_object(self):
+        client = FakeCopyClient({('src', 'a.zip'): 100})
+        size = ObjectCopier(client).copy_object('src', 'a.zip', 'dst', 'b.zip')
+        self.assertEqual(size, 100)
+        self.assertEqual(client.copy_calls, 1)
+        self.assertEqual(client.objects[('dst', 'b.zip')], 100)
+
+    def test_large_object_uses_parallel_part_copy(self):
+        size = 3 * MIN_COPY_PART_SIZE + 10
+        client = FakeCopyClient({('src', 'big.vhd'): size})
+        ObjectCopier(client, max_concurrency=4, multipart_threshold=MIN_COPY_PART_SIZE).copy_object(
+            'src', 'big.vhd', 'dst', 'big.vhd'
+        )
+        self.assertEqual(client.copy_calls, 0)
+        self.assertEqual(client.completed[('dst', 'big.vhd')], [1, 2, 3, 4])
+        self.assertEqual(client.objects[('dst', 'big.vhd')], size)
+
+    def test_move_prefix_renames_every_object(self):
+        objects = {('b', f'old/{i:04d}'): i for i in range(1500)}
+        objects[('b', 'other/keep')] = 1
+        client = FakeCopyClient(objects)
+        result = ObjectCopier(client, max_concurrency=8).copy_prefix('b', 'old/', 'b', 'new/', move=True)
+        self.assertTrue(result.success)
+        self.assertEqual((result.copied, result.deleted), (1500, 1500))
+        self.assertFalse([k for b, k in client.objects if k.startswith('old/')])
+        self.assertEqual(client.objects[('b', 'new/0042')], 42)
+        self.assertIn(('b', 'other/keep'), client.objects)
+
+    def test_destination_inside_source_is_rejected(self):
+        with self.assertRaises(ValueError):
+            ObjectCopier(FakeCopyClient({})).copy_prefix('b', 'a/', 'b', 'a/b/')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,304 @@
+"""
+Tests para S3Handler (con un cliente S3 simulado en memoria)
+"""
+
+import unittest
+import sys
+import os
+import hashlib
+import tempfile
+import threading
+from unittest import mock
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from s3_handler import S3Handler
+from core.bucket_ledger import BucketSizeLedger
+from core.object_index import ObjectIndex
+from core.s3_multipart import UploadManifestStore
+from core import s3_client_pool
+
+
+class FakeListingClient:
+    """Cliente S3 simulado que implementa list_objects_v2 con paginación"""
+
+    def __init__(self, keys):
+        self.keys = sorted(keys)
+        self.calls = 0
+
+    def head_object(self, Bucket, Key):
+        return {'ContentLength': len(Key)}
+
+    def delete_object(self, Bucket, Key):
+        self.keys.remove(Key)
+
+    def list_objects_v2(self, Bucket, Prefix='', MaxKeys=1000, Delimiter=None,
+                        StartAfter=None, ContinuationToken=None):
+        self.calls += 1
+        start = ContinuationToken or StartAfter or ''
+        contents, prefixes = [], []
+        for key in self.keys:
+            if key <= start or not key.startswith(Prefix):
+                continue
+            if len(contents) + len(prefixes) >= MaxKeys:
+                last = max([c['Key'] for c in contents[-1:]] + prefixes[-1:])
+                return {'Contents': contents, 'CommonPrefixes': [{'Prefix': p} for p in prefixes],
+                        'IsTruncated': True, 'NextContinuationToken': last}
+            rest = key[len(Prefix):]
+            if Delimiter and Delimiter in rest:
+                folder = Prefix + rest.split(Delimiter, 1)[0] + Delimiter
+                if folder not in prefixes and folder > start:
+                    prefixes.append(folder)
+                continue
+            contents.append({'Key': key, 'Size': len(key)})
+        return {'Contents': contents, 'CommonPrefixes': [{'Prefix': p} for p in prefixes],
+                'IsTruncated': False}
+
+
+class FakeObjectBody:
+    def __init__(self, data):
+        self.data = data
+
+    def iter_chunks(self, chunk_size):
+        for i in range(0, len(self.data), chunk_size):
+            yield self.data[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeObjectClient:
+    """Cliente S3 simulado con un único objeto descargable por rangos"""
+
+    def __init__(self, data, part_size=None):
+        self.data = data
+        self.part_size = part_size
+        if part_size:
+            # ETag de un objeto subido en varias partes
+            parts = [data[i:i + part_size] for i in range(0, len(data), part_size)]
+            digest = hashlib.md5(b''.join(hashlib.md5(p).digest() for p in parts)).hexdigest()
+            self.etag = f'"{digest}-{len(parts)}"'
+        else:
+            self.etag = f'"{hashlib.md5(data).hexdigest()}"'
+        self.ranges = []
+
+    def head_object(self, Bucket, Key, PartNumber=None):
+        if PartNumber:
+            return {'ContentLength': self.part_size, 'ETag': self.etag}
+        return {'ContentLength': len(self.data), 'ETag': self.etag}
+
+    def get_object(self, Bucket, Key, Range, IfMatch=None):
+        assert IfMatch == self.etag
+        start, end = (int(v) for v in Range[len('bytes='):].split('-'))
+        self.ranges.append((start, end))
+        return {'Body': FakeObjectBody(self.data[start:end + 1])}
+
+
+def make_handler(client, ledger=None, index=None):
+    handler = S3Handler('key', 'secret', 'ewr1.vultrobjects.com', cache_enabled=False,
+                        resumable_uploads=False, size_ledger=False, object_index=False)
+    handler.client = client
+    handler.size_ledger = ledger
+    handler.object_index = index
+    return handler
+
+
+class TestIterObjects(unittest.TestCase):
+    """Tests para el listado paginado"""
+
+    def test_lists_beyond_one_page(self):
+        client = FakeListingClient([f"obj-{i:04d}" for i in range(2500)])
+        handler = make_handler(client)
+        self.assertEqual(len(handler.list_objects('bucket')), 2500)
+        self.assertEqual(client.calls, 3)
+
+    def test_pages_are_lazy(self):
+        client = FakeListingClient([f"obj-{i:04d}" for i in range(2500)])
+        pages = make_handler(client).iter_objects('bucket')
+        first = next(pages)
+        self.assertEqual(len(first['objects']), 1000)
+        self.assertEqual(client.calls, 1)
+
+    def test_delimiter_exposes_folders(self):
+        client = FakeListingClient(['a/1', 'a/2', 'b/1', 'root.txt'])
+        page = next(make_handler(client).iter_objects('bucket', delimiter='/'))
+        self.assertEqual(page['prefixes'], ['a/', 'b/'])
+        self.assertEqual([o['Key'] for o in page['objects']], ['root.txt'])
+
+    def test_start_after_cursor(self):
+        client = FakeListingClient([f"obj-{i}" for i in range(5)])
+        handler = make_handler(client)
+        first = next(handler.iter_objects('bucket', page_size=2))
+        rest = [o['Key'] for page in handler.iter_objects('bucket', start_after=first['cursor'])
+                for o in page['objects']]
+        self.assertEqual(rest, ['obj-2', 'obj-3', 'obj-4'])
+
+
+class TestDownloadFile(unittest.TestCase):
+    """Tests para la descarga segmentada de S3Handler"""
+
+    def test_ranged_download_verifies_etag(self):
+        data = os.urandom(50000)
+        client = FakeObjectClient(data)
+        progress = []
+        with tempfile.TemporaryDirectory() as tmp:
+            dest = os.path.join(tmp, 'restore.bin')
+            ok = make_handler(client).download_file(
+                'bucket', 'backups/restore.bin', dest,
+                segment_size=8000, progress_callback=lambda done, total: progress.append(done)
+            )
+            self.assertTrue(ok)
+            with open(dest, 'rb') as f:
+                self.assertEqual(f.read(), data)
+        self.assertEqual(len(client.ranges), 7)
+        self.assertEqual(max(progress), len(data))
+
+    def test_multipart_etag_verified_inline(self):
+        data = os.urandom(50000)
+        client = FakeObjectClient(data, part_size=12000)
+        handler = make_handler(client)
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch('s3_handler.etag_matches', side_effect=AssertionError("segunda lectura")):
+            ok = handler.download_file('bucket', 'backups/disk.vhd', os.path.join(tmp, 'disk.vhd'),
+                                       segment_size=8000)
+        self.assertTrue(ok, handler.last_error)
+        # Un segmento por parte: los MD5 de los segmentos reconstruyen el ETag
+        self.assertEqual([start for start, _ in sorted(client.ranges)], [0, 12000, 24000, 36000, 48000])
+        self.assertEqual(handler.last_integrity.status, 'verified')
+        self.assertEqual(handler.last_integrity.algorithm, 'etag')
+
+    def test_corrupt_download_is_rejected(self):
+        data = os.urandom(50000)
+        client = FakeObjectClient(data, part_size=12000)
+        client.data = data[:100] + bytes([data[100] ^ 0xFF]) + data[101:]
+        handler = make_handler(client)
+        with tempfile.TemporaryDirectory() as tmp:
+            dest = os.path.join(tmp, 'disk.vhd')
+            self.assertFalse(handler.download_file('bucket', 'backups/disk.vhd', dest))
+            self.assertFalse(os.path.exists(dest))
+        self.assertEqual(handler.last_integrity.status, 'mismatch')
+
+
+class TestUploadFile(unittest.TestCase):
+    """Tests para la subida multiparte de S3Handler"""
+
+    def test_cancelled_upload_keeps_manifest(self):
+        client = mock.Mock()
+        client.create_multipart_upload.return_value = {'UploadId': 'upload-1'}
+        client.upload_part.return_value = {'ETag': '"etag"'}
+        handler = make_handler(client)
+        handler.multipart_threshold = 1
+        cancel = threading.Event()
+        cancel.set()
+        with tempfile.TemporaryDirectory() as tmp:
+            handler.manifest_store = UploadManifestStore(os.path.join(tmp, 'multipart_uploads.json'))
+            path = os.path.join(tmp, 'dump.bin')
+            with open(path, 'wb') as f:
+                f.write(os.urandom(20000))
+            self.assertFalse(handler.upload_file('bucket', path, cancel_event=cancel))
+            record = handler.manifest_store.get(
+                UploadManifestStore.make_key(handler.host_base, 'bucket', 'dump.bin'))
+        self.assertEqual(handler.last_error, "Subida detenida")
+        self.assertEqual(record['upload_id'], 'upload-1')
+        client.complete_multipart_upload.assert_not_called()
+        client.abort_multipart_upload.assert_not_called()
+
+
+class TestBucketSizeLedger(unittest.TestCase):
+    """Tests para el tamaño incremental de buckets"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.ledger = BucketSizeLedger(os.path.join(self.temp_dir, 'bucket_sizes.json'))
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_size_served_from_ledger_after_seed(self):
+        client = FakeListingClient(['a', 'bb', 'ccc'])
+        handler = make_handler(client, self.ledger)
+        self.assertEqual(handler.get_bucket_size('bucket'), (6, None))
+        calls = client.calls
+        self.assertEqual(handler.get_bucket_size('bucket'), (6, None))
+        self.assertEqual(client.calls, calls)
+
+    def test_delete_applies_delta(self):
+        client = FakeListingClient(['a', 'bb', 'ccc'])
+        handler = make_handler(client, self.ledger)
+        handler.get_bucket_size('bucket')
+        handler.delete_object('bucket', 'bb')
+        self.assertEqual(handler.get_bucket_size('bucket'), (4, None))
+        entry = BucketSizeLedger(self.ledger.path).get('ewr1.vultrobjects.com', 'bucket')
+        self.assertEqual((entry['size'], entry['objects']), (4, 2))
+
+    def test_stale_entry_needs_reconcile(self):
+        self.ledger.seed('host', 'bucket', 10, 1)
+        self.assertFalse(self.ledger.needs_reconcile('host', 'bucket'))
+        self.ledger.mark_stale('host', 'bucket')
+        self.assertTrue(self.ledger.needs_reconcile('host', 'bucket'))
+        self.assertTrue(self.ledger.needs_reconcile('host', 'other'))
+
+
+class TestObjectIndexIntegration(unittest.TestCase):
+    """Tests para la navegación desde el índice local"""
+
+    def setUp(self):
+        self.client = FakeListingClient(['a/1', 'a/2', 'b/x/1', 'root.txt'])
+        self.handler = make_handler(self.client, index=ObjectIndex(':memory:'))
+
+    def test_browse_served_from_index_after_reconcile(self):
+        self.handler.reconcile_bucket_size('bucket')
+        calls = self.client.calls
+        folders, objects = self.handler.list_folder('bucket')
+        self.assertEqual(folders, ['a/', 'b/'])
+        self.assertEqual([o['Key'] for o in objects], ['root.txt'])
+        self.assertEqual(self.client.calls, calls)
+
+    def test_delete_updates_index(self):
+        self.handler.reconcile_bucket_size('bucket')
+        self.handler.delete_object('bucket', 'a/1')
+        self.assertEqual([o['key'] for o in self.handler.search_objects('bucket', prefix='a/')], ['a/2'])
+
+    def test_remote_lookup_lists_prefix_once(self):
+        lookup = self.handler._remote_lookup('bucket', 'a/', [('x', 'a/1')])
+        calls = self.client.calls
+        self.assertEqual(lookup('a/1')['size'], 3)
+        self.assertIsNone(lookup('a/3'))
+        self.assertEqual(self.client.calls, calls)
+
+
+class TestClientRegistry(unittest.TestCase):
+    """Tests para el registro compartido de clientes boto3"""
+
+    def setUp(self):
+        s3_client_pool.release_s3_clients()
+        patcher = mock.patch.object(s3_client_pool, '_create_client',
+                                    side_effect=lambda *args: object())
+        self.create_client = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(s3_client_pool.release_s3_clients)
+
+    def _handler(self, secret='secret', host='ewr1.vultrobjects.com', **kwargs):
+        return S3Handler('key', secret, host, resumable_uploads=False, size_ledger=False,
+                         object_index=False, **kwargs)
+
+    def test_handlers_share_client(self):
+        first, second = self._handler(), self._handler()
+        self.assertIs(first.client, second.client)
+        self.assertEqual(self.create_client.call_count, 1)
+
+    def test_different_credentials_get_own_client(self):
+        self.assertIsNot(self._handler().client, self._handler(secret='other').client)
+        self.assertIsNot(self._handler().client, self._handler(host='sjc1.vultrobjects.com').client)
+
+    def test_larger_pool_recreates_client(self):
+        small = self._handler(max_pool_connections=10, max_concurrency=1)
+        large = self._handler(max_pool_connections=100, max_concurrency=1)
+        self.assertIsNot(small.client, large.client)
+        self.assertIs(self._handler(max_pool_connections=20, max_concurrency=1).client, large.client)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,246 @@
+"""
+Tests para el motor de subida multiparte (core.s3_multipart)
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import threading
+from unittest import mock
+from datetime import datetime, timedelta, timezone
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.s3_multipart import (
+    MIB, MultipartUploadCancelled, MultipartUploader, UploadManifestStore, abort_stale_uploads,
+    compute_part_size, concurrency_from_plan, plan_parts, S3_MAX_PARTS, MAX_CONCURRENCY
+)
+
+
+class FakeS3Client:
+    """Cliente S3 mínimo en memoria para las APIs multiparte"""
+
+    def __init__(self, fail_on_part=None):
+        self.fail_on_part = fail_on_part
+        self.parts = {}
+        self.completed = None
+        self.aborted = False
+        self.created = 0
+        self.uploads = []
+        self._lock = threading.Lock()
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self.created += 1
+        return {'UploadId': 'upload-1'}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, ContentLength):
+        if PartNumber == self.fail_on_part:
+            raise IOError("fallo simulado")
+        with self._lock:
+            self.parts[PartNumber] = Body
+        return {'ETag': f'"etag-{PartNumber}"'}
+
+    def list_parts(self, Bucket, Key, UploadId, **kwargs):
+        return {'Parts': [{'PartNumber': n, 'ETag': f'"etag-{n}"'} for n in sorted(self.parts)]}
+
+    def list_multipart_uploads(self, Bucket, **kwargs):
+        return {'Uploads': self.uploads}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.completed = MultipartUpload['Parts']
+        return {'Key': Key}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted = True
+        self.uploads = [u for u in self.uploads if u['UploadId'] != UploadId]
+
+
+class TestPartSizing(unittest.TestCase):
+    """Tests para el cálculo de partes"""
+
+    def test_small_file_uses_minimum(self):
+        self.assertEqual(compute_part_size(100 * MIB), 8 * MIB)
+
+    def test_part_size_scales_with_file(self):
+        self.assertGreater(compute_part_size(100 * 1024 * MIB), compute_part_size(1024 * MIB))
+
+    def test_never_exceeds_max_parts(self):
+        size = 4 * 1024 * 1024 * MIB  # 4 TB
+        part_size = compute_part_size(size, target_parts=S3_MAX_PARTS * 10)
+        self.assertLessEqual(len(plan_parts(size, part_size)), S3_MAX_PARTS)
+
+    def test_plan_parts_covers_file(self):
+        parts = plan_parts(25, 10)
+        self.assertEqual(parts, [(1, 0, 10), (2, 10, 10), (3, 20, 5)])
+
+    def test_concurrency_from_plan(self):
+        self.assertEqual(concurrency_from_plan({'transfers': '4'}), 4)
+        self.assertEqual(concurrency_from_plan({'transfers': '320'}), MAX_CONCURRENCY)
+        self.assertEqual(concurrency_from_plan({'transfers': 'abc'}, default=3), 3)
+        self.assertEqual(concurrency_from_plan(None, default=5), 5)
+
+
+class TestMultipartUploader(unittest.TestCase):
+    """Tests para MultipartUploader"""
+
+    def setUp(self):
+        self.data = os.urandom(3 * 1024 + 17)
+        self.temp_file = tempfile.NamedTemporaryFile(delete=False)
+        self.temp_file.write(self.data)
+        self.temp_file.close()
+
+    def tearDown(self):
+        os.unlink(self.temp_file.name)
+
+    def test_upload_reassembles_file(self):
+        client = FakeS3Client()
+        progress = []
+        uploader = MultipartUploader(
+            client, 'bucket', 'key', self.temp_file.name,
+            part_size=1024, max_concurrency=4,
+            progress_callback=lambda *args: progress.append(args),
+        )
+        uploader.upload()
+
+        self.assertEqual([p['PartNumber'] for p in client.completed], [1, 2, 3, 4])
+        joined = b''.join(client.parts[n] for n in sorted(client.parts))
+        self.assertEqual(joined, self.data)
+        self.assertEqual(len(progress), 4)
+        self.assertEqual(max(p[2] for p in progress), len(self.data))
+
+    def test_failure_aborts_upload(self):
+        client = FakeS3Client(fail_on_part=2)
+        uploader = MultipartUploader(
+            client, 'bucket', 'key', self.temp_file.name, part_size=1024, max_concurrency=2
+        )
+        with self.assertRaises(IOError):
+            uploader.upload()
+        self.assertTrue(client.aborted)
+        self.assertIsNone(client.completed)
+
+
+class TestResumableUpload(unittest.TestCase):
+    """Tests para la reanudación con manifiesto persistente"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, 'data.bin')
+        self.data = os.urandom(4 * 1024)
+        with open(self.file_path, 'wb') as f:
+            f.write(self.data)
+        self.manifest_path = os.path.join(self.temp_dir, 'multipart_uploads.json')
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _uploader(self, client, store):
+        return MultipartUploader(
+            client, 'bucket', 'key', self.file_path,
+            part_size=1024, max_concurrency=1, manifest_store=store,
+        )
+
+    def test_resume_sends_only_missing_parts(self):
+        client = FakeS3Client(fail_on_part=3)
+        store = UploadManifestStore(self.manifest_path)
+        with self.assertRaises(IOError):
+            self._uploader(client, store).upload()
+        self.assertFalse(client.aborted)
+
+        # Nuevo proceso: el manifiesto se lee desde disco
+        client.fail_on_part = None
+        sent_before = set(client.parts)
+        store = UploadManifestStore(self.manifest_path)
+        uploader = self._uploader(client, store)
+        uploader.upload()
+
+        self.assertEqual(client.created, 1)
+        self.assertEqual(uploader.resumed_parts, len(sent_before))
+        self.assertEqual(len(client.completed), 4)
+        self.assertIsNone(store.get(uploader.manifest_key))
+
+    def test_manifest_saves_are_throttled(self):
+        client = FakeS3Client(fail_on_part=4)
+        store = UploadManifestStore(self.manifest_path)
+        with mock.patch.object(store, '_save', wraps=store._save) as save:
+            with self.assertRaises(IOError):
+                self._uploader(client, store).upload()
+        # Alta de la subida, una parte dentro del intervalo y el volcado final al fallar
+        self.assertLessEqual(save.call_count, 3)
+        record = UploadManifestStore(self.manifest_path).get(self._uploader(client, store).manifest_key)
+        self.assertEqual(sorted(record["parts"]), ["1", "2", "3"])
+
+    def _stream_uploader(self, client, store, source_id, cancel_event=None, reads=None):
+        def read_part(offset, length):
+            if reads is not None:
+                reads.append(offset)
+            return self.data[offset:offset + length]
+
+        return MultipartUploader(
+            client, 'bucket', 'disk.vhd', part_size=1024, max_concurrency=1, manifest_store=store,
+            read_part=read_part, source_size=len(self.data), source_id=source_id,
+            cancel_event=cancel_event,
+        )
+
+    def test_stream_source_resumes_without_local_file(self):
+        client = FakeS3Client()
+        store = UploadManifestStore(self.manifest_path)
+        cancel = threading.Event()
+        uploader = self._stream_uploader(client, store, "azure://rg/disk|0x1", cancel)
+        uploader.progress_callback = lambda n, b, done, total: done >= 2048 and cancel.set()
+        with self.assertRaises(MultipartUploadCancelled):
+            uploader.upload()
+        self.assertEqual(len(client.parts), 2)
+
+        reads = []
+        uploader = self._stream_uploader(client, UploadManifestStore(self.manifest_path),
+                                         "azure://rg/disk|0x1", reads=reads)
+        uploader.upload()
+        self.assertEqual(reads, [2048, 3072])
+        self.assertEqual(b"".join(client.parts[n] for n in sorted(client.parts)), self.data)
+        self.assertEqual(client.created, 1)
+
+    def test_stream_source_change_restarts(self):
+        client = FakeS3Client(fail_on_part=3)
+        with self.assertRaises(IOError):
+            self._stream_uploader(client, UploadManifestStore(self.manifest_path), "azure://rg/disk|0x1").upload()
+
+        # Mismo destino, otro disco (ETag distinto): la subida previa se aborta
+        client.fail_on_part = None
+        uploader = self._stream_uploader(client, UploadManifestStore(self.manifest_path), "azure://rg/disk|0x2")
+        uploader.upload()
+        self.assertTrue(client.aborted)
+        self.assertEqual(uploader.resumed_parts, 0)
+        self.assertEqual(client.created, 2)
+
+    def test_abort_stale_uploads(self):
+        client = FakeS3Client()
+        now = datetime.now(timezone.utc)
+        client.uploads = [
+            {'Key': 'old', 'UploadId': 'u-old', 'Initiated': now - timedelta(days=10)},
+            {'Key': 'new', 'UploadId': 'u-new', 'Initiated': now - timedelta(hours=1)},
+        ]
+        aborted = abort_stale_uploads(client, 'bucket', max_age_hours=72, now=now)
+        self.assertEqual(aborted, ['u-old'])
+        self.assertEqual([u['UploadId'] for u in client.uploads], ['u-new'])
+
+    def test_abort_stale_uploads_keeps_resumable(self):
+        client = FakeS3Client()
+        now = datetime.now(timezone.utc)
+        client.uploads = [
+            {'Key': 'paused', 'UploadId': 'u-paused', 'Initiated': now - timedelta(days=10)},
+            {'Key': 'orphan', 'UploadId': 'u-orphan', 'Initiated': now - timedelta(days=10)},
+        ]
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        store = UploadManifestStore(os.path.join(tmp.name, 'multipart_uploads.json'))
+        store.put('endpoint|bucket|paused', {'upload_id': 'u-paused', 'parts': {}})
+        aborted = abort_stale_uploads(client, 'bucket', max_age_hours=72, manifest_store=store, now=now)
+        self.assertEqual(aborted, ['u-orphan'])
+        self.assertIsNotNone(store.get('endpoint|bucket|paused'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests para el vaciado de buckets en tubería (core.s3_purge)
+"""
+
+import unittest
+import sys
+import os
+import threading
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.s3_purge import BucketPurger, DELETE_BATCH_SIZE
+
+
+class FakePurgeClient:
+    """Cliente S3 simulado con objetos y (opcionalmente) versiones"""
+
+    def __init__(self, keys, versioned=False, failing_keys=()):
+        self.objects = {k: [f"v1-{k}", f"v2-{k}"] if versioned else [None] for k in sorted(keys)}
+        self.versioned = versioned
+        self.failing_keys = set(failing_keys)
+        self.batch_sizes = []
+        self._lock = threading.Lock()
+
+    def get_bucket_versioning(self, Bucket):
+        return {'Status': 'Enabled'} if self.versioned else {}
+
+    def list_objects_v2(self, Bucket, MaxKeys, ContinuationToken=None, Prefix=''):
+        keys = [k for k in sorted(self.objects) if k > (ContinuationToken or '')][:MaxKeys]
+        truncated = len(keys) == MaxKeys
+        return {'Contents': [{'Key': k} for k in keys], 'IsTruncated': truncated,
+                'NextContinuationToken': keys[-1] if keys else None}
+
+    def list_object_versions(self, Bucket, MaxKeys, KeyMarker=None, VersionIdMarker=None, Prefix=''):
+        keys = [k for k in sorted(self.objects) if k > (KeyMarker or '')][:MaxKeys]
+        versions = [{'Key': k, 'VersionId': v} for k in keys for v in self.objects[k]]
+        return {'Versions': versions, 'DeleteMarkers': [], 'IsTruncated': len(keys) == MaxKeys,
+                'NextKeyMarker': keys[-1] if keys else None, 'NextVersionIdMarker': None}
+
+    def delete_objects(self, Bucket, Delete):
+        batch = Delete['Objects']
+        errors = []
+        with self._lock:
+            self.batch_sizes.append(len(batch))
+            for obj in batch:
+                if obj['Key'] in self.failing_keys:
+                    errors.append({'Key': obj['Key'], 'Code': 'AccessDenied', 'Message': 'denied'})
+                    continue
+                versions = self.objects.get(obj['Key'], [])
+                if obj.get('VersionId') in versions:
+                    versions.remove(obj.get('VersionId'))
+                if not versions:
+                    self.objects.pop(obj['Key'], None)
+        return {'Errors': errors}
+
+
+class TestBucketPurger(unittest.TestCase):
+    """Tests para BucketPurger"""
+
+    def test_purges_all_objects_in_batches(self):
+        client = FakePurgeClient([f"k{i:05d}" for i in range(2500)])
+        result = BucketPurger(client, 'bucket', max_workers=4).purge()
+        self.assertTrue(result.success)
+        self.assertEqual(result.deleted, 2500)
+        self.assertEqual(client.objects, {})
+        self.assertLessEqual(max(client.batch_sizes), DELETE_BATCH_SIZE)
+
+    def test_versioned_bucket_deletes_every_version(self):
+        client = FakePurgeClient([f"k{i}" for i in range(10)], versioned=True)
+        result = BucketPurger(client, 'bucket').purge()
+        self.assertEqual(result.deleted, 20)
+        self.assertEqual(client.objects, {})
+
+    def test_reports_per_object_errors(self):
+        client = FakePurgeClient(['a', 'b', 'c'], failing_keys=['b'])
+        progress = []
+        result = BucketPurger(client, 'bucket', progress_callback=lambda d, e: progress.append((d, e))).purge()
+        self.assertFalse(result.success)
+        self.assertEqual(result.deleted, 2)
+        self.assertEqual(result.errors[0]['Key'], 'b')
+        self.assertEqual(progress[-1], (2, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Tests para la exportación comprimida con acceso aleatorio (core.seekable_zstd)
+"""
+
+import unittest
+import sys
+import os
+import io
+import tempfile
+import threading
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.seekable_zstd import (
+    INDEX_SUFFIX, ZSTD_AVAILABLE, SeekableZstdExporter, SeekableZstdReader, build_seek_table, read_seek_table
+)
+from core.segmented_download import PART_SUFFIX, DownloadCancelled
+
+if ZSTD_AVAILABLE:
+    import zstandard
+
+
+FRAME = 4096
+# Disco de ejemplo: bloques repetitivos, un tramo aleatorio y ceros al final
+DATA = b"".join(bytes([i % 251]) * 512 for i in range(80)) + os.urandom(9000) + bytes(30000)
+
+
+class FrameSource:
+    """Origen de tramas en memoria que registra lo pedido"""
+
+    def __init__(self, data, cancel_after=None, cancel_event=None):
+        self.data = data
+        self.cancel_after = cancel_after
+        self.cancel_event = cancel_event
+        self.requested = []
+        self._lock = threading.Lock()
+
+    def __call__(self, start, length):
+        with self._lock:
+            self.requested.append(start)
+            if self.cancel_after is not None and len(self.requested) >= self.cancel_after:
+                self.cancel_event.set()
+        return self.data[start:start + length]
+
+
+class TestSeekTable(unittest.TestCase):
+    """Tests del formato de la tabla de tramas"""
+
+    def test_round_trip(self):
+        entries = [(1200, 4096), (37, 4096), (900, 1000)]
+        f = io.BytesIO(b"x" * 2137 + build_seek_table(entries))
+        self.assertEqual(read_seek_table(f), entries)
+
+    def test_plain_file_is_rejected(self):
+        with self.assertRaises(ValueError):
+            read_seek_table(io.BytesIO(os.urandom(100)))
+
+
+@unittest.skipUnless(ZSTD_AVAILABLE, "zstandard no está instalado")
+class TestSeekableZstdExporter(unittest.TestCase):
+    """Tests de la exportación y la lectura por tramas"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dest = os.path.join(self.tmp.name, "disk.vhd.zst")
+
+    def make(self, source, data=DATA, **kwargs):
+        kwargs.setdefault("frame_size", FRAME)
+        kwargs.setdefault("max_concurrency", 4)
+        return SeekableZstdExporter(source, self.dest, len(data), source_id="0x1", **kwargs)
+
+    def test_standard_decompressor_reads_whole_file(self):
+        progress = []
+        self.make(FrameSource(DATA), progress_callback=lambda done, total: progress.append(done)).export()
+        with open(self.dest, "rb") as f:
+            compressed = f.read()
+        reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(compressed), read_across_frames=True)
+        self.assertEqual(reader.read(), DATA)
+        self.assertLess(len(compressed), len(DATA) // 2)
+        self.assertEqual(progress[-1], len(DATA))
+        self.assertEqual(os.listdir(self.tmp.name), ["disk.vhd.zst"])
+
+    def test_random_access(self):
+        self.make(FrameSource(DATA)).export()
+        with SeekableZstdReader(self.dest) as disk:
+            self.assertEqual(disk.size, len(DATA))
+            self.assertEqual(disk.frame_count, -(-len(DATA) // FRAME))
+            disk.seek(40000)
+            self.assertEqual(disk.read(10000), DATA[40000:50000])
+            disk.seek(-100, 2)
+            self.assertEqual(disk.read(), DATA[-100:])
+
+    def test_resume_continues_after_last_frame(self):
+        cancel = threading.Event()
+        with self.assertRaises(DownloadCancelled):
+            self.make(FrameSource(DATA, cancel_after=5, cancel_event=cancel),
+                      max_concurrency=1, cancel_event=cancel).export()
+        written = os.path.getsize(self.dest + PART_SUFFIX + INDEX_SUFFIX) // 8
+        self.assertGreater(written, 0)
+        # Datos de una trama cuya entrada no llegó a escribirse
+        with open(self.dest + PART_SUFFIX, "ab") as f:
+            f.write(b"basura")
+
+        source = FrameSource(DATA)
+        exporter = self.make(source)
+        exporter.export()
+        self.assertEqual(exporter.resumed_frames, written)
+        self.assertNotIn(0, source.requested)
+        with SeekableZstdReader(self.dest) as disk:
+            self.assertEqual(disk.read(), DATA)
+
+    def test_changed_source_starts_over(self):
+        cancel = threading.Event()
+        with self.assertRaises(DownloadCancelled):
+            self.make(FrameSource(DATA, cancel_after=3, cancel_event=cancel),
+                      max_concurrency=1, cancel_event=cancel).export()
+        source = FrameSource(DATA)
+        SeekableZstdExporter(source, self.dest, len(DATA), source_id="0x2", frame_size=FRAME).export()
+        self.assertIn(0, source.requested)
+
+    def test_sparse_frames_are_not_requested(self):
+        ranges = [(0, 999), (50000, 50999)]
+        data = bytearray(len(DATA))
+        for start, end in ranges:
+            data[start:end + 1] = DATA[start:end + 1]
+        data = bytes(data)
+        source = FrameSource(data)
+        progress = []
+        self.make(source, data, data_ranges=ranges,
+                  progress_callback=lambda done, total: progress.append((done, total))).export()
+        self.assertEqual(sorted(source.requested), [0, 49152])
+        self.assertEqual(progress[-1], (2000, 2000))
+        with SeekableZstdReader(self.dest) as disk:
+            self.assertEqual(disk.read(), data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,299 @@
+"""
+Tests para la descarga segmentada reanudable y la verificación de ETags
+"""
+
+import unittest
+import sys
+import os
+import hashlib
+import tempfile
+import threading
+from unittest import mock
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.segmented_download import (
+    PART_SUFFIX, STATE_SUFFIX, DownloadCancelled, DownloadIntegrityError, SegmentedDownloader, SegmentState
+)
+from core.s3_etag import compute_etag, etag_matches, etag_parts_count
+from core.integrity import ExpectedChecksums, crc32c
+from core.chunk_manifest import ChunkLedger
+
+
+DATA = bytes(range(256)) * 400  # 102.400 bytes
+
+
+class RangeSource:
+    """Origen de rangos en memoria con fallos y pausas inyectables"""
+
+    def __init__(self, data, fail_once=(), stop_after=None, cancel_event=None):
+        self.data = data
+        self.fail_once = set(fail_once)
+        self.stop_after = stop_after
+        self.cancel_event = cancel_event
+        self.requested = []
+        self._lock = threading.Lock()
+
+    def __call__(self, start, end):
+        with self._lock:
+            self.requested.append(start)
+            if self.stop_after is not None and len(self.requested) > self.stop_after:
+                self.cancel_event.set()
+            if start in self.fail_once:
+                self.fail_once.discard(start)
+                raise ConnectionError("conexión reiniciada")
+        chunk = self.data[start:end + 1]
+        for i in range(0, len(chunk), 1000):
+            yield chunk[i:i + 1000]
+
+
+class TestSegmentedDownloader(unittest.TestCase):
+    """Tests para SegmentedDownloader"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dest = os.path.join(self.tmp.name, 'restore', 'dump.bin')
+
+    def make(self, source, **kwargs):
+        kwargs.setdefault('segment_size', 10000)
+        kwargs.setdefault('max_concurrency', 4)
+        return SegmentedDownloader(source, self.dest, len(DATA), etag='abc', **kwargs)
+
+    def read_dest(self):
+        with open(self.dest, 'rb') as f:
+            return f.read()
+
+    def test_downloads_all_segments(self):
+        progress = []
+        self.make(RangeSource(DATA), progress_callback=lambda d, t: progress.append(d)).download()
+        self.assertEqual(self.read_dest(), DATA)
+        self.assertEqual(max(progress), len(DATA))
+        self.assertFalse(os.path.exists(self.dest + PART_SUFFIX))
+        self.assertFalse(os.path.exists(self.dest + PART_SUFFIX + STATE_SUFFIX))
+
+    def test_slow_progress_callback_does_not_serialize_segments(self):
+        # Dos hilos de segmento deben poder estar dentro del callback a la vez
+        barrier = threading.Barrier(2, timeout=5)
+        waiting = []
+        lock = threading.Lock()
+
+        def on_progress(done, total):
+            thread = threading.current_thread()
+            with lock:
+                if not thread.name.startswith('s3-segment') or len(waiting) >= 2 or thread in waiting:
+                    return
+                waiting.append(thread)
+            barrier.wait()
+
+        self.make(RangeSource(DATA), progress_callback=on_progress).download()
+        self.assertEqual(self.read_dest(), DATA)
+        self.assertFalse(barrier.broken)
+
+    def test_failed_segment_is_retried(self):
+        source = RangeSource(DATA, fail_once=[20000])
+        self.make(source).download()
+        self.assertEqual(self.read_dest(), DATA)
+        self.assertEqual(source.requested.count(20000), 2)
+
+    def test_resume_skips_completed_segments(self):
+        cancel = threading.Event()
+        first = RangeSource(DATA, stop_after=3, cancel_event=cancel)
+        with self.assertRaises(DownloadCancelled):
+            self.make(first, max_concurrency=1, cancel_event=cancel).download()
+        self.assertTrue(os.path.exists(self.dest + PART_SUFFIX + STATE_SUFFIX))
+
+        second = RangeSource(DATA)
+        downloader = self.make(second)
+        downloader.download()
+        self.assertEqual(self.read_dest(), DATA)
+        self.assertEqual(downloader.resumed_bytes, 30000)
+        self.assertNotIn(0, second.requested)
+
+    def test_state_saves_are_throttled(self):
+        cancel = threading.Event()
+        with mock.patch.object(SegmentState, 'save', autospec=True, side_effect=SegmentState.save) as save:
+            with self.assertRaises(DownloadCancelled):
+                self.make(RangeSource(DATA, stop_after=8, cancel_event=cancel),
+                          max_concurrency=1, cancel_event=cancel).download()
+        # Estado inicial más la escritura final al detenerse, no una por segmento
+        self.assertEqual(save.call_count, 2)
+        state = SegmentState.load(self.dest + PART_SUFFIX + STATE_SUFFIX, len(DATA), 'abc')
+        self.assertEqual(len(state.pending_segments()), state.segment_count - 8)
+
+    def test_chunk_ledger_restores_lost_state(self):
+        stored = []
+        ledger = ChunkLedger(lambda: stored[-1].copy() if stored else None, stored.append,
+                             lambda index: stored[-1].mark_done(index))
+        cancel = threading.Event()
+        with self.assertRaises(DownloadCancelled):
+            self.make(RangeSource(DATA, stop_after=3, cancel_event=cancel), max_concurrency=1,
+                      cancel_event=cancel, chunk_ledger=ledger).download()
+        self.assertEqual(stored[-1].done_count, 3)
+
+        # Sin el archivo de estado, el manifiesto de la transferencia basta para reanudar
+        os.remove(self.dest + PART_SUFFIX + STATE_SUFFIX)
+        source = RangeSource(DATA)
+        self.make(source, chunk_ledger=ledger).download()
+        self.assertEqual(self.read_dest(), DATA)
+        self.assertNotIn(0, source.requested)
+        self.assertTrue(stored[-1].is_complete)
+
+    def test_changed_etag_discards_state(self):
+        cancel = threading.Event()
+        with self.assertRaises(DownloadCancelled):
+            self.make(RangeSource(DATA, stop_after=2, cancel_event=cancel),
+                      max_concurrency=1, cancel_event=cancel).download()
+        source = RangeSource(DATA)
+        SegmentedDownloader(source, self.dest, len(DATA), etag='otro', segment_size=10000).download()
+        self.assertIn(0, source.requested)
+        self.assertEqual(self.read_dest(), DATA)
+
+    def test_failed_verification_discards_partial_file(self):
+        with self.assertRaises(DownloadIntegrityError):
+            self.make(RangeSource(DATA), verify=lambda path: False).download()
+        self.assertFalse(os.path.exists(self.dest))
+        self.assertFalse(os.path.exists(self.dest + PART_SUFFIX))
+
+    def test_concurrent_saves_keep_latest_bitmap(self):
+        path = os.path.join(self.tmp.name, 'state' + STATE_SUFFIX)
+        state = SegmentState(path, len(DATA), 1000)
+
+        def complete(first):
+            for index in range(first, state.segment_count, 8):
+                state.mark_done(index)
+
+        # Sin intervalo mínimo: cada segmento completado escribe el estado
+        with mock.patch('core.segmented_download._logger') as logger, \
+                mock.patch('core.segmented_download.STATE_SAVE_INTERVAL', 0):
+            threads = [threading.Thread(target=complete, args=(first,)) for first in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        logger.error.assert_not_called()
+        self.assertEqual(SegmentState.load(path, len(DATA)).pending_segments(), [])
+
+
+class TestInlineIntegrity(unittest.TestCase):
+    """Tests para la verificación en línea de los segmentos"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dest = os.path.join(self.tmp.name, 'disk.vhd')
+        # La implementación en Python puro basta para estos tamaños
+        patcher = mock.patch('core.integrity.CRC32C_AVAILABLE', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make(self, source, data, expected, **kwargs):
+        kwargs.setdefault('segment_size', 10000)
+        return SegmentedDownloader(source, self.dest, len(data), etag='abc', expected=expected, **kwargs)
+
+    def test_crc32c_combined_across_resume(self):
+        expected = ExpectedChecksums(crc32c=crc32c(DATA))
+        cancel = threading.Event()
+        with self.assertRaises(DownloadCancelled):
+            self.make(RangeSource(DATA, stop_after=3, cancel_event=cancel), DATA, expected,
+                      max_concurrency=1, cancel_event=cancel).download()
+
+        # Los resúmenes de la primera sesión se guardaron con el mapa de bits
+        verify = mock.Mock(side_effect=AssertionError("segunda lectura"))
+        downloader = self.make(RangeSource(DATA), DATA, expected, verify=verify)
+        downloader.download()
+        self.assertEqual(downloader.integrity.status, 'verified')
+        self.assertEqual(downloader.integrity.algorithm, 'crc32c')
+
+    def test_sparse_holes_are_hashed_as_zeros(self):
+        data = bytearray(len(DATA))
+        ranges = [(3000, 4999), (52000, 52999)]
+        for start, end in ranges:
+            data[start:end + 1] = DATA[start:end + 1]
+        data = bytes(data)
+        downloader = self.make(RangeSource(data), data, ExpectedChecksums(crc32c=crc32c(data)),
+                               data_ranges=ranges)
+        downloader.download()
+        self.assertEqual(downloader.integrity.status, 'verified')
+
+    def test_mismatch_discards_partial_file(self):
+        corrupt = DATA[:500] + b'\x00' + DATA[501:]
+        with self.assertRaises(DownloadIntegrityError):
+            self.make(RangeSource(corrupt), DATA, ExpectedChecksums(crc32c=crc32c(DATA))).download()
+        self.assertFalse(os.path.exists(self.dest + PART_SUFFIX))
+
+    def test_whole_md5_single_segment(self):
+        expected = ExpectedChecksums(md5=hashlib.md5(DATA).hexdigest())
+        downloader = self.make(RangeSource(DATA), DATA, expected, segment_size=len(DATA))
+        downloader.download()
+        self.assertEqual(downloader.integrity.status, 'verified')
+
+    def test_whole_md5_across_segments(self):
+        expected = ExpectedChecksums(md5=hashlib.md5(DATA).hexdigest())
+        source = RangeSource(DATA)
+        last_started = threading.Event()
+
+        def fetch(start, end):
+            # El primer segmento termina el último: el prefijo avanza fuera de orden
+            if start == 0:
+                last_started.wait(5)
+            elif end == len(DATA) - 1:
+                last_started.set()
+            return source(start, end)
+
+        verify = mock.Mock(side_effect=AssertionError("segunda lectura"))
+        downloader = self.make(fetch, DATA, expected, max_concurrency=4, verify=verify)
+        downloader.download()
+        self.assertEqual(downloader.integrity.status, 'verified')
+        self.assertEqual(downloader.integrity.algorithm, 'md5')
+
+    def test_whole_md5_mismatch_across_segments(self):
+        expected = ExpectedChecksums(md5=hashlib.md5(b'otro contenido').hexdigest())
+        with self.assertRaises(DownloadIntegrityError):
+            self.make(RangeSource(DATA), DATA, expected, max_concurrency=4).download()
+        self.assertFalse(os.path.exists(self.dest + PART_SUFFIX))
+
+    def test_whole_md5_after_resume_with_holes(self):
+        data = bytearray(len(DATA))
+        ranges = [(3000, 4999), (52000, 52999)]
+        for start, end in ranges:
+            data[start:end + 1] = DATA[start:end + 1]
+        data = bytes(data)
+        expected = ExpectedChecksums(md5=hashlib.md5(data).hexdigest())
+        cancel = threading.Event()
+        with self.assertRaises(DownloadCancelled):
+            self.make(RangeSource(data, stop_after=1, cancel_event=cancel), data, expected,
+                      segment_size=5000, max_concurrency=1, cancel_event=cancel, data_ranges=ranges).download()
+
+        downloader = self.make(RangeSource(data), data, expected, segment_size=5000, data_ranges=ranges)
+        downloader.download()
+        self.assertEqual(downloader.integrity.status, 'verified')
+
+
+class TestETag(unittest.TestCase):
+    """Tests para el cálculo local de ETags"""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp()
+        with os.fdopen(handle, 'wb') as f:
+            f.write(DATA)
+        self.addCleanup(os.remove, self.path)
+
+    def test_single_part_etag_is_md5(self):
+        self.assertEqual(compute_etag(self.path), hashlib.md5(DATA).hexdigest())
+
+    def test_multipart_etag(self):
+        parts = [DATA[i:i + 40000] for i in range(0, len(DATA), 40000)]
+        expected = hashlib.md5(b''.join(hashlib.md5(p).digest() for p in parts)).hexdigest()
+        etag = f'"{expected}-3"'
+        self.assertEqual(etag_parts_count(etag), 3)
+        self.assertTrue(etag_matches(self.path, etag, part_size=40000))
+        self.assertFalse(etag_matches(self.path, etag, part_size=50000))
+
+    def test_unverifiable_etag(self):
+        self.assertIsNone(etag_matches(self.path, '"kms-opaque-etag"'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,208 @@
+"""
+Tests para la persistencia del TransferManager (estado + diario de progreso)
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+from unittest import mock
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+import transfer_manager
+from transfer_manager import TransferManager, TransferStatus, TransferType
+from core.chunk_manifest import ChunkManifest
+from core.integrity import MISMATCH, IntegrityCheck
+
+
+class FakeWorker(QThread):
+    finished = pyqtSignal(bool, str)
+
+    def __init__(self):
+        super().__init__()
+        self.launched = False
+
+    def start(self):
+        self.launched = True
+
+
+class TestTransferPersistence(unittest.TestCase):
+    """Tests para el diario con rebote y la compactación"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "active_transfers.json")
+
+    def _manager(self):
+        return TransferManager(self.path)
+
+    def test_progress_ticks_do_not_rewrite_state(self):
+        manager = self._manager()
+        tid = manager.create_transfer(TransferType.GCP_DOWNLOAD, "blob", "gs://b/blob", "C:/blob", 10**9)
+        with mock.patch.object(manager, '_save_state', wraps=manager._save_state) as save:
+            for i in range(1, 10001):
+                manager.update_progress(tid, i * 1024 * 1024)
+        # Solo el paso a RUNNING es un checkpoint; los ticks van (con rebote) al diario
+        self.assertEqual(save.call_count, 1)
+        self.assertLess(manager._journal_lines, 10)
+
+    def test_restart_replays_journal(self):
+        manager = self._manager()
+        tid = manager.create_transfer(TransferType.AZURE_TO_LOCAL, "disk", "sas", "C:/disk.vhd", 1000)
+        manager.update_progress(tid, 100)
+        with mock.patch.object(transfer_manager, 'PROGRESS_FLUSH_INTERVAL', 0):
+            manager.update_progress(tid, 400)
+        manager.update_progress(tid, 500)
+        manager.flush_progress()
+
+        restored = self._manager()
+        transfer = restored.get_transfer(tid)
+        self.assertEqual(transfer.bytes_transferred, 500)
+        self.assertEqual(transfer.status, TransferStatus.PAUSED.value)
+        # Al arrancar se compacta: el diario queda vacío
+        self.assertEqual(os.path.getsize(restored.journal_path), 0)
+
+    def test_truncated_journal_line_is_ignored(self):
+        manager = self._manager()
+        tid = manager.create_transfer(TransferType.GCP_DOWNLOAD, "blob", "src", "dst", 1000)
+        manager.update_progress(tid, 100)
+        manager.update_progress(tid, 200)
+        manager.flush_progress()
+        with open(manager.journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"id": "' + tid + '", "byt')
+        self.assertEqual(self._manager().get_transfer(tid).bytes_transferred, 200)
+
+    def test_metrics_query_api(self):
+        manager = self._manager()
+        tid = manager.create_transfer(TransferType.GCP_DOWNLOAD, "blob", "src", "dst", 10**6)
+        emitted = []
+        manager.transfer_metrics_updated.connect(lambda t, m: emitted.append((t, m)))
+        manager.update_progress(tid, 1000)
+        manager.update_progress(tid, 2000)
+        manager.flush_ui_updates()
+        self.assertEqual(manager.get_metrics(tid).bytes_done, 2000)
+        self.assertEqual(manager.get_aggregate_metrics().active, 1)
+        self.assertEqual(len(emitted), 1)
+        manager.complete_transfer(tid, True)
+        self.assertEqual(manager.get_aggregate_metrics().active, 0)
+        self.assertEqual(manager.get_metrics(tid).bytes_done, 2000)
+
+    def test_stop_publishes_aggregate_and_idles_timer(self):
+        manager = self._manager()
+        self.assertFalse(manager._ui_timer_armed)
+        tid = manager.create_transfer(TransferType.GCP_DOWNLOAD, "blob", "src", "dst", 10**6)
+        aggregates = []
+        manager.aggregate_metrics_updated.connect(aggregates.append)
+        manager.update_progress(tid, 1000)
+        self.assertTrue(manager._ui_timer_armed)
+        manager.pause_transfer(tid)
+        # Sin lote de progreso pendiente: el agregado final llega igualmente
+        self.assertEqual(aggregates[-1]["active"], 0)
+        manager.flush_ui_updates()
+        self.assertFalse(manager._ui_timer_armed)
+
+    def test_journal_is_compacted(self):
+        manager = self._manager()
+        tid = manager.create_transfer(TransferType.GCP_DOWNLOAD, "blob", "src", "dst", 10**6)
+        manager.update_progress(tid, 1)
+        with mock.patch.object(transfer_manager, 'PROGRESS_FLUSH_INTERVAL', 0), \
+                mock.patch.object(transfer_manager, 'JOURNAL_COMPACT_LINES', 50):
+            for i in range(2, 130):
+                manager.update_progress(tid, i)
+        self.assertLess(manager._journal_lines, 50)
+        self.assertEqual(self._manager().get_transfer(tid).bytes_transferred, 129)
+
+    def test_progress_is_coalesced_for_the_ui(self):
+        manager = self._manager()
+        ids = [manager.create_transfer(TransferType.GCP_DOWNLOAD, f"b{n}", "src", "dst", 10**6)
+               for n in range(100)]
+        immediate, batches = [], []
+        manager.transfer_updated.connect(lambda *args: immediate.append(args))
+        manager.progress_batch.connect(batches.append)
+        for step in range(1, 21):
+            for tid in ids:
+                manager.update_progress(tid, step * 1000)
+        manager.flush_ui_updates()
+        # Solo el paso a RUNNING se entrega al momento; el resto llega en un único lote
+        self.assertEqual(len(immediate), 100)
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(batches[0][ids[0]]["bytes_transferred"], 20000)
+
+    def test_chunk_manifest_survives_restart(self):
+        manager = self._manager()
+        tid = manager.create_transfer(TransferType.AZURE_TO_LOCAL, "disk", "sas", "C:/disk.vhd", 10 * 1024)
+        ledger = manager.chunk_ledger(tid)
+        ledger.start(ChunkManifest(10 * 1024, 1024, source_id="0x8DB1"))
+        # Fragmentos terminados fuera de orden por varios hilos
+        for index in (7, 0, 3, 9):
+            ledger.mark_done(index)
+        manager.flush_progress()
+
+        restored = self._manager()
+        manifest = restored.chunk_ledger(tid).recorded(10 * 1024, 1024, "0x8DB1")
+        self.assertEqual(manifest.pending_chunks(), [1, 2, 4, 5, 6, 8])
+        # Otro origen (ETag distinto): no sirve para reanudar
+        self.assertIsNone(restored.chunk_ledger(tid).recorded(10 * 1024, 1024, "0x8DB2"))
+
+    def test_integrity_result_is_persisted(self):
+        manager = self._manager()
+        tid = manager.create_transfer(TransferType.GCP_DOWNLOAD, "obj", "gs://b/obj", "C:/obj", 1000)
+        manager.record_integrity(tid, IntegrityCheck(MISMATCH, "md5", "aa", "bb"))
+        manager.complete_transfer(tid, False, "Descarga corrupta")
+
+        restored = self._manager().get_transfer(tid)
+        self.assertEqual(restored.integrity_status, MISMATCH)
+        self.assertIn("md5", restored.integrity_message)
+
+    def test_restart_resumes_interrupted_transfers(self):
+        manager = self._manager()
+        running = manager.create_transfer(TransferType.S3_DOWNLOAD, "obj", "b/obj", "C:/obj", 1000)
+        manager.update_progress(running, 100)
+        paused = manager.create_transfer(TransferType.S3_DOWNLOAD, "obj2", "b/obj2", "C:/obj2", 1000)
+        manager.pause_transfer(paused)
+
+        restored = self._manager()
+        self.assertTrue(restored.get_transfer(running).auto_resume)
+        self.assertFalse(restored.get_transfer(paused).auto_resume)
+
+        workers = {}
+        restored.resume_coordinator.register(
+            TransferType.S3_DOWNLOAD, lambda t: workers.setdefault(t.id, FakeWorker())
+        )
+        report = restored.resume_coordinator.resume_pending()
+        self.assertEqual(report.resumed, [running])
+        self.assertTrue(workers[running].launched)
+        # Despachada: otra pasada no la duplica
+        self.assertEqual(restored.resume_coordinator.resume_pending().resumed, [])
+
+
+    def test_late_tick_after_pause_keeps_it_paused(self):
+        manager = self._manager()
+        tid = manager.create_transfer(TransferType.AZURE_TO_LOCAL, "disk", "sas", "C:/disk.vhd", 1000)
+        manager.update_progress(tid, 400)
+        manager.pause_transfer(tid)
+        # Bloques en vuelo y la retirada del progreso llegan después de la pausa
+        manager.update_progress(tid, 450)
+        manager.update_progress(tid, 380)
+        manager.flush_progress()
+
+        transfer = manager.get_transfer(tid)
+        self.assertEqual(transfer.status, TransferStatus.PAUSED.value)
+        self.assertEqual(transfer.bytes_transferred, 400)
+        restored = self._manager().get_transfer(tid)
+        self.assertEqual(restored.status, TransferStatus.PAUSED.value)
+        self.assertFalse(restored.auto_resume)
+
+        # Reanudar con un worker nuevo vuelve a aceptar su progreso
+        manager.start_worker(FakeWorker(), tid)
+        manager.update_progress(tid, 500)
+        self.assertEqual(manager.get_transfer(tid).status, TransferStatus.RUNNING.value)
+
+
+if __name__ == '__main__':
+    unittest.main()
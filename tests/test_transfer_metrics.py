@@ -0,0 +1,88 @@
+"""
+Tests para las métricas de velocidad y ETA (core.transfer_metrics)
+"""
+
+import unittest
+import sys
+import os
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.transfer_metrics import (
+    DEGRADED_WARMUP, RateTracker, TransferMetrics, aggregate_metrics, format_eta, format_rate
+)
+
+MIB = 1024 * 1024
+
+
+def feed(tracker, rate, seconds, start_time=0.0, start_bytes=0, total=None, step=0.5):
+    t, b = start_time, start_bytes
+    while t < start_time + seconds:
+        t += step
+        b += int(rate * step)
+        tracker.update(b, total, now=t)
+    return t, b
+
+
+class TestRateTracker(unittest.TestCase):
+    """Tests para RateTracker"""
+
+    def test_steady_rate_and_eta(self):
+        tracker = RateTracker()
+        tracker.update(0, 1000 * MIB, now=0.0)
+        t, b = feed(tracker, 10 * MIB, 30)
+        m = tracker.snapshot(now=t)
+        self.assertAlmostEqual(m.rate_ewma / MIB, 10, delta=0.1)
+        self.assertAlmostEqual(m.rate_window / MIB, 10, delta=0.1)
+        self.assertAlmostEqual(m.rate_average / MIB, 10, delta=0.1)
+        self.assertAlmostEqual(m.eta_seconds, (1000 * MIB - b) / m.rate_ewma, delta=0.01)
+
+    def test_window_reacts_faster_than_ewma_and_flags_degraded(self):
+        tracker = RateTracker()
+        tracker.update(0, 10 ** 12, now=0.0)
+        t, b = feed(tracker, 50 * MIB, DEGRADED_WARMUP)
+        t, b = feed(tracker, 1 * MIB, 15, t, b)
+        m = tracker.snapshot(now=t)
+        self.assertLess(m.rate_window / MIB, 2)
+        self.assertAlmostEqual(m.rate_peak / MIB, 50, delta=1)
+        self.assertTrue(m.degraded)
+
+    def test_idle_transfer_decays_to_zero(self):
+        tracker = RateTracker()
+        tracker.update(0, now=0.0)
+        t, _ = feed(tracker, 10 * MIB, 10)
+        m = tracker.snapshot(now=t + 60)
+        self.assertEqual(m.rate_window, 0.0)
+        self.assertLess(m.rate_ewma, 0.01 * MIB)
+        self.assertIsNone(m.eta_seconds)
+
+    def test_restart_resets_metrics(self):
+        tracker = RateTracker()
+        tracker.update(0, now=0.0)
+        t, _ = feed(tracker, 10 * MIB, 10)
+        tracker.update(0, now=t + 1)
+        self.assertEqual(tracker.snapshot(now=t + 1).rate_peak, 0.0)
+
+
+class TestAggregate(unittest.TestCase):
+    """Tests para aggregate_metrics y el formato"""
+
+    def test_aggregate_sums_rates(self):
+        metrics = [
+            TransferMetrics(bytes_done=0, total_bytes=100 * MIB, rate_ewma=10 * MIB),
+            TransferMetrics(bytes_done=50 * MIB, total_bytes=100 * MIB, rate_ewma=5 * MIB, degraded=True),
+        ]
+        result = aggregate_metrics(metrics)
+        self.assertEqual((result.active, result.degraded), (2, 1))
+        self.assertEqual(result.rate_ewma, 15 * MIB)
+        self.assertAlmostEqual(result.eta_seconds, 10.0)
+
+    def test_format(self):
+        self.assertEqual(format_rate(12.34 * MIB), "12.3 MB/s")
+        self.assertEqual(format_eta(250), "4m 10s")
+        self.assertEqual(format_eta(None), "--")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+"""
+Tests para el planificador global de transferencias (core.transfer_scheduler)
+"""
+
+import unittest
+import threading
+import sys
+import os
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.transfer_scheduler import (
+    DOWNLOAD, FAIRNESS_BURST, MIB, UPLOAD, TokenBucket, TransferPriority, TransferScheduler
+)
+
+INTERACTIVE = TransferPriority.INTERACTIVE
+BACKGROUND = TransferPriority.BACKGROUND
+
+
+class FakeClock:
+    """Reloj manual: ``sleep`` avanza el tiempo sin esperar"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        self.slept += seconds
+
+
+class TestAdmission(unittest.TestCase):
+    """Tests de admisión y colas"""
+
+    def setUp(self):
+        self.started = []
+
+    def submit(self, scheduler, ticket_id, priority):
+        return scheduler.submit(ticket_id, lambda: self.started.append(ticket_id), priority)
+
+    def test_limit_and_release_dispatches_next(self):
+        scheduler = TransferScheduler(max_concurrent=2)
+        self.assertTrue(self.submit(scheduler, "a", INTERACTIVE))
+        self.assertTrue(self.submit(scheduler, "b", INTERACTIVE))
+        self.assertFalse(self.submit(scheduler, "c", INTERACTIVE))
+        self.assertEqual(self.started, ["a", "b"])
+        self.assertTrue(scheduler.is_queued("c"))
+
+        scheduler.release("a")
+        self.assertEqual(self.started, ["a", "b", "c"])
+        self.assertTrue(scheduler.is_running("c"))
+        self.assertEqual(scheduler.running_count(), 2)
+
+    def test_background_cannot_take_reserved_slot(self):
+        scheduler = TransferScheduler(max_concurrent=3)
+        for ticket_id in ("b1", "b2", "b3"):
+            self.submit(scheduler, ticket_id, BACKGROUND)
+        self.assertEqual(self.started, ["b1", "b2"])
+        # El hueco reservado sigue libre para una descarga interactiva
+        self.assertTrue(self.submit(scheduler, "i1", INTERACTIVE))
+        self.assertEqual(scheduler.queued(), ["b3"])
+
+    def test_single_slot_still_runs_background(self):
+        scheduler = TransferScheduler(max_concurrent=1)
+        self.assertTrue(self.submit(scheduler, "b1", BACKGROUND))
+
+    def test_interactive_first_with_fairness_burst(self):
+        scheduler = TransferScheduler(max_concurrent=1)
+        self.submit(scheduler, "busy", INTERACTIVE)
+        self.submit(scheduler, "bg", BACKGROUND)
+        for n in range(FAIRNESS_BURST + 2):
+            self.submit(scheduler, f"i{n}", INTERACTIVE)
+
+        previous = "busy"
+        while scheduler.queued():
+            scheduler.release(previous)
+            previous = self.started[-1]
+
+        order = self.started[1:]
+        # Las interactivas van primero, pero el fondo no espera indefinidamente
+        self.assertEqual(order.index("bg"), FAIRNESS_BURST)
+        self.assertEqual([t for t in order if t != "bg"], [f"i{n}" for n in range(FAIRNESS_BURST + 2)])
+
+    def test_stale_release_is_ignored(self):
+        scheduler = TransferScheduler(max_concurrent=1)
+        first, second = (lambda: self.started.append("t1")), (lambda: self.started.append("t1"))
+        scheduler.submit("t1", first, INTERACTIVE)
+        self.submit(scheduler, "next", INTERACTIVE)
+        self.assertTrue(scheduler.release("t1", first))
+        self.assertFalse(scheduler.release("t1"))
+        # Reanudada con el mismo identificador: el aviso tardío del worker anterior no cuenta
+        scheduler.release("next")
+        scheduler.submit("t1", second, INTERACTIVE)
+        self.assertFalse(scheduler.release("t1", first))
+        self.assertTrue(scheduler.is_running("t1"))
+
+    def test_cancel_queued(self):
+        scheduler = TransferScheduler(max_concurrent=1)
+        self.submit(scheduler, "a", INTERACTIVE)
+        self.submit(scheduler, "b", INTERACTIVE)
+        self.assertTrue(scheduler.cancel("b"))
+        self.assertFalse(scheduler.cancel("b"))
+        scheduler.release("a")
+        self.assertEqual(self.started, ["a"])
+
+    def test_failed_start_frees_slot(self):
+        scheduler = TransferScheduler(max_concurrent=1)
+
+        def broken():
+            raise RuntimeError("boom")
+
+        self.assertFalse(scheduler.submit("x", broken))
+        self.assertEqual(scheduler.running_count(), 0)
+        self.assertTrue(self.submit(scheduler, "a", INTERACTIVE))
+
+    def test_configure_more_slots_dispatches(self):
+        scheduler = TransferScheduler(max_concurrent=1)
+        self.submit(scheduler, "a", INTERACTIVE)
+        self.submit(scheduler, "b", INTERACTIVE)
+        scheduler.configure(max_concurrent=2)
+        self.assertEqual(self.started, ["a", "b"])
+
+
+class TestBandwidth(unittest.TestCase):
+    """Tests del token bucket y del reparto de banda"""
+
+    def test_token_bucket_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10 * MIB, clock=clock, sleep=clock.sleep)
+        for _ in range(40):
+            self.assertTrue(bucket.consume(MIB))
+        # 40 MiB a 10 MiB/s: el bucket arranca sin crédito
+        self.assertAlmostEqual(clock.now, 4.0, places=3)
+
+    def test_unlimited_never_sleeps(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=0, clock=clock, sleep=clock.sleep)
+        self.assertTrue(bucket.consume(100 * MIB))
+        self.assertEqual(clock.slept, 0)
+
+    def test_cancel_during_wait(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=MIB, clock=clock, sleep=clock.sleep)
+        cancel = threading.Event()
+        cancel.set()
+        self.assertFalse(bucket.consume(10 * MIB, cancel))
+
+    def test_background_share_only_with_interactive_running(self):
+        scheduler = TransferScheduler(max_concurrent=3, download_limit=10 * MIB, background_share=0.2)
+        clock = FakeClock()
+        for buckets in (scheduler._buckets, scheduler._background_buckets):
+            for bucket in buckets.values():
+                bucket._clock = clock
+                bucket._sleep = clock.sleep
+                bucket.set_rate(bucket.rate)
+
+        scheduler.submit("i1", lambda: None, INTERACTIVE)
+        scheduler.throttle(DOWNLOAD, 4 * MIB, BACKGROUND)
+        # Con una interactiva activa el fondo se limita al 20% (2 MiB/s)
+        self.assertAlmostEqual(clock.now, 2.0, places=3)
+
+        scheduler.release("i1")
+        start = clock.now
+        # Sin interactivas solo cuenta el límite global (6 MiB de crédito acumulado)
+        scheduler.throttle(DOWNLOAD, 16 * MIB, BACKGROUND)
+        self.assertAlmostEqual(clock.now - start, 1.0, places=3)
+
+    def test_rclone_bwlimit(self):
+        scheduler = TransferScheduler(upload_limit=5 * MIB)
+        self.assertEqual(scheduler.rclone_bwlimit(UPLOAD), "5120K")
+        self.assertIsNone(scheduler.rclone_bwlimit(DOWNLOAD))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Tests para la detección de archivos sin cambios (core.upload_diff)
+"""
+
+import unittest
+import sys
+import os
+import hashlib
+import tempfile
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.s3_etag import BOTO3_DEFAULT_CHUNK_SIZE, candidate_part_sizes, compute_etag
+from core.upload_diff import ChangeDetector, LocalETagCache, prefer_listing
+
+
+class TestChangeDetector(unittest.TestCase):
+    """Tests para ChangeDetector y LocalETagCache"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "data.bin")
+        self.data = os.urandom(3 * 1024 * 1024 + 17)
+        with open(self.path, 'wb') as f:
+            f.write(self.data)
+        self.cache = LocalETagCache(os.path.join(self.tmp.name, "etags.json"))
+        self.detector = ChangeDetector(self.cache)
+
+    def test_single_part_etag(self):
+        remote = {'size': len(self.data), 'etag': f'"{hashlib.md5(self.data).hexdigest()}"'}
+        self.assertTrue(self.detector.is_unchanged(self.path, remote))
+        remote['etag'] = '"' + '0' * 32 + '"'
+        self.assertFalse(self.detector.is_unchanged(self.path, remote))
+
+    def test_size_mismatch_is_changed(self):
+        remote = {'size': len(self.data) - 1, 'etag': hashlib.md5(self.data).hexdigest()}
+        self.assertFalse(self.detector.is_unchanged(self.path, remote))
+
+    def test_multipart_etag_with_unknown_part_size(self):
+        etag = compute_etag(self.path, 1024 * 1024)
+        self.assertTrue(etag.endswith('-4'))
+        self.assertTrue(self.detector.is_unchanged(self.path, {'size': len(self.data), 'etag': etag}))
+
+    def test_opaque_etag_falls_back_to_mtime(self):
+        mtime = os.stat(self.path).st_mtime
+        remote = {'size': len(self.data), 'etag': 'kms-opaque', 'mtime': mtime + 60}
+        self.assertTrue(self.detector.is_unchanged(self.path, remote))
+        remote['mtime'] = mtime - 60
+        self.assertFalse(self.detector.is_unchanged(self.path, remote))
+
+    def test_cache_persists_and_invalidates_on_change(self):
+        remote = {'size': len(self.data), 'etag': hashlib.md5(self.data).hexdigest()}
+        self.detector.is_unchanged(self.path, remote)
+        self.cache.save()
+        reloaded = LocalETagCache(self.cache.path)
+        stat = os.stat(self.path)
+        self.assertEqual(reloaded.get(self.path, stat.st_size, stat.st_mtime_ns, 0), remote['etag'])
+        self.assertIsNone(reloaded.get(self.path, stat.st_size, stat.st_mtime_ns + 1, 0))
+
+
+class TestHelpers(unittest.TestCase):
+    """Tests para candidate_part_sizes y prefer_listing"""
+
+    def test_candidate_part_sizes_match_parts_count(self):
+        size = 100 * 1024 * 1024
+        candidates = candidate_part_sizes(size, 13)
+        self.assertIn(BOTO3_DEFAULT_CHUNK_SIZE, candidates)
+        self.assertTrue(all(-(-size // part) == 13 for part in candidates))
+
+    def test_prefer_listing(self):
+        self.assertTrue(prefer_listing(None, 10))
+        self.assertTrue(prefer_listing(5000, 10))
+        self.assertFalse(prefer_listing(1_000_000, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
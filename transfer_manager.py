@@ -3,14 +3,29 @@ Transfer Manager - Gestor central de transferencias con persistencia y resume
 """
 import json
 import os
+import threading
+import time
 import uuid
 from datetime import datetime
 from typing import Dict, List, Optional
-from PyQt6.QtCore import QObject, pyqtSignal, QThread
-from dataclasses import dataclass, asdict
+from PyQt6.QtCore import QObject, pyqtSignal, QThread, QTimer
+from core.progress_bus import PROGRESS_UI_INTERVAL_MS, ProgressCoalescer, ProgressUpdate
+from core.chunk_manifest import ChunkLedger, ChunkManifest
+from core.transfer_metrics import AggregateMetrics, RateTracker, TransferMetrics, aggregate_metrics
+from core.transfer_scheduler import MIB, TransferPriority, TransferScheduler
+from core.resume_coordinator import ResumeCoordinator
+from dataclasses import dataclass, asdict, replace
 from enum import Enum
 
 
+# Intervalo mínimo entre escrituras de progreso al diario (por transferencia)
+PROGRESS_FLUSH_INTERVAL = 2.0
+# Líneas de diario tras las que se compacta en el estado completo
+JOURNAL_COMPACT_LINES = 2000
+# Intervalo mínimo entre avisos de métricas a la UI (por transferencia y agregado)
+METRICS_EMIT_INTERVAL = 1.0
+
+
 class TransferStatus(Enum):
     QUEUED = "queued"
     RUNNING = "running"
@@ -20,11 +35,20 @@ class TransferStatus(Enum):
     CANCELLED = "cancelled"
 
 
+# Estados en los que el progreso tardío de un worker ya no cuenta
+_STOPPED_STATUSES = (
+    TransferStatus.PAUSED.value, TransferStatus.CANCELLED.value, TransferStatus.COMPLETED.value,
+)
+
+
 class TransferType(Enum):
     AZURE_TO_LOCAL = "azure_to_local"
     AZURE_TO_GCP = "azure_to_gcp"
+    AZURE_TO_S3 = "azure_to_s3"
     AZURE_TO_AZURE = "azure_to_azure"
     GCP_DOWNLOAD = "gcp_download"
+    S3_DOWNLOAD = "s3_download"
+    S3_UPLOAD = "s3_upload"
 
 
 @dataclass
@@ -46,18 +70,36 @@ class TransferInfo:
     subscription_id: Optional[str] = None
     resource_group: Optional[str] = None
     disk_name: Optional[str] = None
-    # GCP specific
+    # GCP / S3 specific
     bucket_name: Optional[str] = None
     blob_name: Optional[str] = None
+    # S3 specific (perfil con las credenciales para reanudar)
+    profile_name: Optional[str] = None
+    # Subida multiparte S3: entrada del manifiesto local y su UploadId
+    manifest_key: Optional[str] = None
+    upload_id: Optional[str] = None
     # Error info
     error_message: Optional[str] = None
+    # Interrumpida por un cierre o caída (no por el usuario): reanudar al arrancar
+    auto_resume: bool = False
+    # Opcional: fragmentos completados, para transferencias por rangos en paralelo
+    chunk_manifest: Optional[ChunkManifest] = None
+    # Verificación en línea: "verified", "mismatch" o "unverifiable" (None si no se hizo)
+    integrity_status: Optional[str] = None
+    integrity_message: Optional[str] = None
+    # CRC32C calculado del contenido (base64, formato GCS)
+    crc32c: Optional[str] = None
     
     def to_dict(self):
-        return asdict(self)
+        manifest = self.chunk_manifest
+        data = asdict(replace(self, chunk_manifest=None))
+        data["chunk_manifest"] = manifest.to_dict() if manifest else None
+        return data
     
     @classmethod
     def from_dict(cls, data: dict):
-        return cls(**data)
+        manifest = data.get("chunk_manifest")
+        return cls(**dict(data, chunk_manifest=ChunkManifest.from_dict(manifest) if manifest else None))
     
     @property
     def progress_percent(self) -> int:
@@ -71,43 +113,168 @@ class TransferManager(QObject):
     
     # Señales para UI
     transfer_added = pyqtSignal(str)  # transfer_id
-    transfer_updated = pyqtSignal(str, int, str)  # transfer_id, progress%, status_text
+    transfer_updated = pyqtSignal(str, int, str)  # transfer_id, progress%, status_text (inmediata)
+    progress_batch = pyqtSignal(dict)  # transfer_id -> ProgressUpdate.to_dict(), a 10 Hz como mucho
     transfer_finished = pyqtSignal(str, bool, str)  # transfer_id, success, message
     transfer_removed = pyqtSignal(str)  # transfer_id
+    transfer_metrics_updated = pyqtSignal(str, dict)  # transfer_id, TransferMetrics.to_dict()
+    aggregate_metrics_updated = pyqtSignal(dict)  # AggregateMetrics.to_dict()
+    # Arranque del temporizador de la UI desde cualquier hilo (conexión en cola)
+    _ui_timer_wake = pyqtSignal()
+    # Fin de un worker: el hueco se libera (y el siguiente arranca) en el hilo del gestor
+    _release_requested = pyqtSignal(str, object)  # ticket_id, start de esa ejecución
     
     def __init__(self, persist_path: str = None):
         super().__init__()
         self.persist_path = persist_path or os.path.join(os.getcwd(), "active_transfers.json")
+        # Diario de progreso (JSON lines) entre checkpoints del estado completo
+        self.journal_path = f"{self.persist_path}.journal"
         self.transfers: Dict[str, TransferInfo] = {}
         self.workers: Dict[str, QThread] = {}
+        self._lock = threading.RLock()
+        self._journal_lines = 0
+        # transfer_id -> instante de la última línea de progreso escrita
+        self._last_flush: Dict[str, float] = {}
+        # Progreso en memoria aún no escrito al diario
+        self._pending_progress = set()
+        # transfer_id -> fragmentos completados desde la última línea del diario
+        self._pending_chunks: Dict[str, List[int]] = {}
+        # Velocidad y ETA por transferencia activa; métricas finales de las terminadas
+        self._rates: Dict[str, RateTracker] = {}
+        self._final_metrics: Dict[str, TransferMetrics] = {}
+        self._last_metrics_emit: Dict[str, float] = {}
+        self._last_aggregate_emit = 0.0
+        self._aggregate_peak = 0.0
+        # Admisión, prioridades y ancho de banda comunes a todos los workers
+        self.scheduler = TransferScheduler()
+        # Reanudación de lo interrumpido; las pestañas registran sus adaptadores
+        self.resume_coordinator = ResumeCoordinator(self)
+        # Progreso hacia la UI: último estado por transferencia, entregado por lotes
+        self._progress_bus = ProgressCoalescer()
+        self._ui_timer = QTimer(self)
+        self._ui_timer.setInterval(PROGRESS_UI_INTERVAL_MS)
+        self._ui_timer.timeout.connect(self.flush_ui_updates)
+        # Solo corre mientras hay transferencias activas; lo arranca el primer aviso
+        self._ui_timer_armed = False
+        self._ui_timer_wake.connect(self._ui_timer.start)
+        self._release_requested.connect(self._release_ticket)
         self._load_state()
     
     def _load_state(self):
-        """Cargar estado de transferencias desde JSON"""
+        """Cargar el estado completo y reaplicar el diario de progreso"""
         if os.path.exists(self.persist_path):
             try:
                 with open(self.persist_path, 'r', encoding='utf-8') as f:
                     data = json.load(f)
                     for t_data in data.get("transfers", []):
                         t = TransferInfo.from_dict(t_data)
-                        # Mark running transfers as paused (they were interrupted)
-                        if t.status == TransferStatus.RUNNING.value:
-                            t.status = TransferStatus.PAUSED.value
                         self.transfers[t.id] = t
             except Exception as e:
                 print(f"Error loading transfer state: {e}")
+        replayed = self._replay_journal()
+        interrupted = 0
+        for t in self.transfers.values():
+            # En curso o en cola al cerrar: interrumpidas, el coordinador las reanuda
+            if t.status in (TransferStatus.RUNNING.value, TransferStatus.QUEUED.value):
+                t.status = TransferStatus.PAUSED.value
+                t.auto_resume = True
+                interrupted += 1
+        if replayed or interrupted:
+            # Compactar al arrancar: el diario vuelve a empezar vacío
+            self._save_state()
+    
+    def _replay_journal(self) -> int:
+        """Aplicar las líneas de progreso posteriores al último checkpoint"""
+        if not os.path.exists(self.journal_path):
+            return 0
+        applied = 0
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Última línea truncada por un cierre abrupto
+                        break
+                    transfer = self.transfers.get(entry.get("id"))
+                    if transfer is None:
+                        continue
+                    transfer.bytes_transferred = entry["bytes"]
+                    if entry.get("total"):
+                        transfer.total_bytes = entry["total"]
+                    if entry.get("chunks") and transfer.chunk_manifest is not None:
+                        for index in entry["chunks"]:
+                            try:
+                                transfer.chunk_manifest.mark_done(index)
+                            except IndexError:
+                                # Diario de un manifiesto anterior (tamaño distinto)
+                                pass
+                    transfer.updated_at = entry.get("at", transfer.updated_at)
+                    applied += 1
+        except Exception as e:
+            print(f"Error replaying transfer journal: {e}")
+        return applied
     
     def _save_state(self):
-        """Guardar estado de transferencias a JSON"""
+        """
+        Checkpoint: escribir el estado completo (atómico, con fsync) y vaciar el diario.
+
+        Solo se llama en cambios de estado (crear, pausar, completar...), no
+        en cada avance de progreso.
+        """
+        with self._lock:
+            try:
+                data = {
+                    "transfers": [t.to_dict() for t in self.transfers.values() 
+                                  if t.status not in [TransferStatus.COMPLETED.value, TransferStatus.CANCELLED.value]]
+                }
+                tmp_path = f"{self.persist_path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.persist_path)
+                # El estado completo ya incluye todo el progreso: el diario sobra
+                with open(self.journal_path, 'w', encoding='utf-8'):
+                    pass
+                self._journal_lines = 0
+                self._pending_progress.clear()
+                self._pending_chunks.clear()
+            except Exception as e:
+                print(f"Error saving transfer state: {e}")
+    
+    def _append_progress(self, transfer: TransferInfo):
+        """Añadir una línea de progreso al diario (sin fsync) y compactar si crece"""
+        entry = {
+            "id": transfer.id,
+            "bytes": transfer.bytes_transferred,
+            "total": transfer.total_bytes,
+            "at": transfer.updated_at,
+        }
+        chunks = self._pending_chunks.get(transfer.id)
+        if chunks:
+            # Solo los fragmentos nuevos: el mapa completo va en el checkpoint
+            entry["chunks"] = chunks
         try:
-            data = {
-                "transfers": [t.to_dict() for t in self.transfers.values() 
-                              if t.status not in [TransferStatus.COMPLETED.value, TransferStatus.CANCELLED.value]]
-            }
-            with open(self.persist_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, separators=(',', ':')) + "\n")
         except Exception as e:
-            print(f"Error saving transfer state: {e}")
+            print(f"Error writing transfer journal: {e}")
+            return
+        self._journal_lines += 1
+        self._pending_progress.discard(transfer.id)
+        self._pending_chunks.pop(transfer.id, None)
+        if self._journal_lines >= JOURNAL_COMPACT_LINES:
+            self._save_state()
+    
+    def flush_progress(self):
+        """Escribir al diario el progreso pendiente (p. ej. al cerrar la aplicación)"""
+        with self._lock:
+            for transfer_id in list(self._pending_progress):
+                transfer = self.transfers.get(transfer_id)
+                if transfer is not None:
+                    self._append_progress(transfer)
+            self._pending_progress.clear()
     
     def create_transfer(self, transfer_type: TransferType, name: str, source: str, 
                          destination: str, total_bytes: int = 0, **kwargs) -> str:
@@ -135,20 +302,126 @@ class TransferManager(QObject):
         return transfer_id
     
     def update_progress(self, transfer_id: str, bytes_transferred: int, 
-                        status_text: str = "", total_bytes: int = None):
-        """Actualizar progreso de una transferencia"""
+                        status_text: str = "", total_bytes: int = None, immediate: bool = False):
+        """
+        Actualizar progreso de una transferencia.
+
+        Los avisos se agrupan y llegan a la UI por lotes (``progress_batch``);
+        el paso a RUNNING, o ``immediate``, se entrega al momento
+        (``transfer_updated``).
+
+        Se ignoran los avisos de una transferencia pausada, cancelada o
+        completada: los que llegan tarde (bloques en vuelo, la retirada del
+        progreso al detenerse) no deben volver a ponerla en marcha. Un worker
+        nuevo la reactiva a través de ``start_worker``.
+        """
         if transfer_id not in self.transfers:
             return
         
         transfer = self.transfers[transfer_id]
+        if transfer.status in _STOPPED_STATUSES:
+            return
         transfer.bytes_transferred = bytes_transferred
         if total_bytes:
             transfer.total_bytes = total_bytes
         transfer.updated_at = datetime.now().isoformat()
+        became_running = transfer.status != TransferStatus.RUNNING.value
         transfer.status = TransferStatus.RUNNING.value
         
-        self._save_state()
-        self.transfer_updated.emit(transfer_id, transfer.progress_percent, status_text)
+        with self._lock:
+            now = time.monotonic()
+            if became_running:
+                self._save_state()
+                self._last_flush[transfer_id] = now
+            elif now - self._last_flush.get(transfer_id, 0.0) >= PROGRESS_FLUSH_INTERVAL:
+                # Con rebote: el diario nunca va por delante de lo realmente escrito
+                self._append_progress(transfer)
+                self._last_flush[transfer_id] = now
+            else:
+                self._pending_progress.add(transfer_id)
+            tracker = self._rates.get(transfer_id)
+            if tracker is None:
+                tracker = self._rates[transfer_id] = RateTracker()
+                self._final_metrics.pop(transfer_id, None)
+            wake_timer = not self._ui_timer_armed
+            self._ui_timer_armed = True
+        tracker.update(bytes_transferred, transfer.total_bytes, now)
+        if wake_timer:
+            self._ui_timer_wake.emit()
+        if became_running or immediate:
+            self.transfer_updated.emit(transfer_id, transfer.progress_percent, status_text)
+        else:
+            self._progress_bus.post(transfer_id, ProgressUpdate(
+                transfer.progress_percent, bytes_transferred, transfer.total_bytes, status_text))
+    
+    def flush_ui_updates(self):
+        """
+        Entregar el lote de progreso acumulado y las métricas (temporizador, hilo de la UI).
+
+        El agregado se publica en cada tick mientras haya transferencias
+        activas, aunque ninguna haya avisado (p. ej. atascadas); sin ninguna
+        activa el temporizador se detiene hasta el siguiente aviso.
+        """
+        batch = self._progress_bus.drain()
+        now = time.monotonic()
+        if batch:
+            self.progress_batch.emit({tid: update.to_dict() for tid, update in batch.items()})
+            for transfer_id in batch:
+                self._emit_metrics(transfer_id, now)
+        with self._lock:
+            idle = not self._rates
+            if idle:
+                self._ui_timer_armed = False
+        if idle:
+            self._ui_timer.stop()
+        elif now - self._last_aggregate_emit >= METRICS_EMIT_INTERVAL:
+            self._emit_aggregate(now)
+    
+    def _emit_metrics(self, transfer_id: str, now: float):
+        """Avisar de las métricas con un ritmo acotado, no en cada tick"""
+        if now - self._last_metrics_emit.get(transfer_id, 0.0) >= METRICS_EMIT_INTERVAL:
+            self._last_metrics_emit[transfer_id] = now
+            metrics = self.get_metrics(transfer_id)
+            if metrics is not None:
+                self.transfer_metrics_updated.emit(transfer_id, metrics.to_dict())
+    
+    def _emit_aggregate(self, now: float):
+        self._last_aggregate_emit = now
+        self.aggregate_metrics_updated.emit(self.get_aggregate_metrics().to_dict())
+    
+    def _stop_metrics(self, transfer_id: str, keep: bool):
+        """
+        Cerrar el medidor de una transferencia (conservando su resumen si ``keep``).
+
+        Publica el agregado al momento: sin esto la UI seguiría mostrando la
+        velocidad de una transferencia que ya terminó, se pausó o se canceló.
+        """
+        with self._lock:
+            tracker = self._rates.pop(transfer_id, None)
+            self._last_metrics_emit.pop(transfer_id, None)
+            if tracker is None:
+                return
+            if keep:
+                self._final_metrics[transfer_id] = tracker.snapshot()
+        self._emit_aggregate(time.monotonic())
+    
+    def get_metrics(self, transfer_id: str) -> Optional[TransferMetrics]:
+        """Velocidades (EWMA, ventana, media, pico) y ETA de una transferencia"""
+        with self._lock:
+            tracker = self._rates.get(transfer_id)
+            if tracker is None:
+                return self._final_metrics.get(transfer_id)
+        return tracker.snapshot()
+    
+    def get_aggregate_metrics(self) -> AggregateMetrics:
+        """Suma de las métricas de las transferencias en curso"""
+        with self._lock:
+            running = [tid for tid, t in self.transfers.items()
+                       if t.status == TransferStatus.RUNNING.value and tid in self._rates]
+            trackers = [self._rates[tid] for tid in running]
+        result = aggregate_metrics((tracker.snapshot() for tracker in trackers), self._aggregate_peak)
+        self._aggregate_peak = result.rate_peak
+        return result
     
     def complete_transfer(self, transfer_id: str, success: bool, message: str = ""):
         """Marcar transferencia como completada"""
@@ -158,9 +431,11 @@ class TransferManager(QObject):
         transfer = self.transfers[transfer_id]
         transfer.status = TransferStatus.COMPLETED.value if success else TransferStatus.ERROR.value
         transfer.updated_at = datetime.now().isoformat()
+        transfer.auto_resume = False
         if not success:
             transfer.error_message = message
         
+        self._stop_metrics(transfer_id, keep=True)
         self._save_state()
         self.transfer_finished.emit(transfer_id, success, message)
         
@@ -176,6 +451,10 @@ class TransferManager(QObject):
         transfer = self.transfers[transfer_id]
         transfer.status = TransferStatus.PAUSED.value
         transfer.updated_at = datetime.now().isoformat()
+        # Pausa del usuario: no reanudar sola en el próximo arranque
+        transfer.auto_resume = False
+        self.scheduler.cancel(transfer_id)
+        self._stop_metrics(transfer_id, keep=False)
         self._save_state()
         
         # Signal worker to stop (worker must check _should_stop flag)
@@ -198,9 +477,71 @@ class TransferManager(QObject):
         
         transfer = self.transfers[transfer_id]
         transfer.status = TransferStatus.CANCELLED.value
+        self.scheduler.cancel(transfer_id)
+        self._stop_metrics(transfer_id, keep=False)
         self._save_state()
         self.transfer_removed.emit(transfer_id)
     
+    def update_transfer(self, transfer_id: str, **fields):
+        """Actualizar campos de una transferencia (p. ej. un SAS renovado) con checkpoint"""
+        transfer = self.transfers.get(transfer_id)
+        if transfer is None:
+            return
+        for name, value in fields.items():
+            setattr(transfer, name, value.value if isinstance(value, Enum) else value)
+        transfer.updated_at = datetime.now().isoformat()
+        self._save_state()
+    
+    def record_integrity(self, transfer_id: str, check):
+        """Guardar el resultado de la verificación de integridad (``IntegrityCheck``)"""
+        if check is None:
+            return
+        self.update_transfer(
+            transfer_id,
+            integrity_status=check.status,
+            integrity_message=check.message,
+            crc32c=check.crc32c,
+        )
+    
+    def get_chunk_manifest(self, transfer_id: str) -> Optional[ChunkManifest]:
+        """Copia del manifiesto de fragmentos de la transferencia (None si no tiene)"""
+        with self._lock:
+            transfer = self.transfers.get(transfer_id)
+            manifest = transfer.chunk_manifest if transfer else None
+            return manifest.copy() if manifest else None
+    
+    def set_chunk_manifest(self, transfer_id: str, manifest: ChunkManifest):
+        """Guardar el manifiesto con el que arranca (o reanuda) un motor por rangos, con checkpoint"""
+        with self._lock:
+            transfer = self.transfers.get(transfer_id)
+            if transfer is None:
+                return
+            transfer.chunk_manifest = manifest.copy()
+            self._save_state()
+    
+    def mark_chunk_done(self, transfer_id: str, index: int):
+        """
+        Registrar un fragmento completado (desde cualquier hilo, en cualquier orden).
+
+        Los índices nuevos van al diario con el mismo rebote que el progreso;
+        el progreso en bytes lo sigue informando el worker.
+        """
+        with self._lock:
+            transfer = self.transfers.get(transfer_id)
+            manifest = transfer.chunk_manifest if transfer else None
+            if manifest is None or not manifest.mark_done(index):
+                return
+            self._pending_chunks.setdefault(transfer_id, []).append(index)
+            self._pending_progress.add(transfer_id)
+    
+    def chunk_ledger(self, transfer_id: str) -> ChunkLedger:
+        """Enlace del manifiesto de la transferencia para los motores por rangos"""
+        return ChunkLedger(
+            lambda: self.get_chunk_manifest(transfer_id),
+            lambda manifest: self.set_chunk_manifest(transfer_id, manifest),
+            lambda index: self.mark_chunk_done(transfer_id, index),
+        )
+    
     def get_transfer(self, transfer_id: str) -> Optional[TransferInfo]:
         return self.transfers.get(transfer_id)
     
@@ -217,12 +558,57 @@ class TransferManager(QObject):
         """Registrar un worker para una transferencia"""
         self.workers[transfer_id] = worker
     
+    def configure_scheduler(self, settings: dict):
+        """Aplicar los ajustes de transferencias (máximo simultáneo y límites en MB/s)"""
+        self.scheduler.configure(
+            max_concurrent=settings.get('max_concurrent_transfers'),
+            download_limit=float(settings.get('download_limit_mbps') or 0) * MIB,
+            upload_limit=float(settings.get('upload_limit_mbps') or 0) * MIB,
+        )
+    
+    def start_worker(self, worker: QThread, transfer_id: str = None,
+                     priority: TransferPriority = TransferPriority.INTERACTIVE) -> str:
+        """
+        Arrancar un worker a través del planificador (en lugar de ``worker.start()``).
+
+        Si no hay hueco la transferencia queda en cola (QUEUED) y arranca sola
+        cuando termine otra. El worker debe emitir ``finished`` al acabar,
+        fallar o pausarse.
+
+        Returns:
+            Identificador de la reserva (``transfer_id`` si se indicó).
+        """
+        ticket_id = transfer_id or f"w-{uuid.uuid4().hex[:8]}"
+        worker.transfer_priority = priority
+        transfer = self.transfers.get(transfer_id) if transfer_id else None
+        if transfer_id:
+            self.register_worker(transfer_id, worker)
+        if transfer is not None:
+            # Reanudada (estaba pausada o con error): su progreso vuelve a contar
+            transfer.status = TransferStatus.QUEUED.value
+        start = worker.start
+        # ``finished`` llega desde el hilo del worker: la señal lleva la liberación
+        # (y el ``start()`` del siguiente en cola) al hilo del gestor
+        worker.finished.connect(lambda *args: self._release_requested.emit(ticket_id, start))
+        if not self.scheduler.submit(ticket_id, start, priority) and transfer is not None:
+            self.transfer_updated.emit(transfer_id, transfer.progress_percent, "⏳ En cola")
+        return ticket_id
+    
+    def _release_ticket(self, ticket_id: str, start):
+        self.scheduler.release(ticket_id, start)
+    
+    def throttle(self, direction: str, nbytes: int,
+                 priority: TransferPriority = TransferPriority.INTERACTIVE, cancel_event=None) -> bool:
+        """Respetar el límite de banda global; los workers lo llaman por bloque transferido"""
+        return self.scheduler.throttle(direction, nbytes, priority, cancel_event)
+    
     def cleanup_completed(self):
         """Limpiar transferencias completadas/canceladas"""
         to_remove = [tid for tid, t in self.transfers.items() 
                      if t.status in [TransferStatus.COMPLETED.value, TransferStatus.CANCELLED.value]]
         for tid in to_remove:
             del self.transfers[tid]
+            self._final_metrics.pop(tid, None)
         self._save_state()
 
 
@@ -15,8 +15,19 @@ from PyQt6.QtGui import QFont, QDesktopServices
 from PyQt6.QtCore import QUrl
 import json
 import os
+import threading
+import time
 
 from config_manager import ConfigManager
+from core.azure_disk import (
+    DEFAULT_DISK_CONNECTIONS, SparseRangeReader, download_disk, export_disk_compressed, open_session,
+    probe_disk, range_fetcher, sparse_ranges, window_reader
+)
+from core.gcs_compose import (
+    DEFAULT_COMPONENT_SIZE, ComposeIntegrityError, ComposeUploadCancelled, ComposeUploader, source_tag
+)
+from core.segmented_download import DownloadCancelled
+from core.seekable_zstd import DEFAULT_COMPRESSION_LEVEL, ZSTD_AVAILABLE, ZSTD_SUFFIX
 try:
     from s3_handler import S3Handler
     S3_AVAILABLE = True
@@ -26,6 +37,8 @@ except ImportError:
 # Transfer Manager for multi-download queue
 try:
     from transfer_manager import get_transfer_manager, TransferType, TransferStatus
+    from core.transfer_scheduler import DOWNLOAD, UPLOAD, TransferPriority
+    from core.resume_coordinator import ResumeNotReady, sas_expired
     from ui.transfer_queue_widget import TransferQueueWidget
     TRANSFER_MANAGER_AVAILABLE = True
 except ImportError:
@@ -208,13 +221,25 @@ class ListDisksWorker(QThread):
 
 
 class DownloadDiskWorker(QThread):
-    """Worker para descargar disco usando cualquier credential - Soporta resume"""
+    """
+    Worker para descargar un disco con varias conexiones (GETs por rango) - Soporta resume.
+
+    Los segmentos completados se registran junto al ``.part``: una nueva
+    ejecución con el mismo destino solo descarga los que faltan. Un destino
+    ``.zst`` se guarda comprimido en tramas con tabla de acceso aleatorio.
+    """
     progress = pyqtSignal(int, str)
     progress_bytes = pyqtSignal(int, int)  # bytes_downloaded, total_bytes
+    sas_granted = pyqtSignal(str, str)  # sas_url, caducidad (ISO, UTC)
+    integrity_checked = pyqtSignal(object)  # IntegrityCheck de la verificación en línea
     finished = pyqtSignal(bool, str)
     
+    # Intervalo mínimo entre avisos de progreso (los emiten varios hilos)
+    PROGRESS_INTERVAL = 0.5
+    
     def __init__(self, credential, subscription_id, resource_group, disk_name, output_path,
-                 sas_url=None, start_byte=0, transfer_id=None):
+                 sas_url=None, transfer_id=None, max_connections=DEFAULT_DISK_CONNECTIONS, sparse=True,
+                 compression_level=DEFAULT_COMPRESSION_LEVEL):
         super().__init__()
         self.credential = credential
         self.subscription_id = subscription_id
@@ -222,19 +247,29 @@ class DownloadDiskWorker(QThread):
         self.disk_name = disk_name
         self.output_path = output_path
         self.sas_url = sas_url  # Pre-existing SAS for resume
-        self.start_byte = start_byte
         self.transfer_id = transfer_id
-        self._should_stop = False
+        self.max_connections = max_connections
+        # Solo las páginas asignadas del disco; los huecos quedan como huecos del archivo
+        self.sparse = sparse
+        self.compressed = output_path.lower().endswith(ZSTD_SUFFIX)
+        self.compression_level = compression_level
+        self._cancel_event = threading.Event()
+        # La asigna TransferManager.start_worker; sin ella no se limita la banda
+        self.transfer_priority = None
+        # Lo asigna AzureTab._track_worker: manifiesto de segmentos en TransferInfo
+        self.chunk_ledger = None
+        self._progress_lock = threading.Lock()
+        self._last_report = 0.0
+        # Bytes ya descontados del límite de banda (None hasta el primer aviso)
+        self._throttled_bytes = None
     
     def stop(self):
-        """Flag to gracefully stop the download"""
-        self._should_stop = True
+        """Detener la descarga conservando los segmentos completos"""
+        self._cancel_event.set()
     
     def run(self):
         try:
             from azure.mgmt.compute import ComputeManagementClient
-            import requests
-            import os
             
             # If we don't have a SAS URL, get one
             if not self.sas_url:
@@ -251,61 +286,37 @@ class DownloadDiskWorker(QThread):
                 ).result()
                 
                 self.sas_url = grant_access_result.access_sas
+                # Persistir el SAS: una reanudación tras reiniciar lo reutiliza mientras no caduque
+                from datetime import datetime, timedelta, timezone
+                expiry = datetime.now(timezone.utc) + timedelta(seconds=86400)
+                self.sas_granted.emit(self.sas_url, expiry.isoformat())
             
-            self.progress.emit(30, "Iniciando descarga...")
-            
-            # Check if we're resuming an existing file
-            existing_size = 0
-            if os.path.exists(self.output_path) and self.start_byte > 0:
-                existing_size = os.path.getsize(self.output_path)
-                if existing_size > 0:
-                    self.start_byte = existing_size
-            
-            # Prepare headers for range request
-            headers = {}
-            if self.start_byte > 0:
-                headers['Range'] = f'bytes={self.start_byte}-'
-                self.progress.emit(30, f"Reanudando desde {self.start_byte / (1024**3):.2f} GB...")
-            
-            response = requests.get(self.sas_url, stream=True, headers=headers)
-            response.raise_for_status()
-            
-            # Handle partial content (206) or full content (200)
-            if response.status_code == 206:
-                # Partial content - we're resuming
-                content_range = response.headers.get('content-range', '')
-                if '/' in content_range:
-                    total_size = int(content_range.split('/')[-1])
-                else:
-                    total_size = int(response.headers.get('content-length', 0)) + self.start_byte
-            else:
-                # Full content - start from beginning
-                total_size = int(response.headers.get('content-length', 0))
-                self.start_byte = 0
+            self.progress.emit(30, f"Iniciando descarga ({self.max_connections} conexiones)...")
             
-            downloaded = self.start_byte
-            
-            # Open file in append mode if resuming, write mode if starting fresh
-            mode = 'ab' if self.start_byte > 0 else 'wb'
-            
-            with open(self.output_path, mode) as f:
-                for chunk in response.iter_content(chunk_size=8192 * 1024):  # 8MB chunks
-                    if self._should_stop:
-                        self.finished.emit(False, "⏸️ Descarga pausada")
-                        return
-                    
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        
-                        # Emit byte-level progress for TransferManager
-                        self.progress_bytes.emit(downloaded, total_size)
-                        
-                        if total_size > 0:
-                            pct = int((downloaded / total_size) * 70) + 30
-                            gb_dl = downloaded / (1024**3)
-                            gb_total = total_size / (1024**3)
-                            self.progress.emit(pct, f"Descargando: {gb_dl:.2f} / {gb_total:.2f} GB")
+            try:
+                if self.compressed:
+                    # Compresión zstd en paralelo mientras se descarga
+                    export_disk_compressed(
+                        self.sas_url, self.output_path,
+                        max_connections=self.max_connections,
+                        level=self.compression_level,
+                        progress_callback=self._on_progress,
+                        cancel_event=self._cancel_event,
+                        sparse=self.sparse,
+                    )
+                else:
+                    download_disk(
+                        self.sas_url, self.output_path,
+                        max_connections=self.max_connections,
+                        progress_callback=self._on_progress,
+                        cancel_event=self._cancel_event,
+                        sparse=self.sparse,
+                        integrity_callback=self.integrity_checked.emit,
+                        chunk_ledger=self.chunk_ledger,
+                    )
+            except DownloadCancelled:
+                self.finished.emit(False, "⏸️ Descarga pausada")
+                return
             
             # Only revoke access if we obtained a new SAS
             if self.credential:
@@ -323,17 +334,50 @@ class DownloadDiskWorker(QThread):
             self.finished.emit(True, f"✅ Disco descargado en:\n{self.output_path}")
         except Exception as e:
             self.finished.emit(False, f"❌ Error: {str(e)}")
+    
+    def _on_progress(self, bytes_done, total_size):
+        if self.transfer_priority is not None:
+            # Los avisos llegan desde los hilos de los segmentos: frenar al que avisa
+            with self._progress_lock:
+                # El primer aviso (tras reanudar) solo fija la base, no se cobra
+                delta = 0 if self._throttled_bytes is None else bytes_done - self._throttled_bytes
+                self._throttled_bytes = max(bytes_done, self._throttled_bytes or 0)
+            if delta > 0:
+                get_transfer_manager().throttle(DOWNLOAD, delta, self.transfer_priority, self._cancel_event)
+        now = time.monotonic()
+        if bytes_done < total_size and now - self._last_report < self.PROGRESS_INTERVAL:
+            return
+        self._last_report = now
+        
+        # Emit byte-level progress for TransferManager
+        self.progress_bytes.emit(bytes_done, total_size)
+        if total_size > 0:
+            pct = int((bytes_done / total_size) * 65) + 30
+            gb_dl = bytes_done / (1024**3)
+            gb_total = total_size / (1024**3)
+            self.progress.emit(pct, f"Descargando: {gb_dl:.2f} / {gb_total:.2f} GB")
 
 
 
 
 class AzureToGCPTransferWorker(QThread):
-    """Worker para transferir disco de Azure a GCP (Streaming)"""
+    """
+    Worker para transferir disco de Azure a GCP sin descarga local.
+
+    Lee rangos del SAS en paralelo y los sube como componentes que GCS une
+    con ``compose``; los componentes subidos sobreviven a un corte y la
+    reanudación solo envía los que faltan.
+    """
     progress = pyqtSignal(int, str)
+    progress_bytes = pyqtSignal(int, int)  # bytes_transferred, total_bytes
+    integrity_checked = pyqtSignal(object)  # IntegrityCheck de los componentes y el compuesto
     finished = pyqtSignal(bool, str)
     
+    # Intervalo mínimo entre avisos de progreso (los emiten varios hilos)
+    PROGRESS_INTERVAL = 0.5
+    
     def __init__(self, azure_credential, subscription_id, resource_group, disk_name, 
-                 gcp_bucket_name, gcp_blob_name=None):
+                 gcp_bucket_name, gcp_blob_name=None, sparse=True, max_connections=DEFAULT_DISK_CONNECTIONS):
         super().__init__()
         self.cred = azure_credential
         self.sub_id = subscription_id
@@ -341,14 +385,22 @@ class AzureToGCPTransferWorker(QThread):
         self.disk_name = disk_name
         self.bucket_name = gcp_bucket_name
         self.blob_name = gcp_blob_name or f"{disk_name}.vhd"
-        self._is_running = True
+        # Leer de Azure solo las páginas asignadas (los ceros se generan en local)
+        self.sparse = sparse
+        self.max_connections = max_connections
+        self._cancel_event = threading.Event()
+        # La asigna TransferManager.start_worker; sin ella no se limita la banda
+        self.transfer_priority = None
+        # Lo asigna AzureTab._track_worker: manifiesto de componentes en TransferInfo
+        self.chunk_ledger = None
+        self._progress_lock = threading.Lock()
+        self._last_report = 0.0
+        self._throttled_bytes = None
         
     def run(self):
         try:
             from azure.mgmt.compute import ComputeManagementClient
             from google.cloud import storage
-            import requests
-            import time
             
             # 1. Obtener SAS de Azure
             self.progress.emit(5, "Conectando con Azure...")
@@ -367,71 +419,36 @@ class AzureToGCPTransferWorker(QThread):
             # Asumimos que GOOGLE_APPLICATION_CREDENTIALS ya está seteado por la UI
             storage_client = storage.Client()
             bucket = storage_client.bucket(self.bucket_name)
-            blob = bucket.blob(self.blob_name)
-            
-            # 3. Streaming Upload
-            self.progress.emit(20, "Iniciando transferencia (Streaming)...")
-            
-            # Obtener stream de Azure
-            response = requests.get(sas_url, stream=True)
-            response.raise_for_status()
-            total_size = int(response.headers.get('content-length', 0))
-            
-            # Clase adaptador para reportar progreso durante la lectura del stream
-            class ProgressReader:
-                def __init__(self, stream, total, progress_signal, worker):
-                    self.stream = stream
-                    self.total = total
-                    self.downloaded = 0
-                    self.signal = progress_signal
-                    self.worker = worker
-                    self.last_emit = 0
-
-                def read(self, size=-1):
-                    if not self.worker._is_running:
-                        raise Exception("Transferencia cancelada por usuario")
-                        
-                    data = self.stream.read(size)
-                    if data:
-                        self.downloaded += len(data)
-                        # Emitir cada 1% o cada 2MB para no saturar
-                        if self.total > 0:
-                            pct = int((self.downloaded / self.total) * 100)
-                            # Mapear 20-95% en la barra global
-                            ui_pct = 20 + int(pct * 0.75)
-                            
-                            current_time = time.time()
-                            if current_time - self.last_emit > 0.5: # Throttle emits
-                                gb_dl = self.downloaded / (1024**3)
-                                gb_tot = self.total / (1024**3)
-                                self.signal.emit(ui_pct, f"Transfiriendo: {gb_dl:.2f} / {gb_tot:.2f} GB ({pct}%)")
-                                self.last_emit = current_time
-                    return data
-                
-                def tell(self):
-                    """Return current position in stream (required by GCP upload)"""
-                    return self.downloaded
-                
-                def seek(self, pos, whence=0):
-                    """Seek is not supported for streaming, but GCP may call it"""
-                    if pos == 0 and whence == 0:
-                        # GCP may try to seek to start - we can't, but we can ignore
-                        pass
-                    # For streaming, we just ignore seeks
-                    return self.downloaded
-                
-                def readable(self):
-                    return True
-                
-                def seekable(self):
-                    return False
-
-
-            adapter = ProgressReader(response.raw, total_size, self.progress, self)
             
-            # Subir usando upload_from_file que consumirá el adaptador
-            # blob.upload_from_file espera un objeto file-like y hace read()
-            blob.upload_from_file(adapter, content_type="application/octet-stream")
+            # 3. Subida por componentes en paralelo
+            self.progress.emit(20, f"Iniciando transferencia ({self.max_connections} conexiones)...")
+            session = open_session(self.max_connections)
+            try:
+                total_size, etag = probe_disk(session, sas_url)
+                data_ranges = sparse_ranges(session, sas_url, total_size) if self.sparse else None
+                if data_ranges is None:
+                    data_ranges = [(0, total_size - 1)]
+                fetch_range = range_fetcher(session, sas_url, etag)
+                uploader = ComposeUploader(
+                    bucket, self.blob_name, total_size,
+                    lambda start, end: SparseRangeReader(fetch_range, total_size, data_ranges, start, end),
+                    tag=source_tag(etag, total_size, DEFAULT_COMPONENT_SIZE),
+                    max_concurrency=self.max_connections,
+                    progress_callback=self._on_progress,
+                    cancel_event=self._cancel_event,
+                    chunk_ledger=self.chunk_ledger,
+                )
+                try:
+                    result = uploader.upload()
+                except ComposeUploadCancelled:
+                    self.finished.emit(False, "⏸️ Transferencia pausada")
+                    return
+                except ComposeIntegrityError as e:
+                    self.integrity_checked.emit(e.integrity)
+                    raise
+            finally:
+                session.close()
+            self.integrity_checked.emit(result.integrity)
             
             # 4. Finalizar
             self.progress.emit(95, "Revocando SAS en Azure...")
@@ -440,14 +457,38 @@ class AzureToGCPTransferWorker(QThread):
                 disk_name=self.disk_name
             ).wait()
             
+            reused = f"\n({result.reused} de {result.components} componentes ya estaban subidos)" if result.reused else ""
             self.progress.emit(100, "¡Transferencia Completada!")
-            self.finished.emit(True, f"✅ Disco transferido a GCP:\nBucket: {self.bucket_name}\nArchivo: {self.blob_name}")
+            self.finished.emit(True, f"✅ Disco transferido a GCP:\nBucket: {self.bucket_name}\nArchivo: {self.blob_name}{reused}")
             
         except Exception as e:
             self.finished.emit(False, f"❌ Error: {str(e)}")
+    
+    def _on_progress(self, bytes_done, total_size):
+        if self.transfer_priority is not None:
+            # Los avisos llegan desde los hilos de los componentes: frenar al que avisa
+            with self._progress_lock:
+                # El primer aviso (tras reanudar) solo fija la base, no se cobra
+                delta = 0 if self._throttled_bytes is None else bytes_done - self._throttled_bytes
+                self._throttled_bytes = max(bytes_done, self._throttled_bytes or 0)
+            if delta > 0:
+                get_transfer_manager().throttle(UPLOAD, delta, self.transfer_priority, self._cancel_event)
+        now = time.monotonic()
+        if bytes_done < total_size and now - self._last_report < self.PROGRESS_INTERVAL:
+            return
+        self._last_report = now
+        
+        self.progress_bytes.emit(bytes_done, total_size)
+        if total_size > 0:
+            pct = int((bytes_done / total_size) * 100)
+            gb_done = bytes_done / (1024**3)
+            gb_total = total_size / (1024**3)
+            # Mapear 20-95% en la barra global
+            self.progress.emit(20 + int(pct * 0.75), f"Transfiriendo: {gb_done:.2f} / {gb_total:.2f} GB ({pct}%)")
             
     def stop(self):
-        self._is_running = False
+        """Detener conservando los componentes ya subidos"""
+        self._cancel_event.set()
 
 
 
@@ -578,6 +619,7 @@ class GetResourceGroupsWorker(QThread):
 class S3UploadWorker(QThread):
     """Worker para subir archivos a S3"""
     progress = pyqtSignal(int, str)
+    progress_bytes = pyqtSignal(int, int)  # bytes_uploaded, total_bytes
     finished = pyqtSignal(bool, str)
     
     def __init__(self, s3_handler, bucket_name, file_path, object_name=None):
@@ -586,12 +628,16 @@ class S3UploadWorker(QThread):
         self.bucket = bucket_name
         self.file_path = file_path
         self.object_name = object_name or os.path.basename(file_path)
+        self.transfer_priority = None
         
     def run(self):
         try:
             self.progress.emit(10, f"Iniciando subida a {self.bucket}...")
             # La subida es sincrónica en s3_handler, pero estamos en un thread
-            success = self.s3.upload_file(self.bucket, self.file_path, self.object_name)
+            success = self.s3.upload_file(
+                self.bucket, self.file_path, self.object_name,
+                progress_callback=self._on_part_uploaded
+            )
             
             if success:
                 self.progress.emit(100, "Subida completada")
@@ -601,6 +647,125 @@ class S3UploadWorker(QThread):
         except Exception as e:
             self.finished.emit(False, f"❌ Error subiendo a S3: {str(e)}")
 
+    def _on_part_uploaded(self, part_number, part_bytes, bytes_done, total_bytes):
+        """Progreso por parte del motor multiparte (se llama desde hilos del pool)"""
+        if self.transfer_priority is not None:
+            # Frenar el hilo de la parte retiene su hueco del pool: el ritmo medio respeta el límite
+            get_transfer_manager().throttle(UPLOAD, part_bytes, self.transfer_priority)
+        self.progress_bytes.emit(bytes_done, total_bytes)
+        if total_bytes > 0:
+            pct = 10 + int((bytes_done / total_bytes) * 89)
+            self.progress.emit(pct, f"Subiendo parte {part_number}: "
+                                    f"{bytes_done / (1024**3):.2f} / {total_bytes / (1024**3):.2f} GB")
+
+
+class AzureToS3TransferWorker(QThread):
+    """
+    Worker para exportar un disco de Azure a Vultr S3 sin archivo temporal.
+
+    Las partes multiparte se leen del SAS por rangos (solo las páginas
+    asignadas; los huecos son ceros generados en local) y se suben en
+    paralelo. El manifiesto multiparte permite reanudar tras un corte.
+    """
+    progress = pyqtSignal(int, str)
+    progress_bytes = pyqtSignal(int, int)  # bytes_uploaded, total_bytes
+    sas_granted = pyqtSignal(str, str)  # sas_url, caducidad (ISO, UTC)
+    finished = pyqtSignal(bool, str)
+    
+    def __init__(self, credential, subscription_id, resource_group, disk_name, s3_handler,
+                 bucket_name, object_name=None, sas_url=None, sparse=True,
+                 max_connections=DEFAULT_DISK_CONNECTIONS):
+        super().__init__()
+        self.credential = credential
+        self.subscription_id = subscription_id
+        self.resource_group = resource_group
+        self.disk_name = disk_name
+        self.s3 = s3_handler
+        self.bucket = bucket_name
+        self.object_name = object_name or f"{disk_name}.vhd"
+        self.sas_url = sas_url  # SAS vigente de una ejecución anterior
+        self.sparse = sparse
+        self.max_connections = max_connections
+        self._cancel_event = threading.Event()
+        # La asigna TransferManager.start_worker; sin ella no se limita la banda
+        self.transfer_priority = None
+    
+    def stop(self):
+        """Detener conservando las partes ya subidas"""
+        self._cancel_event.set()
+    
+    def run(self):
+        try:
+            from azure.mgmt.compute import ComputeManagementClient
+            
+            granted = False
+            if not self.sas_url:
+                self.progress.emit(5, "Solicitando acceso al disco...")
+                compute_client = ComputeManagementClient(self.credential, self.subscription_id)
+                grant_access_result = compute_client.disks.begin_grant_access(
+                    resource_group_name=self.resource_group,
+                    disk_name=self.disk_name,
+                    grant_access_data={'access': 'Read', 'duration_in_seconds': 86400}
+                ).result()
+                self.sas_url = grant_access_result.access_sas
+                granted = True
+                from datetime import datetime, timedelta, timezone
+                expiry = datetime.now(timezone.utc) + timedelta(seconds=86400)
+                self.sas_granted.emit(self.sas_url, expiry.isoformat())
+            
+            self.progress.emit(10, f"Iniciando subida directa a {self.bucket}...")
+            session = open_session(self.max_connections)
+            try:
+                total_size, etag = probe_disk(session, self.sas_url)
+                data_ranges = sparse_ranges(session, self.sas_url, total_size) if self.sparse else None
+                if data_ranges is None:
+                    data_ranges = [(0, total_size - 1)]
+                # Cada parte se relee entera si la conexión con Azure se corta a mitad
+                read_part = window_reader(range_fetcher(session, self.sas_url, etag), total_size,
+                                          data_ranges, self._cancel_event)
+                
+                # El manifiesto solo se reutiliza si el disco es el mismo (ETag y tamaño)
+                source_id = f"azure://{self.resource_group}/{self.disk_name}|{(etag or '').strip(chr(34))}"
+                success = self.s3.upload_stream(
+                    self.bucket, self.object_name, read_part, total_size, source_id,
+                    progress_callback=self._on_part_uploaded,
+                    cancel_event=self._cancel_event,
+                )
+            finally:
+                session.close()
+            
+            if not success:
+                if self._cancel_event.is_set():
+                    self.finished.emit(False, "⏸️ Subida pausada")
+                else:
+                    self.finished.emit(False, f"❌ {self.s3.last_error or 'Falló la subida a S3'}")
+                return
+            
+            if granted:
+                self.progress.emit(99, "Revocando acceso...")
+                try:
+                    compute_client.disks.begin_revoke_access(
+                        resource_group_name=self.resource_group,
+                        disk_name=self.disk_name
+                    ).result()
+                except Exception:
+                    pass  # Ignore revoke errors
+            
+            self.progress.emit(100, "Subida completada")
+            self.finished.emit(True, f"✅ Disco exportado a Vultr S3:\nBucket: {self.bucket}\nArchivo: {self.object_name}")
+        except Exception as e:
+            self.finished.emit(False, f"❌ Error: {str(e)}")
+    
+    def _on_part_uploaded(self, part_number, part_bytes, bytes_done, total_bytes):
+        """Progreso por parte del motor multiparte (se llama desde hilos del pool)"""
+        if self.transfer_priority is not None:
+            get_transfer_manager().throttle(UPLOAD, part_bytes, self.transfer_priority, self._cancel_event)
+        self.progress_bytes.emit(bytes_done, total_bytes)
+        if total_bytes > 0:
+            pct = 10 + int((bytes_done / total_bytes) * 89)
+            self.progress.emit(pct, f"Subiendo parte {part_number}: "
+                                    f"{bytes_done / (1024**3):.2f} / {total_bytes / (1024**3):.2f} GB")
+
 
 # ============================================================================
 # PESTAÑA PRINCIPAL DE AZURE
@@ -692,6 +857,7 @@ class AzureTab(QWidget):
             
             # Initialize transfer manager reference
             self.transfer_manager = get_transfer_manager()
+            self._register_resume_adapters()
         else:
             self.transfer_queue = None
             self.transfer_manager = None
@@ -1411,6 +1577,10 @@ class AzureTab(QWidget):
         # Guardar subscription para futuro uso
         self.save_subscription()
         
+        # Con credenciales ya se pueden renovar SAS: reanudar lo interrumpido
+        if self.transfer_manager:
+            self.transfer_manager.resume_coordinator.resume_pending()
+        
         QMessageBox.information(self, "Conectado",
             f"✅ Conexión exitosa!\n\nAhora puedes ir a la pestaña 'Mis Discos' para ver y descargar tus discos.")
     
@@ -1606,7 +1776,8 @@ class AzureTab(QWidget):
             return
 
         try:
-            s3 = S3Handler(data['access_key'], data['secret_key'], data['host_base'])
+            s3 = S3Handler(data['access_key'], data['secret_key'], data['host_base'],
+                           transfer_plan=cm.get_active_plan_config())
             buckets, error = s3.list_buckets()
             self.bucket_combo.clear()
             if buckets:
@@ -1701,10 +1872,15 @@ class AzureTab(QWidget):
         is_temp = False
         
         if dest_index == 0: # Local
+            file_filter = "VHD Files (*.vhd);;All Files (*)"
+            default_name = f"{disk['name']}.vhd"
+            if ZSTD_AVAILABLE:
+                # .vhd.zst: comprimido mientras se descarga, con acceso aleatorio por tramas
+                file_filter = "VHD Files (*.vhd);;VHD comprimido (*.vhd.zst);;All Files (*)"
+                if ConfigManager().get_transfer_settings().get('azure_compressed_export', False):
+                    default_name += ZSTD_SUFFIX
             file_path, _ = QFileDialog.getSaveFileName(
-                self, "Guardar disco como...",
-                f"{disk['name']}.vhd",
-                "VHD Files (*.vhd);;All Files (*)"
+                self, "Guardar disco como...", default_name, file_filter
             )
             if not file_path:
                 return
@@ -1715,17 +1891,13 @@ class AzureTab(QWidget):
                 QMessageBox.warning(self, "Error", "Selecciona un bucket de Vultr")
                 return
             
-            # Use temp folder
-            import tempfile
-            temp_dir = tempfile.gettempdir()
-            file_path = os.path.join(temp_dir, f"{disk['name']}.vhd")
-            is_temp = True
-            
-            reply = QMessageBox.question(self, "Confirmar Descarga y Subida", 
-                f"El disco se descargará temporalmente a:\n{file_path}\n\nY luego se subirá al bucket:\n{bucket}\n\n¿Continuar?",
+            reply = QMessageBox.question(self, "Confirmar Exportación", 
+                f"El disco se subirá directamente (sin archivo temporal) al bucket:\n{bucket}\n\n¿Continuar?",
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
             if reply != QMessageBox.StandardButton.Yes:
                 return
+            self._start_azure_to_s3(disk, bucket)
+            return
 
         elif dest_index == 2: # Azure Transfer
             tgt_profile_name = self.target_profile_combo.currentText()
@@ -1770,7 +1942,7 @@ class AzureTab(QWidget):
             )
             self.transfer_worker.progress.connect(self.on_download_progress)
             self.transfer_worker.finished.connect(self.on_transfer_finished)
-            self.transfer_worker.start()
+            self._start_scheduled(self.transfer_worker)
             return # Salir, no seguir con flujo de descarga local
 
         elif dest_index == 3: # GCP Transfer
@@ -1783,7 +1955,7 @@ class AzureTab(QWidget):
                 f"TRANSFERENCIA DIRECTA AZURE -> GCP\n\n"
                 f"Origen: {disk['name']} ({disk['size_gb']} GB)\n"
                 f"Destino: Bucket '{gcp_bucket}'\n"
-                f"Modo: Streaming Directo (Sin descarga local)\n\n"
+                f"Modo: Directo por componentes en paralelo (Sin descarga local)\n\n"
                 f"¿Iniciar transferencia?",
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
             
@@ -1793,18 +1965,29 @@ class AzureTab(QWidget):
             self.download_progress.setVisible(True)
             self.download_progress.setValue(0)
             self.download_status.setVisible(True)
-            self.download_status.setText("Iniciando streaming a GCP...")
+            self.download_status.setText("Iniciando transferencia a GCP...")
             
             self.gcp_transfer_worker = AzureToGCPTransferWorker(
                 azure_credential=self.active_credential,
                 subscription_id=self.subscription_id,
                 resource_group=disk['resource_group'],
                 disk_name=disk['name'],
-                gcp_bucket_name=gcp_bucket
+                gcp_bucket_name=gcp_bucket,
+                **self._disk_options()
             )
             self.gcp_transfer_worker.progress.connect(self.on_download_progress)
             self.gcp_transfer_worker.finished.connect(self.on_transfer_finished)
-            self.gcp_transfer_worker.start()
+            if self.transfer_manager:
+                transfer_id = self.transfer_manager.create_transfer(
+                    TransferType.AZURE_TO_GCP, disk['name'], f"azure://{disk['resource_group']}/{disk['name']}",
+                    f"gs://{gcp_bucket}/{self.gcp_transfer_worker.blob_name}",
+                    subscription_id=self.subscription_id, resource_group=disk['resource_group'],
+                    disk_name=disk['name'], bucket_name=gcp_bucket, blob_name=self.gcp_transfer_worker.blob_name,
+                )
+                self._track_worker(self.gcp_transfer_worker, transfer_id)
+                self.transfer_manager.start_worker(self.gcp_transfer_worker, transfer_id, TransferPriority.BACKGROUND)
+            else:
+                self.gcp_transfer_worker.start()
             return
 
         self.download_progress.setVisible(True)
@@ -1816,11 +1999,44 @@ class AzureTab(QWidget):
             self.subscription_id,
             disk['resource_group'],
             disk['name'],
-            file_path
+            file_path,
+            compression_level=self._compression_level(),
+            **self._disk_options()
         )
         self.download_worker.finished.connect(lambda s, m: self.on_download_finished_chain(s, m, dest_index, file_path, is_temp))
         self.download_worker.progress.connect(self.on_download_progress)
-        self.download_worker.start()
+        if self.transfer_manager:
+            # Registrada para poder reanudarla (también tras un reinicio)
+            transfer_id = self.transfer_manager.create_transfer(
+                TransferType.AZURE_TO_LOCAL, disk['name'], f"azure://{disk['resource_group']}/{disk['name']}",
+                file_path, subscription_id=self.subscription_id, resource_group=disk['resource_group'],
+                disk_name=disk['name'],
+            )
+            self.download_worker.transfer_id = transfer_id
+            self._track_worker(self.download_worker, transfer_id)
+            self.transfer_manager.start_worker(self.download_worker, transfer_id, TransferPriority.BACKGROUND)
+        else:
+            self.download_worker.start()
+
+    def _disk_options(self):
+        """Conexiones simultáneas y modo disperso de las exportaciones de disco (configurables)"""
+        settings = ConfigManager().get_transfer_settings()
+        return {
+            'max_connections': max(1, int(settings.get('azure_disk_connections', DEFAULT_DISK_CONNECTIONS))),
+            'sparse': bool(settings.get('azure_sparse_export', True)),
+        }
+    
+    def _compression_level(self):
+        """Nivel zstd de las exportaciones comprimidas (configurable)"""
+        settings = ConfigManager().get_transfer_settings()
+        return int(settings.get('azure_compression_level', DEFAULT_COMPRESSION_LEVEL))
+    
+    def _start_scheduled(self, worker):
+        """Arrancar un worker de disco como transferencia de fondo del planificador global"""
+        if TRANSFER_MANAGER_AVAILABLE:
+            get_transfer_manager().start_worker(worker, priority=TransferPriority.BACKGROUND)
+        else:
+            worker.start()
 
     def on_transfer_finished(self, success, message):
         self.download_progress.setVisible(False)
@@ -1837,29 +2053,78 @@ class AzureTab(QWidget):
             
         if dest_index == 0 or dest_index == 2: # Local or Azure (fallback)
              self.on_download_finished(True, message)
+
+    def _vultr_s3_handler(self, profile_name=None):
+        """S3Handler del perfil indicado (o del activo); (None, None) sin credenciales"""
+        if not S3_AVAILABLE:
+            return None, None
+        cm = ConfigManager()
+        vultr_profile = profile_name or cm.get_active_profile()
+        if not vultr_profile:
+            # Fallback check
+            profs = cm.list_profiles()
+            if profs: vultr_profile = profs[0]
+
+        data = cm.get_config(vultr_profile) if vultr_profile else None
+        if not data:
+            return None, None
+        s3 = S3Handler(data['access_key'], data['secret_key'], data['host_base'],
+                       transfer_plan=cm.get_active_plan_config())
+        return s3, vultr_profile
+
+    def _start_azure_to_s3(self, disk, bucket):
+        """Exportar el disco a Vultr S3 en streaming (rangos del SAS -> partes multiparte)"""
+        s3, vultr_profile = self._vultr_s3_handler()
+        if not s3:
+            QMessageBox.warning(self, "Error", "No se pudieron cargar las credenciales de Vultr para la subida.")
+            return
         
-        elif dest_index == 1: # Vultr S3
-            self.download_status.setText("⬆️ Iniciando subida a Vultr S3...")
-            bucket = self.bucket_combo.currentText()
-            
-            # Initialize S3 Handler
-            cm = ConfigManager()
-            vultr_profile = cm.get_active_profile()
-            if not vultr_profile:
-                # Fallback check
-                profs = cm.list_profiles()
-                if profs: vultr_profile = profs[0]
-
-            data = cm.get_config(vultr_profile)
-            if not data:
-                self.on_download_finished(False, "No se pudieron cargar las credenciales de Vultr para la subida.")
-                return
-                
-            s3 = S3Handler(data['access_key'], data['secret_key'], data['host_base'])
-            
-            self.upload_worker = S3UploadWorker(s3, bucket, file_path)
-            self.upload_worker.progress.connect(self.on_download_progress) # Reuse progress bar
-            self.upload_worker.finished.connect(lambda s, m: self.on_upload_finished(s, m, file_path, is_temp))
+        self.download_progress.setVisible(True)
+        self.download_progress.setValue(0)
+        self.download_status.setVisible(True)
+        self.download_status.setText("⬆️ Iniciando exportación a Vultr S3...")
+        
+        self.upload_worker = AzureToS3TransferWorker(
+            self.active_credential, self.subscription_id, disk['resource_group'], disk['name'],
+            s3, bucket, **self._disk_options()
+        )
+        self.upload_worker.progress.connect(self.on_download_progress)
+        self.upload_worker.finished.connect(self.on_transfer_finished)
+        if self.transfer_manager:
+            object_name = self.upload_worker.object_name
+            transfer_id = self.transfer_manager.create_transfer(
+                TransferType.AZURE_TO_S3, disk['name'], f"azure://{disk['resource_group']}/{disk['name']}",
+                f"{bucket}/{object_name}", subscription_id=self.subscription_id,
+                resource_group=disk['resource_group'], disk_name=disk['name'],
+                bucket_name=bucket, blob_name=object_name, profile_name=vultr_profile,
+            )
+            self._track_worker(self.upload_worker, transfer_id)
+            self.transfer_manager.start_worker(self.upload_worker, transfer_id, TransferPriority.BACKGROUND)
+        else:
+            self.upload_worker.start()
+
+    def _start_s3_upload(self, file_path, bucket, is_temp):
+        """Subir a Vultr S3 el disco descargado (segunda fase de una exportación anterior)"""
+        self.download_status.setText("⬆️ Iniciando subida a Vultr S3...")
+        
+        s3, vultr_profile = self._vultr_s3_handler()
+        if not s3:
+            self.on_download_finished(False, "No se pudieron cargar las credenciales de Vultr para la subida.")
+            return
+        
+        self.upload_worker = S3UploadWorker(s3, bucket, file_path)
+        self.upload_worker.progress.connect(self.on_download_progress) # Reuse progress bar
+        self.upload_worker.finished.connect(lambda s, m: self.on_upload_finished(s, m, file_path, is_temp))
+        if self.transfer_manager:
+            object_name = self.upload_worker.object_name
+            transfer_id = self.transfer_manager.create_transfer(
+                TransferType.S3_UPLOAD, object_name, file_path, f"{bucket}/{object_name}",
+                os.path.getsize(file_path), bucket_name=bucket, blob_name=object_name,
+                profile_name=vultr_profile,
+            )
+            self._track_worker(self.upload_worker, transfer_id)
+            self.transfer_manager.start_worker(self.upload_worker, transfer_id, TransferPriority.BACKGROUND)
+        else:
             self.upload_worker.start()
             
     def on_upload_finished(self, success, message, file_path, is_temp):
@@ -2066,22 +2331,65 @@ class AzureTab(QWidget):
             QMessageBox.warning(self, "Error", "Transferencia no encontrada")
             return
         
-        # Check if SAS URL is still valid
-        if not transfer.sas_url:
-            # Need to get a new SAS - requires fresh credentials
-            if not self.active_credential:
-                QMessageBox.warning(self, "Error", 
-                    "Debes conectarte primero para obtener un nuevo SAS URL.\n"
-                    "Después podrás reanudar la descarga.")
+        try:
+            # Mismo adaptador que la reanudación automática (renueva el SAS si caducó)
+            self.transfer_manager.resume_coordinator.resume(transfer_id)
+        except ResumeNotReady as e:
+            QMessageBox.warning(self, "Error", f"{e}.\nDespués podrás reanudar la transferencia.")
+            return
+        except KeyError:
+            QMessageBox.warning(self, "Error", "Este tipo de transferencia no se puede reanudar.")
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"No se pudo reanudar: {str(e)}")
+            return
+        
+        QMessageBox.information(self, "Reanudando", 
+            f"Reanudando:\n{transfer.name}\n\nDesde: {transfer.bytes_transferred/(1024**3):.2f} GB")
+    
+    # =================================================================
+    # REANUDACIÓN AUTOMÁTICA - Adaptadores por tipo de transferencia
+    # =================================================================
+    
+    def _register_resume_adapters(self):
+        coordinator = self.transfer_manager.resume_coordinator
+        coordinator.register(TransferType.AZURE_TO_LOCAL, self._resume_disk_download)
+        coordinator.register(TransferType.AZURE_TO_GCP, self._resume_azure_to_gcp)
+        coordinator.register(TransferType.S3_UPLOAD, self._resume_s3_upload)
+        coordinator.register(TransferType.AZURE_TO_S3, self._resume_azure_to_s3)
+    
+    def _track_worker(self, worker, transfer_id):
+        """Reflejar en el TransferManager el progreso, el SAS renovado y el final del worker"""
+        def on_progress(bytes_done, total_bytes):
+            self.transfer_manager.update_progress(transfer_id, bytes_done, "", total_bytes)
+        
+        def on_finished(success, message):
+            transfer = self.transfer_manager.get_transfer(transfer_id)
+            # La pausa del usuario también termina el worker: no es un error
+            if not success and transfer and transfer.status == TransferStatus.PAUSED.value:
                 return
-            
-            # Will get new SAS in worker
-            sas_url = None
-        else:
-            # Use existing SAS URL
-            sas_url = transfer.sas_url
+            self.transfer_manager.complete_transfer(transfer_id, success, message)
+        
+        worker.progress_bytes.connect(on_progress)
+        worker.finished.connect(on_finished)
+        if hasattr(worker, 'sas_granted'):
+            worker.sas_granted.connect(lambda url, expiry: self.transfer_manager.update_transfer(
+                transfer_id, sas_url=url, sas_expiry=expiry))
+        if hasattr(worker, 'integrity_checked'):
+            worker.integrity_checked.connect(
+                lambda check: self.transfer_manager.record_integrity(transfer_id, check))
+        if hasattr(worker, 'chunk_ledger'):
+            worker.chunk_ledger = self.transfer_manager.chunk_ledger(transfer_id)
+    
+    def _resume_disk_download(self, transfer):
+        """Azure -> local: continuar desde los segmentos ya descargados"""
+        sas_url = transfer.sas_url
+        if sas_expired(transfer.sas_url, transfer.sas_expiry):
+            if not self.active_credential:
+                raise ResumeNotReady("El SAS caducó: conéctate a Azure para obtener uno nuevo")
+            sas_url = None  # El worker solicita uno nuevo
         
-        # Create worker for resume
+        # El mapa de segmentos junto al .part es el punto de control: solo se piden los que faltan
         worker = DownloadDiskWorker(
             credential=self.active_credential,
             subscription_id=transfer.subscription_id,
@@ -2089,30 +2397,67 @@ class AzureTab(QWidget):
             disk_name=transfer.disk_name,
             output_path=transfer.destination,
             sas_url=sas_url,
-            start_byte=transfer.bytes_transferred,
-            transfer_id=transfer_id
+            transfer_id=transfer.id,
+            compression_level=self._compression_level(),
+            **self._disk_options()
         )
-        
-        # Connect signals to TransferManager
-        def update_transfer_progress(bytes_dl, total_bytes):
-            self.transfer_manager.update_progress(
-                transfer_id, bytes_dl, 
-                f"Descargando: {bytes_dl/(1024**3):.2f} / {total_bytes/(1024**3):.2f} GB",
-                total_bytes
-            )
-        
-        def on_worker_finished(success, message):
-            self.transfer_manager.complete_transfer(transfer_id, success, message)
-        
-        worker.progress_bytes.connect(update_transfer_progress)
-        worker.finished.connect(on_worker_finished)
-        
-        # Register worker with manager
-        self.transfer_manager.register_worker(transfer_id, worker)
-        
-        # Update status
-        transfer.status = TransferStatus.RUNNING.value
-        
-        worker.start()
-        QMessageBox.information(self, "Reanudando", 
-            f"Reanudando descarga de:\n{transfer.name}\n\nDesde: {transfer.bytes_transferred/(1024**3):.2f} GB")
+        self._track_worker(worker, transfer.id)
+        if transfer.bucket_name:
+            # Exportación a S3 interrumpida en la descarga: al terminar, subir
+            file_path, bucket = transfer.destination, transfer.bucket_name
+            worker.finished.connect(lambda s, m: s and self._start_s3_upload(file_path, bucket, True))
+        return worker
+    
+    def _resume_azure_to_gcp(self, transfer):
+        """Azure -> GCS: con un SAS nuevo; los componentes ya subidos al bucket se reutilizan"""
+        if not self.active_credential:
+            raise ResumeNotReady("Conéctate a Azure para reanudar la transferencia a GCP")
+        if not os.environ.get("GOOGLE_APPLICATION_CREDENTIALS"):
+            raise ResumeNotReady("Conéctate a GCP para reanudar la transferencia")
+        worker = AzureToGCPTransferWorker(
+            azure_credential=self.active_credential,
+            subscription_id=transfer.subscription_id,
+            resource_group=transfer.resource_group,
+            disk_name=transfer.disk_name,
+            gcp_bucket_name=transfer.bucket_name,
+            gcp_blob_name=transfer.blob_name,
+            **self._disk_options()
+        )
+        self._track_worker(worker, transfer.id)
+        return worker
+    
+    def _resume_azure_to_s3(self, transfer):
+        """Azure -> S3 directo: el manifiesto multiparte conserva las partes ya subidas"""
+        if not S3_AVAILABLE:
+            raise ResumeNotReady("Soporte S3 no disponible")
+        sas_url = transfer.sas_url
+        if sas_expired(transfer.sas_url, transfer.sas_expiry):
+            if not self.active_credential:
+                raise ResumeNotReady("El SAS caducó: conéctate a Azure para obtener uno nuevo")
+            sas_url = None  # El worker solicita uno nuevo
+        s3, _ = self._vultr_s3_handler(transfer.profile_name)
+        if not s3:
+            raise ResumeNotReady(f"Perfil S3 '{transfer.profile_name}' no disponible")
+        worker = AzureToS3TransferWorker(
+            self.active_credential, transfer.subscription_id, transfer.resource_group,
+            transfer.disk_name, s3, transfer.bucket_name, transfer.blob_name,
+            sas_url=sas_url, **self._disk_options()
+        )
+        self._track_worker(worker, transfer.id)
+        return worker
+    
+    def _resume_s3_upload(self, transfer):
+        """Disco -> S3: el manifiesto multiparte conserva las partes ya subidas"""
+        if not S3_AVAILABLE:
+            raise ResumeNotReady("Soporte S3 no disponible")
+        if not os.path.exists(transfer.source):
+            raise FileNotFoundError(f"El archivo local ya no existe: {transfer.source}")
+        cm = ConfigManager()
+        data = cm.get_config(transfer.profile_name) if transfer.profile_name else None
+        if not data:
+            raise ResumeNotReady(f"Perfil S3 '{transfer.profile_name}' no disponible")
+        s3 = S3Handler(data['access_key'], data['secret_key'], data['host_base'],
+                       transfer_plan=cm.get_active_plan_config())
+        worker = S3UploadWorker(s3, transfer.bucket_name, transfer.source, transfer.blob_name)
+        self._track_worker(worker, transfer.id)
+        return worker
@@ -17,10 +17,19 @@ from PyQt6.QtGui import QIcon, QAction
 from google.cloud import storage
 from datetime import datetime
 from transfer_manager import get_transfer_manager, TransferType, TransferStatus
+from core.transfer_scheduler import DOWNLOAD, TransferPriority
+from core.resume_coordinator import ResumeNotReady
+from core.integrity import MISMATCH, ExpectedChecksums, verify_digests
 import re
 from ui.transfer_queue_widget import TransferQueueWidget
 from ui.gcp_sync_tab import GCPSyncTab
 
+try:
+    from core.object_index import get_object_index
+    OBJECT_INDEX_AVAILABLE = True
+except ImportError:
+    OBJECT_INDEX_AVAILABLE = False
+
 class GCPWorker(QThread):
     """Worker genérico para operaciones de GCP que pueden bloquear la UI"""
     finished = pyqtSignal(bool, object, str)
@@ -79,16 +88,25 @@ class GCPFolderUploadWorker(QThread):
 
 
 class GCPDownloadWorker(QThread):
-    """Worker para descargas desde GCP integrado con TransferManager"""
+    """
+    Worker para descargas desde GCP integrado con TransferManager.
+
+    El contenido se resume (MD5/CRC32C) mientras se escribe y al final se
+    compara con ``md5Hash``/``crc32c`` del blob; un archivo que no coincide
+    se borra para que la siguiente descarga empiece de cero.
+    """
     finished = pyqtSignal(bool, str)
     
-    def __init__(self, blob, save_path, transfer_id):
+    def __init__(self, blob, save_path, transfer_id, resume=False):
         super().__init__()
         self.blob = blob
         self.save_path = save_path
         self.transfer_id = transfer_id
+        # Al reanudar se continúa desde lo que ya hay en disco
+        self.resume = resume
         self.transfer_manager = get_transfer_manager()
         self._is_running = True
+        self.transfer_priority = TransferPriority.INTERACTIVE
         
     def run(self):
         import time
@@ -101,17 +119,45 @@ class GCPDownloadWorker(QThread):
                 self.finished.emit(False, "Transferencia no encontrada")
                 return
 
-            self.transfer_manager.update_progress(self.transfer_id, 0, "Iniciando...", total_size)
-            
             downloaded = 0
+            if self.resume and os.path.exists(self.save_path):
+                downloaded = os.path.getsize(self.save_path)
+                if total_size:
+                    downloaded = min(downloaded, total_size)
+            
+            self.transfer_manager.update_progress(self.transfer_id, downloaded, "Iniciando...", total_size)
+            
             # Chunk size 1MB
             chunk_size = 1024 * 1024 
             
+            expected = ExpectedChecksums.from_gcs_blob(self.blob)
+            if getattr(self.blob, 'content_encoding', None) == 'gzip':
+                # Se recibe descomprimido: los resúmenes de GCS son del contenido comprimido
+                expected = ExpectedChecksums()
+            hasher = expected.hasher()
+            if downloaded and not expected.empty:
+                # Lo descargado en una sesión anterior se resume una sola vez antes de seguir
+                with open(self.save_path, 'rb') as existing:
+                    remaining = downloaded
+                    while remaining > 0:
+                        chunk = existing.read(min(chunk_size, remaining))
+                        if not chunk:
+                            break
+                        hasher.update(chunk)
+                        remaining -= len(chunk)
+            
             # Usar blob.open('rb') para streaming eficiente
-            with open(self.save_path, 'wb') as f:
+            with open(self.save_path, 'ab' if downloaded else 'wb') as f:
+                f.truncate(downloaded)
                 with self.blob.open('rb') as stream:
+                    if downloaded:
+                        stream.seek(downloaded)
                     while True:
                         if not self._is_running:
+                            info = self.transfer_manager.get_transfer(self.transfer_id)
+                            if info and info.status == TransferStatus.PAUSED.value:
+                                self.finished.emit(False, "Descarga pausada")
+                                return
                             self.transfer_manager.update_transfer(self.transfer_id, status=TransferStatus.CANCELLED)
                             self.finished.emit(False, "Descarga cancelada")
                             return
@@ -120,10 +166,10 @@ class GCPDownloadWorker(QThread):
                         info = self.transfer_manager.get_transfer(self.transfer_id)
                         if not info: break # Eliminado
                         
-                        if info.status == TransferStatus.PAUSED:
+                        if info.status == TransferStatus.PAUSED.value:
                             time.sleep(0.5)
                             continue
-                        elif info.status == TransferStatus.CANCELLED:
+                        elif info.status == TransferStatus.CANCELLED.value:
                             self._is_running = False
                             continue
                             
@@ -132,10 +178,11 @@ class GCPDownloadWorker(QThread):
                             break
                             
                         f.write(chunk)
+                        hasher.update(chunk)
                         downloaded += len(chunk)
+                        self.transfer_manager.throttle(DOWNLOAD, len(chunk), self.transfer_priority)
                         
-                        # Actualizar progreso
-                        speed_val = 0 # Calculate speed if needed
+                        # Actualizar progreso (la velocidad y la ETA las calcula el TransferManager)
                         self.transfer_manager.update_progress(
                             self.transfer_id, 
                             downloaded,
@@ -144,6 +191,11 @@ class GCPDownloadWorker(QThread):
                         )
             
             if self._is_running:
+                check = verify_digests(expected, [hasher.digest()]) if downloaded == total_size else None
+                self.transfer_manager.record_integrity(self.transfer_id, check)
+                if check and check.status == MISMATCH:
+                    os.remove(self.save_path)
+                    raise IOError(f"Descarga corrupta, se ha descartado: {check.message}")
                 self.transfer_manager.complete_transfer(self.transfer_id, True, "Descarga completada exitosamente")
                 self.finished.emit(True, "Descarga completada exitosamente")
             
@@ -168,6 +220,9 @@ class GCPTab(QWidget):
         self.project_id = None
         self.active_workers = set()
         self.transfer_manager = get_transfer_manager()
+        self.transfer_manager.resume_coordinator.register(
+            TransferType.GCP_DOWNLOAD, self._resume_gcp_download, TransferPriority.INTERACTIVE
+        )
         
         self.init_ui()
         # Auto-auth re-enabled with safe delay.
@@ -207,6 +262,7 @@ class GCPTab(QWidget):
         # Cola de transferencias (reemplaza barra de progreso simple)
         self.transfer_queue = TransferQueueWidget()
         self.transfer_queue.setMaximumHeight(200) # Limitar altura
+        self.transfer_queue.resume_requested.connect(self.on_resume_transfer)
         explorer_layout.addWidget(self.transfer_queue)
 
         # Botón de conectar manual
@@ -349,6 +405,9 @@ class GCPTab(QWidget):
             if hasattr(self, 'sync_tab'):
                 self.sync_tab.set_client(self.client)
             
+            # Con cliente ya se pueden reanudar las descargas interrumpidas
+            self.transfer_manager.resume_coordinator.resume_pending()
+            
         except Exception as e:
             self.connection_status.setText(f"❌ Error de conexión: {str(e)}")
             self.connect_btn.setEnabled(True)
@@ -471,13 +530,27 @@ class GCPTab(QWidget):
         if not self.current_bucket: return
         self.objects_tree.clear()
         
-        worker = GCPWorker(lambda: list(self.client.list_blobs(self.current_bucket)))
+        worker = GCPWorker(self._list_and_index_blobs, self.current_bucket)
         worker.finished.connect(self.on_objects_loaded)
         worker.finished.connect(lambda: self.cleanup_worker(worker))
         
         self.active_workers.add(worker)
         worker.start()
 
+    def _list_and_index_blobs(self, bucket):
+        """Listar el bucket (hilo de fondo) y resincronizar el índice local de metadatos"""
+        blobs = list(self.client.list_blobs(bucket))
+        if OBJECT_INDEX_AVAILABLE:
+            bucket_name = getattr(bucket, 'name', bucket)
+            get_object_index().sync_pages(f"gcs:{self.project_id}", bucket_name, [[{
+                'Key': blob.name,
+                'Size': blob.size or 0,
+                'ETag': blob.etag,
+                'LastModified': blob.updated,
+                'StorageClass': blob.storage_class,
+            } for blob in blobs]])
+        return blobs
+
     def on_objects_loaded(self, success, blobs, message):
         if success:
             # Diccionario para mapear rutas a nodos del árbol
@@ -645,7 +718,9 @@ class GCPTab(QWidget):
                 blob.name,
                 f"gcp://{self.current_bucket.name}/{blob.name}", 
                 save_path, 
-                blob.size or 0
+                blob.size or 0,
+                bucket_name=self.current_bucket.name,
+                blob_name=blob.name,
             )
             
             # Usar GCPDownloadWorker integrado
@@ -654,10 +729,34 @@ class GCPTab(QWidget):
             worker.finished.connect(lambda s, m: self.cleanup_worker(worker))
             
             self.active_workers.add(worker)
-            worker.start()
+            self.transfer_manager.start_worker(worker, transfer_id, TransferPriority.INTERACTIVE)
             
             self.connection_status.setText(f"🚀 Iniciando descarga de {blob.name}...")
 
+    def _resume_gcp_download(self, transfer):
+        """Adaptador de reanudación: continuar la descarga desde el archivo parcial"""
+        if not self.client:
+            raise ResumeNotReady("Conéctate a GCP para reanudar la descarga")
+        if not transfer.bucket_name or not transfer.blob_name:
+            raise ValueError("La transferencia no guarda bucket ni objeto de origen")
+        blob = self.client.bucket(transfer.bucket_name).get_blob(transfer.blob_name)
+        if blob is None:
+            raise FileNotFoundError(f"El objeto ya no existe: {transfer.blob_name}")
+        worker = GCPDownloadWorker(blob, transfer.destination, transfer.id, resume=True)
+        worker.finished.connect(lambda s, m: self.cleanup_worker(worker))
+        self.active_workers.add(worker)
+        return worker
+
+    def on_resume_transfer(self, transfer_id):
+        try:
+            self.transfer_manager.resume_coordinator.resume(transfer_id)
+        except ResumeNotReady as e:
+            QMessageBox.warning(self, "GCP", str(e))
+        except KeyError:
+            QMessageBox.warning(self, "GCP", "Este tipo de transferencia no se puede reanudar.")
+        except Exception as e:
+            QMessageBox.critical(self, "GCP", f"No se pudo reanudar: {str(e)}")
+
     def _download_thread(self, blob, save_path):
         # Legacy stub
         blob.download_to_filename(save_path)
@@ -16,6 +16,10 @@ from drive_detector import DriveDetector
 from startup_manager import StartupManager
 from notification_manager import NotificationManager, NotificationType
 from core.task_runner import TaskRunner
+from transfer_manager import get_transfer_manager, TransferType, TransferStatus
+from core.transfer_scheduler import DOWNLOAD, UPLOAD, TransferPriority
+from core.s3_multipart import UploadManifestStore
+from core.resume_coordinator import ResumeNotReady
 from multiple_mount_manager import MultipleMountManager
 from ui.multi_mounts_widget import MultiMountsWidget
 from ui.tools_tab import ToolsTab
@@ -69,27 +73,135 @@ except ImportError:
     logger = None
 
 import os
+import threading
+import time
 
 class UploadThread(QThread):
+    """Subida de un archivo a S3; la multiparte se reanuda desde su manifiesto"""
+    progress = pyqtSignal(int)
     finished = pyqtSignal(bool, dict)
 
-    def __init__(self, s3_handler, bucket_name, file_path):
+    def __init__(self, s3_handler, bucket_name, file_path, transfer_id=None, object_name=None):
         super().__init__()
         self.s3_handler = s3_handler
         self.bucket_name = bucket_name
         self.file_path = file_path
+        self.object_name = object_name or os.path.basename(file_path)
+        self.transfer_id = transfer_id
+        self.transfer_manager = get_transfer_manager() if transfer_id else None
+        self._cancel_event = threading.Event()
+        self.transfer_priority = TransferPriority.INTERACTIVE
+        self._upload_id_recorded = False
 
     def run(self):
+        file_name = os.path.basename(self.file_path)
         try:
-            success = self.s3_handler.upload_file(self.bucket_name, self.file_path)
-            file_name = os.path.basename(self.file_path)
-            if success:
-                self.finished.emit(True, {"file": file_name})
-            else:
-                error_message = getattr(self.s3_handler, "last_error", "") or ""
-                self.finished.emit(False, {"file": file_name, "error": error_message})
+            success = self.s3_handler.upload_file(
+                self.bucket_name, self.file_path, self.object_name,
+                progress_callback=self._on_part_uploaded,
+                cancel_event=self._cancel_event,
+            )
+            if self._cancel_event.is_set():
+                # Pausa: las partes enviadas siguen en el manifiesto multiparte
+                self.finished.emit(False, {"file": file_name, "error": "Subida pausada"})
+                return
+            error_message = "" if success else (getattr(self.s3_handler, "last_error", "") or "")
+            if self.transfer_manager:
+                self.transfer_manager.complete_transfer(self.transfer_id, success, error_message)
+            self.finished.emit(success, {"file": file_name, "error": error_message})
         except Exception as e:
-            self.finished.emit(False, {"file": os.path.basename(self.file_path), "error": str(e)})
+            if self.transfer_manager:
+                self.transfer_manager.complete_transfer(self.transfer_id, False, str(e))
+            self.finished.emit(False, {"file": file_name, "error": str(e)})
+
+    def _on_part_uploaded(self, part_number, part_bytes, bytes_done, total_bytes):
+        """Progreso por parte del motor multiparte (se llama desde hilos del pool)"""
+        self.progress.emit(int(bytes_done * 100 / total_bytes) if total_bytes else 100)
+        if not self.transfer_manager:
+            return
+        self.transfer_manager.throttle(UPLOAD, part_bytes, self.transfer_priority, self._cancel_event)
+        self.transfer_manager.update_progress(self.transfer_id, bytes_done, "", total_bytes)
+        if not self._upload_id_recorded:
+            self._record_upload_id()
+
+    def _record_upload_id(self):
+        """Guardar en la transferencia el UploadId que el motor dejó en el manifiesto"""
+        store = getattr(self.s3_handler, "manifest_store", None)
+        transfer = self.transfer_manager.get_transfer(self.transfer_id)
+        record = store.get(transfer.manifest_key) if store and transfer and transfer.manifest_key else None
+        self._upload_id_recorded = True
+        if record and record.get("upload_id") != transfer.upload_id:
+            self.transfer_manager.update_transfer(self.transfer_id, upload_id=record["upload_id"])
+
+    def stop(self):
+        self._cancel_event.set()
+
+
+class DownloadThread(QThread):
+    """Restauración de un objeto S3 con descarga segmentada y reanudable"""
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(bool, dict)
+
+    # Intervalo mínimo entre actualizaciones del TransferManager (segundos)
+    PROGRESS_INTERVAL = 0.5
+
+    def __init__(self, s3_handler, bucket_name, object_name, file_path, transfer_id=None):
+        super().__init__()
+        self.s3_handler = s3_handler
+        self.bucket_name = bucket_name
+        self.object_name = object_name
+        self.file_path = file_path
+        self.transfer_id = transfer_id
+        self.transfer_manager = get_transfer_manager() if transfer_id else None
+        self._cancel_event = threading.Event()
+        self._last_report = 0.0
+        self.transfer_priority = TransferPriority.INTERACTIVE
+        # Bytes ya descontados del límite de banda (None hasta el primer aviso)
+        self._throttled_bytes = None
+        self._throttle_lock = threading.Lock()
+
+    def run(self):
+        file_name = os.path.basename(self.file_path)
+        try:
+            success = self.s3_handler.download_file(
+                self.bucket_name, self.object_name, self.file_path,
+                progress_callback=self._on_progress,
+                cancel_event=self._cancel_event,
+            )
+            if self._cancel_event.is_set():
+                # Pausa: el TransferManager ya refleja el estado y los segmentos se conservan
+                self.finished.emit(False, {"file": file_name, "error": "Descarga pausada"})
+                return
+            error_message = "" if success else (getattr(self.s3_handler, "last_error", "") or "")
+            if self.transfer_manager:
+                self.transfer_manager.record_integrity(
+                    self.transfer_id, getattr(self.s3_handler, "last_integrity", None))
+                self.transfer_manager.complete_transfer(self.transfer_id, success, error_message)
+            self.finished.emit(success, {"file": file_name, "error": error_message})
+        except Exception as e:
+            if self.transfer_manager:
+                self.transfer_manager.complete_transfer(self.transfer_id, False, str(e))
+            self.finished.emit(False, {"file": file_name, "error": str(e)})
+
+    def _on_progress(self, bytes_done, total_bytes):
+        if self.transfer_manager:
+            # Los avisos llegan desde los hilos de los segmentos: frenar al que avisa
+            with self._throttle_lock:
+                # El primer aviso (tras reanudar) solo fija la base, no se cobra
+                delta = 0 if self._throttled_bytes is None else bytes_done - self._throttled_bytes
+                self._throttled_bytes = max(bytes_done, self._throttled_bytes or 0)
+            if delta > 0:
+                self.transfer_manager.throttle(DOWNLOAD, delta, self.transfer_priority, self._cancel_event)
+        now = time.monotonic()
+        if bytes_done < total_bytes and now - self._last_report < self.PROGRESS_INTERVAL:
+            return
+        self._last_report = now
+        self.progress.emit(int(bytes_done * 100 / total_bytes) if total_bytes else 100)
+        if self.transfer_manager:
+            self.transfer_manager.update_progress(self.transfer_id, bytes_done, "", total_bytes)
+
+    def stop(self):
+        self._cancel_event.set()
 
 
 class BackupThread(QThread):
@@ -114,18 +226,35 @@ class BackupThread(QThread):
                 self.finished.emit(False, {"reason": "no_files"})
                 return
 
-            for index, file_path in enumerate(files, start=1):
-                relative_path = os.path.relpath(file_path, self.folder_path)
-                self.progress.emit(
-                    int(((index - 1) * 100) / total),
-                    {
-                        "current": index,
-                        "total": total,
-                        "file": relative_path,
-                    },
-                )
-                self.s3_handler.upload_file(self.bucket_name, file_path, relative_path)
-            
+            last_percent = -1
+
+            def on_file_done(done, bytes_done, errors, key):
+                # Un aviso por punto porcentual: miles de archivos no saturan la UI
+                nonlocal last_percent
+                percent = int(done * 100 / total)
+                if percent != last_percent or done == total:
+                    last_percent = percent
+                    self.progress.emit(percent, {"current": done, "total": total, "file": key})
+
+            # Plano de datos asíncrono: cientos de PUTs en vuelo en lugar de uno por archivo;
+            # los archivos que ya están en el bucket sin cambios no se vuelven a enviar
+            ok = self.s3_handler.upload_files(
+                self.bucket_name,
+                [(file_path, os.path.relpath(file_path, self.folder_path)) for file_path in files],
+                progress_callback=on_file_done,
+                skip_unchanged=True,
+                remote_prefix='',
+            )
+            if not ok:
+                result = self.s3_handler.last_batch_result
+                self.finished.emit(False, {
+                    "reason": "upload_errors",
+                    "detail": self.s3_handler.last_error or "",
+                    "total": total,
+                    "errors": list(result.errors) if result else [],
+                })
+                return
+
             self.finished.emit(True, {"total": total})
         except Exception as e:
             self.finished.emit(False, {"reason": "exception", "detail": str(e)})
@@ -148,6 +277,18 @@ class MainWindow(QMainWindow):
         self.config_manager = ConfigManager()
         self.s3_handler = None
         self.rclone_manager = RcloneManager(self.config_manager)
+        # Planificador global (transferencias simultáneas y límites de banda) y
+        # reanudación automática, antes de que las pestañas creen workers
+        transfer_settings = self.config_manager.get_transfer_settings()
+        transfer_manager = get_transfer_manager()
+        transfer_manager.configure_scheduler(transfer_settings)
+        transfer_manager.resume_coordinator.enabled = transfer_settings['auto_resume_transfers']
+        transfer_manager.resume_coordinator.register(
+            TransferType.S3_DOWNLOAD, self._resume_s3_download, TransferPriority.INTERACTIVE
+        )
+        transfer_manager.resume_coordinator.register(
+            TransferType.S3_UPLOAD, self._resume_s3_upload, TransferPriority.INTERACTIVE
+        )
         self.multiple_mount_manager = None
         self.real_time_sync = None
         self.upload_thread = None
@@ -163,6 +304,7 @@ class MainWindow(QMainWindow):
         self.task_runner = TaskRunner(self)
         self._refreshing_buckets = False
         self._current_bucket_handler = None
+        self._reconciling_buckets = set()
         
         # ===== QUICK WINS: Inicializar gestores =====
         # Gestor de inicio automático
@@ -275,9 +417,19 @@ class MainWindow(QMainWindow):
         self.setup_tray_icon()
         self.update_background_button_text()
         
+        # Reanudación automática de lo que un cierre o caída dejó a medias: las
+        # pestañas ya registraron sus adaptadores y reintentan al conectarse
+        QTimer.singleShot(3000, get_transfer_manager().resume_coordinator.resume_pending)
+        
         # ===== MEJORA #52: Inicializar dashboard =====
         if hasattr(self, 'dashboard_tab'):
             QTimer.singleShot(1000, self.update_dashboard_stats)
+            # Velocidad en vivo: el TransferManager avisa como mucho una vez por segundo
+            get_transfer_manager().aggregate_metrics_updated.connect(
+                lambda metrics: self.dashboard_tab.update_stats(
+                    {'transfer_speed': metrics.get('rate_ewma', 0.0) / (1024 * 1024)}
+                )
+            )
         
         # ===== MEJORA #56: Atajos de Teclado =====
         try:
@@ -740,6 +892,12 @@ class MainWindow(QMainWindow):
 
     def _execute_shutdown_tasks(self):
         """Realizar tareas de limpieza antes de salir"""
+        # Progreso de transferencias aún no escrito al diario (rebote de escrituras)
+        try:
+            get_transfer_manager().flush_progress()
+        except Exception:
+            pass
+
         # Si se cerró sin desmontar, no mostrar diálogos
         if self._close_without_unmount:
             # Solo detener sincronización silenciosamente
@@ -946,8 +1104,11 @@ class MainWindow(QMainWindow):
         self.upload_button.clicked.connect(self.upload_file)
         self.backup_button = QPushButton(self.tr("backup_folder"))
         self.backup_button.clicked.connect(self.full_backup)
+        self.restore_button = QPushButton("⬇️ Restaurar archivo")
+        self.restore_button.clicked.connect(self.restore_file)
         buttons_layout.addWidget(self.upload_button)
         buttons_layout.addWidget(self.backup_button)
+        buttons_layout.addWidget(self.restore_button)
         
         actions_layout.addLayout(buttons_layout)
         actions_group.setLayout(actions_layout)
@@ -1450,6 +1611,7 @@ class MainWindow(QMainWindow):
             self.statusBar().showMessage(self.tr("buckets_found").format(len(buckets)))
             if LOGGING_AVAILABLE:
                 logger.info(f"Buckets cargados exitosamente: {len(buckets)}")
+            self._cleanup_stale_uploads(buckets)
         else:
             self.statusBar().showMessage(self.tr("no_buckets_found"))
             if LOGGING_AVAILABLE:
@@ -1463,6 +1625,18 @@ class MainWindow(QMainWindow):
         # Actualizar dashboard con métricas posiblemente nuevas
         self.update_dashboard_stats(force_remote=force_remote)
 
+    def _cleanup_stale_uploads(self, buckets):
+        """Abortar en segundo plano las subidas multiparte huérfanas (una vez por perfil)"""
+        handler = self.s3_handler
+        if not handler or getattr(self, '_stale_cleanup_handler', None) is handler:
+            return
+        self._stale_cleanup_handler = handler
+
+        def cleanup():
+            return sum(len(handler.cleanup_stale_uploads(bucket)) for bucket in buckets)
+
+        self.task_runner.run(cleanup, description=f"cleanup_stale_uploads[{handler.host_base}]")
+
     def refresh_profiles_list(self):
         """Refresh the list of available profiles (Vultr + MEGA)"""
         current = self.profile_selector.currentText()
@@ -1529,6 +1703,7 @@ class MainWindow(QMainWindow):
             # Enable file operations (will use rclone instead of S3)
             self.upload_button.setEnabled(True) 
             self.backup_button.setEnabled(True)
+            self.restore_button.setEnabled(False)
             return
 
         # 2. It is a Vultr S3 Profile
@@ -1541,6 +1716,7 @@ class MainWindow(QMainWindow):
         # delete button depends on selection
         self.upload_button.setEnabled(True)
         self.backup_button.setEnabled(True)
+        self.restore_button.setEnabled(True)
 
         config = self.config_manager.get_config(profile_name)
         if config:
@@ -1571,7 +1747,13 @@ class MainWindow(QMainWindow):
                     return
                 
                 # Intentar crear el handler
-                self.s3_handler = S3Handler(access_key, secret_key, host_base)
+                transfer_settings = self.config_manager.get_transfer_settings()
+                self.s3_handler = S3Handler(
+                    access_key, secret_key, host_base,
+                    transfer_plan=self.config_manager.get_active_plan_config(),
+                    stale_upload_hours=transfer_settings['stale_upload_hours'],
+                    max_pool_connections=transfer_settings['max_pool_connections']
+                )
                 self.statusBar().showMessage(self.tr("profile_loaded").format(profile_name))
                 
                 if LOGGING_AVAILABLE:
@@ -1656,13 +1838,36 @@ class MainWindow(QMainWindow):
         file_path, _ = QFileDialog.getOpenFileName(self, self.tr("dialog_select_upload_file"))
         if file_path:
             bucket_name = self.bucket_selector.currentText()
+            object_name = os.path.basename(file_path)
+            destination = f"{bucket_name}/{object_name}"
+            transfer_manager = get_transfer_manager()
+
+            # Reutilizar una subida interrumpida del mismo archivo y destino
+            transfer_id = None
+            for transfer in transfer_manager.get_all_transfers():
+                if (transfer.transfer_type == TransferType.S3_UPLOAD.value
+                        and transfer.source == file_path and transfer.destination == destination
+                        and transfer.status in (TransferStatus.PAUSED.value, TransferStatus.ERROR.value,
+                                                TransferStatus.QUEUED.value)):
+                    transfer_id = transfer.id
+                    break
+            if transfer_id is None:
+                transfer_id = transfer_manager.create_transfer(
+                    TransferType.S3_UPLOAD, object_name, file_path, destination,
+                    os.path.getsize(file_path),
+                    bucket_name=bucket_name, blob_name=object_name,
+                    profile_name=self.config_manager.get_active_profile(),
+                    manifest_key=UploadManifestStore.make_key(self.s3_handler.host_base, bucket_name, object_name),
+                )
+
             self.progress_bar.setVisible(True)
             self.progress_bar.setValue(0)
-            self.statusBar().showMessage(self.tr("status_uploading_file").format(os.path.basename(file_path)))
+            self.statusBar().showMessage(self.tr("status_uploading_file").format(object_name))
             
-            self.upload_thread = UploadThread(self.s3_handler, bucket_name, file_path)
+            self.upload_thread = UploadThread(self.s3_handler, bucket_name, file_path, transfer_id)
+            self.upload_thread.progress.connect(self.progress_bar.setValue)
             self.upload_thread.finished.connect(self.upload_finished)
-            self.upload_thread.start()
+            transfer_manager.start_worker(self.upload_thread, transfer_id, TransferPriority.INTERACTIVE)
 
     def upload_finished(self, success, payload):
         self.progress_bar.setVisible(False)
@@ -1691,6 +1896,110 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, self.tr("error"), message)
             self.statusBar().showMessage(self.tr("status_upload_failed"), 5000)
 
+    def restore_file(self):
+        """Descargar un objeto del bucket actual como transferencia reanudable"""
+        if not self.s3_handler:
+            QMessageBox.warning(self, self.tr("warning"), self.tr("select_profile_first"))
+            return
+
+        bucket_name = self.bucket_selector.currentText()
+        if not bucket_name:
+            QMessageBox.warning(self, self.tr("warning"), self.tr("no_buckets_available"))
+            return
+
+        from PyQt6.QtWidgets import QInputDialog
+        object_name, ok = QInputDialog.getText(
+            self, "⬇️ Restaurar archivo", f"Ruta del objeto en '{bucket_name}':"
+        )
+        object_name = object_name.strip() if ok else ""
+        if not object_name:
+            return
+
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Guardar como", os.path.basename(object_name.rstrip('/'))
+        )
+        if not file_path:
+            return
+
+        profile_name = self.config_manager.get_active_profile()
+        source = f"{bucket_name}/{object_name}"
+        transfer_manager = get_transfer_manager()
+
+        # Reutilizar una restauración interrumpida del mismo objeto y destino
+        transfer_id = None
+        for transfer in transfer_manager.get_all_transfers():
+            if (transfer.transfer_type == TransferType.S3_DOWNLOAD.value
+                    and transfer.source == source and transfer.destination == file_path
+                    and transfer.status in (TransferStatus.PAUSED.value, TransferStatus.ERROR.value,
+                                            TransferStatus.QUEUED.value)):
+                transfer_id = transfer.id
+                break
+        if transfer_id is None:
+            transfer_id = transfer_manager.create_transfer(
+                TransferType.S3_DOWNLOAD, os.path.basename(file_path), source, file_path,
+                bucket_name=bucket_name, blob_name=object_name, profile_name=profile_name,
+            )
+
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setValue(0)
+        self.statusBar().showMessage(f"Restaurando {object_name}...")
+
+        self.download_thread = DownloadThread(
+            self.s3_handler, bucket_name, object_name, file_path, transfer_id
+        )
+        self.download_thread.progress.connect(self.progress_bar.setValue)
+        self.download_thread.finished.connect(self.restore_finished)
+        transfer_manager.start_worker(self.download_thread, transfer_id, TransferPriority.INTERACTIVE)
+
+    def _resume_handler(self, transfer):
+        """S3Handler con las credenciales del perfil de una transferencia interrumpida"""
+        config = self.config_manager.get_config(transfer.profile_name) if transfer.profile_name else None
+        if not config:
+            raise ResumeNotReady(f"Perfil '{transfer.profile_name}' no disponible")
+        transfer_settings = self.config_manager.get_transfer_settings()
+        return S3Handler(
+            config['access_key'], config['secret_key'], config['host_base'],
+            transfer_plan=self.config_manager.get_active_plan_config(),
+            stale_upload_hours=transfer_settings['stale_upload_hours'],
+            max_pool_connections=transfer_settings['max_pool_connections']
+        )
+
+    def _resume_s3_download(self, transfer):
+        """Adaptador de reanudación: la descarga segmentada continúa desde sus segmentos"""
+        handler = self._resume_handler(transfer)
+        thread = DownloadThread(handler, transfer.bucket_name, transfer.blob_name, transfer.destination, transfer.id)
+        thread.finished.connect(self._on_resumed_restore_finished)
+        return thread
+
+    def _resume_s3_upload(self, transfer):
+        """Adaptador de reanudación: la subida multiparte envía solo las partes que faltan"""
+        if not os.path.isfile(transfer.source):
+            raise FileNotFoundError(f"El archivo de origen ya no existe: {transfer.source}")
+        handler = self._resume_handler(transfer)
+        thread = UploadThread(handler, transfer.bucket_name, transfer.source, transfer.id, transfer.blob_name)
+        thread.finished.connect(self._on_resumed_upload_finished)
+        return thread
+
+    def _on_resumed_upload_finished(self, success, payload):
+        payload = payload or {}
+        if success:
+            self.statusBar().showMessage(f"✅ {payload.get('file', '')} subido", 5000)
+
+    def _on_resumed_restore_finished(self, success, payload):
+        payload = payload or {}
+        if success:
+            self.statusBar().showMessage(f"✅ {payload.get('file', '')} restaurado", 5000)
+
+    def restore_finished(self, success, payload):
+        self.progress_bar.setVisible(False)
+        payload = payload or {}
+        if success:
+            self.statusBar().showMessage(f"✅ {payload.get('file', '')} restaurado", 5000)
+        else:
+            message = payload.get("error") or "Error al restaurar archivo"
+            QMessageBox.warning(self, self.tr("error"), message)
+            self.statusBar().showMessage(message, 5000)
+
     def full_backup(self):
         # Check if using MEGA profile
         if getattr(self, '_current_profile_type', None) == 'mega':
@@ -1741,7 +2050,8 @@ class MainWindow(QMainWindow):
             self.backup_thread = BackupThread(self.s3_handler, bucket_name, dir_path)
             self.backup_thread.progress.connect(self.backup_progress)
             self.backup_thread.finished.connect(self.backup_finished)
-            self.backup_thread.start()
+            # Copia de carpeta: trabajo de fondo, cede huecos a las restauraciones
+            get_transfer_manager().start_worker(self.backup_thread, priority=TransferPriority.BACKGROUND)
 
     def backup_progress(self, value, payload):
         self.progress_bar.setValue(value)
@@ -1771,7 +2081,7 @@ class MainWindow(QMainWindow):
             reason = payload.get("reason")
             if reason == "no_files":
                 message = self.tr("backup_no_files")
-            elif reason == "exception":
+            elif reason in ("exception", "upload_errors"):
                 detail = payload.get("detail", "")
                 message = self.tr("backup_error_dialog").format(detail)
             else:
@@ -2499,6 +2809,28 @@ class MainWindow(QMainWindow):
                 error_message=error_message
             )
     
+    def _schedule_bucket_size_reconcile(self, bucket_name):
+        """Reconciliar el tamaño del bucket con un escaneo completo a baja prioridad"""
+        handler = self.s3_handler
+        pending = self._reconciling_buckets
+        key = (id(handler), bucket_name)
+        if key in pending:
+            return
+        pending.add(key)
+
+        def on_success(result):
+            if handler is self.s3_handler and result and result[1] is None:
+                self.update_dashboard_stats()
+
+        self.task_runner.run(
+            handler.reconcile_bucket_size,
+            bucket_name,
+            on_success=on_success,
+            on_finished=lambda: pending.discard(key),
+            description=f"reconcile_bucket_size[{bucket_name}]",
+            low_priority=True,
+        )
+
     def update_dashboard_stats(self, force_remote=False):
         """Actualizar estadísticas del dashboard (Mejora #52)"""
         if not hasattr(self, 'dashboard_tab'):
@@ -2512,8 +2844,11 @@ class MainWindow(QMainWindow):
             if self.s3_handler and self.bucket_selector.count() > 0:
                 try:
                     bucket_name = self.bucket_selector.currentText()
-                    # Obtener tamaño real del bucket
-                    space_used, error_msg = self.s3_handler.get_bucket_size(bucket_name, use_cache=not force_remote)
+                    # Tamaño desde el libro incremental (O(1)); el escaneo completo va en segundo plano
+                    space_used, error_msg = self.s3_handler.get_bucket_size(bucket_name)
+                    reconcile_hours = self.config_manager.get_transfer_settings()['bucket_size_reconcile_hours']
+                    if force_remote or self.s3_handler.needs_size_reconcile(bucket_name, reconcile_hours):
+                        self._schedule_bucket_size_reconcile(bucket_name)
 
                     if error_msg:
                         if LOGGING_AVAILABLE:
@@ -2547,8 +2882,11 @@ class MainWindow(QMainWindow):
             # Obtener archivos sincronizados hoy
             stats['files_synced_today'] = 0  # TODO: Implementar contador
             
-            # Velocidad de transferencia
-            stats['transfer_speed'] = 0.0  # TODO: Implementar
+            # Velocidad de transferencia (EWMA agregada de las transferencias en curso, MB/s)
+            try:
+                stats['transfer_speed'] = get_transfer_manager().get_aggregate_metrics().rate_ewma / (1024 * 1024)
+            except Exception:
+                stats['transfer_speed'] = 0.0
             
             # Última sincronización
             if self.real_time_sync and self.real_time_sync.is_running():
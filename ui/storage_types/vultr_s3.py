@@ -101,11 +101,35 @@ class VultrS3Storage(BaseStorage):
         """Lista el contenido de un bucket o ruta"""
         # Para S3, path debería ser "bucket_name" o "bucket_name/folder"
         try:
-            buckets = self.rclone_manager.list_buckets_rclone(account.id)
-            items = [
-                StorageItem(name=b, path=f"/{b}", is_dir=True)
-                for b in buckets
-            ]
+            parts = path.strip('/').split('/', 1)
+            if not parts[0]:
+                buckets = self.rclone_manager.list_buckets_rclone(account.id)
+                items = [
+                    StorageItem(name=b, path=f"/{b}", is_dir=True)
+                    for b in buckets
+                ]
+                return items, ""
+
+            # Navegación por carpetas: índice local si está al día, si no listado con delimitador '/'
+            bucket = parts[0]
+            prefix = f"{parts[1].rstrip('/')}/" if len(parts) > 1 and parts[1] else ""
+            handler = self._get_s3_handler(account)
+            folders, objects = handler.list_folder(bucket, prefix)
+            items = []
+            for folder in folders:
+                name = folder[len(prefix):].rstrip('/')
+                items.append(StorageItem(name=name, path=f"/{bucket}/{folder}", is_dir=True))
+            for obj in objects:
+                if obj['Key'] == prefix:
+                    continue  # Marcador de carpeta
+                modified = obj.get('LastModified')
+                items.append(StorageItem(
+                    name=obj['Key'][len(prefix):],
+                    path=f"/{bucket}/{obj['Key']}",
+                    is_dir=False,
+                    size=obj.get('Size', 0),
+                    modified=modified.isoformat() if modified else None
+                ))
             return items, ""
         except Exception as e:
             return [], str(e)
@@ -203,6 +227,7 @@ class VultrS3Storage(BaseStorage):
             self._s3_handlers[account.id] = S3Handler(
                 account.config.get('access_key'),
                 account.config.get('secret_key'),
-                account.config.get('host_base')
+                account.config.get('host_base'),
+                transfer_plan=self.config_manager.get_active_plan_config()
             )
         return self._s3_handlers[account.id]
@@ -6,13 +6,22 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QObject, QEvent
 from ui.plan_editor import PlanEditorDialog
 import os
+import threading
+
+try:
+    from transfer_manager import get_transfer_manager
+    from core.transfer_scheduler import UPLOAD, TransferPriority
+    TRANSFER_MANAGER_AVAILABLE = True
+except ImportError:
+    TRANSFER_MANAGER_AVAILABLE = False
 
 class SmartUploadWorker(QThread):
     progress_update = pyqtSignal(str)
     status_update = pyqtSignal(str)
     finished = pyqtSignal(bool, str)
 
-    def __init__(self, rclone_manager, profile_name, source_folder, bucket_name, do_zip, do_sync, reuse_zip, **kwargs):
+    def __init__(self, rclone_manager, profile_name, source_folder, bucket_name, do_zip, do_sync, reuse_zip,
+                 dedup=False, **kwargs):
         super().__init__()
         self.rclone_manager = rclone_manager
         self.profile_name = profile_name
@@ -21,12 +30,15 @@ class SmartUploadWorker(QThread):
         self.do_zip = do_zip
         self.do_sync = do_sync
         self.reuse_zip = reuse_zip
+        self.dedup = dedup
         self.extra_params = kwargs  # transfers, checkers, tpslimit, burst ...
         self.is_running = True
         self._is_cancelled = False
+        self._cancel_event = threading.Event()
 
     def cancel(self):
         self._is_cancelled = True
+        self._cancel_event.set()
         self.is_running = False
         self.status_update.emit("⚠️ Cancelando operación...")
 
@@ -37,8 +49,31 @@ class SmartUploadWorker(QThread):
                 if self._is_cancelled:
                     raise Exception("Operación cancelada por el usuario")
 
-            # 1. Backup ZIP (Si está activado)
-            if self.do_zip:
+            # 1a. Backup deduplicado: sustituye al ZIP completo
+            if self.do_zip and self.dedup:
+                check_cancel()
+                self.status_update.emit("🧩 Backup deduplicado: subiendo solo fragmentos nuevos...")
+
+                def dedup_callback(msg):
+                    self.progress_update.emit(f"[DEDUP] {msg}")
+
+                success, msg = self.rclone_manager.dedup_backup(
+                    self.profile_name,
+                    self.source_folder,
+                    self.bucket_name,
+                    progress_callback=dedup_callback,
+                    cancel_event=self._cancel_event,
+                    **self.extra_params
+                )
+
+                check_cancel()
+                if not success:
+                    self.finished.emit(False, f"Error en backup deduplicado: {msg}")
+                    return
+                self.status_update.emit(f"✅ {msg}")
+
+            # 1b. Backup ZIP (Si está activado)
+            elif self.do_zip:
                 check_cancel()
                 zip_path = None
                 
@@ -225,12 +260,19 @@ class ToolsTab(QWidget):
         self.chk_reuse_zip.setStyleSheet("margin-left: 20px; color: #f39c12;")
         # Deshabilitar si chk_zip no está marcado
         self.chk_zip.toggled.connect(self.chk_reuse_zip.setEnabled)
+
+        self.chk_dedup = QCheckBox("🧩 Deduplicado (solo fragmentos nuevos)")
+        self.chk_dedup.setToolTip("En lugar de un ZIP completo, sube solo los fragmentos que cambiaron desde el último backup.")
+        self.chk_dedup.setStyleSheet("margin-left: 20px; color: #27ae60;")
+        self.chk_zip.toggled.connect(self.chk_dedup.setEnabled)
+        self.chk_dedup.toggled.connect(lambda checked: self.chk_reuse_zip.setEnabled(not checked and self.chk_zip.isChecked()))
         
         self.chk_sync = QCheckBox("⚡ Video Sincronización (Carpetas)")
         self.chk_sync.setChecked(True)
         
         modes_layout.addWidget(self.chk_zip)
         modes_layout.addWidget(self.chk_reuse_zip)
+        modes_layout.addWidget(self.chk_dedup)
         modes_layout.addWidget(self.chk_sync)
         modes_group.setLayout(modes_layout)
         left_layout.addWidget(modes_group)
@@ -432,6 +474,7 @@ class ToolsTab(QWidget):
     def install_help_filters(self):
         helps = {
             self.chk_zip: "<h3>📦 Backup Comprimido (.zip)</h3><p>Crea un archivo ZIP de toda la carpeta antes de subirlo. Útil para históricos.</p>",
+            self.chk_dedup: "<h3>🧩 Backup Deduplicado</h3><p>Corta los archivos en fragmentos por contenido y sube solo los que el bucket no tiene. Cada backup queda como una instantánea restaurable.</p>",
             self.chk_sync: "<h3>⚡ Video Sincronización</h3><p>Sube archivo a archivo con alto paralelismo.</p>",
             self.plan_selector: "<h3>⚙️ Perfil de Rendimiento</h3><p>Selecciona la agresividad de la subida.</p><ul><li><b>Ultra</b>: 320 hilos. Máxima velocidad.</li><li><b>Balanced</b>: 32 hilos. Uso normal.</li><li><b>Stability</b>: 4 hilos. Redes lentas.</li></ul>",
             self.bucket_selector: "<h3>🪣 Bucket Destino</h3><p>Dónde se guardarán los archivos en Vultr.</p>",
@@ -494,6 +537,7 @@ class ToolsTab(QWidget):
         do_zip = self.chk_zip.isChecked()
         do_sync = self.chk_sync.isChecked()
         reuse_zip = self.chk_reuse_zip.isChecked()
+        dedup = do_zip and self.chk_dedup.isChecked()
 
         if not do_zip and not do_sync:
             QMessageBox.warning(self, "Error", "Elige ZIP, Sync o ambos.")
@@ -511,16 +555,34 @@ class ToolsTab(QWidget):
             # Fallback seguro
             plan_config = {'transfers': '32', 'checkers': '32'}
 
+        transfer_manager = get_transfer_manager() if TRANSFER_MANAGER_AVAILABLE else None
+        if transfer_manager:
+            # rclone no pasa por el token bucket: se le aplica el límite global de subida
+            bwlimit = transfer_manager.scheduler.rclone_bwlimit(UPLOAD)
+            if bwlimit:
+                plan_config = dict(plan_config, bwlimit=bwlimit)
+
         self.worker = SmartUploadWorker(
-            self.rclone_manager, profile, folder, bucket, do_zip, do_sync, reuse_zip, **plan_config
+            self.rclone_manager, profile, folder, bucket, do_zip, do_sync, reuse_zip, dedup=dedup, **plan_config
         )
         self.worker.progress_update.connect(self.append_log)
         self.worker.status_update.connect(self.update_status)
         self.worker.finished.connect(self.on_finished)
-        self.worker.start()
+        self.worker_ticket = None
+        if transfer_manager:
+            self.worker_ticket = transfer_manager.start_worker(self.worker, priority=TransferPriority.BACKGROUND)
+            if transfer_manager.scheduler.is_queued(self.worker_ticket):
+                self.update_status("⏳ En cola: esperando a que terminen otras transferencias...")
+        else:
+            self.worker.start()
 
     def cancel_upload(self):
         """Cancela la subida actual"""
+        ticket = getattr(self, 'worker_ticket', None)
+        if ticket and get_transfer_manager().scheduler.cancel(ticket):
+            # Aún no había arrancado: basta con sacarlo de la cola
+            self.on_finished(False, "🛑 Operación cancelada por el usuario.")
+            return
         if hasattr(self, 'worker') and self.worker and self.worker.isRunning():
             self.update_status("🛑 Solicitando cancelación...")
             self.worker.cancel()
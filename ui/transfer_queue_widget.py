@@ -9,6 +9,7 @@ from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QFont
 
 from transfer_manager import get_transfer_manager, TransferInfo, TransferStatus
+from core.transfer_metrics import format_eta, format_rate
 
 
 class TransferItemWidget(QFrame):
@@ -45,8 +46,10 @@ class TransferItemWidget(QFrame):
         type_badges = {
             "azure_to_local": ("💾 Local", "#27ae60"),
             "azure_to_gcp": ("☁️ GCP", "#3498db"),
+            "azure_to_s3": ("☁️ Vultr S3", "#e67e22"),
             "azure_to_azure": ("🔄 Azure", "#9b59b6"),
             "gcp_download": ("⬇️ GCP", "#1abc9c"),
+            "s3_download": ("⬇️ S3", "#e67e22"),
         }
         badge_text, badge_color = type_badges.get(transfer.transfer_type, ("📥", "#7f8c8d"))
         
@@ -108,6 +111,11 @@ class TransferItemWidget(QFrame):
         self.status_label.setStyleSheet("color: #bdc3c7; font-size: 12px; font-weight: 500;")
         status_row.addWidget(self.status_label, 1)
         
+        # Velocidad y tiempo restante (métricas del TransferManager)
+        self.speed_label = QLabel("")
+        self.speed_label.setStyleSheet("color: #3498db; font-size: 12px; font-weight: bold;")
+        status_row.addWidget(self.speed_label)
+        
         # Size info
         bytes_dl = transfer.bytes_transferred / (1024**3)
         bytes_total = transfer.total_bytes / (1024**3) if transfer.total_bytes > 0 else 0
@@ -208,7 +216,22 @@ class TransferItemWidget(QFrame):
         gb_total = total_bytes / (1024**3) if total_bytes > 0 else 0
         self.size_label.setText(f"{gb_dl:.2f} / {gb_total:.2f} GB")
     
+    def update_metrics(self, metrics: dict):
+        rate = metrics.get("rate_ewma", 0.0)
+        text = f"{format_rate(rate)} · ETA {format_eta(metrics.get('eta_seconds'))}"
+        if metrics.get("degraded"):
+            # Muy por debajo del pico de esta misma transferencia
+            text = f"⚠️ {text}"
+            self.speed_label.setToolTip(f"Enlace degradado (pico {format_rate(metrics.get('rate_peak', 0.0))})")
+        else:
+            self.speed_label.setToolTip(
+                f"Media {format_rate(metrics.get('rate_average', 0.0))} · "
+                f"pico {format_rate(metrics.get('rate_peak', 0.0))}"
+            )
+        self.speed_label.setText(text)
+    
     def set_finished(self, success: bool, message: str = ""):
+        self.speed_label.setText("")
         if success:
             self.status_label.setText("✅ Completado")
             self.status_label.setStyleSheet("color: #2ecc71; font-size: 10px;")
@@ -291,8 +314,10 @@ class TransferQueueWidget(QWidget):
     def connect_signals(self):
         self.manager.transfer_added.connect(self.on_transfer_added)
         self.manager.transfer_updated.connect(self.on_transfer_updated)
+        self.manager.progress_batch.connect(self.on_progress_batch)
         self.manager.transfer_finished.connect(self.on_transfer_finished)
         self.manager.transfer_removed.connect(self.on_transfer_removed)
+        self.manager.transfer_metrics_updated.connect(self.on_transfer_metrics)
     
     def load_existing_transfers(self):
         """Cargar transferencias existentes al iniciar"""
@@ -328,6 +353,23 @@ class TransferQueueWidget(QWidget):
             if transfer:
                 widget.update_size(transfer.bytes_transferred, transfer.total_bytes)
     
+    def on_progress_batch(self, batch: dict):
+        """Aplicar un lote de progreso con un único repintado del contenedor"""
+        self.transfers_container.setUpdatesEnabled(False)
+        try:
+            for transfer_id, update in batch.items():
+                widget = self.transfer_widgets.get(transfer_id)
+                if widget is None:
+                    continue
+                widget.update_progress(update["percent"], update["status_text"])
+                widget.update_size(update["bytes_transferred"], update["total_bytes"])
+        finally:
+            self.transfers_container.setUpdatesEnabled(True)
+    
+    def on_transfer_metrics(self, transfer_id: str, metrics: dict):
+        if transfer_id in self.transfer_widgets:
+            self.transfer_widgets[transfer_id].update_metrics(metrics)
+    
     def on_transfer_finished(self, transfer_id: str, success: bool, message: str):
         if transfer_id in self.transfer_widgets:
             widget = self.transfer_widgets[transfer_id]